@@ -0,0 +1,367 @@
+"""
+Vectorized reporting analytics.
+
+Each metric reads its fact tables once as narrow DataFrames (only the columns it needs, one
+query per table, on a streaming read connection) and computes the result with pandas/NumPy
+group-bys, cuts and searchsorted instead of looping over ORM objects in Python.
+
+The *_from_frame(s) functions take the DataFrames directly, so they can be tested and
+benchmarked on synthetic data (see benchmarks/analytics_vectorized.py). Timestamps are
+converted to FINANCIAL_TIMEZONE before being bucketed, like financial_rollups.py. Payments,
+expenses and ISP payments of closed months come from their Parquet snapshots.
+"""
+from datetime import date, datetime
+import uuid
+from zoneinfo import ZoneInfo
+
+from flask import Blueprint, current_app, has_app_context, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from app import db
+from app.models import Customer, Invoice, Vendor
+from invoice_balances import COUNTED_PAYMENT_STATUSES
+from month_snapshots import read_range
+from streaming import read_connection
+
+DEFAULT_TIMEZONE = 'Asia/Karachi'
+
+AGEING_BUCKETS = ['0-30 days', '31-60 days', '61-90 days', '90+ days']
+HEATMAP_WEEKS = 5
+# Completed ISP payments; rows from before the status column have none
+ISP_PAYMENT_STATUSES = ('completed', None)
+# Roles allowed to see the company dashboards, like /dashboard/unified-financial
+DASHBOARD_ROLES = ('super_admin', 'company_owner')
+MONTH_ABBREVIATIONS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def _timezone():
+    name = DEFAULT_TIMEZONE
+    if has_app_context():
+        name = current_app.config.get('FINANCIAL_TIMEZONE', DEFAULT_TIMEZONE)
+    return ZoneInfo(name)
+
+
+def read_frame(statement, parse_dates=None):
+    """
+    Run a (narrow) select on a dedicated read connection and return it as a DataFrame.
+    """
+    with read_connection() as connection:
+        return pd.read_sql(statement, connection, parse_dates=parse_dates)
+
+
+def local_times(series, tz=None):
+    """Timestamps as naive local times, for bucketing into local months/weeks."""
+    return pd.to_datetime(series, utc=True).dt.tz_convert(tz or _timezone()).dt.tz_localize(None)
+
+
+def month_numbers(times):
+    """Months since year 0 (year * 12 + month - 1), as plain integers for fast bucketing."""
+    return times.dt.year.to_numpy(dtype=np.int64) * 12 + times.dt.month.to_numpy(dtype=np.int64) - 1
+
+
+def month_window(months, today=None):
+    """The last `months` months up to and including today's, as month numbers."""
+    today = today or datetime.now(_timezone()).date()
+    current = today.year * 12 + today.month - 1
+    return np.arange(current - months + 1, current + 1, dtype=np.int64)
+
+
+def _month_label(month_number):
+    return f"{month_number // 12:04d}-{month_number % 12 + 1:02d}"
+
+
+def monthly_sums(month_nums, values, window):
+    """Sum of `values` per month in `window` (zeros for empty months)."""
+    sums = pd.Series(values).groupby(month_nums).sum()
+    return sums.reindex(window, fill_value=0).to_numpy(dtype=float)
+
+
+def monthly_counts(month_nums, window):
+    counts = pd.Series(month_nums).value_counts()
+    return counts.reindex(window, fill_value=0).to_numpy(dtype=np.int64)
+
+
+def revenue_trend_from_frames(payments, expenses, isp_payments, window):
+    """
+    Monthly revenue (counted payments), expenses (business + ISP) and profit.
+
+    Args:
+        payments: DataFrame with local `when` timestamps and `amount`
+        expenses: same, for expenses
+        isp_payments: same, for ISP payments
+        window: month numbers from month_window()
+    """
+    def sums(frame):
+        return monthly_sums(month_numbers(frame['when']), frame['amount'].to_numpy(dtype=float), window)
+
+    revenue = sums(payments)
+    spent = sums(expenses) + sums(isp_payments)
+    profit = revenue - spent
+
+    return [
+        {'month': _month_label(m), 'revenue': round(r, 2), 'expenses': round(e, 2), 'profit': round(p, 2)}
+        for m, r, e, p in zip(window.tolist(), revenue.tolist(), spent.tolist(), profit.tolist())
+    ]
+
+
+def customer_growth_from_frame(customers, window):
+    """
+    New, churned and total active customers per month.
+
+    A customer counts from its installation month; inactive customers count as churned in
+    the month they were last updated (there is no separate deactivation date).
+
+    Args:
+        customers: DataFrame with `installed` (dates), `is_active` and local `updated` timestamps
+        window: month numbers from month_window()
+    """
+    installed = month_numbers(pd.to_datetime(customers['installed']))
+    inactive = customers[(customers['is_active'] == False) & customers['updated'].notna()]
+    churned = month_numbers(inactive['updated'])
+
+    new = monthly_counts(installed, window)
+    lost = monthly_counts(churned, window)
+    # Customers installed / churned up to the end of each month
+    total = np.searchsorted(np.sort(installed), window, side='right') - np.searchsorted(np.sort(churned), window, side='right')
+
+    return [
+        {
+            'month': _month_label(m),
+            'month_short': MONTH_ABBREVIATIONS[m % 12],
+            'new': int(n),
+            'churned': int(c),
+            'total': int(t),
+        }
+        for m, n, c, t in zip(window.tolist(), new.tolist(), lost.tolist(), total.tolist())
+    ]
+
+
+def collections_ageing_from_frames(open_invoices, payments, as_of, window):
+    """
+    Outstanding invoice amounts by days past due, plus monthly collection counts/amounts.
+
+    Args:
+        open_invoices: DataFrame with `due_date` and `remaining_amount` (> 0)
+        payments: DataFrame with local `when` timestamps and `amount`
+        as_of: Date the ageing is measured at
+        window: month numbers for the collection trend
+    """
+    days_overdue = (pd.Timestamp(as_of) - pd.to_datetime(open_invoices['due_date'])).dt.days
+    buckets = pd.cut(days_overdue, bins=[-np.inf, 30, 60, 90, np.inf], labels=AGEING_BUCKETS)
+    ageing = open_invoices['remaining_amount'].astype(float).groupby(buckets, observed=False).sum()
+
+    payment_months = month_numbers(payments['when'])
+    amounts = monthly_sums(payment_months, payments['amount'].to_numpy(dtype=float), window)
+    counts = monthly_counts(payment_months, window)
+
+    return {
+        'aging_analysis': [
+            {'bucket': bucket, 'amount': round(float(ageing.get(bucket, 0)), 2)} for bucket in AGEING_BUCKETS
+        ],
+        'collection_trends': [
+            {'month': _month_label(m), 'payment_count': int(c), 'collection_amount': round(a, 2)}
+            for m, c, a in zip(window.tolist(), counts.tolist(), amounts.tolist())
+        ],
+        'total_outstanding': round(float(open_invoices['remaining_amount'].astype(float).sum()), 2),
+    }
+
+
+def income_heatmap_from_frame(payments):
+    """
+    Income per calendar month and week of the month (days 29-31 fall in week 5).
+
+    Args:
+        payments: DataFrame with local `when` timestamps and `amount`
+    """
+    months = payments['when'].dt.month.to_numpy() - 1
+    weeks = np.minimum((payments['when'].dt.day.to_numpy() - 1) // 7, HEATMAP_WEEKS - 1)
+
+    grid = np.zeros((12, HEATMAP_WEEKS))
+    np.add.at(grid, (months, weeks), payments['amount'].to_numpy(dtype=float))
+
+    return [
+        {'month': MONTH_ABBREVIATIONS[m], 'week': f"Week {w + 1}", 'value': round(float(grid[m, w]), 2)}
+        for m in range(12) for w in range(HEATMAP_WEEKS)
+    ]
+
+
+def _counted(frame, statuses=None):
+    """Active rows (is_active may be NULL), optionally with one of `statuses`."""
+    keep = frame['is_active'] != False
+    if statuses is not None:
+        keep &= frame['status'].isin(statuses)
+    return frame[keep]
+
+
+def _snapshot_frame(table, company_id, start, date_name, statuses=None, end=None):
+    """
+    Local `when` and `amount` of a financial table in [start, end); closed months are read
+    from their Parquet snapshots (see month_snapshots.py).
+    """
+    frame = read_range(table, company_id, start, end, columns=['amount', 'is_active', *(['status'] if statuses else [])])
+    frame = _counted(frame, statuses)
+    return pd.DataFrame({'when': local_times(frame[date_name]), 'amount': frame['amount'].to_numpy(dtype=float)})
+
+
+def _payments_frame(company_id, start=None, end=None):
+    return _snapshot_frame('payments', company_id, start, 'payment_date', COUNTED_PAYMENT_STATUSES, end)
+
+
+def _window_start(window):
+    first = int(window[0])
+    return datetime(first // 12, first % 12 + 1, 1, tzinfo=_timezone())
+
+
+def revenue_trend(company_id, months=6, today=None):
+    window = month_window(months, today)
+    start = _window_start(window)
+
+    expenses = _snapshot_frame('expenses', company_id, start, 'expense_date')
+    isp_payments = _snapshot_frame('isp_payments', company_id, start, 'payment_date', ISP_PAYMENT_STATUSES)
+
+    return revenue_trend_from_frames(_payments_frame(company_id, start), expenses, isp_payments, window)
+
+
+def customer_growth(company_id, months=6, today=None):
+    customers = read_frame(select(
+        Customer.installation_date.label('installed'), Customer.is_active, Customer.updated_at.label('updated'),
+    ).where(Customer.company_id == company_id))
+    customers['updated'] = local_times(customers['updated'])
+    return customer_growth_from_frame(customers, month_window(months, today))
+
+
+def collections_ageing(company_id, as_of=None, months=6):
+    as_of = as_of or datetime.now(_timezone()).date()
+    window = month_window(months, as_of)
+
+    open_invoices = read_frame(select(Invoice.due_date, Invoice.remaining_amount).where(
+        Invoice.company_id == company_id, Invoice.is_active == True, Invoice.remaining_amount > 0,
+    ))
+    return collections_ageing_from_frames(open_invoices, _payments_frame(company_id, _window_start(window)), as_of, window)
+
+
+def income_heatmap(company_id, year=None):
+    year = year or datetime.now(_timezone()).year
+    payments = _payments_frame(company_id, datetime(year, 1, 1, tzinfo=_timezone()), datetime(year + 1, 1, 1, tzinfo=_timezone()))
+    return income_heatmap_from_frame(payments)
+
+
+analytics_bp = Blueprint('analytics', __name__)
+
+
+def _can_view_company(company_id):
+    claims = get_jwt()
+    if claims.get('role') == 'super_admin' or str(company_id) == str(claims.get('company_id')):
+        return True
+    if not claims.get('company_id'):
+        return False
+    # Vendor companies are visible to the company that manages the vendor
+    return db.session.query(Vendor.id).filter(
+        Vendor.company_id == uuid.UUID(str(claims['company_id'])),
+        Vendor.vendor_company_id == uuid.UUID(str(company_id)),
+    ).first() is not None
+
+
+def _months_param():
+    return max(1, min(request.args.get('months', 6, type=int), 36))
+
+
+def get_vendor_revenue_trend(vendor_company_id):
+    if not _can_view_company(vendor_company_id):
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(revenue_trend(vendor_company_id, _months_param())), 200
+
+
+def get_vendor_customer_growth(vendor_company_id):
+    if not _can_view_company(vendor_company_id):
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify([
+        {'month': row['month'], 'new_customers': row['new'], 'total_customers': row['total']}
+        for row in customer_growth(vendor_company_id, _months_param())
+    ]), 200
+
+
+def _dashboard_company():
+    """
+    Company a dashboard request is about: the caller's own, or ?company_id= for super_admin.
+
+    Returns:
+        (company_id, None) or (None, error response)
+    """
+    claims = get_jwt()
+    if claims.get('role') not in DASHBOARD_ROLES:
+        return None, (jsonify({'error': 'Unauthorized'}), 403)
+    company_id = claims.get('company_id')
+    if claims.get('role') == 'super_admin' and request.args.get('company_id'):
+        company_id = request.args['company_id']
+    if not company_id:
+        return None, (jsonify({'error': 'company_id is required'}), 400)
+    try:
+        return uuid.UUID(str(company_id)), None
+    except ValueError:
+        return None, (jsonify({'error': 'company_id must be a UUID'}), 400)
+
+
+def get_collections_ageing():
+    company_id, error = _dashboard_company()
+    if error:
+        return error
+    try:
+        as_of = date.fromisoformat(request.args['as_of']) if request.args.get('as_of') else None
+    except ValueError:
+        return jsonify({'error': 'as_of must be YYYY-MM-DD'}), 400
+    return jsonify(collections_ageing(company_id, as_of, _months_param())), 200
+
+
+def get_income_heatmap():
+    company_id, error = _dashboard_company()
+    if error:
+        return error
+    return jsonify(income_heatmap(company_id, request.args.get('year', type=int))), 200
+
+
+# path -> view; every view is JWT protected
+ANALYTICS_ROUTES = {
+    '/vendors/<uuid:vendor_company_id>/revenue-trend': get_vendor_revenue_trend,
+    '/vendors/<uuid:vendor_company_id>/customer-growth': get_vendor_customer_growth,
+    '/dashboard/collections-ageing': get_collections_ageing,
+    '/dashboard/income-heatmap': get_income_heatmap,
+}
+
+for _path, _view in ANALYTICS_ROUTES.items():
+    analytics_bp.add_url_rule(_path, view_func=jwt_required()(_view), methods=['GET'])
+
+
+def init_analytics(app):
+    """
+    Register the analytics endpoints. Existing routes for the same paths (with any
+    converter) are pointed at the vectorized views.
+
+    Args:
+        app: Flask application instance
+    """
+    def shape(path):
+        return '/'.join('<>' if part.startswith('<') else part for part in path.split('/'))
+
+    views = {shape(path): view for path, view in ANALYTICS_ROUTES.items()}
+    for rule in list(app.url_map.iter_rules()):
+        view = views.get(shape(rule.rule))
+        if view is not None:
+            param = next(iter(rule.arguments), None)
+            app.view_functions[rule.endpoint] = _bind_view_args(view, param)
+
+    app.register_blueprint(analytics_bp)
+
+
+def _bind_view_args(view, param):
+    """Adapt a view to an existing rule whose URL parameter may have another name."""
+    @jwt_required()
+    def bound(**kwargs):
+        if param is None:
+            return view()
+        return view(kwargs[param])
+    bound.__name__ = view.__name__
+    return bound
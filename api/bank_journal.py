@@ -0,0 +1,440 @@
+"""
+Append-only balance journal for bank accounts.
+
+Every change to a Payment, ISPPayment, Expense, ExtraIncome, InternalTransfer or to a
+BankAccount's initial balance is posted to bank_account_journal from a session flush
+listener, in the same transaction as the change. Edits and cancellations post reversing
+entries; journal rows are never updated, so concurrent postings are plain INSERTs and never
+lock the bank account row.
+
+A daily job writes BankAccountCheckpoint rows. The balance as of any moment is the latest
+checkpoint before it plus the (bounded) tail of journal entries since, instead of a sum over
+all history. An entry dated before existing checkpoints (a backdated or reversed posting)
+adds its amount to those checkpoints in the same transaction, so they stay exact.
+
+Checkpoints are taken at local midnight in FINANCIAL_TIMEZONE, the day boundary postings are
+dated by, so the day's ordinary postings fall after the latest checkpoint and never touch
+(or lock) checkpoint rows. Postings hold a shared advisory lock per account until they
+commit; writing a checkpoint takes it exclusively, so its sum cannot miss a backdated posting
+that committed while the checkpoint was being written (Postgres).
+"""
+from datetime import datetime, time, timezone
+from decimal import Decimal
+import logging
+import uuid
+from zoneinfo import ZoneInfo
+
+from flask import Blueprint, current_app, has_app_context, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import bindparam, event, func, insert, inspect, text, update
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import (
+    BankAccount, BankAccountCheckpoint, BankAccountJournal, Expense, ExtraIncome,
+    InternalTransfer, ISPPayment, Payment,
+)
+from invoice_balances import COUNTED_PAYMENT_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Opening balances are dated before any real transaction
+OPENING_ENTRY_DATE = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Checkpoints are taken at local midnight, like the dashboard's days
+DEFAULT_TIMEZONE = 'Asia/Karachi'
+
+_ENTRIES_KEY = 'bank_journal_entries'
+
+
+def _as_aware(value):
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _checkpoint_timezone():
+    name = DEFAULT_TIMEZONE
+    if has_app_context():
+        name = current_app.config.get('FINANCIAL_TIMEZONE', DEFAULT_TIMEZONE)
+    return ZoneInfo(name)
+
+
+def _lock_accounts(connection, account_ids, shared):
+    """
+    Per-account advisory lock held until the transaction ends: shared for postings,
+    exclusive while a checkpoint is written. No-op off Postgres.
+    """
+    if connection.dialect.name != 'postgresql' or not account_ids:
+        return
+    lock = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+    # Sorted so concurrent lockers of several accounts cannot deadlock
+    connection.execute(
+        text(f"SELECT {lock}(hashtext('bank_account:' || k)) FROM unnest(CAST(:keys AS text[])) AS k ORDER BY k"),
+        {'keys': sorted(str(account_id) for account_id in account_ids)},
+    )
+
+
+def _payment_postings(v):
+    if v['status'] in COUNTED_PAYMENT_STATUSES and v['is_active'] is not False:
+        return [(v['bank_account_id'], v['amount'], v['payment_date'], 'payment')]
+    return []
+
+
+def _isp_payment_postings(v):
+    if v['status'] in (None, 'completed') and v['is_active'] is not False:
+        return [(v['bank_account_id'], -v['amount'], v['payment_date'], 'isp_payment')]
+    return []
+
+
+def _expense_postings(v):
+    if v['is_active'] is not False:
+        return [(v['bank_account_id'], -v['amount'], v['expense_date'], 'expense')]
+    return []
+
+
+def _extra_income_postings(v):
+    if v['is_active'] is not False:
+        return [(v['bank_account_id'], v['amount'], v['income_date'], 'extra_income')]
+    return []
+
+
+def _transfer_postings(v):
+    if v['status'] in (None, 'completed'):
+        return [
+            (v['from_account_id'], -v['amount'], v['transfer_date'], 'transfer_out'),
+            (v['to_account_id'], v['amount'], v['transfer_date'], 'transfer_in'),
+        ]
+    return []
+
+
+def _opening_postings(v):
+    return [(v['id'], v['initial_balance'] or 0, OPENING_ENTRY_DATE, 'opening')]
+
+
+# model -> (columns the postings depend on, function turning those values into postings)
+JOURNAL_SOURCES = {
+    Payment: (('bank_account_id', 'amount', 'payment_date', 'status', 'is_active'), _payment_postings),
+    ISPPayment: (('bank_account_id', 'amount', 'payment_date', 'status', 'is_active'), _isp_payment_postings),
+    Expense: (('bank_account_id', 'amount', 'expense_date', 'is_active'), _expense_postings),
+    ExtraIncome: (('bank_account_id', 'amount', 'income_date', 'is_active'), _extra_income_postings),
+    InternalTransfer: (('from_account_id', 'to_account_id', 'amount', 'transfer_date', 'status'), _transfer_postings),
+    BankAccount: (('id', 'initial_balance'), _opening_postings),
+}
+
+
+def _committed_values(obj, columns):
+    """
+    Values of `columns` as last loaded from the database, before pending changes. Expired
+    attributes are loaded from the row; changed ones keep their old value in the history
+    because the journal columns have active history (see install_bank_journal_listeners).
+    """
+    state = inspect(obj)
+    values = {}
+    for key in columns:
+        history = state.attrs[key].load_history()
+        if history.deleted:
+            values[key] = history.deleted[0]
+        elif history.unchanged:
+            values[key] = history.unchanged[0]
+        else:
+            values[key] = None
+    return values
+
+
+def _current_values(obj, columns):
+    return {key: getattr(obj, key) for key in columns}
+
+
+def _postings(values, build):
+    if values.get('amount', 0) is None:
+        return []
+    postings = []
+    for account_id, amount, entry_date, source_type in build(values):
+        # New accounts get their id on flush; the opening entry is resolved then
+        if (account_id is not None or source_type == 'opening') and amount:
+            postings.append((account_id, Decimal(str(amount)), _as_aware(entry_date), source_type))
+    return postings
+
+
+def _collect_journal_entries(session, flush_context, instances):
+    pending = session.info.setdefault(_ENTRIES_KEY, [])
+
+    def queue(obj, postings, sign, description):
+        for account_id, amount, entry_date, source_type in postings:
+            pending.append({
+                'obj': obj,
+                'bank_account_id': account_id,
+                'amount': amount * sign,
+                'entry_date': entry_date,
+                'source_type': source_type,
+                'description': description,
+            })
+
+    for model, (columns, build) in JOURNAL_SOURCES.items():
+        for obj in session.new:
+            if isinstance(obj, model):
+                queue(obj, _postings(_current_values(obj, columns), build), 1, None)
+
+        for obj in session.dirty:
+            if isinstance(obj, model) and session.is_modified(obj):
+                old = _postings(_committed_values(obj, columns), build)
+                new = _postings(_current_values(obj, columns), build)
+                if old != new:
+                    queue(obj, old, -1, 'Reversal of previous posting')
+                    queue(obj, new, 1, None)
+
+        for obj in session.deleted:
+            if isinstance(obj, model):
+                queue(obj, _postings(_committed_values(obj, columns), build), -1, 'Reversal of deleted record')
+
+
+def _company_id(obj):
+    return getattr(obj, 'company_id', None)
+
+
+def _write_journal_entries(session, flush_context):
+    pending = session.info.pop(_ENTRIES_KEY, None)
+    if not pending:
+        return
+
+    rows = []
+    for entry in pending:
+        obj = entry.pop('obj')
+        # Source ids and server defaults are available once the flush has run
+        entry['source_id'] = obj.id
+        if entry['bank_account_id'] is None:
+            entry['bank_account_id'] = obj.id
+        entry['company_id'] = _company_id(obj)
+        if entry['entry_date'] is None:
+            entry['entry_date'] = _as_aware(getattr(obj, 'created_at', None)) or datetime.now(timezone.utc)
+        rows.append(entry)
+
+    connection = session.connection()
+    _lock_accounts(connection, {row['bank_account_id'] for row in rows}, shared=True)
+    connection.execute(insert(BankAccountJournal.__table__), [
+        {'id': uuid.uuid4(), **row} for row in rows
+    ])
+
+    # A checkpoint is the sum of every entry dated before it, so a backdated posting moves
+    # each later checkpoint by its amount. Postings dated after the latest checkpoint (the
+    # usual case) match no rows.
+    checkpoints = BankAccountCheckpoint.__table__
+    connection.execute(
+        update(checkpoints).where(
+            checkpoints.c.bank_account_id == bindparam('account_id'),
+            checkpoints.c.as_of > bindparam('entry_date'),
+        ).values(balance=checkpoints.c.balance + bindparam('delta')),
+        [
+            {'account_id': row['bank_account_id'], 'entry_date': row['entry_date'], 'delta': row['amount']}
+            for row in rows
+        ],
+    )
+
+
+def _discard_journal_entries(session, previous_transaction=None):
+    session.info.pop(_ENTRIES_KEY, None)
+
+
+def _track_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+_listeners_installed = False
+
+
+def install_bank_journal_listeners():
+    """
+    Post journal entries on every session flush. Installed once per process.
+    """
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    # active_history makes an assignment to an expired column load its committed value
+    # first, so the old posting can be reversed after the object was committed
+    for model, (columns, _) in JOURNAL_SOURCES.items():
+        for key in columns:
+            if key != 'id':
+                event.listen(getattr(model, key), 'set', _track_old_value, active_history=True)
+    event.listen(Session, 'before_flush', _collect_journal_entries)
+    event.listen(Session, 'after_flush_postexec', _write_journal_entries)
+    event.listen(Session, 'after_soft_rollback', _discard_journal_entries)
+    _listeners_installed = True
+
+
+def _latest_checkpoint(bank_account_id, at):
+    return BankAccountCheckpoint.query.filter(
+        BankAccountCheckpoint.bank_account_id == bank_account_id,
+        BankAccountCheckpoint.as_of <= at,
+    ).order_by(BankAccountCheckpoint.as_of.desc()).first()
+
+
+def balance_as_of(bank_account_id, at=None):
+    """
+    Balance of an account from all entries dated before `at` (default: now): the latest
+    checkpoint plus the journal entries since.
+    """
+    at = _as_aware(at) or datetime.now(timezone.utc)
+    checkpoint = _latest_checkpoint(bank_account_id, at)
+
+    tail = db.session.query(func.coalesce(func.sum(BankAccountJournal.amount), 0)).filter(
+        BankAccountJournal.bank_account_id == bank_account_id,
+        BankAccountJournal.entry_date < at,
+    )
+    if checkpoint:
+        tail = tail.filter(BankAccountJournal.entry_date >= checkpoint.as_of)
+
+    opening = Decimal(str(checkpoint.balance)) if checkpoint else Decimal('0')
+    return opening + Decimal(str(tail.scalar()))
+
+
+def account_statement(bank_account_id, start, end):
+    """
+    Journal entries dated in [start, end) with a running balance after each entry.
+
+    Returns:
+        dict with opening_balance, closing_balance and entries
+    """
+    start, end = _as_aware(start), _as_aware(end)
+    opening = balance_as_of(bank_account_id, start)
+
+    running = func.sum(BankAccountJournal.amount).over(
+        order_by=(BankAccountJournal.entry_date, BankAccountJournal.id)
+    )
+    rows = db.session.query(BankAccountJournal, running.label('running')).filter(
+        BankAccountJournal.bank_account_id == bank_account_id,
+        BankAccountJournal.entry_date >= start,
+        BankAccountJournal.entry_date < end,
+    ).order_by(BankAccountJournal.entry_date, BankAccountJournal.id).all()
+
+    entries = [
+        {
+            'id': str(entry.id),
+            'entry_date': entry.entry_date.isoformat(),
+            'amount': float(entry.amount),
+            'source_type': entry.source_type,
+            'source_id': str(entry.source_id) if entry.source_id else None,
+            'description': entry.description,
+            'balance': float(opening + Decimal(str(running_total))),
+        }
+        for entry, running_total in rows
+    ]
+
+    return {
+        'opening_balance': float(opening),
+        'closing_balance': entries[-1]['balance'] if entries else float(opening),
+        'entries': entries,
+    }
+
+
+def create_balance_checkpoints(as_of=None):
+    """
+    Write a checkpoint for every active account at `as_of` (default: start of today in
+    FINANCIAL_TIMEZONE) and refresh the cached BankAccount.current_balance.
+
+    Returns:
+        number of checkpoints written
+    """
+    if as_of is None:
+        tz = _checkpoint_timezone()
+        as_of = datetime.combine(datetime.now(tz).date(), time.min, tzinfo=tz).astimezone(timezone.utc)
+    as_of = _as_aware(as_of)
+    written = 0
+
+    for account in BankAccount.query.filter(BankAccount.is_active == True).all():
+        # Waits for postings to the account that are still in flight; postings that start
+        # later wait for this commit and then move the new checkpoint themselves
+        _lock_accounts(db.session.connection(), [account.id], shared=False)
+        exists = BankAccountCheckpoint.query.filter_by(bank_account_id=account.id, as_of=as_of).first()
+        if not exists:
+            db.session.add(BankAccountCheckpoint(
+                bank_account_id=account.id,
+                as_of=as_of,
+                balance=balance_as_of(account.id, as_of),
+            ))
+            written += 1
+        account.current_balance = balance_as_of(account.id)
+        db.session.commit()
+
+    logger.info(f"Wrote {written} bank account balance checkpoints as of {as_of.isoformat()}")
+    return written
+
+
+def generate_balance_checkpoints(app=None):
+    """
+    Scheduled job wrapper for create_balance_checkpoints().
+    """
+    if not app:
+        logger.error("No Flask app provided to generate_balance_checkpoints")
+        return
+    with app.app_context():
+        return {'checkpoints': create_balance_checkpoints()}
+
+
+bank_journal_bp = Blueprint('bank_journal', __name__)
+
+
+def _parse_datetime(value):
+    return _as_aware(datetime.fromisoformat(value)) if value else None
+
+
+def _get_account_for_request(account_id):
+    claims = get_jwt()
+    account = db.session.get(BankAccount, account_id)
+    if not account:
+        return None
+    if claims.get('role') != 'super_admin' and str(account.company_id) != str(claims.get('company_id')):
+        return None
+    return account
+
+
+@bank_journal_bp.route('/bank-accounts/<uuid:account_id>/balance', methods=['GET'])
+@jwt_required()
+def get_account_balance(account_id):
+    account = _get_account_for_request(account_id)
+    if not account:
+        return jsonify({'error': 'Bank account not found'}), 404
+
+    try:
+        as_of = _parse_datetime(request.args.get('as_of'))
+    except ValueError:
+        return jsonify({'error': 'as_of must be an ISO date or datetime'}), 400
+
+    return jsonify({
+        'bank_account_id': str(account.id),
+        'as_of': (as_of or datetime.now(timezone.utc)).isoformat(),
+        'balance': float(balance_as_of(account.id, as_of)),
+    }), 200
+
+
+@bank_journal_bp.route('/bank-accounts/<uuid:account_id>/statement', methods=['GET'])
+@jwt_required()
+def get_account_statement(account_id):
+    account = _get_account_for_request(account_id)
+    if not account:
+        return jsonify({'error': 'Bank account not found'}), 404
+
+    try:
+        start = _parse_datetime(request.args.get('start_date'))
+        end = _parse_datetime(request.args.get('end_date')) or datetime.now(timezone.utc)
+    except ValueError:
+        return jsonify({'error': 'start_date and end_date must be ISO dates or datetimes'}), 400
+    if not start:
+        return jsonify({'error': 'start_date is required'}), 400
+
+    return jsonify(account_statement(account.id, start, end)), 200
+
+
+def init_bank_journal(app):
+    """
+    Install the journal listeners and register the balance/statement API.
+
+    Args:
+        app: Flask application instance
+    """
+    install_bank_journal_listeners()
+    app.register_blueprint(bank_journal_bp)
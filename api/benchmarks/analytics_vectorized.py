@@ -0,0 +1,125 @@
+"""
+Row-wise Python vs vectorized pandas/NumPy reporting analytics on synthetic data.
+
+Generates N payments (default 1M) and 10% as many open invoices spread over three years,
+then computes the income heatmap, the monthly collection trend and collections ageing twice:
+by looping over row tuples the way the per-object dashboard code does, and with the
+*_from_frame(s) functions in analytics.py. Both results are compared before timings are
+printed. No database is needed; only the frame computation is measured.
+
+Usage:
+    python -m benchmarks.analytics_vectorized --payments 1000000
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, timedelta
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import (
+    AGEING_BUCKETS, MONTH_ABBREVIATIONS, collections_ageing_from_frames, income_heatmap_from_frame, month_window,
+)
+
+AS_OF = date(2026, 6, 30)
+
+
+def _synthetic_frames(payment_count, seed=7):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2023-07-01')
+    seconds = rng.integers(0, 3 * 365 * 24 * 3600, payment_count)
+    payments = pd.DataFrame({
+        'when': start + pd.to_timedelta(seconds, unit='s'),
+        'amount': rng.integers(500, 5000, payment_count).astype(float),
+    })
+
+    invoice_count = payment_count // 10
+    invoices = pd.DataFrame({
+        'due_date': pd.Timestamp(AS_OF) - pd.to_timedelta(rng.integers(-15, 400, invoice_count), unit='D'),
+        'remaining_amount': rng.integers(100, 3000, invoice_count).astype(float),
+    })
+    return payments, invoices
+
+
+def _row_wise(payment_rows, invoice_rows, window):
+    heatmap = defaultdict(float)
+    trend_amounts = defaultdict(float)
+    trend_counts = defaultdict(int)
+    window_set = set(window)
+
+    for when, amount in payment_rows:
+        heatmap[(when.month - 1, min((when.day - 1) // 7, 4))] += amount
+        month = when.year * 12 + when.month - 1
+        if month in window_set:
+            trend_amounts[month] += amount
+            trend_counts[month] += 1
+
+    ageing = defaultdict(float)
+    for due_date, remaining in invoice_rows:
+        days = (AS_OF - due_date).days
+        if days <= 30:
+            bucket = AGEING_BUCKETS[0]
+        elif days <= 60:
+            bucket = AGEING_BUCKETS[1]
+        elif days <= 90:
+            bucket = AGEING_BUCKETS[2]
+        else:
+            bucket = AGEING_BUCKETS[3]
+        ageing[bucket] += remaining
+
+    return {
+        'heatmap': [
+            {'month': MONTH_ABBREVIATIONS[m], 'week': f"Week {w + 1}", 'value': round(heatmap[(m, w)], 2)}
+            for m in range(12) for w in range(5)
+        ],
+        'trend': [(m, trend_counts[m], round(trend_amounts[m], 2)) for m in window],
+        'ageing': [(bucket, round(ageing[bucket], 2)) for bucket in AGEING_BUCKETS],
+    }
+
+
+def _vectorized(payments, invoices, window):
+    result = collections_ageing_from_frames(invoices, payments, AS_OF, window)
+    return {
+        'heatmap': income_heatmap_from_frame(payments),
+        'trend': [
+            (m, row['payment_count'], row['collection_amount'])
+            for m, row in zip(window.tolist(), result['collection_trends'])
+        ],
+        'ageing': [(row['bucket'], row['amount']) for row in result['aging_analysis']],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--payments', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    payments, invoices = _synthetic_frames(args.payments)
+    window = month_window(12, AS_OF)
+
+    # What the row-wise path iterates over: one Python object per row
+    payment_rows = list(zip(payments['when'].dt.to_pydatetime(), payments['amount'].tolist()))
+    invoice_rows = list(zip((d.date() for d in invoices['due_date']), invoices['remaining_amount'].tolist()))
+
+    started = time.perf_counter()
+    expected = _row_wise(payment_rows, invoice_rows, window.tolist())
+    row_wise_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = _vectorized(payments, invoices, window)
+    vectorized_seconds = time.perf_counter() - started
+
+    for key in expected:
+        for left, right in zip(expected[key], actual[key]):
+            if left != right and not (isinstance(left, dict) and abs(left['value'] - right['value']) < 0.01):
+                raise SystemExit(f"Results differ for {key}: {left} != {right}")
+
+    print(f"{args.payments:,} payments, {len(invoices):,} open invoices")
+    print(f"{'row-wise Python':<18} {row_wise_seconds * 1000:>10.1f} ms")
+    print(f"{'vectorized':<18} {vectorized_seconds * 1000:>10.1f} ms")
+    print(f"speed-up: {row_wise_seconds / vectorized_seconds:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Latency of the customer typeahead (customer_search.search_customers) on real data.
+
+Builds search terms from the company's own customers (fragments of names, internet ids,
+phone numbers and addresses, as a user would type them), runs each search and prints the
+p50/p95/max latency plus the plan of one query, which should show Bitmap Index Scans on the
+idx_customers_*_trgm indexes. The target is p95 < 50 ms at 200k customers.
+
+Requires the PostgreSQL database configured for the app with migration c41e8f2a6d97 applied.
+Read only.
+
+Usage:
+    python -m benchmarks.customer_search --company-id <uuid> --searches 500
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import func, select, text
+
+from app import create_app, db
+from app.models import Customer
+from customer_search import search_customers
+
+
+def _search_terms(company_id, count, seed=7):
+    rng = random.Random(seed)
+    rows = db.session.execute(
+        select(Customer.first_name, Customer.last_name, Customer.internet_id, Customer.phone_1,
+               Customer.installation_address)
+        .where(Customer.company_id == company_id)
+        .order_by(func.random())
+        .limit(count)
+    ).all()
+
+    terms = []
+    for row in rows:
+        value = rng.choice([f"{row.first_name} {row.last_name}", row.internet_id, row.phone_1, row.installation_address])
+        length = rng.randint(3, min(8, len(value))) if len(value) >= 3 else len(value)
+        start = rng.randint(0, len(value) - length)
+        terms.append(value[start:start + length])
+    return terms
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--company-id', required=True)
+    parser.add_argument('--searches', type=int, default=500)
+    parser.add_argument('--limit', type=int, default=20)
+    options = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        customers = db.session.query(func.count(Customer.id)).filter(Customer.company_id == options.company_id).scalar()
+        terms = _search_terms(options.company_id, options.searches)
+        if not terms:
+            print("The company has no customers.")
+            return
+
+        # Warm the connection and the index pages
+        for term in terms[:20]:
+            search_customers(options.company_id, term, options.limit)
+
+        timings = []
+        for term in terms:
+            started = time.perf_counter()
+            search_customers(options.company_id, term, options.limit)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+
+        print(f"{customers:,} customers, {len(timings)} searches, limit {options.limit}")
+        print(f"p50 {_percentile(timings, 0.5):.1f} ms   p95 {_percentile(timings, 0.95):.1f} ms   max {timings[-1]:.1f} ms")
+
+        plan = db.session.execute(
+            text("EXPLAIN (ANALYZE, BUFFERS) SELECT id FROM customers WHERE company_id = :company_id AND ("
+                 "(first_name || ' ' || last_name) ILIKE :pattern OR internet_id ILIKE :pattern OR cnic ILIKE :pattern "
+                 "OR phone_1 ILIKE :pattern OR installation_address ILIKE :pattern) LIMIT :limit"),
+            {'company_id': options.company_id, 'pattern': f"%{terms[0]}%", 'limit': options.limit},
+        ).scalars().all()
+        print(f"\nPlan for {terms[0]!r}:")
+        print('\n'.join(plan))
+
+
+if __name__ == '__main__':
+    main()
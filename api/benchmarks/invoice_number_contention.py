@@ -0,0 +1,112 @@
+"""
+Contention benchmark for invoice number allocation.
+
+Several threads number invoices concurrently, first with the read-the-max scheme
+(SELECT MAX + 1, then INSERT into a scratch table with a unique constraint, retrying on
+collisions) and then with the sequence-backed InvoiceNumberAllocator.
+
+Requires the PostgreSQL database configured for the app. The allocator numbers a scratch
+prefix whose sequence is dropped afterwards; nothing is written to the invoices table and
+no company's invoice numbers are consumed.
+
+Usage:
+    python -m benchmarks.invoice_number_contention --threads 8 --numbers 2000 --block 100
+"""
+import argparse
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app import create_app, db
+from invoice_numbers import InvoiceNumberAllocator, sequence_name
+
+SCRATCH_TABLE = 'bench_invoice_numbers'
+SCRATCH_PREFIX = 'BENCH-'
+
+
+class ScratchAllocator(InvoiceNumberAllocator):
+    def _number_template(self, company_id):
+        return SCRATCH_PREFIX, 6
+
+
+def _setup():
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}"))
+        conn.execute(text(f"CREATE UNLOGGED TABLE {SCRATCH_TABLE} (counter BIGINT PRIMARY KEY)"))
+
+
+def _teardown():
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}"))
+        conn.execute(text(f"DROP SEQUENCE IF EXISTS {sequence_name(SCRATCH_PREFIX)}"))
+
+
+def _max_plus_one_worker(app, count, stats):
+    with app.app_context():
+        created = collisions = 0
+        while created < count:
+            try:
+                with db.engine.begin() as conn:
+                    next_counter = conn.execute(
+                        text(f"SELECT COALESCE(MAX(counter), 0) + 1 FROM {SCRATCH_TABLE}")
+                    ).scalar()
+                    conn.execute(text(f"INSERT INTO {SCRATCH_TABLE} (counter) VALUES (:c)"), {'c': next_counter})
+                created += 1
+            except IntegrityError:
+                collisions += 1
+        with stats['lock']:
+            stats['collisions'] += collisions
+
+
+def _allocator_worker(app, count, block, stats):
+    with app.app_context():
+        allocator = ScratchAllocator(block_size=block)
+        numbers = []
+        while len(numbers) < count:
+            numbers.extend(allocator.reserve(None, min(block, count - len(numbers))))
+        with stats['lock']:
+            stats['numbers'].extend(numbers)
+
+
+def _run(target, threads, args):
+    workers = [threading.Thread(target=target, args=args) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--numbers', type=int, default=2000, help='numbers allocated per thread')
+    parser.add_argument('--block', type=int, default=100, help='allocator block size')
+    options = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        _setup()
+
+    total = options.threads * options.numbers
+    try:
+        stats = {'lock': threading.Lock(), 'collisions': 0}
+        elapsed = _run(_max_plus_one_worker, options.threads, (app, options.numbers, stats))
+        print(f"max+1     : {total} numbers in {elapsed:.2f}s "
+              f"({total / elapsed:,.0f}/s), {stats['collisions']} unique collisions retried")
+
+        stats = {'lock': threading.Lock(), 'numbers': []}
+        elapsed = _run(_allocator_worker, options.threads, (app, options.numbers, options.block, stats))
+        duplicates = len(stats['numbers']) - len(set(stats['numbers']))
+        print(f"allocator : {total} numbers in {elapsed:.2f}s "
+              f"({total / elapsed:,.0f}/s), block={options.block}, {duplicates} duplicates")
+    finally:
+        with app.app_context():
+            _teardown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Time to produce a month's route book of invoice PDFs, cold and from the cache.
+
+Renders every active invoice a company billed in the month (optionally one area) into one
+merged PDF with invoice_pdf.render_route_book, first into an empty cache directory and then
+again with every invoice cached, and prints both timings and the output size.
+
+Requires the database configured for the app. Read only; PDFs go to a temporary directory.
+
+Usage:
+    python -m benchmarks.invoice_pdfs --company-id <uuid> --month 2026-10 [--area-id <uuid>] [--workers 8]
+"""
+import argparse
+from datetime import date
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from app import create_app
+from invoice_pdf import render_route_book, route_book_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--company-id', required=True)
+    parser.add_argument('--month', required=True, help='YYYY-MM')
+    parser.add_argument('--area-id')
+    parser.add_argument('--workers', type=int)
+    options = parser.parse_args()
+
+    year, month = (int(part) for part in options.month.split('-'))
+    company_id = uuid.UUID(options.company_id)
+    area_id = uuid.UUID(options.area_id) if options.area_id else None
+
+    app = create_app()
+    pdf_dir = tempfile.mkdtemp(prefix='invoice-pdfs-')
+    app.config['INVOICE_PDF_DIR'] = pdf_dir
+    if options.workers:
+        app.config['INVOICE_PDF_WORKERS'] = options.workers
+    try:
+        with app.app_context():
+            count = len(route_book_ids(company_id, date(year, month, 1), area_id))
+            print(f"{count:,} invoices")
+            for label in ('cold', 'cached'):
+                started = time.perf_counter()
+                path = render_route_book(company_id, date(year, month, 1), area_id)
+                elapsed = time.perf_counter() - started
+                size = os.path.getsize(path) if path else 0
+                print(f"  {label:<7} {elapsed:>8.2f} s   {size / 1024 / 1024:>8.1f} MiB")
+    finally:
+        shutil.rmtree(pdf_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Payload size and latency of /customers/list and /invoices/list, full vs sparse fieldsets.
+
+Calls each list endpoint through the Flask test client, once as the UI does today (every
+column and relationship) and once with the `fields=` the pickers need (fieldsets.py), and
+prints the response size and the p50/p95 latency of each. The requests are made with an
+access token for the given user, role and company, so the company's own data is measured.
+
+Requires the database configured for the app. Read only.
+
+Usage:
+    python -m benchmarks.list_payloads --company-id <uuid> --user-id <uuid> --repeat 20
+"""
+import argparse
+import time
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from fieldsets import init_fieldsets
+
+CASES = [
+    ('/customers/list', 'id,first_name,last_name,internet_id'),
+    ('/invoices/list', 'id,invoice_number,customer_name,internet_id,total_amount,status,due_date'),
+]
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _measure(client, headers, url, repeat):
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise SystemExit(f"{url}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+        size = len(response.get_data())
+    timings.sort()
+    return size, len(response.get_json()), timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--company-id', required=True)
+    parser.add_argument('--user-id', required=True)
+    parser.add_argument('--role', default='company_owner')
+    parser.add_argument('--repeat', type=int, default=20)
+    options = parser.parse_args()
+
+    app = create_app()
+    init_fieldsets(app)
+    with app.app_context():
+        token = create_access_token(
+            identity=options.user_id,
+            additional_claims={'company_id': options.company_id, 'role': options.role},
+        )
+    headers = {'Authorization': f"Bearer {token}"}
+
+    client = app.test_client()
+    for path, fields in CASES:
+        # Warm the connection pool and the table pages
+        client.get(path, headers=headers)
+
+        print(path)
+        for label, url in (('full', path), ('fields', f"{path}?fields={fields}")):
+            size, rows, timings = _measure(client, headers, url, options.repeat)
+            print(f"  {label:<7} {rows:>8,} rows {size / 1024:>10,.1f} KiB   "
+                  f"p50 {_percentile(timings, 0.5):>8.1f} ms   p95 {_percentile(timings, 0.95):>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
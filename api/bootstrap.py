@@ -0,0 +1,55 @@
+"""
+Registers every module's hooks, listeners and blueprints on an app.
+
+run.py (the API) and scheduler_runner.py (the dedicated scheduler process) both call
+init_extensions(), so jobs run with the same session listeners, rollups and caches as
+the API that serves their results. The scheduler itself is started separately.
+"""
+from job_runs import init_job_runs
+from invoice_numbers import init_invoice_numbers
+from invoice_balances import init_invoice_balances
+from bank_journal import init_bank_journal
+from fanout import init_fanout
+from financial_rollups import init_financial_rollups
+from analytics import init_analytics
+from month_snapshots import init_month_snapshots
+from pagination import init_pagination
+from fieldsets import init_fieldsets
+from exports import init_exports
+from export_jobs import init_export_jobs
+from customer_search import init_customer_search
+from inventory_search import init_inventory_search
+from bulk_import import init_bulk_import
+from uniqueness_index import init_uniqueness_index
+from invoice_pdf import init_invoice_pdf
+from single_flight import init_single_flight
+from dashboard_cache import init_dashboard_cache
+
+
+def init_extensions(app):
+    """
+    Initialize every extension module on `app`, in dependency order.
+
+    Args:
+        app: Flask application instance
+    """
+    init_job_runs(app)
+    init_invoice_numbers(app)
+    init_invoice_balances(app)
+    init_bank_journal(app)
+    init_fanout(app)
+    init_financial_rollups(app)
+    init_analytics(app)
+    init_month_snapshots(app)
+    init_pagination(app)
+    init_fieldsets(app)
+    init_exports(app)
+    init_export_jobs(app)
+    init_customer_search(app)
+    init_inventory_search(app)
+    init_bulk_import(app)
+    init_uniqueness_index(app)
+    init_invoice_pdf(app)
+    init_single_flight(app)
+    init_dashboard_cache(app)
+    return app
@@ -0,0 +1,588 @@
+"""
+Bulk import behind /<entity>/validate-bulk, /<entity>/validate-single-row and /<entity>/bulk-add.
+
+An onboarding sheet of 10k customers used to cost 10k ORM inserts and 20k uniqueness lookups.
+Here a sheet is handled as one pandas DataFrame:
+
+    validate   every check runs column-wise over the whole frame: required fields, lengths,
+               formats, allowed values, dates and numbers; ids of areas, ISPs, plans etc. are
+               resolved with one query per referenced table, and duplicates (inside the sheet
+               and against the database) with one query over all unique columns
+    load       the rows that pass are COPYed into a temporary staging table and merged into
+               the target table(s) with one INSERT ... SELECT ... ON CONFLICT DO NOTHING in
+               the same transaction (Postgres); rows that lost a race with a concurrent insert
+               are reported as failed. Other databases get a multi-row INSERT instead of COPY.
+
+Responses keep the shape EnhancedBulkAddModal reads:
+
+    {success, totalRecords, successCount, failedCount, validRows,
+     errors: [{row, errors, fieldErrors, data}]}
+
+`row` is the 0-based position of the row in the sheet (or in validatedData for bulk-add).
+Each entity is described by an ImportSpec in IMPORT_SPECS.
+"""
+import io
+import uuid
+
+import pandas as pd
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import insert, or_, select, text
+
+from app import db
+from app.models import Area, Customer, CustomerPackage, ISP, ServicePlan, SubZone, User
+from dashboard_cache import invalidate_companies
+from uniqueness_index import record_values
+
+MAX_IMPORT_ROWS = 50000
+EMAIL_PATTERN = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+
+
+class InvalidImport(ValueError):
+    """An upload that cannot be read as a sheet, or an import request without a company."""
+
+
+class ImportSpec:
+    """
+    How an entity is imported.
+
+    Args:
+        model: Target model; rows get a new uuid id and the importer's company_id
+        columns: dict of column name -> 'text', 'uuid', 'date', 'float', 'int' or 'bool'.
+            Only these columns are read from the sheet; text lengths come from the model.
+        required: Columns that must have a value
+        unique: Columns unique across the table, checked inside the sheet and in the database
+        references: dict of column -> model whose company's ids the value must be one of
+        choices: dict of column -> allowed (lower-case) values
+        checks: Callable(frame, flag) adding entity specific column-wise checks
+        defaults: dict of column -> value stored when the sheet leaves it blank
+        dependent: DependentRows inserted with every imported row; columns it reads that
+            are not on `model` are validated but only stored there
+    """
+
+    def __init__(self, model, columns, required=(), unique=(), references=None, choices=None, checks=None,
+                 defaults=None, dependent=None):
+        self.model = model
+        self.columns = columns
+        self.required = required
+        self.unique = unique
+        self.references = references or {}
+        self.choices = choices or {}
+        self.checks = checks
+        # Blank cells get the model's default= like an ORM insert would
+        model_defaults = scalar_defaults(model)
+        self.defaults = {
+            **{name: value for name, value in model_defaults.items() if name in columns},
+            **(defaults or {}),
+        }
+        self.dependent = dependent
+
+    def lengths(self):
+        table_columns = self.model.__table__.columns
+        return {
+            name: table_columns[name].type.length
+            for name, kind in self.columns.items()
+            if kind == 'text' and name in table_columns and getattr(table_columns[name].type, 'length', None)
+        }
+
+    def stored_columns(self):
+        table_columns = self.model.__table__.columns
+        return [name for name in self.columns if name in table_columns]
+
+    def extra_columns(self):
+        table_columns = self.model.__table__.columns
+        return [name for name in self.columns if name not in table_columns]
+
+    def default_columns(self):
+        """dict of model column not read from the sheet -> its scalar default= value."""
+        return {
+            name: value for name, value in scalar_defaults(self.model).items()
+            if name not in self.columns and name not in ('id', 'company_id')
+        }
+
+
+def scalar_defaults(model):
+    """
+    dict of column -> the model's scalar default= value.
+
+    The COPY/merge path inserts with raw SQL, which never sees ORM-side defaults, so the
+    importer writes them out explicitly. Callable defaults (uuid4, timestamps) are left out.
+    """
+    return {
+        column.name: column.default.arg
+        for column in model.__table__.columns
+        if column.default is not None and column.default.is_scalar
+    }
+
+
+class DependentRows:
+    """
+    One row inserted into another table for every imported row, e.g. a customer's package.
+
+    Args:
+        model: Model of the dependent table; its rows get a new uuid id
+        parent_key: Column of `model` referencing the imported row's id
+        values: dict of `model` column -> imported column it is copied from
+        constants: dict of `model` column -> value
+    """
+
+    def __init__(self, model, parent_key, values, constants=None):
+        self.model = model
+        self.parent_key = parent_key
+        self.values = values
+        # Columns the import does not set get the model's default=
+        self.constants = {
+            **{name: value for name, value in scalar_defaults(model).items()
+               if name not in ('id', parent_key, *values)},
+            **(constants or {}),
+        }
+
+    def merge_sql(self, staging):
+        """INSERT of the dependents of the rows in the `inserted` CTE, returning their parent ids."""
+        targets = ['id', self.parent_key, *self.values, *self.constants]
+        sources = ['s._dependent_id', 's.id', *(f"s.{source}" for source in self.values.values()),
+                   *(f":{name}" for name in self.constants)]
+        return (
+            f"INSERT INTO {self.model.__table__.name} ({', '.join(targets)}) "
+            f"SELECT {', '.join(sources)} FROM {staging} s JOIN inserted USING (id) "
+            f"RETURNING {self.parent_key}"
+        )
+
+    def rows(self, records):
+        return [
+            {
+                'id': record['_dependent_id'],
+                self.parent_key: record['id'],
+                **{target: record[source] for target, source in self.values.items()},
+                **self.constants,
+            }
+            for record in records
+        ]
+
+
+def _customer_checks(frame, flag):
+    flag('email', frame['email'].notna() & ~frame['email'].str.fullmatch(EMAIL_PATTERN, na=False),
+         'Invalid email format')
+
+    for field in ('phone_1', 'phone_2'):
+        digits = frame[field].str.replace(r'\D', '', regex=True)
+        normalized = digits.where(digits.str.startswith('92', na=False), '92' + digits)
+        flag(field, frame[field].notna() & ~normalized.str.len().between(10, 13),
+             f"Invalid phone number format for {field}")
+
+    cnic_digits = frame['cnic'].str.replace(r'\D', '', regex=True)
+    flag('cnic', frame['cnic'].notna() & (cnic_digits.str.len() != 13), 'CNIC must be exactly 13 digits')
+
+    connection = frame['connection_type'].str.lower()
+    flag('internet_connection_type',
+         connection.isin(['internet', 'both']) & frame['internet_connection_type'].isna(),
+         'internet_connection_type is required when connection_type is internet or both')
+    flag('tv_cable_connection_type',
+         connection.isin(['tv_cable', 'both']) & frame['tv_cable_connection_type'].isna(),
+         'tv_cable_connection_type is required when connection_type is tv_cable or both')
+
+
+IMPORT_SPECS = {
+    'customers': ImportSpec(
+        Customer,
+        columns={
+            'internet_id': 'text', 'first_name': 'text', 'last_name': 'text', 'email': 'text',
+            'phone_1': 'text', 'phone_2': 'text', 'installation_address': 'text', 'cnic': 'text',
+            'area_id': 'uuid', 'sub_zone_id': 'uuid', 'isp_id': 'uuid', 'technician_id': 'uuid',
+            'service_plan_id': 'uuid',
+            'installation_date': 'date', 'recharge_date': 'date',
+            'connection_type': 'text', 'internet_connection_type': 'text', 'tv_cable_connection_type': 'text',
+            'wire_length': 'float', 'wire_ownership': 'text', 'router_ownership': 'text',
+            'router_serial_number': 'text', 'patch_cord_ownership': 'text', 'patch_cord_count': 'int',
+            'patch_cord_ethernet_ownership': 'text', 'patch_cord_ethernet_count': 'int',
+            'splicing_box_ownership': 'text', 'splicing_box_serial_number': 'text',
+            'ethernet_cable_ownership': 'text', 'ethernet_cable_length': 'float', 'dish_ownership': 'text',
+            'dish_mac_address': 'text', 'node_count': 'int', 'stb_serial_number': 'text',
+            'discount_amount': 'float', 'miscellaneous_details': 'text', 'miscellaneous_charges': 'float',
+            'gps_coordinates': 'text', 'is_active': 'bool',
+        },
+        required=(
+            'internet_id', 'first_name', 'last_name', 'email', 'phone_1', 'area_id', 'installation_address',
+            'service_plan_id', 'isp_id', 'connection_type', 'cnic', 'installation_date',
+        ),
+        unique=('internet_id', 'cnic'),
+        references={
+            'area_id': Area, 'sub_zone_id': SubZone, 'isp_id': ISP, 'service_plan_id': ServicePlan,
+            'technician_id': User,
+        },
+        choices={'connection_type': ('internet', 'tv_cable', 'both')},
+        checks=_customer_checks,
+        defaults={'is_active': True},
+        # The plan is not a customer column; it becomes the customer's first package
+        dependent=DependentRows(
+            CustomerPackage,
+            parent_key='customer_id',
+            values={'service_plan_id': 'service_plan_id', 'start_date': 'installation_date'},
+            constants={'is_active': True},
+        ),
+    ),
+}
+
+
+def read_upload(file_storage):
+    """Read an uploaded CSV or Excel file into a frame of strings (header names lower-cased)."""
+    name = (file_storage.filename or '').lower()
+    try:
+        if name.endswith('.csv'):
+            frame = pd.read_csv(file_storage.stream, dtype=str, keep_default_na=False)
+        elif name.endswith(('.xlsx', '.xls')):
+            frame = pd.read_excel(file_storage.stream, dtype=str, keep_default_na=False)
+        else:
+            raise InvalidImport('Upload a .csv or .xlsx file')
+    except (ValueError, UnicodeDecodeError) as e:
+        if isinstance(e, InvalidImport):
+            raise
+        raise InvalidImport(f"Could not read the file: {str(e)}") from e
+    frame.columns = [str(column).strip().lower() for column in frame.columns]
+    return frame
+
+
+def _prepare(spec, frame):
+    """Only the spec's columns, as stripped strings with blanks as NA, in sheet order."""
+    frame = frame.reset_index(drop=True)
+    prepared = pd.DataFrame(index=frame.index)
+    for name in spec.columns:
+        if name in frame.columns:
+            values = frame[name].astype('string').str.strip()
+            prepared[name] = values.mask(values == '')
+        else:
+            prepared[name] = pd.Series(pd.NA, index=frame.index, dtype='string')
+    return prepared
+
+
+def _parse_uuid(value):
+    try:
+        return uuid.UUID(value)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _existing_ids(model, company_id, ids):
+    if not ids:
+        return set()
+    rows = db.session.execute(select(model.id).where(model.company_id == company_id, model.id.in_(ids)))
+    return {str(row_id) for row_id in rows.scalars()}
+
+
+def _existing_values(spec, frame):
+    """Values of the unique columns that are already taken, from one query."""
+    model = spec.model
+    wanted = {name: frame[name].dropna().unique().tolist() for name in spec.unique}
+    conditions = [getattr(model, name).in_(values) for name, values in wanted.items() if values]
+    taken = {name: set() for name in spec.unique}
+    if not conditions:
+        return taken
+    columns = [getattr(model, name) for name in spec.unique]
+    for row in db.session.execute(select(*columns).where(or_(*conditions))):
+        for name, value in zip(spec.unique, row):
+            if value is not None:
+                taken[name].add(value)
+    return taken
+
+
+def validate_frame(spec, frame, company_id):
+    """
+    Validate every row of an uploaded frame.
+
+    Returns:
+        (typed frame of the valid rows, report dict)
+
+    Raises:
+        InvalidImport
+    """
+    company_id = _company_uuid(company_id)
+    prepared = _prepare(spec, frame)
+    messages = pd.DataFrame(index=prepared.index, columns=list(spec.columns), dtype=object)
+
+    def flag(field, mask, message):
+        mask = pd.Series(mask, index=prepared.index).fillna(False).astype(bool) & messages[field].isna()
+        messages.loc[mask, field] = message
+
+    for name in spec.required:
+        flag(name, prepared[name].isna(), f"Missing required field: {name}")
+
+    for name, length in spec.lengths().items():
+        flag(name, prepared[name].str.len() > length, f"{name} must be at most {length} characters")
+
+    typed = pd.DataFrame(index=prepared.index)
+    for name, kind in spec.columns.items():
+        values = prepared[name]
+        present = values.notna()
+        if kind == 'date':
+            parsed = pd.to_datetime(values, format='%Y-%m-%d', errors='coerce')
+            flag(name, present & parsed.isna(), f"{name} must be in YYYY-MM-DD format")
+            # astype(object) first: an all-blank column would otherwise stay NaT
+            typed[name] = parsed.dt.date.astype(object).where(parsed.notna(), None)
+        elif kind in ('float', 'int'):
+            parsed = pd.to_numeric(values, errors='coerce')
+            invalid = parsed.isna() if kind == 'float' else parsed.isna() | (parsed % 1 != 0)
+            flag(name, present & invalid, f"{name} must be a {'whole ' if kind == 'int' else ''}number")
+            typed[name] = parsed.astype(object).where(parsed.notna(), None)
+            if kind == 'int':
+                typed[name] = typed[name].map(lambda value: int(value) if value is not None else None)
+        elif kind == 'bool':
+            lowered = values.str.lower()
+            flag(name, present & ~lowered.isin(['true', 'false', '1', '0', 'yes', 'no']), f"{name} must be true or false")
+            typed[name] = lowered.map({'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False})
+            typed[name] = typed[name].astype(object).where(typed[name].notna(), None)
+        elif kind == 'uuid':
+            unique_values = values.dropna().unique()
+            parsed_ids = {value: _parse_uuid(value) for value in unique_values}
+            flag(name, present & values.map(parsed_ids).isna(), f"Invalid {name}")
+            typed[name] = values.map(parsed_ids).astype(object).where(present, None)
+        else:
+            typed[name] = values.astype(object).where(present, None)
+
+    for name, allowed in spec.choices.items():
+        flag(name, prepared[name].notna() & ~prepared[name].str.lower().isin(allowed),
+             f"{name} must be one of: {', '.join(allowed)}")
+        typed[name] = typed[name].map(lambda value: value.lower() if isinstance(value, str) else value)
+
+    if spec.checks:
+        spec.checks(prepared, flag)
+
+    for name, default in spec.defaults.items():
+        typed[name] = typed[name].map(lambda value: default if value is None else value)
+
+    for name, model in spec.references.items():
+        ids = {str(value) for value in typed[name].dropna()}
+        known = _existing_ids(model, company_id, [uuid.UUID(value) for value in ids])
+        flag(name, typed[name].notna() & ~typed[name].map(lambda value: str(value) in known if value else True),
+             f"Invalid {name} selection")
+
+    taken = _existing_values(spec, prepared)
+    for name in spec.unique:
+        flag(name, prepared[name].notna() & prepared[name].duplicated(keep=False), f"Duplicate {name} in the file")
+        flag(name, prepared[name].isin(taken[name]), f"{name} already exists")
+
+    failed = messages.notna().any(axis=1)
+    display = prepared.astype(object).where(prepared.notna(), '')
+    errors = []
+    for row in messages.index[failed]:
+        field_errors = messages.loc[row].dropna().to_dict()
+        errors.append({
+            'row': int(row),
+            'errors': list(field_errors.values()),
+            'fieldErrors': field_errors,
+            'data': display.loc[row].to_dict(),
+        })
+
+    report = {
+        'success': not errors,
+        'totalRecords': len(prepared),
+        'successCount': int((~failed).sum()),
+        'failedCount': int(failed.sum()),
+        'validRows': display.loc[~failed].to_dict('records'),
+        'errors': errors,
+    }
+    return typed.loc[~failed], report
+
+
+def _copy_merge(spec, valid):
+    """COPY the rows into a staging table and merge them; returns the ids that were inserted."""
+    table = spec.model.__table__.name
+    staging = f"import_{table}"
+    columns = _insert_columns(spec)
+    staging_columns = [*columns, *spec.extra_columns()]
+
+    connection = db.session.connection()
+    connection.execute(text(f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"))
+    for name in spec.extra_columns():
+        connection.execute(text(f"ALTER TABLE {staging} ADD COLUMN {name} uuid"))
+    if spec.dependent:
+        connection.execute(text(f"ALTER TABLE {staging} ADD COLUMN _dependent_id uuid"))
+        staging_columns.append('_dependent_id')
+
+    buffer = io.StringIO()
+    valid[staging_columns].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {staging} ({', '.join(staging_columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+    merge, params = merge_statement(spec, staging)
+    return {str(row_id) for row_id in connection.execute(text(merge), params).scalars()}
+
+
+def _insert_columns(spec):
+    return ['id', 'company_id', *spec.stored_columns(), *spec.default_columns()]
+
+
+def merge_statement(spec, staging):
+    """
+    The INSERT ... SELECT ... ON CONFLICT DO NOTHING moving staged rows (and their dependents)
+    into the target table(s), with its bind parameters. It returns the ids of the inserted rows.
+    """
+    column_list = ', '.join(_insert_columns(spec))
+    merge = (
+        f"WITH inserted AS (INSERT INTO {spec.model.__table__.name} ({column_list}) SELECT {column_list} "
+        f"FROM {staging} ON CONFLICT DO NOTHING RETURNING id) "
+    )
+    if spec.dependent:
+        return merge + spec.dependent.merge_sql(staging), spec.dependent.constants
+    return merge + "SELECT id FROM inserted", {}
+
+
+def _insert_merge(spec, valid):
+    """Multi-row INSERT for databases without COPY; every row is inserted."""
+    columns = _insert_columns(spec)
+    records = valid.to_dict('records')
+    db.session.execute(insert(spec.model), [{name: record[name] for name in columns} for record in records])
+    if spec.dependent:
+        db.session.execute(insert(spec.dependent.model), spec.dependent.rows(records))
+    return {str(record['id']) for record in records}
+
+
+def import_rows(spec, frame, company_id):
+    """
+    Validate a frame and insert its valid rows in one transaction.
+
+    Returns:
+        The validation report with successCount/failedCount counting inserted rows;
+        validRows are the rows that were inserted
+
+    Raises:
+        InvalidImport
+    """
+    company_id = _company_uuid(company_id)
+    valid, report = validate_frame(spec, frame, company_id)
+    if valid.empty:
+        return report
+
+    valid = valid.copy()
+    valid['id'] = [uuid.uuid4() for _ in range(len(valid))]
+    valid['company_id'] = company_id
+    for name, value in spec.default_columns().items():
+        valid[name] = value
+    if spec.dependent:
+        valid['_dependent_id'] = [uuid.uuid4() for _ in range(len(valid))]
+
+    try:
+        if db.session.get_bind().dialect.name == 'postgresql':
+            inserted = _copy_merge(spec, valid)
+        else:
+            inserted = _insert_merge(spec, valid)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    invalidate_companies([company_id])
+    record_values(spec.model, valid.to_dict('records'))
+
+    # validRows lists the valid rows in sheet order, like `valid`
+    kept = []
+    errors = list(report['errors'])
+    for row, row_id, data in zip(valid.index, valid['id'], report['validRows']):
+        if str(row_id) in inserted:
+            kept.append(data)
+            continue
+        # Passed validation but conflicted with a concurrent insert
+        message = f"{' or '.join(spec.unique)} already exists"
+        errors.append({'row': int(row), 'errors': [message], 'fieldErrors': {}, 'data': data})
+
+    report['errors'] = sorted(errors, key=lambda error: error['row'])
+    report['validRows'] = kept
+    report['successCount'] = len(kept)
+    report['failedCount'] = report['totalRecords'] - len(kept)
+    report['success'] = report['failedCount'] == 0
+    return report
+
+
+def _company_uuid(company_id):
+    if company_id is None:
+        raise InvalidImport('Imports must be made within a company')
+    try:
+        return uuid.UUID(str(company_id))
+    except ValueError as e:
+        raise InvalidImport('Invalid company') from e
+
+
+bulk_import_bp = Blueprint('bulk_import', __name__)
+
+
+def _rows_frame(rows):
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise InvalidImport('Expected a list of rows')
+    frame = pd.DataFrame(rows)
+    frame.columns = [str(column).strip().lower() for column in frame.columns]
+    return frame.astype(object).where(frame.notna(), '').astype(str)
+
+
+def _respond(entity, load_frame, action):
+    spec = IMPORT_SPECS.get(entity)
+    if spec is None:
+        return jsonify({'error': f"Bulk import is not available for {entity}"}), 404
+    try:
+        company_id = _company_uuid(get_jwt().get('company_id'))
+        frame = load_frame()
+        if len(frame) > MAX_IMPORT_ROWS:
+            raise InvalidImport(f"A file can have at most {MAX_IMPORT_ROWS} rows")
+        return jsonify(action(spec, frame, company_id)), 200
+    except InvalidImport as e:
+        return jsonify({'error': str(e)}), 400
+
+
+def _uploaded_frame():
+    upload = request.files.get('file')
+    if upload is None:
+        raise InvalidImport('No file uploaded')
+    return read_upload(upload)
+
+
+def _report(spec, frame, company_id):
+    return validate_frame(spec, frame, company_id)[1]
+
+
+def validate_bulk(entity):
+    return _respond(entity, _uploaded_frame, _report)
+
+
+def validate_single_row(entity):
+    row = (request.get_json(silent=True) or {}).get('rowData')
+    return _respond(entity, lambda: _rows_frame([row]), _report)
+
+
+def bulk_add(entity):
+    rows = (request.get_json(silent=True) or {}).get('validatedData')
+    return _respond(entity, lambda: _rows_frame(rows), import_rows)
+
+
+BULK_VIEWS = {
+    'validate-bulk': validate_bulk,
+    'validate-single-row': validate_single_row,
+    'bulk-add': bulk_add,
+}
+
+for _action, _view in BULK_VIEWS.items():
+    bulk_import_bp.add_url_rule(f"/<entity>/{_action}", view_func=jwt_required()(_view), methods=['POST'])
+
+
+def init_bulk_import(app):
+    """
+    Serve /<entity>/validate-bulk, /<entity>/validate-single-row and /<entity>/bulk-add for
+    every entity in IMPORT_SPECS. Existing routes of those entities are pointed at them.
+
+    Args:
+        app: Flask application instance
+    """
+    for rule in list(app.url_map.iter_rules()):
+        parts = rule.rule.strip('/').split('/')
+        if len(parts) == 2 and parts[1] in BULK_VIEWS and parts[0] in IMPORT_SPECS:
+            app.view_functions[rule.endpoint] = _bound_bulk_view(parts[0], BULK_VIEWS[parts[1]])
+
+    app.register_blueprint(bulk_import_bp)
+
+
+def _bound_bulk_view(entity, view):
+    @jwt_required()
+    def bound(**kwargs):
+        return view(entity)
+    bound.__name__ = f"{view.__name__}_{entity}"
+    return bound
@@ -15,3 +15,52 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
+    # Invoice numbers cached per process for single invoice creation (see invoice_numbers.py)
+    INVOICE_NUMBER_BLOCK_SIZE = int(os.environ.get('INVOICE_NUMBER_BLOCK_SIZE', '50'))
+
+    # Daily billing job: worker threads (keep within the DB connection pool) and shard key ('company' or 'area')
+    BILLING_MAX_WORKERS = int(os.environ.get('BILLING_MAX_WORKERS', str(min(os.cpu_count() or 1, 4))))
+    BILLING_SHARD_BY = os.environ.get('BILLING_SHARD_BY', 'company')
+    # 'embedded': every API worker contends for the scheduler leader lock, one runs the jobs
+    # 'external': jobs only run in scheduler_runner.py
+    SCHEDULER_MODE = os.environ.get('SCHEDULER_MODE', 'embedded')
+    SCHEDULER_LOCK_KEY = int(os.environ.get('SCHEDULER_LOCK_KEY', '7210894531'))
+    SCHEDULER_POLL_INTERVAL = int(os.environ.get('SCHEDULER_POLL_INTERVAL', '15'))
+    # Scheduled job runs slower than their budget (seconds) fire job_runs latency budget hooks
+    JOB_DEFAULT_LATENCY_BUDGET = int(os.environ.get('JOB_DEFAULT_LATENCY_BUDGET', '900'))
+    JOB_LATENCY_BUDGETS = {
+        'generate_invoices_job': int(os.environ.get('GENERATE_INVOICES_LATENCY_BUDGET', '600')),
+    }
+    # Local timezone used to bucket transactions into days for the financial dashboard rollups
+    FINANCIAL_TIMEZONE = os.environ.get('FINANCIAL_TIMEZONE', 'Asia/Karachi')
+    # Per-worker cache of /dashboard/*-advanced responses; the TTL bounds staleness across workers
+    DASHBOARD_CACHE_MAX_ENTRIES = int(os.environ.get('DASHBOARD_CACHE_MAX_ENTRIES', '512'))
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', '120'))
+    # Identical concurrent dashboard requests share one computation (see single_flight.py)
+    SINGLE_FLIGHT_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_TIMEOUT', '30'))
+    SINGLE_FLIGHT_CROSS_WORKER = os.environ.get('SINGLE_FLIGHT_CROSS_WORKER', 'false').lower() in ['true', 'on', '1']
+    SINGLE_FLIGHT_RESULT_TTL = int(os.environ.get('SINGLE_FLIGHT_RESULT_TTL', '60'))
+    # Threads shared by all requests for parallel dashboard sub-queries (each holds a DB connection)
+    DASHBOARD_FANOUT_WORKERS = int(os.environ.get('DASHBOARD_FANOUT_WORKERS', '4'))
+    # Closed months' financial rows are snapshotted to Parquet here (see month_snapshots.py)
+    MONTH_SNAPSHOT_DIR = os.environ.get('MONTH_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+    MONTH_CLOSE_GRACE_DAYS = int(os.environ.get('MONTH_CLOSE_GRACE_DAYS', '5'))
+    # Paginated listings with capped/estimated totals stop counting at this many rows (see counting.py)
+    ROW_COUNT_CAP = int(os.environ.get('ROW_COUNT_CAP', '10000'))
+    # Background export jobs (see export_jobs.py): artifact directory, worker threads per process and artifact lifetime
+    EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports'))
+    EXPORT_JOB_WORKERS = int(os.environ.get('EXPORT_JOB_WORKERS', '2'))
+    EXPORT_JOB_TTL = int(os.environ.get('EXPORT_JOB_TTL', '86400'))
+    # Availability checks (see uniqueness_index.py): Bloom filter false positive rate and per-process resync interval
+    UNIQUENESS_FALSE_POSITIVE_RATE = float(os.environ.get('UNIQUENESS_FALSE_POSITIVE_RATE', '0.01'))
+    UNIQUENESS_RESYNC_SECONDS = int(os.environ.get('UNIQUENESS_RESYNC_SECONDS', '600'))
+    # How often a check reads max(created_at) to pick up rows inserted by other processes
+    UNIQUENESS_WATERMARK_SECONDS = float(os.environ.get('UNIQUENESS_WATERMARK_SECONDS', '1'))
+    # Invoice PDFs (see invoice_pdf.py): cache directory, render processes for route books and cache lifetime
+    INVOICE_PDF_DIR = os.environ.get('INVOICE_PDF_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'invoice_pdfs'))
+    INVOICE_PDF_WORKERS = int(os.environ.get('INVOICE_PDF_WORKERS', '0')) or None
+    INVOICE_PDF_TTL = int(os.environ.get('INVOICE_PDF_TTL', str(30 * 24 * 3600)))
+    # Route books with at least this many invoices are rendered as background jobs
+    INVOICE_PDF_ROUTE_BOOK_JOB_THRESHOLD = int(os.environ.get('INVOICE_PDF_ROUTE_BOOK_JOB_THRESHOLD', '200'))
+    # Every process deletes stale cached PDFs and export files from its own disk this often (seconds)
+    LOCAL_SWEEP_INTERVAL = int(os.environ.get('LOCAL_SWEEP_INTERVAL', '3600'))
\ No newline at end of file
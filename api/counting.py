@@ -0,0 +1,111 @@
+"""
+Row count strategies for paginated listings.
+
+A COUNT(*) over a large filtered result (detailed_logs, invoices, whatsapp_message_queue)
+can cost more than fetching the page itself. count_rows() counts a select with one of:
+
+    exact      SELECT count(*) over the whole result
+    capped     count at most `cap` + 1 rows; above the cap report the cap, not exact ("10k+")
+    estimate   the planner's row estimate from EXPLAIN (Postgres); when the estimate is below
+               the cap the rows are counted exactly, so small filtered results stay exact.
+               Other databases fall back to capped.
+
+Every result says whether it is exact, so the UI can show "10,000+" or "~1.2M".
+"""
+from flask import current_app, has_app_context
+from sqlalchemy import func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app import db
+
+DEFAULT_CAP = 10000
+STRATEGIES = ('exact', 'capped', 'estimate')
+
+
+class CountResult:
+    """A row count, whether it is exact and the strategy that produced it."""
+
+    def __init__(self, value, exact, strategy):
+        self.value = value
+        self.exact = exact
+        self.strategy = strategy
+
+    def as_dict(self):
+        return {'total': self.value, 'total_exact': self.exact, 'count_strategy': self.strategy}
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, 'postgresql')
+def _compile_explain(element, compiler, **kw):
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+def _cap():
+    if has_app_context():
+        return current_app.config.get('ROW_COUNT_CAP', DEFAULT_CAP)
+    return DEFAULT_CAP
+
+
+def count_exact(statement, session=None):
+    session = session or db.session
+    return session.execute(select(func.count()).select_from(statement.order_by(None).subquery())).scalar()
+
+
+def count_capped(statement, cap, session=None):
+    """
+    Returns:
+        (count, exact): count is `cap` and exact False when there are more than `cap` rows
+    """
+    session = session or db.session
+    limited = statement.order_by(None).limit(cap + 1).subquery()
+    count = session.execute(select(func.count()).select_from(limited)).scalar()
+    if count > cap:
+        return cap, False
+    return count, True
+
+
+def estimate_rows(statement, session=None):
+    """The planner's estimated row count of a select (Postgres only)."""
+    session = session or db.session
+    plan = session.execute(_Explain(statement.order_by(None))).scalar()
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(statement, strategy='exact', cap=None, session=None):
+    """
+    Count the rows of a select with the given strategy.
+
+    Args:
+        statement: Select to count (ORDER BY is dropped)
+        strategy: One of STRATEGIES
+        cap: Row limit for 'capped' and the exact-count threshold for 'estimate'
+             (default ROW_COUNT_CAP)
+
+    Returns:
+        CountResult
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown count strategy {strategy}")
+    session = session or db.session
+    cap = cap or _cap()
+
+    if strategy == 'estimate' and session.get_bind().dialect.name == 'postgresql':
+        estimate = estimate_rows(statement, session)
+        if estimate >= cap:
+            return CountResult(estimate, False, 'estimate')
+        strategy = 'capped'
+    elif strategy == 'estimate':
+        strategy = 'capped'
+
+    if strategy == 'capped':
+        count, exact = count_capped(statement, cap, session)
+        return CountResult(count, exact, 'capped')
+
+    return CountResult(count_exact(statement, session), True, 'exact')
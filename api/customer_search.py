@@ -0,0 +1,123 @@
+"""
+Server-side customer typeahead for SearchableCustomerSelect.
+
+GET /customers/search?q=<text>&limit=<n> returns the company's top `limit` customers
+matching `q` in their name, internet_id, cnic, phone_1 or installation_address, best match
+first, with only the fields the picker shows. GET /customers/search?id=<uuid> returns the one
+customer (to label an already selected value).
+
+On Postgres every searched column has a pg_trgm GIN index, so `ILIKE '%q%'` is answered from
+the indexes (a BitmapOr of them) instead of scanning the company's customers, and matches
+are ranked by trigram similarity with boosts for exact and prefix matches on internet_id,
+cnic and phone_1. Queries shorter than three characters have no trigrams and fall back to
+scanning the company's rows. Other databases get the same filter ranked by the boosts only.
+"""
+import uuid
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import case, func, literal_column, or_, select
+
+from app import db
+from app.models import Customer
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+
+def customer_name():
+    """Same expression as the idx_customers_name_trgm index."""
+    return Customer.first_name + literal_column("' '") + Customer.last_name
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _rank(q, name):
+    identifiers = (Customer.internet_id, Customer.cnic, Customer.phone_1)
+    boost = (
+        case(*((func.lower(column) == q.lower(), 2) for column in identifiers), else_=0)
+        + case(*((column.ilike(f"{_escape_like(q)}%", escape='\\'), 1) for column in (*identifiers, name)), else_=0)
+    )
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return boost
+    return boost + func.greatest(*(
+        func.similarity(column, q)
+        for column in (name, Customer.internet_id, Customer.cnic, Customer.phone_1, Customer.installation_address)
+    ))
+
+
+def _serialize(row):
+    return {
+        'id': str(row.id),
+        'name': row.name,
+        'internet_id': row.internet_id,
+        'phone_1': row.phone_1,
+        'installation_address': row.installation_address,
+        'is_active': row.is_active,
+    }
+
+
+def search_customers(company_id, q, limit=DEFAULT_LIMIT):
+    """
+    The company's best `limit` customer matches for `q`, as slim dicts.
+    """
+    q = q.strip()
+    if not q:
+        return []
+
+    name = customer_name()
+    pattern = f"%{_escape_like(q)}%"
+    rank = _rank(q, name)
+    statement = select(
+        Customer.id, name.label('name'), Customer.internet_id, Customer.phone_1,
+        Customer.installation_address, Customer.is_active,
+    ).where(
+        Customer.company_id == company_id,
+        or_(*(
+            column.ilike(pattern, escape='\\')
+            for column in (name, Customer.internet_id, Customer.cnic, Customer.phone_1, Customer.installation_address)
+        )),
+    ).order_by(rank.desc(), Customer.is_active.desc(), name).limit(limit)
+
+    return [_serialize(row) for row in db.session.execute(statement)]
+
+
+def get_customer_option(company_id, customer_id):
+    name = customer_name()
+    row = db.session.execute(select(
+        Customer.id, name.label('name'), Customer.internet_id, Customer.phone_1,
+        Customer.installation_address, Customer.is_active,
+    ).where(Customer.company_id == company_id, Customer.id == customer_id)).first()
+    return _serialize(row) if row else None
+
+
+customer_search_bp = Blueprint('customer_search', __name__)
+
+
+@customer_search_bp.route('/customers/search', methods=['GET'])
+@jwt_required()
+def get_customer_search():
+    company_id = get_jwt().get('company_id')
+
+    if request.args.get('id'):
+        try:
+            customer_id = uuid.UUID(request.args['id'])
+        except ValueError:
+            return jsonify({'error': 'Invalid customer id'}), 400
+        option = get_customer_option(company_id, customer_id)
+        return jsonify([option] if option else []), 200
+
+    limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+    return jsonify(search_customers(company_id, request.args.get('q', ''), limit)), 200
+
+
+def init_customer_search(app):
+    """
+    Register the customer typeahead endpoint.
+
+    Args:
+        app: Flask application instance
+    """
+    app.register_blueprint(customer_search_bp)
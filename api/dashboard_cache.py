@@ -0,0 +1,303 @@
+"""
+Per-company result cache for the /dashboard/*-advanced endpoints.
+
+Responses are cached per (company, role, endpoint, normalised filter params) in a
+size-bounded LRU with a TTL. Every company has a generation number; any committed session
+write to a row of that company bumps it (rows without a company_id column are traced to
+it through their parent, see COMPANY_PARENTS), which turns all of the company's cached
+entries into misses (they are dropped on their next lookup or by LRU eviction). Bulk writes
+that bypass the session call invalidate_companies() themselves.
+
+The cache lives in each worker process. Writes committed by other workers are only seen
+once entries expire, so DASHBOARD_CACHE_TTL bounds how stale a dashboard can be.
+"""
+from collections import OrderedDict
+import functools
+import threading
+import time
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Complaint, Customer, CustomerPackage, InventoryAssignment, InventoryItem, InventoryTransaction,
+    Invoice, InvoiceLineItem, Task, TaskAssignee,
+)
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_SECONDS = 120
+
+# Endpoints whose responses are cached by init_dashboard_cache()
+CACHED_DASHBOARD_PATHS = (
+    '/dashboard/executive-advanced',
+    '/dashboard/customer-advanced',
+    '/dashboard/employee-advanced',
+    '/dashboard/inventory-advanced',
+    '/dashboard/regional-advanced',
+    '/dashboard/service-plan-advanced',
+    '/dashboard/service-support-advanced',
+)
+
+# Writes to these tables never change dashboard figures
+IGNORED_TABLES = {'detailed_logs', 'job_runs'}
+
+# Models without a company_id -> (foreign key attribute, parent model that has one)
+COMPANY_PARENTS = {
+    Complaint: ('customer_id', Customer),
+    CustomerPackage: ('customer_id', Customer),
+    InvoiceLineItem: ('invoice_id', Invoice),
+    InventoryAssignment: ('inventory_item_id', InventoryItem),
+    InventoryTransaction: ('inventory_item_id', InventoryItem),
+    TaskAssignee: ('task_id', Task),
+}
+
+# Query params that only bust browser caches
+IGNORED_PARAMS = {'_', 't', 'timestamp'}
+
+_DIRTY_KEY = 'dashboard_cache_dirty_companies'
+
+
+def normalize_params(args):
+    """
+    Turn request args into a hashable key that ignores parameter order, empty values and
+    the 'all' placeholder the filter widgets send for "no filter".
+    """
+    items = []
+    for key in sorted(set(args.keys())):
+        if key in IGNORED_PARAMS:
+            continue
+        values = sorted(v.strip() for v in args.getlist(key) if v is not None)
+        values = tuple(v for v in values if v and v.lower() != 'all')
+        if values:
+            items.append((key, values))
+    return tuple(items)
+
+
+class DashboardCache:
+    """
+    Thread-safe LRU + TTL cache of dashboard responses with per-company invalidation.
+
+    Args:
+        max_entries: Entries kept before the least recently used one is evicted
+        ttl_seconds: Age after which an entry is treated as a miss
+        clock: Monotonic time source (for tests)
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def configure(self, max_entries=None, ttl_seconds=None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if ttl_seconds is not None:
+                self.ttl_seconds = ttl_seconds
+            self._evict_over_capacity()
+
+    def generation(self, company_id):
+        """
+        Current generation of a company. Read it before computing a value and pass it to
+        set(), so a write that lands during the computation is not hidden by the result.
+        """
+        with self._lock:
+            return self._generations.get(str(company_id), 0)
+
+    def get(self, company_id, key):
+        """
+        Return the cached value, or None on a miss.
+        """
+        full_key = (str(company_id), key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+
+            stored_at, generation, value = entry
+            if generation != self._generations.get(full_key[0], 0):
+                del self._entries[full_key]
+                self._counters['misses'] += 1
+                return None
+            if self.clock() - stored_at > self.ttl_seconds:
+                del self._entries[full_key]
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return None
+
+            self._entries.move_to_end(full_key)
+            self._counters['hits'] += 1
+            return value
+
+    def set(self, company_id, key, value, generation=None):
+        full_key = (str(company_id), key)
+        with self._lock:
+            current = self._generations.get(full_key[0], 0)
+            if generation is not None and generation != current:
+                # The company changed while the value was being computed
+                return
+            self._entries[full_key] = (self.clock(), current, value)
+            self._entries.move_to_end(full_key)
+            self._evict_over_capacity()
+
+    def _evict_over_capacity(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def invalidate_company(self, company_id):
+        with self._lock:
+            company_id = str(company_id)
+            self._generations[company_id] = self._generations.get(company_id, 0) + 1
+            self._counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hit_rate': round(self._counters['hits'] / lookups, 4) if lookups else 0,
+            }
+
+
+dashboard_cache = DashboardCache()
+
+
+def invalidate_companies(company_ids):
+    """
+    Drop cached dashboards for these companies. For writes that bypass the session
+    (bulk insert()/update() statements).
+    """
+    for company_id in set(company_ids):
+        if company_id is not None:
+            dashboard_cache.invalidate_company(company_id)
+
+
+def _company_of(session, obj):
+    if hasattr(obj, 'company_id'):
+        return obj.company_id
+    parent = COMPANY_PARENTS.get(type(obj))
+    if parent is None:
+        return None
+    key, parent_model = parent
+    parent_id = getattr(obj, key, None)
+    if parent_id is None:
+        return None
+    with session.no_autoflush:
+        row = session.get(parent_model, parent_id)
+    return row.company_id if row is not None else None
+
+
+def _collect_dirty_companies(session, flush_context, instances):
+    dirty = session.info.setdefault(_DIRTY_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table in IGNORED_TABLES:
+            continue
+        company_id = _company_of(session, obj)
+        if company_id is not None:
+            dirty.add(str(company_id))
+
+
+def _invalidate_dirty_companies(session):
+    invalidate_companies(session.info.pop(_DIRTY_KEY, ()))
+
+
+def _discard_dirty_companies(session, previous_transaction=None):
+    session.info.pop(_DIRTY_KEY, None)
+
+
+_listeners_installed = False
+
+
+def install_dashboard_cache_listeners():
+    """
+    Invalidate a company's cached dashboards when a transaction that wrote its rows
+    commits. Installed once per process.
+    """
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Session, 'before_flush', _collect_dirty_companies)
+    event.listen(Session, 'after_commit', _invalidate_dirty_companies)
+    event.listen(Session, 'after_soft_rollback', _discard_dirty_companies)
+    _listeners_installed = True
+
+
+def cached_dashboard(view, cache=None):
+    """
+    Wrap a JWT protected dashboard view so successful responses are served from `cache`
+    (default: dashboard_cache) for identical filters within the same company and role.
+    """
+    cache = cache or dashboard_cache
+
+    @functools.wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        claims = get_jwt()
+        company_id = claims.get('company_id')
+        if company_id is None:
+            return view(*args, **kwargs)
+
+        key = (request.path, claims.get('role'), normalize_params(request.args))
+        cached = cache.get(company_id, key)
+        if cached is not None:
+            body, mimetype = cached
+            response = Response(body, status=200, mimetype=mimetype)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        generation = cache.generation(company_id)
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.direct_passthrough:
+            cache.set(company_id, key, (response.get_data(), response.mimetype), generation)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    return wrapper
+
+
+dashboard_cache_bp = Blueprint('dashboard_cache', __name__)
+
+
+@dashboard_cache_bp.route('/dashboard/cache-stats', methods=['GET'])
+@jwt_required()
+def get_dashboard_cache_stats():
+    if get_jwt().get('role') not in ('super_admin', 'company_owner'):
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(dashboard_cache.stats()), 200
+
+
+def init_dashboard_cache(app):
+    """
+    Cache the /dashboard/*-advanced endpoints, install the invalidation listeners and
+    register the cache stats endpoint.
+
+    Args:
+        app: Flask application instance
+    """
+    dashboard_cache.configure(
+        max_entries=app.config.get('DASHBOARD_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+        ttl_seconds=app.config.get('DASHBOARD_CACHE_TTL', DEFAULT_TTL_SECONDS),
+    )
+    install_dashboard_cache_listeners()
+
+    for rule in app.url_map.iter_rules():
+        if rule.rule in CACHED_DASHBOARD_PATHS:
+            app.view_functions[rule.endpoint] = cached_dashboard(app.view_functions[rule.endpoint])
+
+    app.register_blueprint(dashboard_cache_bp)
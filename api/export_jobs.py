@@ -0,0 +1,408 @@
+"""
+Background export jobs with progress polling and cached artifacts.
+
+Long exports (years of payments, every customer) run on a small process-wide worker pool
+instead of holding a request worker for minutes:
+
+    POST /exports               {"entity": "payments", "format": "xlsx", "params": {...}}
+                                -> 202 with the job; params are the /<entity>/export params
+                                   (sort_by, sort_dir, q, filter_<name>, fields)
+    GET  /exports/<id>          status, rows_written / total_rows and progress (0..1)
+    GET  /exports/<id>/download the finished file
+    GET  /exports               the company's recent jobs
+
+Files are written with exports.py to EXPORT_DIR/<job id>.<format> (via a .part file, so
+a half-written file is never served). Jobs are scoped like /<entity>/export
+(pagination.request_scope): a role reads, submits and downloads only the exports of the
+entities and rows PageSpec.access grants it. Every job is keyed by its company, access level,
+entity, format, normalized params and the data version of the exported rows: their count and
+the latest created_at/updated_at of the listed table and its display joins. Submitting an export whose
+key matches a finished, unexpired job returns that job and its file without recomputing;
+one that matches a queued or running job returns that job.
+
+Artifacts expire EXPORT_JOB_TTL seconds after they were last produced or reused.
+cleanup_export_jobs() (scheduled every 15 minutes) deletes expired jobs and fails jobs whose
+worker died before finishing. A file lives on the host whose worker wrote it, so every host
+also deletes its own files untouched for EXPORT_JOB_TTL (see local_files.py); reusing an
+artifact touches its file.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+
+from flask import Blueprint, current_app, jsonify, request, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import and_, func, or_
+
+from app import db
+from app.models import ExportJob
+from counting import count_rows
+from exports import FORMATS, export_statement, write_csv, write_xlsx
+from local_files import register_sweep
+from pagination import PAGE_SPECS, InvalidPageRequest, base_statement, filter_params, request_scope
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_TTL_SECONDS = 24 * 3600
+# Queued/running jobs older than this are assumed lost with their worker process
+STALE_AFTER = timedelta(hours=2)
+EXPORT_PARAMS = ('sort_by', 'sort_dir', 'sort', 'q', 'fields')
+ACTIVE_STATUSES = ('queued', 'running')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def export_dir():
+    return current_app.config.get('EXPORT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports'))
+
+
+def _ttl():
+    return timedelta(seconds=current_app.config.get('EXPORT_JOB_TTL', DEFAULT_TTL_SECONDS))
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _aware(value):
+    # SQLite hands timestamps back without a zone
+    return value.replace(tzinfo=timezone.utc) if value is not None and value.tzinfo is None else value
+
+
+def normalize_params(params):
+    """The export params that affect the output, stripped, without empty/'all' values."""
+    normalized = {}
+    for key in sorted(params or {}):
+        if key not in EXPORT_PARAMS and not key.startswith('filter_'):
+            continue
+        value = params[key]
+        value = '' if value is None else str(value).strip()
+        if value and value.lower() != 'all':
+            normalized[key] = value
+    return normalized
+
+
+def _version_column(model):
+    columns = model.__table__.columns
+    if 'updated_at' in columns:
+        return func.coalesce(model.updated_at, model.created_at) if 'created_at' in columns else model.updated_at
+    return model.created_at if 'created_at' in columns else None
+
+
+def data_version(spec, params, company_id, active_only=False):
+    """
+    The row count and latest created/updated timestamps of the rows an export covers,
+    display joins included. Any insert, update or delete among them changes it.
+    """
+    statement = base_statement(
+        spec, company_id, filter_params(params), (params.get('q') or '').strip(), active_only=active_only,
+    )
+    models = [spec.model, *(target for target, _ in spec.joins())]
+    stamps = [func.max(column) for column in map(_version_column, models) if column is not None]
+    row = db.session.execute(statement.with_only_columns(func.count(), *stamps)).one()
+    return [str(value) for value in row]
+
+
+def cache_key(company_id, access, entity, export_format, params, version):
+    payload = json.dumps([str(company_id), access, entity, export_format, params, version], separators=(',', ':'))
+    return hashlib.blake2b(payload.encode(), digest_size=32).hexdigest()
+
+
+def serialize_export_job(job):
+    progress = None
+    if job.status == 'succeeded':
+        progress = 1.0
+    elif job.total_rows:
+        progress = round(min((job.rows_written or 0) / job.total_rows, 0.99), 3)
+    return {
+        'id': str(job.id),
+        'entity': job.entity,
+        'format': job.format,
+        'params': job.params,
+        'status': job.status,
+        'total_rows': job.total_rows,
+        'rows_written': job.rows_written,
+        'progress': progress,
+        'file_size': job.file_size,
+        'error': job.error_message,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'expires_at': job.expires_at.isoformat() if job.expires_at else None,
+    }
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('EXPORT_JOB_WORKERS', DEFAULT_MAX_WORKERS),
+                thread_name_prefix='export',
+            )
+        return _executor
+
+
+def _run_in_app(app, job_id):
+    with app.app_context():
+        try:
+            run_export_job(job_id)
+        finally:
+            db.session.remove()
+
+
+def _reusable_job(key):
+    job = ExportJob.query.filter(
+        ExportJob.cache_key == key,
+        ExportJob.status.in_(('succeeded', *ACTIVE_STATUSES)),
+    ).order_by(ExportJob.created_at.desc()).first()
+    if job is None:
+        return None
+    if job.status in ACTIVE_STATUSES:
+        return job
+    if _aware(job.expires_at) > _now() and job.file_path and os.path.exists(job.file_path):
+        return job
+    return None
+
+
+def submit_export(company_id, user_id, entity, export_format, params, access='company'):
+    """
+    Queue an export, or return the matching queued, running or cached job.
+
+    Args:
+        company_id, access: The caller's scope from pagination.request_scope
+
+    Returns:
+        (ExportJob, cached): cached is True when a finished artifact is reused
+
+    Raises:
+        InvalidPageRequest
+    """
+    spec = PAGE_SPECS.get(entity)
+    if spec is None:
+        raise InvalidPageRequest(f"Unknown entity {entity}")
+    if export_format not in FORMATS:
+        raise InvalidPageRequest(f"format must be one of {', '.join(FORMATS)}")
+    if company_id is not None:
+        company_id = uuid.UUID(str(company_id))
+    params = normalize_params(params)
+    active_only = access == 'active'
+    # Validate the sort, filters and fields now rather than in the worker
+    export_statement(spec, params, company_id, active_only)
+
+    version = data_version(spec, params, company_id, active_only)
+    key = cache_key(company_id, access, entity, export_format, params, version)
+    job = _reusable_job(key)
+    if job is not None:
+        cached = job.status == 'succeeded'
+        if cached:
+            job.expires_at = _now() + _ttl()
+            db.session.commit()
+            # Keeps the host-local sweep off the file for another TTL
+            os.utime(job.file_path)
+        return job, cached
+
+    job = ExportJob(
+        company_id=company_id,
+        user_id=user_id,
+        entity=entity,
+        format=export_format,
+        access=access,
+        params=params,
+        cache_key=key,
+        status='queued',
+        rows_written=0,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    if db.engine.dialect.name == 'sqlite':
+        # In-memory SQLite databases are per connection; run in the caller's context
+        run_export_job(job.id)
+    else:
+        _get_executor(app).submit(_run_in_app, app, job.id)
+    return job, False
+
+
+def run_export_job(job_id):
+    """Write a queued job's file, recording progress on the job as batches are written."""
+    job = db.session.get(ExportJob, job_id)
+    if job is None or job.status != 'queued':
+        return
+
+    job.status = 'running'
+    job.started_at = _now()
+    db.session.commit()
+
+    os.makedirs(export_dir(), exist_ok=True)
+    path = os.path.join(export_dir(), f"{job.id}.{job.format}")
+    partial = f"{path}.part"
+    try:
+        spec = PAGE_SPECS[job.entity]
+        statement = export_statement(spec, job.params or {}, job.company_id, job.access == 'active')
+        job.total_rows = count_rows(statement, spec.count_strategy).value
+        db.session.commit()
+
+        def on_batch(rows):
+            job.rows_written = (job.rows_written or 0) + rows
+            db.session.commit()
+
+        if job.format == 'csv':
+            write_csv(statement, partial, on_batch=on_batch)
+        else:
+            write_xlsx(statement, partial, title=job.entity, on_batch=on_batch)
+        os.replace(partial, path)
+
+        job.status = 'succeeded'
+        job.file_path = path
+        job.file_size = os.path.getsize(path)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Export job {job_id} failed: {str(e)}")
+        if os.path.exists(partial):
+            os.remove(partial)
+        job.status = 'failed'
+        job.error_message = str(e)
+    job.finished_at = _now()
+    job.expires_at = job.finished_at + _ttl()
+    db.session.commit()
+
+
+def cleanup_export_jobs(app=None):
+    """
+    Scheduled job: delete expired export jobs and their files, and fail jobs that have been
+    queued or running for longer than STALE_AFTER.
+    """
+    if not app:
+        logger.error("No Flask app provided to cleanup_export_jobs")
+        return
+    with app.app_context():
+        now = _now()
+        stale = ExportJob.query.filter(
+            ExportJob.status.in_(ACTIVE_STATUSES),
+            ExportJob.created_at < now - STALE_AFTER,
+        ).all()
+        for job in stale:
+            job.status = 'failed'
+            job.error_message = 'Export did not finish; its worker stopped'
+            job.finished_at = now
+            job.expires_at = now + _ttl()
+
+        expired = ExportJob.query.filter(ExportJob.expires_at < now).all()
+        for job in expired:
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+            db.session.delete(job)
+        db.session.commit()
+        return {'expired': len(expired), 'stale': len(stale)}
+
+
+export_jobs_bp = Blueprint('export_jobs', __name__)
+
+
+def _user_id():
+    try:
+        return uuid.UUID(str(get_jwt_identity()))
+    except ValueError:
+        return None
+
+
+def _readable_jobs():
+    # One condition per entity the caller may read: its company's jobs, and only jobs read
+    # with 'active' access when that is all the caller has
+    conditions = []
+    for entity, spec in PAGE_SPECS.items():
+        scope = request_scope(spec)
+        if scope is None:
+            continue
+        company_id, access = scope
+        condition = ExportJob.entity == entity
+        if company_id is not None:
+            condition = and_(condition, ExportJob.company_id == company_id)
+        if access == 'active':
+            condition = and_(condition, ExportJob.access == 'active')
+        conditions.append(condition)
+    return or_(*conditions) if conditions else None
+
+
+def _visible_job(job_id):
+    readable = _readable_jobs()
+    if readable is None:
+        return None
+    return ExportJob.query.filter(ExportJob.id == job_id, readable).first()
+
+
+@export_jobs_bp.route('/exports', methods=['POST'])
+@jwt_required()
+def create_export_job():
+    data = request.get_json(silent=True) or {}
+    spec = PAGE_SPECS.get(data.get('entity'))
+    if spec is None:
+        return jsonify({'error': f"Unknown entity {data.get('entity')}"}), 400
+    scope = request_scope(spec)
+    if scope is None:
+        return jsonify({'error': 'Unauthorized'}), 403
+    company_id, access = scope
+    try:
+        job, cached = submit_export(
+            company_id, _user_id(), data.get('entity'), (data.get('format') or 'csv').lower(),
+            data.get('params') or {}, access,
+        )
+    except InvalidPageRequest as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({**serialize_export_job(job), 'cached': cached}), 200 if cached else 202
+
+
+@export_jobs_bp.route('/exports', methods=['GET'])
+@jwt_required()
+def list_export_jobs():
+    readable = _readable_jobs()
+    if readable is None:
+        return jsonify({'error': 'Unauthorized'}), 403
+    jobs = ExportJob.query.filter(readable).order_by(ExportJob.created_at.desc()).limit(min(request.args.get('limit', 20, type=int), 100)).all()
+    return jsonify([serialize_export_job(job) for job in jobs]), 200
+
+
+@export_jobs_bp.route('/exports/<uuid:job_id>', methods=['GET'])
+@jwt_required()
+def get_export_job(job_id):
+    job = _visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Export job not found'}), 404
+    return jsonify(serialize_export_job(job)), 200
+
+
+@export_jobs_bp.route('/exports/<uuid:job_id>/download', methods=['GET'])
+@jwt_required()
+def download_export_job(job_id):
+    job = _visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Export job not found'}), 404
+    if job.status != 'succeeded' or not job.file_path or not os.path.exists(job.file_path):
+        return jsonify({'error': f"Export is {job.status}", 'status': job.status}), 409
+    finished = _aware(job.finished_at)
+    return send_file(
+        job.file_path,
+        mimetype=FORMATS[job.format],
+        as_attachment=True,
+        download_name=f"{job.entity}-export-{finished:%Y%m%d-%H%M%S}.{job.format}",
+    )
+
+
+def init_export_jobs(app):
+    """
+    Register the export job API and the sweep of this host's export files.
+
+    Args:
+        app: Flask application instance
+    """
+    app.register_blueprint(export_jobs_bp)
+    register_sweep('exports', export_dir, lambda: _ttl().total_seconds())
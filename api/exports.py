@@ -0,0 +1,207 @@
+"""
+Streaming CSV/XLSX exports for the generic /<entity>/export endpoints.
+
+The export takes the same sort, `q`, filter_<name> and `fields` params as /<entity>/page
+(see pagination.py) and writes every matching row the caller's role may read there
+(PageSpec.access; other roles get 403). Rows are read in batches through a server-side
+cursor on a dedicated connection (streaming.stream_batches), so memory stays proportional
+to one batch, not to the company's row count:
+
+    format=csv    (default) the header and each batch of rows are sent as soon as they are
+                  written, as a chunked response; the first bytes leave immediately
+    format=xlsx   rows go into an openpyxl write-only workbook, which keeps them in a temp
+                  file instead of a cell tree in memory; the saved file is then streamed
+                  in chunks and removed
+
+X-Accel-Buffering: no keeps nginx from buffering the whole body before forwarding it.
+"""
+import csv
+from datetime import date, datetime, timezone
+import io
+import os
+import tempfile
+import uuid
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required
+from openpyxl import Workbook
+
+from pagination import (
+    PAGE_SPECS, InvalidPageRequest, base_statement, fields_param, filter_params, request_scope, sort_param,
+)
+from streaming import read_connection, stream_batches
+
+EXPORT_BATCH_SIZE = 2000
+FILE_CHUNK_SIZE = 64 * 1024
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def export_statement(spec, args, company_id, active_only=False):
+    """
+    The ordered, filtered and projected select of an export.
+
+    Args:
+        active_only: Leave out rows with is_active false ('active' access)
+
+    Raises:
+        InvalidPageRequest
+    """
+    _, sort_dir, sort_column = sort_param(spec, args)
+    q = (args.get('q') or '').strip()
+    statement = base_statement(spec, company_id, filter_params(args), q, fields_param(spec, args), active_only)
+    id_column = spec.model.id
+    if sort_dir == 'desc':
+        return statement.order_by(sort_column.desc(), id_column.desc())
+    return statement.order_by(sort_column.asc(), id_column.asc())
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _xlsx_value(value):
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Excel has no time zones
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def iter_csv(statement, batch_size=EXPORT_BATCH_SIZE, on_batch=None):
+    """
+    Yield an export as CSV text: the header, then one chunk per batch of rows.
+
+    Args:
+        on_batch: Called with the number of rows of each batch once it is written
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in statement.selected_columns])
+    yield buffer.getvalue()
+
+    with read_connection() as connection:
+        for batch in stream_batches(statement, batch_size, connection):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_value(value) for value in row] for row in batch)
+            yield buffer.getvalue()
+            if on_batch:
+                on_batch(len(batch))
+
+
+def write_csv(statement, path, batch_size=EXPORT_BATCH_SIZE, on_batch=None):
+    """Write an export to a CSV file at `path`."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in iter_csv(statement, batch_size, on_batch):
+            f.write(chunk)
+
+
+def write_xlsx(statement, path, batch_size=EXPORT_BATCH_SIZE, title='Export', on_batch=None):
+    """Write an export to an .xlsx file at `path` with a write-only workbook."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append([column.key for column in statement.selected_columns])
+    with read_connection() as connection:
+        for batch in stream_batches(statement, batch_size, connection):
+            for row in batch:
+                sheet.append([_xlsx_value(value) for value in row])
+            if on_batch:
+                on_batch(len(batch))
+    workbook.save(path)
+
+
+def iter_xlsx(statement, batch_size=EXPORT_BATCH_SIZE, title='Export'):
+    """Yield an export as .xlsx bytes, read back in chunks from a temp file."""
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    try:
+        write_xlsx(statement, path, batch_size, title)
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def export_response(entity, args, company_id, active_only=False):
+    """
+    A streamed export of an entity for the request args.
+
+    Raises:
+        InvalidPageRequest
+    """
+    spec = PAGE_SPECS[entity]
+    export_format = (args.get('format') or 'csv').lower()
+    if export_format not in FORMATS:
+        raise InvalidPageRequest(f"format must be one of {', '.join(FORMATS)}")
+    statement = export_statement(spec, args, company_id, active_only)
+
+    if export_format == 'csv':
+        body = iter_csv(statement)
+    else:
+        body = iter_xlsx(statement, title=entity)
+    filename = f"{entity}-export-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{export_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=FORMATS[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no',
+            'Cache-Control': 'no-store',
+        },
+    )
+
+
+exports_bp = Blueprint('exports', __name__)
+
+
+def get_entity_export(entity):
+    if entity not in PAGE_SPECS:
+        return jsonify({'error': f"Unknown entity {entity}"}), 404
+
+    scope = request_scope(PAGE_SPECS[entity])
+    if scope is None:
+        return jsonify({'error': 'Unauthorized'}), 403
+    company_id, access = scope
+    try:
+        return export_response(entity, request.args, company_id, access == 'active')
+    except InvalidPageRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+
+exports_bp.add_url_rule('/<entity>/export', view_func=jwt_required()(get_entity_export), methods=['GET'])
+
+
+def init_exports(app):
+    """
+    Serve /<entity>/export as a streamed export for every entity in PAGE_SPECS. Existing
+    /<entity>/export routes of those entities are pointed at it.
+
+    Args:
+        app: Flask application instance
+    """
+    for rule in list(app.url_map.iter_rules()):
+        parts = rule.rule.strip('/').split('/')
+        if len(parts) == 2 and parts[1] == 'export' and parts[0] in PAGE_SPECS:
+            app.view_functions[rule.endpoint] = _bound_export_view(parts[0])
+
+    app.register_blueprint(exports_bp)
+
+
+def _bound_export_view(entity):
+    @jwt_required()
+    def view(**kwargs):
+        return get_entity_export(entity)
+    view.__name__ = f"get_{entity}_export"
+    return view
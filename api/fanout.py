@@ -0,0 +1,171 @@
+"""
+Parallel fan-out of independent sub-queries inside one request.
+
+Composite endpoints declare their KPI blocks as zero-argument callables and run_blocks()
+executes them concurrently on a bounded, process-wide thread pool. Each block runs in its own
+application context, so it gets its own scoped session and database connection. The
+endpoint's latency approaches that of its slowest block instead of the sum of all of them.
+
+    result = run_blocks({
+        'revenue': lambda: revenue_query(company_id, start, end),
+        'expenses': lambda: expense_query(company_id, start, end),
+    })
+    result.values['revenue'], result.timings_ms['revenue']
+
+Per-block timings of every fan-out in a request are reported in its Server-Timing header
+(registered by init_fanout()), where browser dev tools show them next to the request.
+
+On timeout, blocks still waiting for a worker are cancelled. A block that is already running
+cannot be stopped from outside its thread, so on Postgres every block's transaction gets a
+statement_timeout ending at the fan-out's deadline: its query is cancelled by the server, the
+block fails, and its pooled connection is returned instead of staying checked out.
+
+Blocks must not touch request state (get_jwt(), request.args) or ORM objects loaded by the
+caller; pass plain values in and return plain values (rows, dicts, numbers) out.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import text
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+_worker_state = threading.local()
+
+
+class FanOutResult:
+    """Values, per-block durations (ms) and total wall time (ms) of a run_blocks() call."""
+
+    def __init__(self, values, timings_ms, total_ms):
+        self.values = values
+        self.timings_ms = timings_ms
+        self.total_ms = total_ms
+
+    def server_timing(self):
+        """Server-Timing header value, e.g. 'revenue;dur=12.4, expenses;dur=30.1, total;dur=30.9'."""
+        parts = [f"{name};dur={duration}" for name, duration in self.timings_ms.items()]
+        parts.append(f"total;dur={self.total_ms}")
+        return ', '.join(parts)
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('DASHBOARD_FANOUT_WORKERS', DEFAULT_MAX_WORKERS),
+                thread_name_prefix='fanout',
+            )
+        return _executor
+
+
+def _limit_statement_time(deadline):
+    """Make the block's queries fail once the fan-out's deadline has passed (Postgres only)."""
+    remaining_ms = max(int((deadline - time.monotonic()) * 1000), 1)
+    db.session.execute(text(f"SET LOCAL statement_timeout = {remaining_ms}"))
+
+
+def _run_block(app, name, fn, deadline=None):
+    started = time.perf_counter()
+    _worker_state.active = True
+    try:
+        with app.app_context():
+            try:
+                if deadline is not None and db.engine.dialect.name == 'postgresql':
+                    _limit_statement_time(deadline)
+                return fn(), round((time.perf_counter() - started) * 1000, 1)
+            finally:
+                db.session.remove()
+    finally:
+        _worker_state.active = False
+
+
+def _run_inline(blocks):
+    values, timings = {}, {}
+    for name, fn in blocks.items():
+        started = time.perf_counter()
+        values[name] = fn()
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    return values, timings
+
+
+def run_blocks(blocks, timeout=None):
+    """
+    Run independent blocks concurrently and collect their results.
+
+    Falls back to running the blocks one after another in the caller's context when there
+    is only one block, when called from inside a block (so nested fan-outs cannot exhaust the
+    pool and deadlock), and on SQLite, whose in-memory databases are per connection.
+
+    Args:
+        blocks: dict of name -> zero-argument callable
+        timeout: Seconds to wait for all blocks; TimeoutError if exceeded. Blocks that have
+            not started are cancelled; on Postgres running blocks' queries are cancelled by
+            statement_timeout at the same deadline.
+
+    Returns:
+        FanOutResult
+
+    Raises:
+        The exception of the first failing block (in declaration order), after the others
+        have finished.
+    """
+    started = time.perf_counter()
+    app = current_app._get_current_object()
+
+    if len(blocks) <= 1 or getattr(_worker_state, 'active', False) or db.engine.dialect.name == 'sqlite':
+        values, timings = _run_inline(blocks)
+        result = FanOutResult(values, timings, round((time.perf_counter() - started) * 1000, 1))
+        _record_timing(result)
+        return result
+
+    executor = _get_executor(app)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    futures = {name: executor.submit(_run_block, app, name, fn, deadline) for name, fn in blocks.items()}
+    _, not_done = wait(futures.values(), timeout=timeout)
+    if not_done:
+        for future in not_done:
+            # Only stops blocks still queued; running ones end at their statement_timeout
+            future.cancel()
+        raise TimeoutError(f"Blocks {[n for n, f in futures.items() if f in not_done]} did not finish in {timeout}s")
+
+    values, timings = {}, {}
+    for name, future in futures.items():
+        # Re-raises the block's exception
+        values[name], timings[name] = future.result()
+
+    result = FanOutResult(values, timings, round((time.perf_counter() - started) * 1000, 1))
+    logger.debug(f"Fan-out finished: {result.server_timing()}")
+    _record_timing(result)
+    return result
+
+
+def _record_timing(result):
+    if has_request_context():
+        g.setdefault('fanout_timings', []).append(result)
+
+
+def _add_server_timing_header(response):
+    results = g.get('fanout_timings')
+    if results:
+        response.headers['Server-Timing'] = ', '.join(result.server_timing() for result in results)
+    return response
+
+
+def init_fanout(app):
+    """
+    Report the block timings of each request's fan-outs in its Server-Timing header.
+
+    Args:
+        app: Flask application instance
+    """
+    app.after_request(_add_server_timing_header)
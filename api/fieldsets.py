@@ -0,0 +1,136 @@
+"""
+Sparse fieldsets for the generic list and detail endpoints.
+
+/customers/list serialises every Customer column and its relationships, while most pickers
+only need a few of them. With `fields=` the /<entity>/list and /<entity>/<id> endpoints of
+the entities in pagination.PAGE_SPECS answer from a column-only select of just those columns
+(no ORM objects, no relationship loads) and return only those keys:
+
+    GET /customers/list?fields=id,first_name,last_name,internet_id
+    GET /invoices/<id>?fields=id,invoice_number,total_amount,status
+
+`id` is always included. The keys are the entity's /<entity>/page columns, display joins
+included (e.g. customer_name on invoices). Lists also accept the page endpoint's `q` and
+filter_<name> params and are ordered by the entity's default sort. Projected requests get
+the rows the original views return to the caller's role (PageSpec.access): other roles are
+refused with 403 and auditors and employees only see active rows. Requests without `fields`
+are served by the original views unchanged. /<entity>/page takes `fields` too.
+"""
+import functools
+import uuid
+
+from flask import jsonify, request
+from flask_jwt_extended import verify_jwt_in_request
+
+from app import db
+from pagination import (
+    PAGE_SPECS, InvalidPageRequest, base_statement, fields_param, filter_params, request_scope, serialize_row,
+)
+
+
+def list_rows(spec, args, company_id, active_only=False):
+    """
+    Every row of an entity with only the requested fields, as dicts.
+
+    Args:
+        active_only: Leave out rows with is_active false
+
+    Raises:
+        InvalidPageRequest
+    """
+    q = (args.get('q') or '').strip()
+    statement = base_statement(spec, company_id, filter_params(args), q, fields_param(spec, args), active_only)
+
+    sort_by, sort_dir = spec.default_sort
+    sort_column = spec.sort_keys[sort_by]
+    order = (sort_column.desc(), spec.model.id.desc()) if sort_dir == 'desc' else (sort_column, spec.model.id)
+    return [serialize_row(row) for row in db.session.execute(statement.order_by(*order))]
+
+
+def get_row(spec, row_id, args, company_id, active_only=False):
+    """
+    One row of an entity with only the requested fields, or None.
+
+    Args:
+        active_only: Treat a row with is_active false as missing
+
+    Raises:
+        InvalidPageRequest
+    """
+    statement = base_statement(spec, company_id, {}, '', fields_param(spec, args), active_only).where(spec.model.id == row_id)
+    row = db.session.execute(statement).first()
+    return serialize_row(row) if row else None
+
+
+def sparse_list(entity, view):
+    """Serve GET /<entity>/list?fields= from list_rows, anything else from `view`."""
+    spec = PAGE_SPECS[entity]
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET' or not request.args.get('fields'):
+            return view(*args, **kwargs)
+        return _projected(spec, lambda company_id, active_only: jsonify(
+            list_rows(spec, request.args, company_id, active_only)
+        ))
+
+    return wrapper
+
+
+def sparse_detail(entity, view, arg_name):
+    """Serve GET /<entity>/<id>?fields= from get_row, anything else from `view`."""
+    spec = PAGE_SPECS[entity]
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET' or not request.args.get('fields'):
+            return view(*args, **kwargs)
+
+        def respond(company_id, active_only):
+            try:
+                row_id = uuid.UUID(str(kwargs[arg_name]))
+            except ValueError:
+                return jsonify({'error': 'Invalid id'}), 400
+            row = get_row(spec, row_id, request.args, company_id, active_only)
+            if row is None:
+                return jsonify({'error': 'Not found'}), 404
+            return jsonify(row)
+
+        return _projected(spec, respond)
+
+    return wrapper
+
+
+def _projected(spec, respond):
+    # The wrapped views are all @jwt_required; check the token before answering for them
+    verify_jwt_in_request()
+    scope = request_scope(spec)
+    if scope is None:
+        return jsonify({'error': 'Unauthorized'}), 403
+    company_id, access = scope
+    try:
+        response = respond(company_id, access == 'active')
+    except InvalidPageRequest as e:
+        return jsonify({'error': str(e)}), 400
+    return response if isinstance(response, tuple) else (response, 200)
+
+
+def init_fieldsets(app):
+    """
+    Accept `fields=` on the /<entity>/list and /<entity>/<id> endpoints of every entity
+    in PAGE_SPECS.
+
+    Args:
+        app: Flask application instance
+    """
+    for rule in list(app.url_map.iter_rules()):
+        if 'GET' not in rule.methods:
+            continue
+        parts = rule.rule.strip('/').split('/')
+        if len(parts) != 2 or parts[0] not in PAGE_SPECS:
+            continue
+        view = app.view_functions[rule.endpoint]
+        if parts[1] == 'list':
+            app.view_functions[rule.endpoint] = sparse_list(parts[0], view)
+        elif parts[1].startswith('<') and len(rule.arguments) == 1:
+            app.view_functions[rule.endpoint] = sparse_detail(parts[0], view, next(iter(rule.arguments)))
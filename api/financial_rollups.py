@@ -0,0 +1,779 @@
+"""
+Materialized daily financial rollups for the unified financial dashboard.
+
+financial_daily_rollups holds one row per company, bank account, local day, category and
+subcategory with the summed amount and transaction count of:
+
+    invoiced      active invoices, by invoice type (dated by billing_start_date)
+    collection    counted customer payments, by payment method
+    isp_payment   completed ISP payments, by payment type
+    expense       active expenses, by expense type id
+    extra_income  active extra income, by income type id
+    bandwidth_cost, bandwidth_gb
+                  cost and usage (GB) of completed ISP payments that record bandwidth
+                  usage, by ISP payment type
+
+The rows are kept current from a session flush listener in the same transaction as the
+change (edits subtract the old contribution and add the new one), and bulk inserts that
+bypass the session call record_bulk_insert(). Updates are upserts of the form
+`amount = amount + delta`, applied in key order, so concurrent writers never overwrite each
+other. /dashboard/unified-financial reads at most one row per day and category instead of
+every transaction in the date range, so its cost no longer grows with history. Requests
+filtering by invoice status still go to the original view.
+
+Two sections stay on the source tables, bounded by the date range rather than history:
+income_by_plan reads the package lines of the invoices billed in the range (the plan of a
+line is only known through its customer package, which the flush listener cannot resolve
+without a query per line, and line items are bulk-inserted by the scheduler), and the
+collections ageing is a snapshot of the invoices open at the end date, which daily deltas
+cannot reproduce.
+
+`flask rebuild-financial-rollups` recomputes the table from the source rows.
+"""
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from functools import wraps
+import logging
+import uuid
+from zoneinfo import ZoneInfo
+
+import click
+from flask import Blueprint, current_app, has_app_context, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import delete, event, extract, func, inspect, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import (
+    BankAccount, CustomerPackage, Expense, ExpenseType, ExtraIncome, ExtraIncomeType, FinancialDailyRollup,
+    Invoice, InvoiceLineItem, ISPPayment, Payment, ServicePlan,
+)
+from analytics import collections_ageing
+from fanout import run_blocks
+from invoice_balances import COUNTED_PAYMENT_STATUSES
+from streaming import read_connection, stream_rows
+
+logger = logging.getLogger(__name__)
+
+# Days are bucketed in the business's local time, like the dashboard's date filters
+DEFAULT_TIMEZONE = 'Asia/Karachi'
+
+_DELTAS_KEY = 'financial_rollup_deltas'
+
+# Roles that may read company financials, as for the other dashboards
+FINANCIAL_ROLES = ('super_admin', 'company_owner')
+
+# Rolled up for bandwidth_analysis only; not part of the cash flow totals
+BANDWIDTH_CATEGORIES = ('bandwidth_cost', 'bandwidth_gb')
+
+# Dashboard filters the rollups cannot answer; requests using them keep the original view
+UNSUPPORTED_FILTERS = ('invoice_status',)
+
+_UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def _invoice_rollups(v):
+    if v['is_active'] is not False:
+        return [(None, v['billing_start_date'], 'invoiced', v['invoice_type'], v['total_amount'])]
+    return []
+
+
+def _payment_rollups(v):
+    if v['status'] in COUNTED_PAYMENT_STATUSES and v['is_active'] is not False:
+        return [(v['bank_account_id'], v['payment_date'], 'collection', v['payment_method'], v['amount'])]
+    return []
+
+
+def _isp_payment_rollups(v):
+    if v['status'] in (None, 'completed') and v['is_active'] is not False:
+        contributions = [(v['bank_account_id'], v['payment_date'], 'isp_payment', v['payment_type'], v['amount'])]
+        if v['bandwidth_usage_gb'] is not None:
+            contributions += [
+                (v['bank_account_id'], v['payment_date'], 'bandwidth_cost', v['payment_type'], v['amount']),
+                (v['bank_account_id'], v['payment_date'], 'bandwidth_gb', v['payment_type'], v['bandwidth_usage_gb']),
+            ]
+        return contributions
+    return []
+
+
+def _expense_rollups(v):
+    if v['is_active'] is not False:
+        return [(v['bank_account_id'], v['expense_date'], 'expense', v['expense_type_id'], v['amount'])]
+    return []
+
+
+def _extra_income_rollups(v):
+    if v['is_active'] is not False:
+        return [(v['bank_account_id'], v['income_date'], 'extra_income', v['income_type_id'], v['amount'])]
+    return []
+
+
+# model -> (columns the rollup depends on, function turning those values into contributions)
+ROLLUP_SOURCES = {
+    Invoice: (('company_id', 'billing_start_date', 'invoice_type', 'total_amount', 'is_active'), _invoice_rollups),
+    Payment: (('company_id', 'bank_account_id', 'payment_date', 'payment_method', 'amount', 'status', 'is_active'), _payment_rollups),
+    ISPPayment: (('company_id', 'bank_account_id', 'payment_date', 'payment_type', 'amount', 'bandwidth_usage_gb', 'status', 'is_active'), _isp_payment_rollups),
+    Expense: (('company_id', 'bank_account_id', 'expense_date', 'expense_type_id', 'amount', 'is_active'), _expense_rollups),
+    ExtraIncome: (('company_id', 'bank_account_id', 'income_date', 'income_type_id', 'amount', 'is_active'), _extra_income_rollups),
+}
+
+
+def _rollup_timezone():
+    name = DEFAULT_TIMEZONE
+    if has_app_context():
+        name = current_app.config.get('FINANCIAL_TIMEZONE', DEFAULT_TIMEZONE)
+    return ZoneInfo(name)
+
+
+def _local_day(value, tz):
+    if value is None or not isinstance(value, datetime):
+        return value
+    if value.tzinfo is None:
+        # timestamptz columns store UTC; drivers without time zone support return it naive
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(tz).date()
+
+
+def _as_uuid(value):
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
+
+
+def _add_contributions(deltas, values, build, sign, tz):
+    company_id = _as_uuid(values['company_id'])
+    if company_id is None:
+        return
+
+    for bank_account_id, when, category, subcategory, amount in build(values):
+        day = _local_day(when, tz)
+        if amount is None or day is None:
+            continue
+        key = (
+            company_id,
+            _as_uuid(bank_account_id),
+            day,
+            category,
+            '' if subcategory is None else str(subcategory),
+        )
+        total, count = deltas.get(key, (Decimal('0'), 0))
+        deltas[key] = (total + sign * Decimal(str(amount)), count + sign)
+
+
+def _track_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+def _committed_values(obj, columns):
+    state = inspect(obj)
+    values = {}
+    for key in columns:
+        history = state.attrs[key].load_history()
+        if history.deleted:
+            values[key] = history.deleted[0]
+        elif history.unchanged:
+            values[key] = history.unchanged[0]
+        else:
+            values[key] = None
+    return values
+
+
+def _current_values(obj, columns):
+    return {key: getattr(obj, key) for key in columns}
+
+
+def _collect_rollup_deltas(session, flush_context, instances):
+    deltas = session.info.setdefault(_DELTAS_KEY, {})
+    tz = _rollup_timezone()
+
+    for model, (columns, build) in ROLLUP_SOURCES.items():
+        for obj in session.new:
+            if isinstance(obj, model):
+                _add_contributions(deltas, _current_values(obj, columns), build, 1, tz)
+
+        for obj in session.dirty:
+            if isinstance(obj, model) and session.is_modified(obj):
+                old = _committed_values(obj, columns)
+                new = _current_values(obj, columns)
+                if old != new:
+                    _add_contributions(deltas, old, build, -1, tz)
+                    _add_contributions(deltas, new, build, 1, tz)
+
+        for obj in session.deleted:
+            if isinstance(obj, model):
+                _add_contributions(deltas, _committed_values(obj, columns), build, -1, tz)
+
+
+def _delta_order(item):
+    (company_id, bank_account_id, day, category, subcategory), _ = item
+    return (str(company_id), bank_account_id is not None, str(bank_account_id), day, category, subcategory)
+
+
+def _upsert_rollups(connection, deltas):
+    # Sorted so concurrent transactions lock rollup rows in the same order
+    rows = [
+        {
+            'company_id': company_id,
+            'bank_account_id': bank_account_id,
+            'day': day,
+            'category': category,
+            'subcategory': subcategory,
+            'amount': amount,
+            'txn_count': count,
+        }
+        for (company_id, bank_account_id, day, category, subcategory), (amount, count) in sorted(deltas.items(), key=_delta_order)
+        if amount or count
+    ]
+
+    # Cash rows have no bank account and are unique on a separate partial index
+    table = FinancialDailyRollup.__table__
+    account_rows = [row for row in rows if row['bank_account_id'] is not None]
+    cash_rows = [row for row in rows if row['bank_account_id'] is None]
+    for key_rows, index_elements, index_where in (
+        (account_rows, [table.c.company_id, table.c.bank_account_id, table.c.day, table.c.category, table.c.subcategory],
+         table.c.bank_account_id.isnot(None)),
+        (cash_rows, [table.c.company_id, table.c.day, table.c.category, table.c.subcategory],
+         table.c.bank_account_id.is_(None)),
+    ):
+        if not key_rows:
+            continue
+        statement = _UPSERT_INSERTS[connection.dialect.name](table)
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements,
+            index_where=index_where,
+            set_={
+                'amount': table.c.amount + statement.excluded.amount,
+                'txn_count': table.c.txn_count + statement.excluded.txn_count,
+                'updated_at': func.current_timestamp(),
+            },
+        )
+        connection.execute(statement, key_rows)
+
+
+def _apply_rollup_deltas(session, flush_context):
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if deltas:
+        _upsert_rollups(session.connection(), deltas)
+
+
+def _discard_rollup_deltas(session, previous_transaction=None):
+    session.info.pop(_DELTAS_KEY, None)
+
+
+_listeners_installed = False
+
+
+def install_financial_rollup_listeners():
+    """
+    Maintain financial_daily_rollups on every session flush. Installed once per process.
+    """
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    # active_history makes an assignment to an expired column load its committed value
+    # first, so the old contribution can be subtracted after the object was committed
+    for model, (columns, _) in ROLLUP_SOURCES.items():
+        for key in columns:
+            event.listen(getattr(model, key), 'set', _track_old_value, active_history=True)
+    event.listen(Session, 'before_flush', _collect_rollup_deltas)
+    event.listen(Session, 'after_flush_postexec', _apply_rollup_deltas)
+    event.listen(Session, 'after_soft_rollback', _discard_rollup_deltas)
+    _listeners_installed = True
+
+
+def record_bulk_insert(model, rows, session=None):
+    """
+    Roll up rows written with a bulk insert(model) statement, which bypasses the flush
+    listeners. Runs in the caller's transaction, so call it before committing.
+
+    Args:
+        model: One of the ROLLUP_SOURCES models
+        rows: The parameter dicts passed to the insert
+        session: Session the insert ran on (default db.session)
+    """
+    columns, build = ROLLUP_SOURCES[model]
+    tz = _rollup_timezone()
+    deltas = {}
+    for row in rows:
+        _add_contributions(deltas, {key: row.get(key) for key in columns}, build, 1, tz)
+    _upsert_rollups((session or db.session).connection(), deltas)
+
+
+def rebuild_financial_rollups(company_id=None):
+    """
+    Recompute the rollups from the source tables. Writes that commit while the rebuild is
+    reading are not reflected, so run it when the company is quiet.
+
+    Returns:
+        number of rollup rows written
+    """
+    tz = _rollup_timezone()
+    deltas = {}
+
+    with read_connection() as connection:
+        for model, (columns, build) in ROLLUP_SOURCES.items():
+            statement = select(*(getattr(model, key) for key in columns))
+            if company_id:
+                statement = statement.where(model.company_id == company_id)
+            for row in stream_rows(statement, connection=connection):
+                _add_contributions(deltas, dict(row._mapping), build, 1, tz)
+
+    try:
+        clear = delete(FinancialDailyRollup.__table__)
+        if company_id:
+            clear = clear.where(FinancialDailyRollup.__table__.c.company_id == company_id)
+        db.session.execute(clear)
+        _upsert_rollups(db.session.connection(), deltas)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(deltas)
+
+
+@click.command('rebuild-financial-rollups')
+@click.option('--company-id', default=None, help='Only rebuild this company')
+def rebuild_financial_rollups_command(company_id):
+    """Recompute financial_daily_rollups from payments, expenses, income and invoices."""
+    written = rebuild_financial_rollups(company_id)
+    click.echo(f"Wrote {written} rollup rows.")
+
+
+def _month_keys(start_date, end_date):
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _month_label(year, month):
+    return f"{year:04d}-{month:02d}"
+
+
+def _percent(part, whole):
+    return round(part / whole * 100, 2) if whole else 0
+
+
+def _rollup_rows(company_id, start_date, end_date, bank_account_id=None, payment_method=None,
+                 isp_payment_type=None, expense_type=None):
+    t = FinancialDailyRollup
+    year = extract('year', t.day)
+    month = extract('month', t.day)
+
+    query = db.session.query(
+        year.label('year'),
+        month.label('month'),
+        t.bank_account_id,
+        t.category,
+        t.subcategory,
+        func.sum(t.amount).label('amount'),
+        func.sum(t.txn_count).label('txn_count'),
+    ).filter(
+        t.company_id == company_id,
+        t.day >= start_date,
+        t.day <= end_date,
+    )
+
+    if bank_account_id:
+        # Invoices are not tied to a bank account; keep them under a bank filter
+        query = query.filter(or_(t.category == 'invoiced', t.bank_account_id == bank_account_id))
+    for categories, value in (
+        (('collection',), payment_method),
+        (('isp_payment', 'bandwidth_cost', 'bandwidth_gb'), isp_payment_type),
+        (('expense',), expense_type),
+    ):
+        if value:
+            query = query.filter(or_(t.category.notin_(categories), t.subcategory == str(value)))
+
+    return query.group_by(year, month, t.bank_account_id, t.category, t.subcategory).all()
+
+
+def _bandwidth_analysis(bandwidth):
+    return [
+        {
+            'month': _month_label(year, month),
+            'total_cost': values['bandwidth_cost'],
+            'total_usage': values['bandwidth_gb'],
+            'cost_per_gb': values['bandwidth_cost'] / values['bandwidth_gb'] if values['bandwidth_gb'] else 0,
+        }
+        for (year, month), values in sorted(bandwidth.items())
+    ]
+
+
+def _income_by_plan(company_id, start_date, end_date):
+    # Package lines of the invoices billed in the range (one per customer package per month)
+    rows = db.session.query(
+        ServicePlan.name,
+        func.sum(InvoiceLineItem.line_total).label('amount'),
+        func.count(InvoiceLineItem.id).label('count'),
+    ).join(
+        Invoice, Invoice.id == InvoiceLineItem.invoice_id
+    ).join(
+        CustomerPackage, CustomerPackage.id == InvoiceLineItem.customer_package_id
+    ).join(
+        ServicePlan, ServicePlan.id == CustomerPackage.service_plan_id
+    ).filter(
+        Invoice.company_id == company_id,
+        Invoice.billing_start_date >= start_date,
+        Invoice.billing_start_date <= end_date,
+        Invoice.is_active.isnot(False),
+    ).group_by(ServicePlan.name).all()
+
+    return sorted(
+        ({'plan': name, 'amount': float(amount or 0), 'count': int(count or 0)} for name, amount, count in rows),
+        key=lambda plan: plan['amount'], reverse=True,
+    )
+
+
+def unified_financial_summary(company_id, start_date, end_date, bank_account_id=None, payment_method=None,
+                              isp_payment_type=None, expense_type=None):
+    """
+    Everything /dashboard/unified-financial returns, computed from financial_daily_rollups.
+    The payload is the FinancialData shape read by the web dashboard (UnifiedDashboard.tsx
+    and its ISPPaymentAnalysis / IncomeAnalysis panels).
+
+    Args:
+        company_id: Company to summarise
+        start_date, end_date: Inclusive local-date range
+        bank_account_id, payment_method, isp_payment_type, expense_type: Optional filters
+    """
+    blocks = run_blocks({
+        'rollups': lambda: _rollup_rows(company_id, start_date, end_date, bank_account_id, payment_method,
+                                        isp_payment_type, expense_type),
+        'accounts': lambda: db.session.query(
+            BankAccount.id, BankAccount.bank_name, BankAccount.account_number,
+            BankAccount.initial_balance, BankAccount.current_balance,
+        ).filter(
+            BankAccount.company_id == company_id, BankAccount.is_active == True
+        ).order_by(BankAccount.bank_name).all(),
+        'expense_types': lambda: dict(
+            db.session.query(ExpenseType.id, ExpenseType.name).filter(ExpenseType.company_id == company_id).all()
+        ),
+        'income_types': lambda: dict(
+            db.session.query(ExtraIncomeType.id, ExtraIncomeType.name).filter(ExtraIncomeType.company_id == company_id).all()
+        ),
+        'ageing': lambda: collections_ageing(company_id, end_date),
+        'plans': lambda: _income_by_plan(company_id, start_date, end_date),
+    })
+    rows = blocks.values['rollups']
+    accounts = blocks.values['accounts']
+    expense_types = blocks.values['expense_types']
+    income_types = blocks.values['income_types']
+
+    def type_name(names, key):
+        try:
+            return names.get(uuid.UUID(key), key or 'Other')
+        except ValueError:
+            return key or 'Other'
+
+    zero = {'amount': 0.0, 'count': 0}
+    totals = {category: dict(zero) for category in ('invoiced', 'collection', 'isp_payment', 'expense', 'extra_income')}
+    monthly = {key: {category: 0.0 for category in totals} for key in _month_keys(start_date, end_date)}
+    by_account = {}
+    by_subcategory = {}
+    bandwidth = {}
+
+    for row in rows:
+        amount = float(row.amount or 0)
+        count = int(row.txn_count or 0)
+        category = row.category
+        month_key = (int(row.year), int(row.month))
+
+        if category in BANDWIDTH_CATEGORIES:
+            bandwidth.setdefault(month_key, {c: 0.0 for c in BANDWIDTH_CATEGORIES})[category] += amount
+            continue
+
+        totals[category]['amount'] += amount
+        totals[category]['count'] += count
+
+        monthly.setdefault(month_key, {c: 0.0 for c in totals})[category] += amount
+
+        if category != 'invoiced':
+            account = by_account.setdefault(row.bank_account_id, {c: dict(zero) for c in totals})
+            account[category]['amount'] += amount
+            account[category]['count'] += count
+
+        sub = by_subcategory.setdefault((category, row.subcategory), dict(zero))
+        sub['amount'] += amount
+        sub['count'] += count
+
+    collections = totals['collection']['amount']
+    extra_income = totals['extra_income']['amount']
+    isp_payments = totals['isp_payment']['amount']
+    expenses = totals['expense']['amount']
+    invoiced = totals['invoiced']['amount']
+    net_cash_flow = collections + extra_income - isp_payments - expenses
+
+    selected_accounts = [a for a in accounts if not bank_account_id or str(a.id) == str(bank_account_id)]
+    total_initial_balance = sum(float(a.initial_balance or 0) for a in selected_accounts)
+
+    monthly_trends, monthly_comparison, three_line_trend = [], [], []
+    for (year, month), m in sorted(monthly.items()):
+        label = _month_label(year, month)
+        inflow = m['collection'] + m['extra_income']
+        outflow = m['isp_payment'] + m['expense']
+        monthly_trends.append({
+            'month': label,
+            'inflow': inflow,
+            'outflow': outflow,
+            'isp_outflow': m['isp_payment'],
+            'expense_outflow': m['expense'],
+            'net_flow': inflow - outflow,
+            'adjusted_flow': inflow - outflow,
+        })
+        monthly_comparison.append({
+            'month': label,
+            'revenue': m['collection'],
+            'extra_income': m['extra_income'],
+            'expenses': outflow,
+            'isp_expenses': m['isp_payment'],
+            'business_expenses': m['expense'],
+            'ratio': _percent(outflow, m['collection'] + m['extra_income']),
+        })
+        three_line_trend.append({
+            'month': label,
+            'invoiced': m['invoiced'],
+            'collected': m['collection'],
+            'spent': outflow,
+        })
+
+    def subcategories(category):
+        return sorted(
+            ((key, value) for (c, key), value in by_subcategory.items() if c == category),
+            key=lambda item: item[1]['amount'], reverse=True,
+        )
+
+    def account_flows(account_id):
+        flows = by_account.get(account_id, {c: dict(zero) for c in totals})
+        inflow = flows['collection']['amount'] + flows['extra_income']['amount']
+        outflow = flows['isp_payment']['amount'] + flows['expense']['amount']
+        return flows, inflow, outflow
+
+    bank_performance = []
+    for account in selected_accounts:
+        flows, inflow, outflow = account_flows(account.id)
+        initial_balance = float(account.initial_balance or 0)
+        bank_performance.append({
+            'bank_name': account.bank_name,
+            'account_number': account.account_number,
+            'collections': flows['collection']['amount'],
+            'extra_income': flows['extra_income']['amount'],
+            'payments': flows['collection']['count'],
+            'isp_payments': flows['isp_payment']['amount'],
+            'expenses': flows['expense']['amount'],
+            'net_flow': inflow - outflow,
+            'initial_balance': initial_balance,
+            'current_balance': float(account.current_balance or 0),
+            'adjusted_balance': initial_balance + inflow - outflow,
+            'utilization_rate': _percent(outflow, inflow),
+        })
+
+    cash_flows, cash_inflow, cash_outflow = account_flows(None)
+    account_names = {a.id: a for a in accounts}
+
+    waterfall = [
+        {'category': 'Invoiced', 'amount': invoiced, 'type': 'positive'},
+        {'category': 'Leakage', 'amount': -max(invoiced - collections, 0), 'type': 'negative'},
+        {'category': 'Collected', 'amount': collections, 'type': 'subtotal'},
+        {'category': 'Extra Income', 'amount': extra_income, 'type': 'positive'},
+        {'category': 'ISP Payments', 'amount': -isp_payments, 'type': 'negative'},
+        {'category': 'OpEx', 'amount': -expenses, 'type': 'negative'},
+        {'category': 'Net Cash', 'amount': net_cash_flow, 'type': 'total'},
+    ]
+
+    return {
+        'kpis': {
+            'total_revenue': collections,
+            'total_collections': collections,
+            'total_isp_payments': isp_payments,
+            'total_expenses': expenses,
+            'total_extra_income': extra_income,
+            'net_cash_flow': net_cash_flow,
+            'collection_efficiency': _percent(collections, invoiced),
+            'operating_profit': invoiced + extra_income - isp_payments - expenses,
+            'total_initial_balance': total_initial_balance,
+            'adjusted_cash_flow': total_initial_balance + net_cash_flow,
+        },
+        'cash_flow': {
+            'monthly_trends': monthly_trends,
+            'inflow_breakdown': [
+                {'method': method or 'Other', 'amount': value['amount']}
+                for method, value in subcategories('collection')
+            ] + ([{'method': 'Extra Income', 'amount': extra_income}] if extra_income else []),
+            'outflow_breakdown': [
+                {'type': 'ISP Payments', 'amount': isp_payments},
+                {'type': 'Business Expenses', 'amount': expenses},
+            ],
+            'initial_balance': total_initial_balance,
+            'total_adjusted_flow': total_initial_balance + net_cash_flow,
+        },
+        'revenue_expense': {
+            'monthly_comparison': monthly_comparison,
+            'total_revenue': collections,
+            'total_extra_income': extra_income,
+            'total_expenses': isp_payments + expenses,
+            'total_isp_expenses': isp_payments,
+            'total_business_expenses': expenses,
+            'average_ratio': _percent(isp_payments + expenses, collections + extra_income),
+        },
+        'bank_performance': bank_performance,
+        'collections': {
+            **blocks.values['ageing'],
+            'total_collections': collections,
+            'payment_count': totals['collection']['count'],
+            'by_method': [
+                {'method': method or 'Other', 'amount': value['amount'], 'count': value['count']}
+                for method, value in subcategories('collection')
+            ],
+        },
+        'isp_payments': {
+            'payment_types': [
+                {
+                    'type': payment_type or 'other',
+                    'total_amount': value['amount'],
+                    'avg_amount': value['amount'] / value['count'] if value['count'] else 0,
+                    'payment_count': value['count'],
+                }
+                for payment_type, value in subcategories('isp_payment')
+            ],
+            'bank_account_breakdown': [
+                {
+                    'bank_name': account_names[account_id].bank_name if account_id in account_names else 'Cash',
+                    'account_number': account_names[account_id].account_number if account_id in account_names else '',
+                    'total_amount': flows['isp_payment']['amount'],
+                    'avg_amount': flows['isp_payment']['amount'] / flows['isp_payment']['count'] if flows['isp_payment']['count'] else 0,
+                    'payment_count': flows['isp_payment']['count'],
+                }
+                for account_id, flows in by_account.items() if flows['isp_payment']['count']
+            ],
+            'bandwidth_analysis': _bandwidth_analysis(bandwidth),
+            'total_isp_payments': isp_payments,
+        },
+        'income_analysis': {
+            'income_by_method': [
+                {'method': method or 'Other', 'amount': value['amount'], 'count': value['count']}
+                for method, value in subcategories('collection')
+            ] + [
+                {'method': type_name(income_types, key), 'amount': value['amount'], 'count': value['count']}
+                for key, value in subcategories('extra_income')
+            ],
+            'income_by_bank': [
+                {
+                    'bank': account_names[account_id].bank_name if account_id in account_names else 'Cash',
+                    'account': account_names[account_id].account_number if account_id in account_names else '',
+                    'amount': flows['collection']['amount'] + flows['extra_income']['amount'],
+                    'count': flows['collection']['count'] + flows['extra_income']['count'],
+                }
+                for account_id, flows in by_account.items()
+                if flows['collection']['count'] or flows['extra_income']['count']
+            ],
+            'income_by_plan': blocks.values['plans'],
+            'total_income': collections + extra_income,
+        },
+        'expense_breakdown': [
+            {'type': type_name(expense_types, key), 'amount': value['amount'], 'count': value['count']}
+            for key, value in subcategories('expense')
+        ],
+        'financial_waterfall': waterfall,
+        'three_line_trend': three_line_trend,
+        'cash_payments': {
+            'collections': cash_flows['collection']['amount'],
+            'payments': cash_flows['collection']['count'],
+            'isp_payments': cash_flows['isp_payment']['amount'],
+            'expenses': cash_flows['expense']['amount'],
+            'extra_income': cash_flows['extra_income']['amount'],
+            'net_flow': cash_inflow - cash_outflow,
+        },
+        'filters': {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'bank_account_id': str(bank_account_id) if bank_account_id else None,
+            'payment_method': payment_method,
+            'isp_payment_type': isp_payment_type,
+            'expense_type': expense_type,
+        },
+        'bank_accounts': [
+            {'id': str(a.id), 'name': f"{a.bank_name} - {a.account_number}"} for a in accounts
+        ],
+        'initial_balance_summary': {
+            'total_initial_balance': total_initial_balance,
+            'accounts_with_balance': sum(1 for a in selected_accounts if a.initial_balance),
+            'average_balance': total_initial_balance / len(selected_accounts) if selected_accounts else 0,
+        },
+    }
+
+
+financial_rollups_bp = Blueprint('financial_rollups', __name__)
+
+
+@financial_rollups_bp.route('/dashboard/unified-financial', methods=['GET'])
+@jwt_required()
+def get_unified_financial():
+    claims = get_jwt()
+    if claims.get('role') not in FINANCIAL_ROLES:
+        return jsonify({'error': 'Unauthorized'}), 403
+    company_id = claims.get('company_id')
+    if claims.get('role') == 'super_admin' and request.args.get('company_id'):
+        company_id = request.args['company_id']
+    if not company_id:
+        return jsonify({'error': 'company_id is required'}), 400
+
+    today = datetime.now(_rollup_timezone()).date()
+    try:
+        start_date = date.fromisoformat(request.args['start_date']) if request.args.get('start_date') else today.replace(day=1)
+        end_date = date.fromisoformat(request.args['end_date']) if request.args.get('end_date') else today
+    except ValueError:
+        return jsonify({'error': 'start_date and end_date must be YYYY-MM-DD'}), 400
+    if start_date > end_date:
+        return jsonify({'error': 'start_date must be on or before end_date'}), 400
+    try:
+        company_id = _as_uuid(company_id)
+        bank_account_id = _as_uuid(request.args.get('bank_account_id') or None)
+    except ValueError:
+        return jsonify({'error': 'company_id and bank_account_id must be UUIDs'}), 400
+
+    return jsonify(unified_financial_summary(
+        company_id,
+        start_date,
+        end_date,
+        bank_account_id=bank_account_id,
+        payment_method=request.args.get('payment_method'),
+        isp_payment_type=request.args.get('isp_payment_type'),
+        expense_type=request.args.get('expense_type'),
+    )), 200
+
+
+def _serve_from_rollups(original_view):
+    @wraps(original_view)
+    def view(*args, **kwargs):
+        if any(request.args.get(name) for name in UNSUPPORTED_FILTERS):
+            return original_view(*args, **kwargs)
+        return get_unified_financial()
+    return view
+
+
+def init_financial_rollups(app):
+    """
+    Install the rollup listeners, register the rebuild CLI command and serve
+    /dashboard/unified-financial from the rollups.
+
+    Args:
+        app: Flask application instance
+    """
+    install_financial_rollup_listeners()
+    app.cli.add_command(rebuild_financial_rollups_command)
+
+    # An already registered /dashboard/unified-financial view still answers the filters
+    # in UNSUPPORTED_FILTERS; everything else is served from the rollups
+    for rule in app.url_map.iter_rules():
+        if rule.rule == '/dashboard/unified-financial':
+            app.view_functions[rule.endpoint] = _serve_from_rollups(app.view_functions[rule.endpoint])
+            return
+    app.register_blueprint(financial_rollups_bp)
@@ -0,0 +1,162 @@
+"""
+Server-side inventory search for SearchableInventorySelect.
+
+GET /inventory/search returns one page of the company's active inventory items matching
+`q` in their item_type, serial number or MAC address (attributes->>'serial_number' /
+attributes->>'mac_address'), with only the fields the picker shows instead of the full
+attributes document of every item.
+
+Request params:
+
+    q              case-insensitive substring of item_type, serial number or MAC
+    unassigned     'true' to leave out items with an open InventoryAssignment
+                   (status 'assigned' and not returned)
+    in_stock       'true' to leave out items with no quantity left
+    page_size      rows per page (1..MAX_PAGE_SIZE)
+    cursor         next_cursor of a previous response
+    id             one item by id (to label an already selected value); other params ignored
+
+Response: {items, page_size, has_more, next_cursor}
+
+Pages are ordered by (item_type, id) and fetched with a keyset cursor (see pagination.py).
+On Postgres `attributes` is JSONB and item_type and both attribute expressions have pg_trgm
+GIN indexes, so `ILIKE '%q%'` is answered from the indexes, and the unassigned filter is an
+anti-join on the partial index of open assignments.
+"""
+import hashlib
+import json
+import uuid
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import exists, or_, select, tuple_
+
+from app import db
+from app.models import InventoryAssignment, InventoryItem, Supplier
+from pagination import InvalidPageRequest, decode_cursor, encode_cursor, serialize_row
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def serial_number():
+    """Same expression as the idx_inventory_items_serial_trgm index."""
+    return InventoryItem.attributes['serial_number'].as_string()
+
+
+def mac_address():
+    """Same expression as the idx_inventory_items_mac_trgm index."""
+    return InventoryItem.attributes['mac_address'].as_string()
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _flag(args, name):
+    return (args.get(name) or '').lower() in ('1', 'true', 'yes')
+
+
+def _open_assignment():
+    return exists().where(
+        InventoryAssignment.inventory_item_id == InventoryItem.id,
+        InventoryAssignment.status == 'assigned',
+        InventoryAssignment.returned_at.is_(None),
+    )
+
+
+def _slim_select():
+    return select(
+        InventoryItem.id, InventoryItem.item_type, InventoryItem.quantity, InventoryItem.unit_price,
+        Supplier.name.label('vendor_name'), serial_number().label('serial_number'),
+        mac_address().label('mac_address'),
+    ).select_from(InventoryItem).outerjoin(Supplier, Supplier.id == InventoryItem.vendor)
+
+
+def search_inventory(company_id, args):
+    """
+    One page of the company's inventory items for the request args (see the module docstring).
+
+    Raises:
+        InvalidPageRequest
+    """
+    q = (args.get('q') or '').strip()
+    unassigned = _flag(args, 'unassigned')
+    in_stock = _flag(args, 'in_stock')
+    try:
+        page_size = max(1, min(int(args.get('page_size', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise InvalidPageRequest('page_size must be an integer')
+    fingerprint = hashlib.blake2b(json.dumps([q, unassigned, in_stock]).encode(), digest_size=8).hexdigest()
+
+    statement = _slim_select().where(
+        InventoryItem.company_id == company_id,
+        InventoryItem.is_active.is_(True),
+    )
+    if q:
+        pattern = f"%{_escape_like(q)}%"
+        statement = statement.where(or_(*(
+            column.ilike(pattern, escape='\\')
+            for column in (InventoryItem.item_type, serial_number(), mac_address())
+        )))
+    if unassigned:
+        statement = statement.where(~_open_assignment())
+    if in_stock:
+        statement = statement.where(InventoryItem.quantity > 0)
+
+    cursor = args.get('cursor')
+    if cursor:
+        item_type, row_id, _ = decode_cursor(cursor, fingerprint)
+        statement = statement.where(tuple_(InventoryItem.item_type, InventoryItem.id) > (item_type, row_id))
+
+    rows = db.session.execute(
+        statement.order_by(InventoryItem.item_type, InventoryItem.id).limit(page_size + 1)
+    ).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    return {
+        'items': [serialize_row(row) for row in rows],
+        'page_size': page_size,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(rows[-1].item_type, rows[-1].id, False, fingerprint) if has_more else None,
+    }
+
+
+def get_inventory_option(company_id, item_id):
+    row = db.session.execute(
+        _slim_select().where(InventoryItem.company_id == company_id, InventoryItem.id == item_id)
+    ).first()
+    return serialize_row(row) if row else None
+
+
+inventory_search_bp = Blueprint('inventory_search', __name__)
+
+
+@inventory_search_bp.route('/inventory/search', methods=['GET'])
+@jwt_required()
+def get_inventory_search():
+    company_id = get_jwt().get('company_id')
+
+    if request.args.get('id'):
+        try:
+            item_id = uuid.UUID(request.args['id'])
+        except ValueError:
+            return jsonify({'error': 'Invalid inventory item id'}), 400
+        option = get_inventory_option(company_id, item_id)
+        return jsonify({'items': [option] if option else [], 'page_size': 1, 'has_more': False, 'next_cursor': None}), 200
+
+    try:
+        return jsonify(search_inventory(company_id, request.args)), 200
+    except InvalidPageRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+
+def init_inventory_search(app):
+    """
+    Register the inventory search endpoint.
+
+    Args:
+        app: Flask application instance
+    """
+    app.register_blueprint(inventory_search_bp)
@@ -0,0 +1,234 @@
+"""
+Denormalized invoice payment totals.
+
+Invoice.paid_amount holds the sum of the invoice's counted payments and is kept current
+inside the same transaction whenever a Payment is added, verified, cancelled, refunded,
+moved to another invoice or deleted. Invoice.remaining_amount is a stored generated
+column (total_amount - paid_amount), so invoice lists, overdue filters and the public
+invoice page read both figures from the invoice row instead of summing payments.
+
+Updates are applied as `paid_amount = paid_amount + delta`, so concurrent payments on the
+same invoice never overwrite each other. Bulk query.update() calls on payments bypass the
+session events; `flask reconcile-invoice-balances` finds (and with --fix repairs) drift.
+"""
+from decimal import Decimal
+import logging
+import uuid
+
+import click
+from sqlalchemy import event, func, inspect, update
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Invoice, Payment
+
+logger = logging.getLogger(__name__)
+
+# Payment statuses that count towards what the customer has paid
+COUNTED_PAYMENT_STATUSES = ('paid', 'partially_paid')
+
+# Payment columns a contribution depends on
+TRACKED_PAYMENT_COLUMNS = ('invoice_id', 'amount', 'status', 'is_active')
+
+_DELTAS_KEY = 'invoice_paid_deltas'
+
+
+def _contribution(invoice_id, amount, status, is_active):
+    """
+    (invoice_id, amount) a payment with these values contributes to paid_amount.
+    """
+    if invoice_id is None or amount is None:
+        return None, Decimal('0')
+    if status not in COUNTED_PAYMENT_STATUSES or is_active is False:
+        return invoice_id, Decimal('0')
+    return invoice_id, Decimal(str(amount))
+
+
+def _committed_value(state, key):
+    """
+    Value of `key` as last loaded from the database, before pending changes. Expired
+    attributes are loaded from the row; changed ones keep their old value in the history
+    because the tracked columns have active history (see install_invoice_balance_listeners).
+    """
+    history = state.attrs[key].load_history()
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _old_contribution(payment):
+    state = inspect(payment)
+    return _contribution(*(_committed_value(state, key) for key in TRACKED_PAYMENT_COLUMNS))
+
+
+def _new_contribution(payment):
+    return _contribution(payment.invoice_id, payment.amount, payment.status, payment.is_active)
+
+
+def _collect_payment_deltas(session, flush_context, instances):
+    deltas = session.info.setdefault(_DELTAS_KEY, {})
+
+    def add(invoice_id, amount):
+        if invoice_id is not None and amount:
+            deltas[invoice_id] = deltas.get(invoice_id, Decimal('0')) + amount
+
+    for obj in session.new:
+        if isinstance(obj, Payment):
+            add(*_new_contribution(obj))
+
+    for obj in session.dirty:
+        if isinstance(obj, Payment) and session.is_modified(obj):
+            old_invoice, old_amount = _old_contribution(obj)
+            new_invoice, new_amount = _new_contribution(obj)
+            add(old_invoice, -old_amount)
+            add(new_invoice, new_amount)
+
+    for obj in session.deleted:
+        if isinstance(obj, Payment):
+            old_invoice, old_amount = _old_contribution(obj)
+            add(old_invoice, -old_amount)
+
+
+def _apply_payment_deltas(session, flush_context):
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if not deltas:
+        return
+
+    connection = session.connection()
+    for invoice_id, delta in deltas.items():
+        if not delta:
+            continue
+        connection.execute(
+            update(Invoice.__table__)
+            .where(Invoice.__table__.c.id == invoice_id)
+            .values(paid_amount=Invoice.__table__.c.paid_amount + delta)
+        )
+
+        # Make already loaded invoices re-read the new totals
+        for obj in session.identity_map.values():
+            if isinstance(obj, Invoice) and obj.id == invoice_id:
+                session.expire(obj, ['paid_amount', 'remaining_amount'])
+
+
+def _discard_payment_deltas(session, previous_transaction=None):
+    session.info.pop(_DELTAS_KEY, None)
+
+
+def _track_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+_listeners_installed = False
+
+
+def install_invoice_balance_listeners():
+    """
+    Maintain Invoice.paid_amount on every session flush. Installed once per process.
+    """
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    # active_history makes an assignment to an expired column load its committed value
+    # first, so the old contribution can be reversed after the object was committed
+    for key in TRACKED_PAYMENT_COLUMNS:
+        event.listen(getattr(Payment, key), 'set', _track_old_value, active_history=True)
+    event.listen(Session, 'before_flush', _collect_payment_deltas)
+    event.listen(Session, 'after_flush_postexec', _apply_payment_deltas)
+    event.listen(Session, 'after_soft_rollback', _discard_payment_deltas)
+    _listeners_installed = True
+
+
+def counted_payments_subquery():
+    return db.session.query(
+        Payment.invoice_id.label('invoice_id'),
+        func.coalesce(func.sum(Payment.amount), 0).label('total'),
+    ).filter(
+        Payment.invoice_id != None,
+        Payment.is_active == True,
+        Payment.status.in_(COUNTED_PAYMENT_STATUSES),
+    ).group_by(Payment.invoice_id).subquery()
+
+
+def find_invoice_balance_drift(company_id=None):
+    """
+    Invoices whose stored paid_amount differs from the sum of their counted payments.
+
+    Returns:
+        list of dicts with invoice id/number, stored and actual paid amounts
+    """
+    payments = counted_payments_subquery()
+    actual = func.coalesce(payments.c.total, 0)
+
+    query = db.session.query(
+        Invoice.id, Invoice.invoice_number, Invoice.company_id, Invoice.paid_amount, actual.label('actual_paid')
+    ).outerjoin(
+        payments, payments.c.invoice_id == Invoice.id
+    ).filter(Invoice.paid_amount != actual)
+
+    if company_id:
+        query = query.filter(Invoice.company_id == company_id)
+
+    return [
+        {
+            'invoice_id': str(row.id),
+            'invoice_number': row.invoice_number,
+            'company_id': str(row.company_id) if row.company_id else None,
+            'stored_paid_amount': float(row.paid_amount or 0),
+            'actual_paid_amount': float(row.actual_paid),
+        }
+        for row in query.all()
+    ]
+
+
+def reconcile_invoice_balances(company_id=None, fix=False):
+    """
+    Report invoices whose paid_amount has drifted, and optionally recompute them.
+    """
+    drift = find_invoice_balance_drift(company_id)
+
+    if fix and drift:
+        payments = counted_payments_subquery()
+        actual = db.session.query(func.coalesce(func.sum(payments.c.total), 0)).filter(
+            payments.c.invoice_id == Invoice.id
+        ).scalar_subquery()
+
+        db.session.query(Invoice).filter(
+            Invoice.id.in_([uuid.UUID(row['invoice_id']) for row in drift])
+        ).update({Invoice.paid_amount: actual}, synchronize_session=False)
+        db.session.commit()
+
+    return drift
+
+
+@click.command('reconcile-invoice-balances')
+@click.option('--company-id', default=None, help='Only check this company')
+@click.option('--fix', is_flag=True, help='Recompute paid_amount for drifted invoices')
+def reconcile_invoice_balances_command(company_id, fix):
+    """Compare Invoice.paid_amount with the payments table and report drift."""
+    drift = reconcile_invoice_balances(company_id, fix)
+
+    for row in drift:
+        click.echo(
+            f"{row['invoice_number']} ({row['invoice_id']}): stored {row['stored_paid_amount']:.2f}, "
+            f"payments {row['actual_paid_amount']:.2f}"
+        )
+
+    if not drift:
+        click.echo("No drift found.")
+    elif fix:
+        click.echo(f"Fixed {len(drift)} invoices.")
+    else:
+        click.echo(f"{len(drift)} invoices drifted. Re-run with --fix to repair them.")
+
+
+def init_invoice_balances(app):
+    """
+    Install the payment listeners and register the reconciliation CLI command.
+
+    Args:
+        app: Flask application instance
+    """
+    install_invoice_balance_listeners()
+    app.cli.add_command(reconcile_invoice_balances_command)
@@ -0,0 +1,244 @@
+"""
+Sequence-backed invoice number allocation.
+
+Invoice numbers keep each company's format as produced by
+app.crud.invoice_crud.generate_invoice_number (a prefix followed by a zero-padded counter,
+e.g. INV-2026-0042). Only the counter comes from a Postgres sequence, so concurrent writers
+never read-the-max and never collide on the unique invoice_number constraint. A whole block
+of numbers is reserved with a single round trip, which lets bulk jobs number thousands of
+invoices at once.
+
+There is one sequence per prefix, created the first time the prefix is numbered and seeded
+past the highest counter already used with it. Companies with their own format count
+independently, prefixes that embed the year start a fresh sequence each year, and companies
+that share a format share its sequence because invoice numbers are unique across companies.
+
+Invoices added through the ORM (manual creation in app.crud) are numbered with
+generate_invoice_number's max+1, which would collide with counters the sequence has already
+handed out. A before_flush listener renumbers those from the sequence, so on Postgres every
+invoice number is allocated from it. Numbers this module handed out are left alone.
+"""
+from datetime import date
+import hashlib
+import logging
+import re
+import threading
+
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app import db
+from app.crud.invoice_crud import generate_invoice_number
+from app.models import Invoice
+
+logger = logging.getLogger(__name__)
+
+INVOICE_NUMBER_SEQUENCE_PREFIX = 'invoice_number_seq_'
+DEFAULT_BLOCK_SIZE = 50
+
+_COUNTER_PATTERN = re.compile(r'(\d+)$')
+
+
+def split_invoice_number(invoice_number):
+    """
+    Split an invoice number into (prefix, counter, width).
+
+    Raises:
+        ValueError: if the number does not end in a numeric counter
+    """
+    match = _COUNTER_PATTERN.search(invoice_number)
+    if not match:
+        raise ValueError(f"Cannot derive a numbering sequence from invoice number {invoice_number!r}")
+    return invoice_number[:match.start()], int(match.group(1)), len(match.group(1))
+
+
+def format_invoice_number(prefix, counter, width):
+    return f"{prefix}{counter:0{width}d}"
+
+
+def sequence_name(prefix):
+    """
+    Name of the Postgres sequence that numbers invoices with `prefix`.
+    """
+    return INVOICE_NUMBER_SEQUENCE_PREFIX + hashlib.md5(prefix.encode('utf-8')).hexdigest()[:16]
+
+
+class InvoiceNumberAllocator:
+    """
+    Hands out invoice numbers from the per-prefix invoice number sequences.
+
+    reserve(company_id, count) fetches `count` numbers in one statement. next_number(company_id)
+    serves single numbers (manual adds) from a per-process block per sequence so that most calls
+    never touch the DB. Numbers left in a block when the process exits are skipped, which leaves
+    gaps but never duplicates.
+    """
+
+    def __init__(self, block_size=None):
+        self._block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}
+        self._templates = {}
+        self._sequences = set()
+        # Single numbers handed out and not yet flushed, so the flush listener keeps them
+        self._issued = set()
+
+    @property
+    def block_size(self):
+        if self._block_size:
+            return self._block_size
+        return current_app.config.get('INVOICE_NUMBER_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)
+
+    def _uses_sequence(self):
+        return db.engine.dialect.name == 'postgresql'
+
+    def _number_template(self, company_id):
+        """
+        Prefix and counter width of the company's invoice number format, refreshed once a day
+        so prefixes that embed the year or month roll over.
+        """
+        today = date.today()
+        cached = self._templates.get(company_id)
+        if cached is None or cached[0] != today:
+            prefix, _, width = split_invoice_number(generate_invoice_number(company_id=company_id))
+            cached = self._templates[company_id] = (today, prefix, width)
+        return cached[1], cached[2]
+
+    def _ensure_sequence(self, conn, prefix):
+        """
+        Create the prefix's sequence on first use, starting after the highest counter any
+        existing invoice with that prefix already has.
+        """
+        name = sequence_name(prefix)
+        if name in self._sequences:
+            return name
+
+        # Serialises processes racing to create the same sequence
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': name})
+        if conn.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is None:
+            start = conn.execute(
+                text(r"""
+                    SELECT COALESCE(MAX(CAST(substring(invoice_number FROM char_length(:prefix) + 1) AS BIGINT)), 0) + 1
+                    FROM invoices
+                    WHERE left(invoice_number, char_length(:prefix)) = :prefix
+                      AND substring(invoice_number FROM char_length(:prefix) + 1) ~ '^\d+$'
+                """),
+                {'prefix': prefix},
+            ).scalar()
+            conn.execute(text(f"CREATE SEQUENCE {name} START WITH {int(start)}"))
+            logger.info(f"Created invoice number sequence {name} for prefix {prefix!r} starting at {start}")
+        self._sequences.add(name)
+        return name
+
+    def _fetch_counters(self, prefix, count):
+        # Runs on its own connection: nextval() is non-transactional, so the numbers stay
+        # reserved even if the caller's transaction rolls back, and no locks are held.
+        with db.engine.connect() as conn:
+            name = self._ensure_sequence(conn, prefix)
+            rows = conn.execute(
+                text(f"SELECT nextval('{name}') FROM generate_series(1, :count) ORDER BY 1"),
+                {'count': count},
+            ).scalars().all()
+            conn.commit()
+        return rows
+
+    def reserve(self, company_id, count):
+        """
+        Reserve `count` invoice numbers for a company with a single round trip.
+
+        Returns:
+            list of formatted invoice numbers, in ascending order
+        """
+        if count <= 0:
+            return []
+
+        if not self._uses_sequence():
+            # No sequences (e.g. SQLite in tests): number the block consecutively from
+            # the next number generate_invoice_number() would return.
+            prefix, start, width = split_invoice_number(generate_invoice_number(company_id=company_id))
+            return [format_invoice_number(prefix, start + offset, width) for offset in range(count)]
+
+        with self._lock:
+            prefix, width = self._number_template(company_id)
+        return [format_invoice_number(prefix, counter, width) for counter in self._fetch_counters(prefix, count)]
+
+    def next_number(self, company_id):
+        """
+        Return one invoice number for a company, refilling the per-process block of its
+        sequence when it runs out.
+        """
+        if not self._uses_sequence():
+            return generate_invoice_number(company_id=company_id)
+
+        with self._lock:
+            prefix, width = self._number_template(company_id)
+            block = self._blocks.setdefault(prefix, [])
+            if not block:
+                block.extend(self._fetch_counters(prefix, self.block_size))
+            number = format_invoice_number(prefix, block.pop(0), width)
+            self._issued.add(number)
+            return number
+
+    def claim(self, invoice_number):
+        """
+        Return True (once) if `invoice_number` was handed out by next_number().
+        """
+        with self._lock:
+            if invoice_number in self._issued:
+                self._issued.discard(invoice_number)
+                return True
+            return False
+
+
+# Shared allocator for the process
+allocator = InvoiceNumberAllocator()
+
+
+def reserve_invoice_numbers(company_id, count):
+    return allocator.reserve(company_id, count)
+
+
+def next_invoice_number(company_id):
+    return allocator.next_number(company_id)
+
+
+def _number_new_invoices(session, flush_context, instances):
+    """
+    Renumber invoices added through the ORM from the sequence unless their number already
+    came from it.
+    """
+    new_invoices = [obj for obj in session.new if isinstance(obj, Invoice)]
+    if not new_invoices or not allocator._uses_sequence():
+        return
+    for invoice in new_invoices:
+        if invoice.invoice_number and allocator.claim(invoice.invoice_number):
+            continue
+        number = next_invoice_number(invoice.company_id)
+        allocator.claim(number)
+        if invoice.invoice_number:
+            logger.info(f"Renumbered manual invoice {invoice.invoice_number} to {number} from the sequence")
+        invoice.invoice_number = number
+
+
+_listeners_installed = False
+
+
+def install_invoice_number_listeners():
+    """
+    Number ORM-created invoices from the sequence on every flush. Installed once per process.
+    """
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Session, 'before_flush', _number_new_invoices)
+    _listeners_installed = True
+
+
+def init_invoice_numbers(app):
+    """
+    Install the invoice numbering listener.
+
+    Args:
+        app: Flask application instance
+    """
+    install_invoice_number_listeners()
@@ -0,0 +1,651 @@
+"""
+Server-side invoice PDFs with a content-hash cache, and merged monthly route books.
+
+    GET /invoices/<id>/pdf                              one invoice
+    GET /invoices/pdf/route-book?month=YYYY-MM[&area_id=] every active invoice of the company
+                                                        billed in that month (optionally one
+                                                        area), ordered by area and internet id,
+                                                        in one PDF
+    GET /invoices/pdf/route-book/jobs/<id>[/download]   status and file of a large route book
+
+A route book of INVOICE_PDF_ROUTE_BOOK_JOB_THRESHOLD or more invoices is not rendered in the
+request: it is queued as a background job (an ExportJob row with entity 'route_book', see
+export_jobs.py) and the request gets 202 with the job to poll.
+
+An invoice is rendered from a snapshot of its own fields, its company and customer, its line
+items and its active payments. The blake2b hash of that snapshot (plus RENDERER_VERSION) names
+the cached file, INVOICE_PDF_DIR/<hash[:2]>/<hash>.pdf, so an invoice is only re-rendered
+after something printed on it changed, and there is nothing to invalidate. Route books are
+cached the same way under a hash of their invoices' hashes.
+
+A route book renders its missing invoices on a process pool (reportlab is CPU bound and holds
+the GIL) and concatenates the files with pypdf. Files untouched for INVOICE_PDF_TTL seconds are
+removed by every host from its own cache directory (see local_files.py) and by
+cleanup_invoice_pdfs(); every cache hit refreshes a file's mtime.
+
+Dates and times are printed in FINANCIAL_TIMEZONE.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from xml.sax.saxutils import escape
+from zoneinfo import ZoneInfo
+
+from flask import Blueprint, current_app, has_app_context, jsonify, request, send_file
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from pypdf import PdfWriter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from sqlalchemy import select
+
+from app import db
+from app.models import Area, Company, Customer, ExportJob, Invoice, InvoiceLineItem, Payment
+from export_jobs import ACTIVE_STATUSES, serialize_export_job
+from local_files import register_sweep, remove_older_than
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so cached files are re-rendered
+RENDERER_VERSION = 1
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+# Invoices loaded and hashed per query round
+LOAD_BATCH_SIZE = 500
+# Fewer missing invoices than this are rendered in the calling process
+POOL_THRESHOLD = 16
+# Rendered invoices reported to on_progress at a time
+PROGRESS_STEP = 50
+DEFAULT_ROUTE_BOOK_JOB_THRESHOLD = 200
+DEFAULT_TIMEZONE = 'Asia/Karachi'
+ROUTE_BOOK_ENTITY = 'route_book'
+
+_pool = None
+_pool_lock = threading.Lock()
+_job_executor = None
+
+
+def pdf_dir():
+    return current_app.config.get('INVOICE_PDF_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'invoice_pdfs'))
+
+
+def _timezone():
+    name = DEFAULT_TIMEZONE
+    if has_app_context():
+        name = current_app.config.get('FINANCIAL_TIMEZONE', DEFAULT_TIMEZONE)
+    return ZoneInfo(name)
+
+
+def _local_date(value, tz):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            # timestamptz columns store UTC; drivers without time zone support return it naive
+            value = value.replace(tzinfo=timezone.utc)
+        value = value.astimezone(tz).date()
+    return value
+
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, (date, Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def load_documents(invoice_ids):
+    """
+    Snapshots of everything printed on the given invoices, as plain dicts (picklable for the
+    render pool), keyed by invoice id string. Three queries however many invoices.
+    """
+    if not invoice_ids:
+        return {}
+    rows = db.session.execute(
+        select(
+            Invoice.id, Invoice.invoice_number, Invoice.invoice_type, Invoice.status,
+            Invoice.billing_start_date, Invoice.billing_end_date, Invoice.due_date,
+            Invoice.subtotal, Invoice.discount_percentage, Invoice.total_amount, Invoice.paid_amount,
+            Invoice.notes,
+            Company.name.label('company_name'), Company.address.label('company_address'),
+            Company.contact_number.label('company_contact_number'), Company.email.label('company_email'),
+            Customer.first_name, Customer.last_name, Customer.internet_id, Customer.phone_1,
+            Customer.installation_address, Area.name.label('area_name'),
+        )
+        .outerjoin(Company, Invoice.company_id == Company.id)
+        .outerjoin(Customer, Invoice.customer_id == Customer.id)
+        .outerjoin(Area, Customer.area_id == Area.id)
+        .where(Invoice.id.in_(invoice_ids))
+    )
+
+    documents = {}
+    for row in rows:
+        documents[str(row.id)] = {
+            'invoice': {
+                name: _text(getattr(row, name)) for name in (
+                    'invoice_number', 'invoice_type', 'status', 'billing_start_date', 'billing_end_date',
+                    'due_date', 'subtotal', 'discount_percentage', 'total_amount', 'paid_amount', 'notes',
+                )
+            },
+            'company': {
+                'name': row.company_name, 'address': row.company_address,
+                'contact_number': row.company_contact_number, 'email': row.company_email,
+            },
+            'customer': {
+                'name': ' '.join(part for part in (row.first_name, row.last_name) if part),
+                'internet_id': row.internet_id, 'phone': row.phone_1,
+                'address': row.installation_address, 'area': row.area_name,
+            },
+            'line_items': [],
+            'payments': [],
+        }
+
+    line_items = db.session.execute(
+        select(
+            InvoiceLineItem.invoice_id, InvoiceLineItem.description, InvoiceLineItem.quantity,
+            InvoiceLineItem.unit_price, InvoiceLineItem.discount_amount, InvoiceLineItem.line_total,
+        )
+        .where(InvoiceLineItem.invoice_id.in_(invoice_ids))
+        .order_by(InvoiceLineItem.invoice_id, InvoiceLineItem.created_at, InvoiceLineItem.id)
+    )
+    for row in line_items:
+        documents[str(row.invoice_id)]['line_items'].append({
+            'description': row.description, 'quantity': row.quantity, 'unit_price': _text(row.unit_price),
+            'discount_amount': _text(row.discount_amount), 'line_total': _text(row.line_total),
+        })
+
+    payments = db.session.execute(
+        select(Payment.invoice_id, Payment.amount, Payment.payment_date, Payment.payment_method, Payment.status)
+        .where(Payment.invoice_id.in_(invoice_ids), Payment.is_active.is_(True))
+        .order_by(Payment.invoice_id, Payment.payment_date, Payment.id)
+    )
+    tz = _timezone()
+    for row in payments:
+        documents[str(row.invoice_id)]['payments'].append({
+            'amount': _text(row.amount), 'payment_date': _local_date(row.payment_date, tz).isoformat(),
+            'payment_method': row.payment_method, 'status': row.status,
+        })
+    return documents
+
+
+def content_hash(document):
+    payload = json.dumps([RENDERER_VERSION, document], sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+
+def _money(value):
+    return f"PKR {Decimal(value or 0):,.2f}"
+
+
+def _label(value):
+    return (value or '').replace('_', ' ').title()
+
+
+def render_invoice(document):
+    """Render an invoice snapshot (see load_documents) to PDF bytes."""
+    styles = getSampleStyleSheet()
+    normal, heading = styles['Normal'], styles['Heading1']
+    small = styles['BodyText'].clone('InvoiceSmall', fontSize=8, leading=10, textColor=colors.HexColor('#64748b'))
+    invoice, company, customer = document['invoice'], document['company'], document['customer']
+
+    def paragraph(text, style=normal):
+        return Paragraph(escape(str(text)).replace('\n', '<br/>'), style)
+
+    grid = TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+    ])
+    company_lines = [company['name'] or '', company['address'], company['contact_number'], company['email']]
+    header = Table([[
+        [paragraph('INVOICE', heading), paragraph(f"#{invoice['invoice_number']}"),
+         paragraph(f"{_label(invoice['status'])} · {_label(invoice['invoice_type'])}", small)],
+        [paragraph(line, small if i else normal) for i, line in enumerate(company_lines) if line],
+    ]], colWidths=['55%', '45%'], style=grid)
+
+    period = invoice['billing_start_date']
+    if (invoice['invoice_type'] or '').lower() == 'subscription':
+        period = f"{invoice['billing_start_date']} to {invoice['billing_end_date']}"
+    bill_to = Table([[
+        [paragraph('BILL TO', small), paragraph(customer['name'] or ''),
+         *(paragraph(line, small) for line in (
+             f"ID: {customer['internet_id']}" if customer['internet_id'] else None,
+             f"Phone: {customer['phone']}" if customer['phone'] else None,
+             customer['address'], customer['area'],
+         ) if line)],
+        [paragraph('BILLING PERIOD', small), paragraph(period or ''),
+         paragraph('DUE DATE', small), paragraph(invoice['due_date'] or '')],
+    ]], colWidths=['55%', '45%'], style=grid)
+
+    items = [['Description', 'Qty', 'Rate', 'Amount']]
+    for item in document['line_items']:
+        items.append([paragraph(item['description']), item['quantity'], _money(item['unit_price']),
+                      _money(item['line_total'])])
+    if len(items) == 1:
+        items.append([paragraph(_label(invoice['invoice_type']) or 'Invoice'), 1, _money(invoice['subtotal']),
+                      _money(invoice['subtotal'])])
+
+    subtotal = Decimal(invoice['subtotal'] or 0)
+    discount = subtotal * Decimal(invoice['discount_percentage'] or 0) / 100
+    totals = [['Subtotal', _money(subtotal)]]
+    if discount:
+        totals.append([f"Discount ({invoice['discount_percentage']}%)", f"-{_money(discount)}"])
+    totals += [
+        ['Total', _money(invoice['total_amount'])],
+        ['Paid', _money(invoice['paid_amount'])],
+        ['Balance due', _money(Decimal(invoice['total_amount'] or 0) - Decimal(invoice['paid_amount'] or 0))],
+    ]
+
+    story = [
+        header, Spacer(1, 8 * mm), bill_to, Spacer(1, 8 * mm),
+        Table(items, colWidths=['55%', '10%', '17%', '18%'], repeatRows=1, style=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e293b')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LINEBELOW', (0, 1), (-1, -1), 0.25, colors.HexColor('#e2e8f0')),
+        ])),
+        Spacer(1, 4 * mm),
+        Table(totals, colWidths=['82%', '18%'], style=TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, -3), (-1, -3), 'Helvetica-Bold'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('LINEABOVE', (0, -3), (-1, -3), 0.5, colors.HexColor('#94a3b8')),
+        ])),
+    ]
+    if document['payments']:
+        payments = [['Date', 'Method', 'Status', 'Amount']]
+        payments += [[p['payment_date'], _label(p['payment_method']), _label(p['status']), _money(p['amount'])]
+                     for p in document['payments']]
+        story += [Spacer(1, 8 * mm), paragraph('PAYMENTS', small), Table(
+            payments, colWidths=['25%', '30%', '25%', '20%'], style=TableStyle([
+                ('FONTSIZE', (0, 0), (-1, -1), 8),
+                ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+                ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.HexColor('#94a3b8')),
+            ]))]
+    if invoice['notes']:
+        story += [Spacer(1, 6 * mm), paragraph('NOTES', small), paragraph(invoice['notes'], small)]
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(
+        buffer, pagesize=A4, leftMargin=18 * mm, rightMargin=18 * mm, topMargin=16 * mm, bottomMargin=16 * mm,
+        title=f"Invoice {invoice['invoice_number']}", author=company['name'] or '',
+    ).build(story)
+    return buffer.getvalue()
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.part"
+    with open(partial, 'wb') as f:
+        f.write(data)
+    os.replace(partial, path)
+
+
+def render_to_path(job):
+    """Render (document, path) to the file; runs in the render pool."""
+    document, path = job
+    _write_atomic(path, render_invoice(document))
+    return path
+
+
+def _cache_path(digest):
+    return os.path.join(pdf_dir(), digest[:2], f"{digest}.pdf")
+
+
+def _cached(path):
+    if not os.path.exists(path):
+        return False
+    os.utime(path)
+    return True
+
+
+def _workers(app):
+    return app.config.get('INVOICE_PDF_WORKERS') or os.cpu_count() or 1
+
+
+def _get_pool(app):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded web worker can copy held locks into the children
+            _pool = ProcessPoolExecutor(max_workers=_workers(app), mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def ensure_rendered(invoice_ids, on_progress=None):
+    """
+    The cached PDF of every invoice, rendering the missing ones.
+
+    Args:
+        on_progress: Called with the number of invoices that became ready since the last call
+
+    Returns:
+        list of (content hash, path) in the order of invoice_ids (unknown ids are skipped)
+    """
+    on_progress = on_progress or (lambda count: None)
+    rendered = []
+    missing = []
+    cached = 0
+    for start in range(0, len(invoice_ids), LOAD_BATCH_SIZE):
+        batch = invoice_ids[start:start + LOAD_BATCH_SIZE]
+        documents = load_documents(batch)
+        for invoice_id in batch:
+            document = documents.get(str(invoice_id))
+            if document is None:
+                continue
+            digest = content_hash(document)
+            path = _cache_path(digest)
+            rendered.append((digest, path))
+            if _cached(path):
+                cached += 1
+            else:
+                missing.append((document, path))
+        on_progress(cached)
+        cached = 0
+
+    if len(missing) < POOL_THRESHOLD:
+        done = map(render_to_path, missing)
+    else:
+        app = current_app._get_current_object()
+        chunksize = max(1, len(missing) // (_workers(app) * 4))
+        done = _get_pool(app).map(render_to_path, missing, chunksize=chunksize)
+    pending = 0
+    for _ in done:
+        pending += 1
+        if pending == PROGRESS_STEP:
+            on_progress(pending)
+            pending = 0
+    if pending:
+        on_progress(pending)
+    return rendered
+
+
+def invoice_pdf(invoice_id):
+    """Path of the cached PDF of one invoice and its content hash, or (None, None)."""
+    rendered = ensure_rendered([invoice_id])
+    if not rendered:
+        return None, None
+    digest, path = rendered[0]
+    return path, digest
+
+
+def route_book_ids(company_id, month_start, area_id=None):
+    """Active invoices of a company billed in the month, in route order (area, internet id)."""
+    month_end = date(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+    statement = (
+        select(Invoice.id)
+        .outerjoin(Customer, Invoice.customer_id == Customer.id)
+        .outerjoin(Area, Customer.area_id == Area.id)
+        .where(
+            Invoice.company_id == company_id,
+            Invoice.is_active.is_(True),
+            Invoice.billing_start_date >= month_start,
+            Invoice.billing_start_date < month_end,
+        )
+        .order_by(Area.name, Customer.internet_id, Invoice.invoice_number)
+    )
+    if area_id is not None:
+        statement = statement.where(Customer.area_id == area_id)
+    return list(db.session.execute(statement).scalars())
+
+
+def render_route_book(company_id, month_start, area_id=None, invoice_ids=None, on_progress=None):
+    """
+    Path of one PDF with every invoice of the month (see route_book_ids), or None if there
+    are none. Reuses the cached file when no invoice in it changed.
+
+    Args:
+        invoice_ids: The month's invoices when the caller already listed them
+        on_progress: See ensure_rendered()
+    """
+    if invoice_ids is None:
+        invoice_ids = route_book_ids(company_id, month_start, area_id)
+    rendered = ensure_rendered(invoice_ids, on_progress)
+    if not rendered:
+        return None
+
+    key = hashlib.blake2b(''.join(digest for digest, _ in rendered).encode(), digest_size=20).hexdigest()
+    path = os.path.join(pdf_dir(), 'books', f"{key}.pdf")
+    if _cached(path):
+        return path
+
+    writer = PdfWriter()
+    for _, invoice_path in rendered:
+        writer.append(invoice_path)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    _write_atomic(path, buffer.getvalue())
+    return path
+
+
+def cleanup_invoice_pdfs(app=None):
+    """Scheduled job: delete cached invoice PDFs and route books untouched for INVOICE_PDF_TTL seconds."""
+    if not app:
+        logger.error("No Flask app provided to cleanup_invoice_pdfs")
+        return
+    with app.app_context():
+        return {'removed': remove_older_than(pdf_dir(), time.time() - _ttl_seconds())}
+
+
+def _ttl_seconds():
+    return current_app.config.get('INVOICE_PDF_TTL', DEFAULT_TTL_SECONDS)
+
+
+def _job_threshold():
+    return current_app.config.get('INVOICE_PDF_ROUTE_BOOK_JOB_THRESHOLD', DEFAULT_ROUTE_BOOK_JOB_THRESHOLD)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _get_job_executor(app):
+    global _job_executor
+    with _pool_lock:
+        if _job_executor is None:
+            # One book at a time per process; each already fans out over the render pool
+            _job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='route-book')
+        return _job_executor
+
+
+def _run_job_in_app(app, job_id):
+    with app.app_context():
+        try:
+            run_route_book_job(job_id)
+        finally:
+            db.session.remove()
+
+
+def submit_route_book(company_id, user_id, month_start, area_id=None):
+    """
+    Queue a route book as an ExportJob, or return the queued or running job for the same book.
+    Finished books are not reused from the job: the invoice cache makes a rerun cheap and
+    picks up invoices that changed since.
+    """
+    params = {'month': f"{month_start:%Y-%m}", 'area_id': str(area_id) if area_id else None}
+    payload = json.dumps([ROUTE_BOOK_ENTITY, str(company_id), params['month'], params['area_id']], separators=(',', ':'))
+    key = hashlib.blake2b(payload.encode(), digest_size=32).hexdigest()
+    job = ExportJob.query.filter(
+        ExportJob.cache_key == key,
+        ExportJob.status.in_(ACTIVE_STATUSES),
+    ).order_by(ExportJob.created_at.desc()).first()
+    if job is not None:
+        return job
+
+    job = ExportJob(
+        company_id=company_id,
+        user_id=user_id,
+        entity=ROUTE_BOOK_ENTITY,
+        format='pdf',
+        access='company',
+        params=params,
+        cache_key=key,
+        status='queued',
+        rows_written=0,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    if db.engine.dialect.name == 'sqlite':
+        # In-memory SQLite databases are per connection; run in the caller's context
+        run_route_book_job(job.id)
+    else:
+        _get_job_executor(app).submit(_run_job_in_app, app, job.id)
+    return job
+
+
+def run_route_book_job(job_id):
+    """Render a queued route book, recording rendered invoices on the job as rows_written."""
+    job = db.session.get(ExportJob, job_id)
+    if job is None or job.status != 'queued':
+        return
+
+    job.status = 'running'
+    job.started_at = _now()
+    db.session.commit()
+
+    try:
+        year, month = (int(part) for part in job.params['month'].split('-'))
+        month_start = date(year, month, 1)
+        area_id = uuid.UUID(job.params['area_id']) if job.params.get('area_id') else None
+        invoice_ids = route_book_ids(job.company_id, month_start, area_id)
+        job.total_rows = len(invoice_ids)
+        db.session.commit()
+
+        def on_progress(count):
+            job.rows_written = (job.rows_written or 0) + count
+            db.session.commit()
+
+        path = render_route_book(job.company_id, month_start, area_id, invoice_ids=invoice_ids, on_progress=on_progress)
+        if path is None:
+            raise ValueError('No invoices for that month')
+        job.status = 'succeeded'
+        job.file_path = path
+        job.file_size = os.path.getsize(path)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Route book job {job_id} failed: {str(e)}")
+        job.status = 'failed'
+        job.error_message = str(e)
+    job.finished_at = _now()
+    job.expires_at = job.finished_at + timedelta(seconds=_ttl_seconds())
+    db.session.commit()
+
+
+invoice_pdf_bp = Blueprint('invoice_pdf', __name__)
+
+
+@invoice_pdf_bp.route('/invoices/<uuid:invoice_id>/pdf', methods=['GET'])
+@jwt_required()
+def get_invoice_pdf(invoice_id):
+    claims = get_jwt()
+    invoice = db.session.get(Invoice, invoice_id)
+    if invoice is None or (claims.get('role') != 'super_admin'
+                           and str(invoice.company_id) != str(claims.get('company_id'))):
+        return jsonify({'error': 'Invoice not found'}), 404
+
+    path, digest = invoice_pdf(invoice.id)
+    return send_file(
+        path,
+        mimetype='application/pdf',
+        as_attachment=request.args.get('download') == 'true',
+        download_name=f"Invoice-{invoice.invoice_number}.pdf",
+        etag=digest,
+        max_age=0,
+    )
+
+
+@invoice_pdf_bp.route('/invoices/pdf/route-book', methods=['GET'])
+@jwt_required()
+def get_route_book():
+    claims = get_jwt()
+    company_id = claims.get('company_id')
+    if claims.get('role') == 'super_admin':
+        company_id = request.args.get('company_id') or company_id
+    try:
+        company_id = uuid.UUID(str(company_id))
+        year, month = (int(part) for part in (request.args.get('month') or '').split('-'))
+        month_start = date(year, month, 1)
+        area_id = uuid.UUID(request.args['area_id']) if request.args.get('area_id') else None
+    except ValueError:
+        return jsonify({'error': 'month (YYYY-MM), company and area_id must be valid'}), 400
+
+    invoice_ids = route_book_ids(company_id, month_start, area_id)
+    if not invoice_ids:
+        return jsonify({'error': 'No invoices for that month'}), 404
+    if len(invoice_ids) >= _job_threshold():
+        job = submit_route_book(company_id, _user_id(), month_start, area_id)
+        return jsonify(serialize_export_job(job)), 202
+
+    path = render_route_book(company_id, month_start, area_id, invoice_ids=invoice_ids)
+    return send_file(
+        path,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=f"route-book-{month_start:%Y-%m}.pdf",
+        max_age=0,
+    )
+
+
+def _user_id():
+    try:
+        return uuid.UUID(str(get_jwt_identity()))
+    except ValueError:
+        return None
+
+
+def _visible_route_book_job(job_id):
+    claims = get_jwt()
+    job = ExportJob.query.filter(ExportJob.id == job_id, ExportJob.entity == ROUTE_BOOK_ENTITY).first()
+    if job is None or (claims.get('role') != 'super_admin'
+                       and str(job.company_id) != str(claims.get('company_id'))):
+        return None
+    return job
+
+
+@invoice_pdf_bp.route('/invoices/pdf/route-book/jobs/<uuid:job_id>', methods=['GET'])
+@jwt_required()
+def get_route_book_job(job_id):
+    job = _visible_route_book_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Route book job not found'}), 404
+    return jsonify(serialize_export_job(job)), 200
+
+
+@invoice_pdf_bp.route('/invoices/pdf/route-book/jobs/<uuid:job_id>/download', methods=['GET'])
+@jwt_required()
+def download_route_book_job(job_id):
+    job = _visible_route_book_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Route book job not found'}), 404
+    if job.status != 'succeeded' or not job.file_path or not os.path.exists(job.file_path):
+        return jsonify({'error': f"Route book is {job.status}", 'status': job.status}), 409
+    return send_file(
+        job.file_path,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=f"route-book-{job.params['month']}.pdf",
+        max_age=0,
+    )
+
+
+def init_invoice_pdf(app):
+    """
+    Register the invoice PDF endpoints and the sweep of this host's PDF cache.
+
+    Args:
+        app: Flask application instance
+    """
+    app.register_blueprint(invoice_pdf_bp)
+    register_sweep('invoice_pdfs', pdf_dir, _ttl_seconds)
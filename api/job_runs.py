@@ -0,0 +1,340 @@
+"""
+Persistent run history and instrumentation for scheduled jobs.
+
+Every job registered through add_instrumented_job() records a JobRun row with its start
+and end time, rows scanned, created/skipped/failed counts, per-phase durations and the
+number of SQL statements it issued. Runs that exceed their latency budget fire the hooks
+registered with register_latency_budget_hook().
+
+Job code reports progress through current_run():
+
+    run = current_run()
+    with run.phase('select'):
+        rows = query.all()
+    run.add(rows_scanned=len(rows))
+
+current_run() returns a no-op recorder outside an instrumented job, so callers never need
+to check for None.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import functools
+import logging
+import os
+import socket
+import threading
+import time
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import JobRun
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUDGET_SECONDS = 900
+
+# thread ident -> JobRunRecorder the thread is working for
+_active_runs = {}
+_budget_hooks = []
+_listener_installed = False
+_listener_lock = threading.Lock()
+
+
+def register_latency_budget_hook(hook):
+    """
+    Call `hook(job_run)` (a serialized JobRun dict) whenever a run exceeds its budget.
+    """
+    _budget_hooks.append(hook)
+    return hook
+
+
+def _log_budget_exceeded(job_run):
+    logger.warning(
+        f"Job {job_run['job_id']} took {job_run['duration_ms']} ms, "
+        f"over its {job_run['budget_ms']} ms latency budget"
+    )
+
+
+register_latency_budget_hook(_log_budget_exceeded)
+
+
+class _NullRun:
+    """Recorder used outside instrumented jobs; every call is a no-op."""
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def add(self, **counts):
+        pass
+
+    def set_details(self, **details):
+        pass
+
+
+_null_run = _NullRun()
+
+
+def current_run():
+    """
+    Return the JobRunRecorder the current thread is working for, or a no-op recorder.
+    """
+    return _active_runs.get(threading.get_ident(), _null_run)
+
+
+@contextmanager
+def attach(run):
+    """
+    Attribute the current thread's statements and counts to `run`. Used by jobs that fan
+    work out to worker threads.
+    """
+    if run is None or run is _null_run:
+        yield
+        return
+
+    ident = threading.get_ident()
+    previous = _active_runs.get(ident)
+    _active_runs[ident] = run
+    try:
+        yield
+    finally:
+        if previous is None:
+            _active_runs.pop(ident, None)
+        else:
+            _active_runs[ident] = previous
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    run = _active_runs.get(threading.get_ident())
+    if run is not None:
+        run._count_statement()
+
+
+def install_statement_counter():
+    """
+    Count SQL statements per job run. Installed once per process.
+    """
+    global _listener_installed
+    with _listener_lock:
+        if not _listener_installed:
+            event.listen(Engine, 'before_cursor_execute', _count_statement)
+            _listener_installed = True
+
+
+class JobRunRecorder:
+    """
+    Records one job execution in job_runs.
+
+    The row is written through its own session so it is persisted regardless of what the
+    job does with db.session, and so its own statements are not counted.
+
+    Args:
+        app: Flask application instance
+        job_id: APScheduler job id
+        job_name: Human readable job name
+        budget_seconds: Latency budget; defaults to JOB_LATENCY_BUDGETS[job_id] or
+                        JOB_DEFAULT_LATENCY_BUDGET
+    """
+
+    def __init__(self, app, job_id, job_name=None, budget_seconds=None):
+        self.app = app
+        self.job_id = job_id
+        self.job_name = job_name
+        if budget_seconds is None:
+            budget_seconds = app.config.get('JOB_LATENCY_BUDGETS', {}).get(
+                job_id, app.config.get('JOB_DEFAULT_LATENCY_BUDGET', DEFAULT_LATENCY_BUDGET_SECONDS)
+            )
+        self.budget_ms = int(budget_seconds * 1000)
+
+        self.run_id = None
+        self.counts = {'rows_scanned': 0, 'created': 0, 'skipped': 0, 'failed': 0}
+        self.phases = {}
+        self.details = {}
+        self.statement_count = 0
+        self._lock = threading.Lock()
+        self._started = None
+        self._attachment = None
+
+    def _count_statement(self):
+        with self._lock:
+            self.statement_count += 1
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a named phase. Phases entered several times (or from several threads)
+        accumulate.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.phases[name] = round(self.phases.get(name, 0) + elapsed_ms, 1)
+
+    def add(self, rows_scanned=0, created=0, skipped=0, failed=0):
+        with self._lock:
+            self.counts['rows_scanned'] += rows_scanned
+            self.counts['created'] += created
+            self.counts['skipped'] += skipped
+            self.counts['failed'] += failed
+
+    def set_details(self, **details):
+        with self._lock:
+            self.details.update(details)
+
+    def __enter__(self):
+        # Bookkeeping must never stop the job itself: if the row cannot be written the job
+        # still runs, only without a history entry
+        try:
+            with self.app.app_context():
+                with Session(db.engine) as session:
+                    job_run = JobRun(
+                        job_id=self.job_id,
+                        job_name=self.job_name,
+                        hostname=f"{socket.gethostname()}:{os.getpid()}",
+                        status='running',
+                        started_at=datetime.now(timezone.utc),
+                        budget_ms=self.budget_ms,
+                    )
+                    session.add(job_run)
+                    session.commit()
+                    self.run_id = job_run.id
+        except Exception as e:
+            logger.error(f"Could not record the start of job {self.job_id}: {str(e)}")
+
+        self._started = time.perf_counter()
+        self._attachment = attach(self)
+        self._attachment.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._attachment.__exit__(None, None, None)
+        duration_ms = int((time.perf_counter() - self._started) * 1000)
+
+        serialized = None
+        if self.run_id is not None:
+            try:
+                serialized = self._finish(duration_ms, exc_type, exc)
+            except Exception as e:
+                logger.error(f"Could not record the end of job {self.job_id} (run {self.run_id}): {str(e)}")
+
+        if serialized and duration_ms > self.budget_ms:
+            for hook in _budget_hooks:
+                try:
+                    hook(serialized)
+                except Exception as e:
+                    logger.error(f"Latency budget hook failed for job {self.job_id}: {str(e)}")
+
+        # Let APScheduler see and log job failures as before
+        return False
+
+    def _finish(self, duration_ms, exc_type, exc):
+        with self.app.app_context():
+            with Session(db.engine) as session:
+                job_run = session.get(JobRun, self.run_id)
+                job_run.status = 'failed' if exc_type else 'succeeded'
+                job_run.finished_at = datetime.now(timezone.utc)
+                job_run.duration_ms = duration_ms
+                job_run.rows_scanned = self.counts['rows_scanned']
+                job_run.created_count = self.counts['created']
+                job_run.skipped_count = self.counts['skipped']
+                job_run.failed_count = self.counts['failed']
+                job_run.statement_count = self.statement_count
+                job_run.phase_durations = self.phases
+                job_run.details = self.details or None
+                job_run.error_message = str(exc) if exc else None
+                session.commit()
+                return serialize_job_run(job_run)
+
+
+def add_instrumented_job(scheduler, app, func, id, name=None, **job_kwargs):
+    """
+    scheduler.add_job() that records every execution of `func` as a JobRun.
+    A dict or list returned by `func` is stored in JobRun.details.
+    """
+    @functools.wraps(func)
+    def run_job(*args, **kwargs):
+        with JobRunRecorder(app, id, name) as run:
+            result = func(*args, **kwargs)
+            if isinstance(result, (dict, list)):
+                run.set_details(result=result)
+            return result
+
+    return scheduler.add_job(func=run_job, id=id, name=name, **job_kwargs)
+
+
+def serialize_job_run(job_run):
+    return {
+        'id': str(job_run.id),
+        'job_id': job_run.job_id,
+        'job_name': job_run.job_name,
+        'hostname': job_run.hostname,
+        'status': job_run.status,
+        'started_at': job_run.started_at.isoformat() if job_run.started_at else None,
+        'finished_at': job_run.finished_at.isoformat() if job_run.finished_at else None,
+        'duration_ms': job_run.duration_ms,
+        'budget_ms': job_run.budget_ms,
+        'over_budget': bool(job_run.duration_ms and job_run.budget_ms and job_run.duration_ms > job_run.budget_ms),
+        'rows_scanned': job_run.rows_scanned,
+        'created': job_run.created_count,
+        'skipped': job_run.skipped_count,
+        'failed': job_run.failed_count,
+        'statement_count': job_run.statement_count,
+        'phase_durations': job_run.phase_durations or {},
+        'details': job_run.details,
+        'error_message': job_run.error_message,
+    }
+
+
+job_runs_bp = Blueprint('job_runs', __name__)
+
+# Job runs span every company (e.g. per-shard billing results), so only platform
+# administrators may read them
+JOB_RUN_ROLES = ('super_admin',)
+
+
+@job_runs_bp.route('/job-runs', methods=['GET'])
+@jwt_required()
+def list_job_runs():
+    if get_jwt().get('role') not in JOB_RUN_ROLES:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    query = JobRun.query
+    if request.args.get('job_id'):
+        query = query.filter(JobRun.job_id == request.args['job_id'])
+    if request.args.get('status'):
+        query = query.filter(JobRun.status == request.args['status'])
+
+    runs = query.order_by(JobRun.started_at.desc()).limit(limit).all()
+    return jsonify([serialize_job_run(run) for run in runs]), 200
+
+
+@job_runs_bp.route('/job-runs/<uuid:run_id>', methods=['GET'])
+@jwt_required()
+def get_job_run(run_id):
+    if get_jwt().get('role') not in JOB_RUN_ROLES:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    job_run = db.session.get(JobRun, run_id)
+    if not job_run:
+        return jsonify({'error': 'Job run not found'}), 404
+    return jsonify(serialize_job_run(job_run)), 200
+
+
+def init_job_runs(app):
+    """
+    Register the job run API and the SQL statement counter.
+
+    Args:
+        app: Flask application instance
+    """
+    install_statement_counter()
+    app.register_blueprint(job_runs_bp)
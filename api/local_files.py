@@ -0,0 +1,91 @@
+"""
+Host-local cleanup of on-disk caches.
+
+Cached invoice PDFs (invoice_pdf.py) and export artifacts (export_jobs.py) live on the disk of
+the host that wrote them, but scheduled jobs only run on the scheduler leader. Every process
+therefore sweeps the directories registered with register_sweep() itself, in one daemon thread
+started by init_scheduler() whether or not the process leads. The thread wakes every
+LOCAL_SWEEP_INTERVAL seconds and deletes files untouched for longer than the directory's max
+age. Processes sharing a directory just race to delete the same files.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SWEEP_INTERVAL = 3600
+
+_sweeps = {}
+_sweeps_lock = threading.Lock()
+_thread = None
+
+
+def remove_older_than(directory, cutoff):
+    """
+    Delete the files under `directory` last modified before `cutoff` (epoch seconds).
+
+    Returns:
+        number of files removed
+    """
+    removed = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                # Removed or replaced by another process meanwhile
+                continue
+    return removed
+
+
+def run_sweeps(app):
+    """Sweep every registered directory once. Returns dict of name -> files removed."""
+    with _sweeps_lock:
+        sweeps = dict(_sweeps)
+    removed = {}
+    with app.app_context():
+        for name, (directory, max_age) in sweeps.items():
+            try:
+                removed[name] = remove_older_than(directory(), time.time() - max_age())
+            except Exception as e:
+                logger.error(f"Sweeping {name} files failed: {str(e)}")
+    return removed
+
+
+def _sweep_forever(app, interval):
+    while True:
+        time.sleep(interval)
+        run_sweeps(app)
+
+
+def register_sweep(name, directory, max_age):
+    """
+    Sweep a directory of this host periodically (see start_sweeper()).
+
+    Args:
+        name: Label of the directory in logs and run_sweeps() results
+        directory: Callable returning the directory (called in an app context)
+        max_age: Callable returning the seconds a file may stay untouched
+    """
+    with _sweeps_lock:
+        _sweeps[name] = (directory, max_age)
+
+
+def start_sweeper(app):
+    """Start this process's sweeper thread, once."""
+    global _thread
+    with _sweeps_lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(
+            target=_sweep_forever,
+            args=(app, app.config.get('LOCAL_SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL)),
+            name='local-sweeper',
+            daemon=True,
+        )
+        _thread.start()
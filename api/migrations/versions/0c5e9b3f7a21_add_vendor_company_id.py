@@ -0,0 +1,34 @@
+"""add_vendor_company_id
+
+Revision ID: 0c5e9b3f7a21
+Revises: a6f3c9d17e42
+Create Date: 2026-10-17 23:58:12.803417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0c5e9b3f7a21'
+down_revision = 'a6f3c9d17e42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The vendor's own Company account (see analytics._can_view_company). Databases that
+    # already have the column from the vendor account feature keep it as is.
+    op.execute("""
+        ALTER TABLE vendors
+        ADD COLUMN IF NOT EXISTS vendor_company_id UUID REFERENCES companies (id)
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vendors_company_vendor_company
+        ON vendors (company_id, vendor_company_id)
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_vendors_company_vendor_company")
+    op.execute("ALTER TABLE vendors DROP COLUMN IF EXISTS vendor_company_id")
@@ -0,0 +1,39 @@
+"""add_customer_recharge_day_key
+
+Revision ID: 331c5f4f66ab
+Revises: 9d596bbe2a92
+Create Date: 2026-10-17 10:12:03.418220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '331c5f4f66ab'
+down_revision = '9d596bbe2a92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Stored generated column (month * 100 + day) so the scheduler can look up
+    # customers due today through an index instead of extract() on every row.
+    op.execute("""
+        ALTER TABLE customers
+        ADD COLUMN IF NOT EXISTS recharge_day_key SMALLINT
+        GENERATED ALWAYS AS (
+            CAST(EXTRACT(month FROM recharge_date) * 100 + EXTRACT(day FROM recharge_date) AS SMALLINT)
+        ) STORED
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_customers_recharge_day_key
+        ON customers (recharge_day_key, company_id)
+        WHERE is_active
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_customers_recharge_day_key")
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_column('recharge_day_key')
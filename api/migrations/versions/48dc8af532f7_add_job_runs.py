@@ -0,0 +1,48 @@
+"""add_job_runs
+
+Revision ID: 48dc8af532f7
+Revises: 331c5f4f66ab
+Create Date: 2026-10-17 13:05:27.630114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '48dc8af532f7'
+down_revision = '331c5f4f66ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_runs',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('job_id', sa.String(length=100), nullable=False),
+        sa.Column('job_name', sa.String(length=255), nullable=True),
+        sa.Column('hostname', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('duration_ms', sa.Integer(), nullable=True),
+        sa.Column('rows_scanned', sa.Integer(), nullable=True),
+        sa.Column('created_count', sa.Integer(), nullable=True),
+        sa.Column('skipped_count', sa.Integer(), nullable=True),
+        sa.Column('failed_count', sa.Integer(), nullable=True),
+        sa.Column('statement_count', sa.Integer(), nullable=True),
+        sa.Column('phase_durations', sa.JSON(), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('budget_ms', sa.Integer(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.create_index('idx_job_runs_job_started', ['job_id', 'started_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.drop_index('idx_job_runs_job_started')
+
+    op.drop_table('job_runs')
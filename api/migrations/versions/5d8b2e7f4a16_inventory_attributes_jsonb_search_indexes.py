@@ -0,0 +1,46 @@
+"""inventory_attributes_jsonb_search_indexes
+
+Revision ID: 5d8b2e7f4a16
+Revises: c41e8f2a6d97
+Create Date: 2026-10-17 22:24:37.902145
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '5d8b2e7f4a16'
+down_revision = 'c41e8f2a6d97'
+branch_labels = None
+depends_on = None
+
+# Trigram indexes answering ILIKE '%q%' for the inventory search (inventory_search.py)
+INDEXES = [
+    ('idx_inventory_items_item_type_trgm', 'inventory_items', "USING gin (item_type gin_trgm_ops)"),
+    ('idx_inventory_items_serial_trgm', 'inventory_items', "USING gin ((attributes ->> 'serial_number') gin_trgm_ops)"),
+    ('idx_inventory_items_mac_trgm', 'inventory_items', "USING gin ((attributes ->> 'mac_address') gin_trgm_ops)"),
+    ('idx_inventory_assignments_open', 'inventory_assignments',
+     "(inventory_item_id) WHERE status = 'assigned' AND returned_at IS NULL"),
+]
+
+
+def upgrade():
+    op.alter_column('inventory_items', 'attributes',
+                    existing_type=sa.JSON(),
+                    type_=postgresql.JSONB(astext_type=sa.Text()),
+                    postgresql_using='attributes::jsonb')
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, table, definition in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.alter_column('inventory_items', 'attributes',
+                    existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                    type_=sa.JSON(),
+                    postgresql_using='attributes::json')
@@ -0,0 +1,89 @@
+"""add_financial_daily_rollups
+
+Revision ID: 5e0f3a9c1d24
+Revises: 99cb70a62f5a
+Create Date: 2026-10-17 18:21:07.514392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '5e0f3a9c1d24'
+down_revision = '99cb70a62f5a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('financial_daily_rollups',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('company_id', sa.UUID(), nullable=False),
+        sa.Column('bank_account_id', sa.UUID(), nullable=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(length=20), nullable=False),
+        sa.Column('subcategory', sa.String(length=100), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('txn_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('financial_daily_rollups', schema=None) as batch_op:
+        batch_op.create_index('idx_financial_rollups_company_day', ['company_id', 'day'], unique=False)
+        batch_op.create_index('uq_financial_rollups_account_key', ['company_id', 'bank_account_id', 'day', 'category', 'subcategory'],
+                              unique=True, postgresql_where=sa.text('bank_account_id IS NOT NULL'))
+        batch_op.create_index('uq_financial_rollups_cash_key', ['company_id', 'day', 'category', 'subcategory'],
+                              unique=True, postgresql_where=sa.text('bank_account_id IS NULL'))
+
+    # Backfill with the same rules as financial_rollups.ROLLUP_SOURCES (days in Asia/Karachi,
+    # the FINANCIAL_TIMEZONE default; run `flask rebuild-financial-rollups` after changing it)
+    op.execute("""
+        INSERT INTO financial_daily_rollups (id, company_id, bank_account_id, day, category, subcategory, amount, txn_count)
+        SELECT gen_random_uuid(), company_id, bank_account_id, day, category, subcategory, SUM(amount), COUNT(*)
+        FROM (
+            SELECT company_id, NULL::uuid AS bank_account_id,
+                   billing_start_date AS day, 'invoiced' AS category, COALESCE(invoice_type, '') AS subcategory,
+                   total_amount AS amount
+            FROM invoices WHERE is_active IS NOT FALSE
+            UNION ALL
+            SELECT company_id, bank_account_id,
+                   (payment_date AT TIME ZONE 'Asia/Karachi')::date, 'collection', COALESCE(payment_method, ''), amount
+            FROM payments WHERE is_active IS NOT FALSE AND status IN ('paid', 'partially_paid')
+            UNION ALL
+            SELECT company_id, bank_account_id,
+                   (payment_date AT TIME ZONE 'Asia/Karachi')::date, 'isp_payment', COALESCE(payment_type::text, ''), amount
+            FROM isp_payments WHERE is_active IS NOT FALSE AND COALESCE(status, 'completed') = 'completed'
+            UNION ALL
+            SELECT company_id, bank_account_id,
+                   (payment_date AT TIME ZONE 'Asia/Karachi')::date, 'bandwidth_cost', COALESCE(payment_type::text, ''), amount
+            FROM isp_payments WHERE is_active IS NOT FALSE AND COALESCE(status, 'completed') = 'completed'
+                AND bandwidth_usage_gb IS NOT NULL
+            UNION ALL
+            SELECT company_id, bank_account_id,
+                   (payment_date AT TIME ZONE 'Asia/Karachi')::date, 'bandwidth_gb', COALESCE(payment_type::text, ''),
+                   bandwidth_usage_gb::numeric
+            FROM isp_payments WHERE is_active IS NOT FALSE AND COALESCE(status, 'completed') = 'completed'
+                AND bandwidth_usage_gb IS NOT NULL
+            UNION ALL
+            SELECT company_id, bank_account_id,
+                   (expense_date AT TIME ZONE 'Asia/Karachi')::date, 'expense', COALESCE(expense_type_id::text, ''), amount
+            FROM expenses WHERE is_active IS NOT FALSE
+            UNION ALL
+            SELECT company_id, bank_account_id,
+                   (income_date AT TIME ZONE 'Asia/Karachi')::date, 'extra_income', COALESCE(income_type_id::text, ''), amount
+            FROM extra_incomes WHERE is_active IS NOT FALSE
+        ) AS source
+        WHERE company_id IS NOT NULL AND amount IS NOT NULL
+        GROUP BY company_id, bank_account_id, day, category, subcategory
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('financial_daily_rollups', schema=None) as batch_op:
+        batch_op.drop_index('uq_financial_rollups_cash_key')
+        batch_op.drop_index('uq_financial_rollups_account_key')
+        batch_op.drop_index('idx_financial_rollups_company_day')
+
+    op.drop_table('financial_daily_rollups')
@@ -0,0 +1,38 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: 7a3d9e5b21c8
+Revises: e2b7c41f9a03
+Create Date: 2026-10-17 21:06:48.517302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '7a3d9e5b21c8'
+down_revision = 'e2b7c41f9a03'
+branch_labels = None
+depends_on = None
+
+# (company_id, sort key, id) for the default sort of each /<entity>/page listing
+INDEXES = [
+    ('idx_detailed_logs_company_created_id', 'detailed_logs', 'company_id, created_at, id'),
+    ('idx_payments_company_payment_date_id', 'payments', 'company_id, payment_date, id'),
+    ('idx_invoices_company_billing_start_id', 'invoices', 'company_id, billing_start_date, id'),
+    ('idx_invoices_company_due_date_id', 'invoices', 'company_id, due_date, id'),
+    ('idx_customers_company_installation_id', 'customers', 'company_id, installation_date, id'),
+]
+
+
+def upgrade():
+    # CONCURRENTLY so detailed_logs and invoices stay writable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,33 @@
+"""add_closed_months
+
+Revision ID: 8b1e4d7c2f60
+Revises: 0c5e9b3f7a21
+Create Date: 2026-10-17 23:59:41.551203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '8b1e4d7c2f60'
+down_revision = '0c5e9b3f7a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Snapshots already on disk have no row and are read from Postgres until the
+    # month-close job closes their months again
+    op.create_table('closed_months',
+        sa.Column('company_id', sa.UUID(), nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('snapshot_id', sa.UUID(), nullable=False),
+        sa.Column('closed_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('company_id', 'month')
+    )
+
+
+def downgrade():
+    op.drop_table('closed_months')
@@ -0,0 +1,83 @@
+"""add_bank_account_journal
+
+Revision ID: 99cb70a62f5a
+Revises: c77783ea6718
+Create Date: 2026-10-17 15:48:40.270194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '99cb70a62f5a'
+down_revision = 'c77783ea6718'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('bank_account_journal',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('company_id', sa.UUID(), nullable=True),
+        sa.Column('bank_account_id', sa.UUID(), nullable=False),
+        sa.Column('entry_date', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('source_type', sa.String(length=30), nullable=False),
+        sa.Column('source_id', sa.UUID(), nullable=True),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.ForeignKeyConstraint(['bank_account_id'], ['bank_accounts.id'], ),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('bank_account_journal', schema=None) as batch_op:
+        batch_op.create_index('idx_bank_journal_account_date', ['bank_account_id', 'entry_date', 'id'], unique=False)
+        batch_op.create_index('idx_bank_journal_source', ['source_type', 'source_id'], unique=False)
+
+    op.create_table('bank_account_checkpoints',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('bank_account_id', sa.UUID(), nullable=False),
+        sa.Column('as_of', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('balance', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.ForeignKeyConstraint(['bank_account_id'], ['bank_accounts.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('bank_account_id', 'as_of', name='uq_bank_checkpoint_account_as_of')
+    )
+
+    # Backfill the journal from existing records (same rules as bank_journal.JOURNAL_SOURCES)
+    op.execute("""
+        INSERT INTO bank_account_journal (id, company_id, bank_account_id, entry_date, amount, source_type, source_id)
+        SELECT gen_random_uuid(), company_id, id, TIMESTAMPTZ '1970-01-01 00:00:00+00', initial_balance, 'opening', id
+        FROM bank_accounts WHERE COALESCE(initial_balance, 0) <> 0
+        UNION ALL
+        SELECT gen_random_uuid(), company_id, bank_account_id, payment_date, amount, 'payment', id
+        FROM payments
+        WHERE bank_account_id IS NOT NULL AND is_active IS NOT FALSE AND status IN ('paid', 'partially_paid')
+        UNION ALL
+        SELECT gen_random_uuid(), company_id, bank_account_id, payment_date, -amount, 'isp_payment', id
+        FROM isp_payments
+        WHERE bank_account_id IS NOT NULL AND is_active IS NOT FALSE AND COALESCE(status, 'completed') = 'completed'
+        UNION ALL
+        SELECT gen_random_uuid(), company_id, bank_account_id, expense_date, -amount, 'expense', id
+        FROM expenses WHERE bank_account_id IS NOT NULL AND is_active IS NOT FALSE
+        UNION ALL
+        SELECT gen_random_uuid(), company_id, bank_account_id, income_date, amount, 'extra_income', id
+        FROM extra_incomes WHERE bank_account_id IS NOT NULL AND is_active IS NOT FALSE
+        UNION ALL
+        SELECT gen_random_uuid(), company_id, from_account_id, transfer_date, -amount, 'transfer_out', id
+        FROM internal_transfers WHERE COALESCE(status, 'completed') = 'completed'
+        UNION ALL
+        SELECT gen_random_uuid(), company_id, to_account_id, transfer_date, amount, 'transfer_in', id
+        FROM internal_transfers WHERE COALESCE(status, 'completed') = 'completed'
+    """)
+
+
+def downgrade():
+    op.drop_table('bank_account_checkpoints')
+    with op.batch_alter_table('bank_account_journal', schema=None) as batch_op:
+        batch_op.drop_index('idx_bank_journal_source')
+        batch_op.drop_index('idx_bank_journal_account_date')
+
+    op.drop_table('bank_account_journal')
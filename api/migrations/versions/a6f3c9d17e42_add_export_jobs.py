@@ -0,0 +1,53 @@
+"""add_export_jobs
+
+Revision ID: a6f3c9d17e42
+Revises: 5d8b2e7f4a16
+Create Date: 2026-10-17 22:58:04.316270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'a6f3c9d17e42'
+down_revision = '5d8b2e7f4a16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('export_jobs',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('company_id', sa.UUID(), nullable=True),
+        sa.Column('user_id', sa.UUID(), nullable=True),
+        sa.Column('entity', sa.String(length=50), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('access', sa.String(length=10), nullable=False),
+        sa.Column('params', sa.JSON(), nullable=True),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('total_rows', sa.Integer(), nullable=True),
+        sa.Column('rows_written', sa.Integer(), nullable=True),
+        sa.Column('file_path', sa.String(length=500), nullable=True),
+        sa.Column('file_size', sa.BigInteger(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('expires_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('export_jobs', schema=None) as batch_op:
+        batch_op.create_index('idx_export_jobs_cache_key', ['cache_key', 'status'], unique=False)
+        batch_op.create_index('idx_export_jobs_company_created', ['company_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('export_jobs', schema=None) as batch_op:
+        batch_op.drop_index('idx_export_jobs_company_created')
+        batch_op.drop_index('idx_export_jobs_cache_key')
+
+    op.drop_table('export_jobs')
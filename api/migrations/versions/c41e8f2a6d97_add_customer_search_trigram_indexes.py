@@ -0,0 +1,38 @@
+"""add_customer_search_trigram_indexes
+
+Revision ID: c41e8f2a6d97
+Revises: 7a3d9e5b21c8
+Create Date: 2026-10-17 21:48:15.630914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'c41e8f2a6d97'
+down_revision = '7a3d9e5b21c8'
+branch_labels = None
+depends_on = None
+
+# Trigram indexes answering ILIKE '%q%' for the customer typeahead (customer_search.py)
+INDEXES = [
+    ('idx_customers_name_trgm', "(first_name || ' ' || last_name) gin_trgm_ops"),
+    ('idx_customers_internet_id_trgm', 'internet_id gin_trgm_ops'),
+    ('idx_customers_cnic_trgm', 'cnic gin_trgm_ops'),
+    ('idx_customers_phone_1_trgm', 'phone_1 gin_trgm_ops'),
+    ('idx_customers_installation_address_trgm', 'installation_address gin_trgm_ops'),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, expression in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON customers USING gin ({expression})")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,52 @@
+"""add_invoice_paid_remaining_amounts
+
+Revision ID: c77783ea6718
+Revises: 48dc8af532f7
+Create Date: 2026-10-17 14:21:09.552871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'c77783ea6718'
+down_revision = '48dc8af532f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('paid_amount', sa.Numeric(precision=10, scale=2), server_default='0', nullable=False))
+
+    # Backfill from counted payments (see invoice_balances.COUNTED_PAYMENT_STATUSES)
+    op.execute("""
+        UPDATE invoices i
+        SET paid_amount = p.total
+        FROM (
+            SELECT invoice_id, SUM(amount) AS total
+            FROM payments
+            WHERE is_active AND status IN ('paid', 'partially_paid') AND invoice_id IS NOT NULL
+            GROUP BY invoice_id
+        ) p
+        WHERE p.invoice_id = i.id
+    """)
+
+    op.execute("""
+        ALTER TABLE invoices
+        ADD COLUMN remaining_amount NUMERIC(10, 2)
+        GENERATED ALWAYS AS (total_amount - paid_amount) STORED
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_invoices_open_due
+        ON invoices (company_id, due_date)
+        WHERE remaining_amount > 0
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_invoices_open_due")
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_column('remaining_amount')
+        batch_op.drop_column('paid_amount')
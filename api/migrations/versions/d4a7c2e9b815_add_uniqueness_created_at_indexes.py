@@ -0,0 +1,36 @@
+"""add_uniqueness_created_at_indexes
+
+Revision ID: d4a7c2e9b815
+Revises: 8b1e4d7c2f60
+Create Date: 2026-10-17 23:59:52.207718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7c2e9b815'
+down_revision = '8b1e4d7c2f60'
+branch_labels = None
+depends_on = None
+
+# created_at of the tables behind the availability checks: uniqueness_index.py reads
+# max(created_at) about once a second and the rows created since
+INDEXES = [
+    ('idx_customers_created_at', 'customers', 'created_at'),
+    ('idx_users_created_at', 'users', 'created_at'),
+    ('idx_vendors_created_at', 'vendors', 'created_at'),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,32 @@
+"""add_single_flight_results
+
+Revision ID: e2b7c41f9a03
+Revises: 5e0f3a9c1d24
+Create Date: 2026-10-17 18:52:33.901246
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7c41f9a03'
+down_revision = '5e0f3a9c1d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Unlogged: results live for seconds and need not survive a crash or reach replicas
+    op.execute("""
+        CREATE UNLOGGED TABLE single_flight_results (
+            key VARCHAR(512) PRIMARY KEY,
+            payload BYTEA NOT NULL,
+            content_type VARCHAR(100),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def downgrade():
+    op.drop_table('single_flight_results')
@@ -0,0 +1,528 @@
+"""
+Columnar snapshots of closed financial months.
+
+Once a month is over (plus MONTH_CLOSE_GRACE_DAYS for late entries), the month-close job
+writes each company's invoices, payments, expenses, extra income and ISP payments dated in
+that month to zstd-compressed Parquet files:
+
+    MONTH_SNAPSHOT_DIR/<company_id>/<YYYY-MM>/<table>.parquet
+    MONTH_SNAPSHOT_DIR/<company_id>/<YYYY-MM>/manifest.json
+
+A month directory is built under a temporary name and renamed into place, and the month is
+then recorded in the closed_months table with the snapshot_id its manifest carries. That row
+is the source of truth on every host: a snapshot is only read while its month has a row with
+a matching snapshot_id, so stale files on any host are never served. read_range() serves the closed months of a date range from the
+files and only the rest (normally just the open month) from Postgres, so long historical
+reports no longer scan the OLTP tables.
+
+Closed months are not expected to change. A write to a row dated in a closed month deletes
+the month's closed_months row in the same transaction (it is read from Postgres again) and
+the next job run closes it again. Writes made with bulk insert() statements bypass the session
+and call record_bulk_write(). `flask close-months` backfills snapshots and
+`flask reopen-month` drops one.
+"""
+from datetime import date, datetime, timedelta
+import json
+import logging
+import os
+import shutil
+import uuid
+from zoneinfo import ZoneInfo
+
+import click
+from flask import Blueprint, current_app, has_app_context, jsonify
+from flask_jwt_extended import jwt_required, get_jwt
+import pandas as pd
+from sqlalchemy import and_, delete, event, func, inspect, not_, or_, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import ClosedMonth, Expense, ExtraIncome, Invoice, ISPPayment, Payment
+from streaming import read_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEZONE = 'Asia/Karachi'
+DEFAULT_GRACE_DAYS = 5
+COMPRESSION = 'zstd'
+MANIFEST = 'manifest.json'
+
+# table -> (model, date column, snapshot columns). Invoice balances keep moving after the
+# month closes, so only the invoiced figures are snapshotted.
+SNAPSHOT_TABLES = {
+    'invoices': (Invoice, 'billing_start_date', (
+        'id', 'customer_id', 'invoice_number', 'invoice_type', 'status', 'billing_start_date',
+        'billing_end_date', 'due_date', 'subtotal', 'discount_percentage', 'total_amount', 'is_active',
+    )),
+    'payments': (Payment, 'payment_date', (
+        'id', 'invoice_id', 'bank_account_id', 'amount', 'payment_date', 'payment_method', 'status',
+        'is_active',
+    )),
+    'expenses': (Expense, 'expense_date', (
+        'id', 'bank_account_id', 'expense_type_id', 'employee_id', 'amount', 'expense_date',
+        'payment_method', 'is_active',
+    )),
+    'extra_incomes': (ExtraIncome, 'income_date', (
+        'id', 'bank_account_id', 'income_type_id', 'amount', 'income_date', 'payment_method',
+        'is_active',
+    )),
+    'isp_payments': (ISPPayment, 'payment_date', (
+        'id', 'isp_id', 'bank_account_id', 'payment_type', 'amount', 'payment_date', 'billing_period',
+        'payment_method', 'status', 'is_active',
+    )),
+}
+
+_MODEL_TABLES = {model: table for table, (model, _, _) in SNAPSHOT_TABLES.items()}
+
+_REOPEN_KEY = 'month_snapshot_reopen'
+
+
+def _timezone():
+    name = DEFAULT_TIMEZONE
+    if has_app_context():
+        name = current_app.config.get('FINANCIAL_TIMEZONE', DEFAULT_TIMEZONE)
+    return ZoneInfo(name)
+
+
+def snapshot_dir():
+    return current_app.config.get('MONTH_SNAPSHOT_DIR') or os.path.join(current_app.root_path, 'snapshots')
+
+
+def month_label(month_number):
+    return f"{month_number // 12:04d}-{month_number % 12 + 1:02d}"
+
+
+def parse_month(label):
+    """'YYYY-MM' -> month number (year * 12 + month - 1)."""
+    year, month = (int(part) for part in label.split('-'))
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month: {label}")
+    return year * 12 + month - 1
+
+
+def _month_of(value, tz):
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(tz)
+    return value.year * 12 + value.month - 1
+
+
+def _month_bounds(month_number, is_date, tz):
+    """[start, end) of a month as dates (date columns) or local aware datetimes."""
+    start = date(month_number // 12, month_number % 12 + 1, 1)
+    end = date((month_number + 1) // 12, (month_number + 1) % 12 + 1, 1)
+    if is_date:
+        return start, end
+    return datetime(start.year, start.month, 1, tzinfo=tz), datetime(end.year, end.month, 1, tzinfo=tz)
+
+
+def _is_date_column(column):
+    return column.type.python_type is date
+
+
+def _month_path(company_id, month_number):
+    return os.path.join(snapshot_dir(), str(company_id), month_label(month_number))
+
+
+def _as_uuid(value):
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
+
+
+def _read_manifest(company_id, month_number):
+    try:
+        with open(os.path.join(_month_path(company_id, month_number), MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_month_closed(company_id, month_number):
+    """Whether the month is recorded as closed (on any host)."""
+    return db.session.query(ClosedMonth.month).filter_by(
+        company_id=_as_uuid(company_id), month=month_label(month_number),
+    ).first() is not None
+
+
+def closed_months(company_id):
+    """
+    Month numbers served from a snapshot for the company, oldest first: closed in the
+    database, with this host's snapshot of the same snapshot_id.
+    """
+    if company_id is None:
+        return []
+    rows = db.session.query(ClosedMonth.month, ClosedMonth.snapshot_id).filter(
+        ClosedMonth.company_id == _as_uuid(company_id)
+    ).all()
+    months = []
+    for label, snapshot_id in rows:
+        month = parse_month(label)
+        manifest = _read_manifest(company_id, month)
+        if manifest and manifest.get('snapshot_id') == str(snapshot_id):
+            months.append(month)
+    return sorted(months)
+
+
+def _runs(months):
+    """Consecutive month numbers merged into (first, last) runs."""
+    runs = []
+    for month in sorted(months):
+        if runs and runs[-1][1] == month - 1:
+            runs[-1][1] = month
+        else:
+            runs.append([month, month])
+    return runs
+
+
+def _normalize(frame, model, columns):
+    """Same dtypes whether a frame came from Postgres or Parquet: ids as strings, times in UTC."""
+    for name in columns:
+        column = getattr(model, name)
+        if name.endswith('_id') or name == 'id':
+            frame[name] = frame[name].map(lambda v: None if v is None or pd.isna(v) else str(v))
+        elif column.type.python_type is datetime:
+            frame[name] = pd.to_datetime(frame[name], utc=True)
+        elif column.type.python_type is date:
+            frame[name] = pd.to_datetime(frame[name]).dt.date
+    return frame
+
+
+def _read_sql(model, columns, conditions):
+    statement = select(*(getattr(model, name) for name in columns)).where(*conditions)
+    with read_connection() as connection:
+        frame = pd.read_sql(statement, connection)
+    return _normalize(frame, model, columns)
+
+
+def close_month(company_id, month_number):
+    """
+    Write the company's rows dated in the month to Parquet and mark the month closed,
+    replacing an existing snapshot.
+
+    Returns:
+        dict of table -> rows written
+    """
+    tz = _timezone()
+    snapshot_id = uuid.uuid4()
+    target = _month_path(company_id, month_number)
+    staging = f"{target}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(staging)
+
+    try:
+        counts = {}
+        for table, (model, date_name, columns) in SNAPSHOT_TABLES.items():
+            date_column = getattr(model, date_name)
+            start, end = _month_bounds(month_number, _is_date_column(date_column), tz)
+            frame = _read_sql(model, columns, (model.company_id == company_id, date_column >= start, date_column < end))
+            frame.to_parquet(os.path.join(staging, f"{table}.parquet"), engine='pyarrow', compression=COMPRESSION, index=False)
+            counts[table] = len(frame)
+
+        with open(os.path.join(staging, MANIFEST), 'w') as f:
+            json.dump({
+                'company_id': str(company_id),
+                'month': month_label(month_number),
+                'snapshot_id': str(snapshot_id),
+                'closed_at': datetime.now(tz).isoformat(),
+                'rows': counts,
+            }, f)
+
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.rename(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    db.session.merge(ClosedMonth(
+        company_id=_as_uuid(company_id), month=month_label(month_number), snapshot_id=snapshot_id,
+    ))
+    db.session.commit()
+    return counts
+
+
+def _reopen(connection, months):
+    """Delete the closed_months rows of (company_id, month number) pairs; returns how many existed."""
+    if not months:
+        return 0
+    table = ClosedMonth.__table__
+    return connection.execute(delete(table).where(or_(*(
+        and_(table.c.company_id == _as_uuid(company_id), table.c.month == month_label(month))
+        for company_id, month in months
+    )))).rowcount
+
+
+def reopen_month(company_id, month_number):
+    """Drop a month's snapshot so it is read from Postgres again. Returns True if one existed."""
+    existed = _reopen(db.session.connection(), [(company_id, month_number)]) > 0
+    db.session.commit()
+    shutil.rmtree(_month_path(company_id, month_number), ignore_errors=True)
+    return existed
+
+
+def record_bulk_write(model, rows, session=None):
+    """
+    Reopen the closed months of rows written with a bulk insert(model) statement, which
+    bypasses the flush listeners. Runs in the caller's transaction, so call it before committing.
+
+    Args:
+        model: One of the SNAPSHOT_TABLES models
+        rows: The parameter dicts passed to the insert
+        session: Session the insert ran on (default db.session)
+    """
+    tz = _timezone()
+    date_name = SNAPSHOT_TABLES[_MODEL_TABLES[model]][1]
+    months = {
+        (str(row['company_id']), _month_of(row[date_name], tz))
+        for row in rows if row.get('company_id') is not None and row.get(date_name) is not None
+    }
+    _reopen((session or db.session).connection(), months)
+
+
+def read_range(table, company_id, start=None, end=None, columns=None):
+    """
+    Rows of a snapshot table for one company dated in [start, end), as a DataFrame.
+
+    Closed months come from their Parquet files, everything else from Postgres. Filtering
+    on status/is_active is left to the caller, since snapshots keep every row.
+
+    Args:
+        table: Key of SNAPSHOT_TABLES
+        start: First date/datetime included (None: from the beginning)
+        end: First date/datetime excluded (None: up to now)
+        columns: Columns to load (default: all snapshot columns); the date column is added
+    """
+    model, date_name, all_columns = SNAPSHOT_TABLES[table]
+    columns = list(columns or all_columns)
+    if date_name not in columns:
+        columns.append(date_name)
+
+    tz = _timezone()
+    date_column = getattr(model, date_name)
+    is_date = _is_date_column(date_column)
+    if is_date:
+        start = start.date() if isinstance(start, datetime) else start
+        end = end.date() if isinstance(end, datetime) else end
+
+    first = _month_of(start, tz) if start is not None else None
+    last = _month_of(end - timedelta(microseconds=1) if not is_date else end - timedelta(days=1), tz) if end is not None else None
+    closed = [
+        m for m in closed_months(company_id)
+        if (first is None or m >= first) and (last is None or m <= last)
+    ]
+
+    frames = [
+        pd.read_parquet(os.path.join(_month_path(company_id, m), f"{table}.parquet"), columns=columns)
+        for m in closed
+    ]
+
+    conditions = [model.company_id == company_id]
+    if start is not None:
+        conditions.append(date_column >= start)
+    if end is not None:
+        conditions.append(date_column < end)
+    closed_ranges = []
+    for run_first, run_last in _runs(closed):
+        range_start, _ = _month_bounds(run_first, is_date, tz)
+        _, range_end = _month_bounds(run_last, is_date, tz)
+        closed_ranges.append(and_(date_column >= range_start, date_column < range_end))
+    if closed_ranges:
+        conditions.append(not_(or_(*closed_ranges)))
+    frames.append(_read_sql(model, columns, conditions))
+
+    frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if closed:
+        frame = _normalize(frame, model, columns)
+        # Partial months at the edges of the range
+        values = frame[date_name]
+        if start is not None:
+            frame = frame[values >= (pd.Timestamp(start).tz_convert('UTC') if not is_date else start)]
+            values = frame[date_name]
+        if end is not None:
+            frame = frame[values < (pd.Timestamp(end).tz_convert('UTC') if not is_date else end)]
+    return frame.reset_index(drop=True)
+
+
+def _earliest_months(tz):
+    """company_id -> month number of its oldest snapshot table row."""
+    earliest = {}
+    for model, date_name, _ in SNAPSHOT_TABLES.values():
+        date_column = getattr(model, date_name)
+        rows = db.session.query(model.company_id, func.min(date_column)).filter(
+            model.company_id.isnot(None)
+        ).group_by(model.company_id).all()
+        for company_id, first in rows:
+            if first is not None:
+                month = _month_of(first, tz)
+                earliest[company_id] = min(month, earliest.get(company_id, month))
+    return earliest
+
+
+def last_closable_month(today=None, grace_days=None):
+    """The newest month that is over by at least the grace period."""
+    tz = _timezone()
+    if grace_days is None:
+        grace_days = current_app.config.get('MONTH_CLOSE_GRACE_DAYS', DEFAULT_GRACE_DAYS)
+    today = today or datetime.now(tz).date()
+    return _month_of(today - timedelta(days=grace_days), tz) - 1
+
+
+def close_months(company_id=None, since=None, today=None):
+    """
+    Close every month up to last_closable_month() that has no snapshot yet.
+
+    Args:
+        company_id: Only this company (default: every company with financial rows)
+        since: First month number to consider (default: the company's oldest row)
+
+    Returns:
+        dict with the number of months closed and rows written
+    """
+    tz = _timezone()
+    last = last_closable_month(today)
+    earliest = _earliest_months(tz)
+    if company_id is not None:
+        earliest = {key: month for key, month in earliest.items() if str(key) == str(company_id)}
+
+    result = {'companies': len(earliest), 'months_closed': 0, 'rows': 0, 'failed': 0}
+    for company, first in earliest.items():
+        done = set(closed_months(company))
+        for month in range(max(first, since) if since is not None else first, last + 1):
+            if month in done:
+                continue
+            try:
+                counts = close_month(company, month)
+            except Exception as e:
+                result['failed'] += 1
+                logger.error(f"Closing {month_label(month)} for company {company} failed: {str(e)}")
+                continue
+            result['months_closed'] += 1
+            result['rows'] += sum(counts.values())
+    return result
+
+
+def close_months_job(app=None):
+    """
+    Scheduled job wrapper for close_months().
+    """
+    if not app:
+        logger.error("No Flask app provided to close_months_job")
+        return
+    with app.app_context():
+        return close_months()
+
+
+def _old_and_new_values(state, key):
+    """
+    Committed and pending values of an attribute. Expired attributes are loaded from the
+    row; changed ones keep their old value because the date and company columns have
+    active history (see install_month_snapshot_listeners).
+    """
+    history = state.attrs[key].load_history()
+    return {value for value in (*history.deleted, *history.unchanged, *history.added) if value is not None}
+
+
+def _collect_closed_month_writes(session, flush_context, instances):
+    tz = _timezone()
+    touched = session.info.setdefault(_REOPEN_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = _MODEL_TABLES.get(type(obj))
+        if table is None:
+            continue
+        state = inspect(obj)
+        date_name = SNAPSHOT_TABLES[table][1]
+        # Both the old and the new month (and company), in case the row moved
+        for company_id in _old_and_new_values(state, 'company_id'):
+            for value in _old_and_new_values(state, date_name):
+                touched.add((str(company_id), _month_of(value, tz)))
+
+
+def _reopen_written_months(session, flush_context):
+    # Months still open for new entries cannot have been closed; skipping them keeps ordinary
+    # postings from issuing the DELETE at all
+    last = last_closable_month()
+    months = {(company_id, month) for company_id, month in session.info.pop(_REOPEN_KEY, ()) if month <= last}
+    reopened = _reopen(session.connection(), months)
+    if reopened:
+        logger.warning(f"Rows dated in closed months changed; reopened {reopened} month(s)")
+
+
+def _discard_written_months(session, previous_transaction=None):
+    session.info.pop(_REOPEN_KEY, None)
+
+
+def _track_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+_listeners_installed = False
+
+
+def install_month_snapshot_listeners():
+    """
+    Reopen a closed month in the transaction that writes one of its rows. Installed once
+    per process.
+    """
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    # active_history makes an assignment to an expired column load its committed value
+    # first, so a row moved out of a closed month still reopens it
+    for model, date_name, _ in SNAPSHOT_TABLES.values():
+        for key in ('company_id', date_name):
+            event.listen(getattr(model, key), 'set', _track_old_value, active_history=True)
+    event.listen(Session, 'before_flush', _collect_closed_month_writes)
+    event.listen(Session, 'after_flush_postexec', _reopen_written_months)
+    event.listen(Session, 'after_soft_rollback', _discard_written_months)
+    _listeners_installed = True
+
+
+@click.command('close-months')
+@click.option('--company-id', default=None, help='Only close months of this company')
+@click.option('--since', default=None, help='First month to close (YYYY-MM)')
+def close_months_command(company_id, since):
+    """Write Parquet snapshots for every closable month that has none."""
+    result = close_months(company_id, parse_month(since) if since else None)
+    click.echo(f"Closed {result['months_closed']} months ({result['rows']} rows), {result['failed']} failed.")
+
+
+@click.command('reopen-month')
+@click.option('--company-id', required=True, help='Company whose month to reopen')
+@click.option('--month', required=True, help='Month to reopen (YYYY-MM)')
+def reopen_month_command(company_id, month):
+    """Drop a month's snapshot so reports read it from Postgres until it is closed again."""
+    if reopen_month(company_id, parse_month(month)):
+        click.echo(f"Reopened {month}.")
+    else:
+        click.echo(f"{month} was not closed.")
+
+
+month_snapshots_bp = Blueprint('month_snapshots', __name__)
+
+
+@month_snapshots_bp.route('/reporting/closed-months', methods=['GET'])
+@jwt_required()
+def get_closed_months():
+    claims = get_jwt()
+    if claims.get('role') not in ('super_admin', 'company_owner'):
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    company_id = claims.get('company_id')
+    months = []
+    for month in closed_months(company_id):
+        with open(os.path.join(_month_path(company_id, month), MANIFEST)) as f:
+            months.append(json.load(f))
+    return jsonify(months), 200
+
+
+def init_month_snapshots(app):
+    """
+    Install the closed-month write listeners and register the month-close CLI commands and
+    the closed months endpoint.
+
+    Args:
+        app: Flask application instance
+    """
+    install_month_snapshot_listeners()
+    app.cli.add_command(close_months_command)
+    app.cli.add_command(reopen_month_command)
+    app.register_blueprint(month_snapshots_bp)
@@ -0,0 +1,544 @@
+"""
+Keyset (cursor) pagination for the generic /<entity>/page endpoints.
+
+Pages are ordered by (sort key, id) and the next page is fetched with a row-value comparison
+against the last row of the current one:
+
+    WHERE company_id = :company AND (created_at, id) < (:last_created_at, :last_id)
+    ORDER BY created_at DESC, id DESC LIMIT :page_size + 1
+
+With a (company_id, sort key, id) index every page costs the same as the first, where
+OFFSET had to walk past all earlier rows. The id tie-breaker keeps the order total, so rows
+sharing a sort value are neither repeated nor skipped.
+
+Cursors are opaque url-safe strings carrying the boundary row's sort value and id, the
+direction to move in and a fingerprint of the sort and filters. A cursor used with other
+filters is rejected (400) rather than silently returning a page of a different result set.
+
+Callers read the rows their role is granted in PageSpec.access (see request_scope): other
+roles and company-scoped tokens without a company get 403.
+
+Request params (what CRUDPage already sends, plus cursor/total):
+
+    page_size             rows per page (1..MAX_PAGE_SIZE)
+    sort_by, sort_dir     a sort key (or other text column) and asc/desc; or sort=key:dir
+    q                     case-insensitive substring search over the entity's search columns
+    filter_<name>         equality on the entity's filter columns, substring on other text columns
+    cursor                next_cursor / prev_cursor of a previous response
+    page                  1-based page number for clients without a cursor (OFFSET fallback)
+    fields                comma-separated column keys to return (id is always included);
+                          only those columns are selected
+    total                 'none' to skip the count, or a counting.py strategy overriding the
+                          entity's count_strategy ('exact', 'capped', 'estimate')
+
+Response: {items, total, total_exact, count_strategy, page_size, has_more, next_cursor,
+prev_cursor}
+"""
+import base64
+from datetime import date, datetime
+from decimal import Decimal
+import hashlib
+import json
+import uuid
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import String, func, or_, select, tuple_
+from sqlalchemy.sql.elements import Label
+
+from app import db
+from app.models import BankAccount, Customer, DetailedLog, Invoice, Payment, User
+from counting import STRATEGIES as COUNT_STRATEGIES, count_rows
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+
+class InvalidPageRequest(ValueError):
+    """A page request with an unknown sort key or filter, or a stale/malformed cursor."""
+
+
+# 'all' rows, the rows of the caller's 'company', or only the 'active' rows of its company
+DEFAULT_ACCESS = {
+    'super_admin': 'all',
+    'company_owner': 'company',
+    'manager': 'company',
+    'auditor': 'active',
+    'employee': 'active',
+}
+
+
+class PageSpec:
+    """
+    How an entity is listed: its columns (display joins included), the sort keys clients
+    may choose, the columns searched by `q` and the columns filter_<name> applies to.
+
+    Args:
+        model: Model of the listed table (its id is the tie-breaker)
+        columns: Zero-argument callable returning the selected columns
+        joins: Zero-argument callable returning (target, onclause) outer joins
+        sort_keys: dict of name -> non-nullable column expression, ideally indexed together
+            with (company_id, ..., id)
+        default_sort: (name, 'asc'|'desc')
+        search: Zero-argument callable returning the columns searched by `q`
+        filters: dict of name -> column expression
+        company_scoped: Restrict non super_admins to their company_id
+        count_strategy: How `total` is counted (see counting.py)
+        access: dict of role -> rows the entity's list and detail views return to it (see
+            DEFAULT_ACCESS); roles not listed may not read the entity
+    """
+
+    def __init__(self, model, columns, sort_keys, default_sort, joins=None, search=None, filters=None,
+                 company_scoped=True, count_strategy='exact', access=None):
+        self.model = model
+        self.columns = columns
+        self.joins = joins or (lambda: ())
+        self.sort_keys = sort_keys
+        self.default_sort = default_sort
+        self.search = search or (lambda: ())
+        self.filters = filters or {}
+        self.company_scoped = company_scoped
+        self.count_strategy = count_strategy
+        self.access = access or DEFAULT_ACCESS
+
+
+def _name_of(user):
+    return func.trim(func.coalesce(user.first_name, '') + ' ' + func.coalesce(user.last_name, ''), type_=String)
+
+
+def _customer_name():
+    return func.trim(Customer.first_name + ' ' + Customer.last_name, type_=String)
+
+
+def _table_columns(model, exclude=()):
+    return [column for column in model.__table__.columns if column.key not in exclude]
+
+
+PAGE_SPECS = {
+    'logs': PageSpec(
+        DetailedLog,
+        columns=lambda: [*_table_columns(DetailedLog), _name_of(User).label('user_name')],
+        joins=lambda: [(User, User.id == DetailedLog.user_id)],
+        sort_keys={
+            'created_at': DetailedLog.created_at,
+            'action': DetailedLog.action,
+            'table_name': DetailedLog.table_name,
+        },
+        default_sort=('created_at', 'desc'),
+        search=lambda: [DetailedLog.action, DetailedLog.table_name, DetailedLog.ip_address, User.first_name, User.last_name],
+        filters={
+            'action': DetailedLog.action,
+            'table_name': DetailedLog.table_name,
+            'user_id': DetailedLog.user_id,
+        },
+        count_strategy='estimate',
+        access={'super_admin': 'all', 'company_owner': 'company', 'auditor': 'company'},
+    ),
+    'payments': PageSpec(
+        Payment,
+        columns=lambda: [
+            *_table_columns(Payment, exclude=('received_by',)),
+            Payment.received_by.label('received_by_id'),
+            _name_of(User).label('received_by'),
+            Invoice.invoice_number,
+            _customer_name().label('customer_name'),
+            (BankAccount.bank_name + ' - ' + BankAccount.account_number).label('bank_account_details'),
+        ],
+        joins=lambda: [
+            (User, User.id == Payment.received_by),
+            (Invoice, Invoice.id == Payment.invoice_id),
+            (Customer, Customer.id == Invoice.customer_id),
+            (BankAccount, BankAccount.id == Payment.bank_account_id),
+        ],
+        sort_keys={
+            'payment_date': Payment.payment_date,
+            'amount': Payment.amount,
+            'status': Payment.status,
+            'payment_method': Payment.payment_method,
+        },
+        default_sort=('payment_date', 'desc'),
+        search=lambda: [
+            Invoice.invoice_number, Customer.first_name, Customer.last_name, Customer.internet_id,
+            Payment.transaction_id,
+        ],
+        filters={
+            'status': Payment.status,
+            'payment_method': Payment.payment_method,
+            'bank_account_id': Payment.bank_account_id,
+            'invoice_id': Payment.invoice_id,
+        },
+        count_strategy='capped',
+    ),
+    'invoices': PageSpec(
+        Invoice,
+        columns=lambda: [
+            *_table_columns(Invoice),
+            _customer_name().label('customer_name'),
+            Customer.internet_id,
+        ],
+        joins=lambda: [(Customer, Customer.id == Invoice.customer_id)],
+        sort_keys={
+            'invoice_number': Invoice.invoice_number,
+            'billing_start_date': Invoice.billing_start_date,
+            'billing_end_date': Invoice.billing_end_date,
+            'due_date': Invoice.due_date,
+            'subtotal': Invoice.subtotal,
+            'discount_percentage': Invoice.discount_percentage,
+            'total_amount': Invoice.total_amount,
+            'status': Invoice.status,
+        },
+        default_sort=('billing_start_date', 'desc'),
+        search=lambda: [Invoice.invoice_number, Customer.first_name, Customer.last_name, Customer.internet_id],
+        filters={
+            'status': Invoice.status,
+            'invoice_type': Invoice.invoice_type,
+            'customer_id': Invoice.customer_id,
+        },
+        count_strategy='capped',
+    ),
+    'customers': PageSpec(
+        Customer,
+        columns=lambda: _table_columns(Customer),
+        sort_keys={
+            'first_name': Customer.first_name,
+            'internet_id': Customer.internet_id,
+            'installation_date': Customer.installation_date,
+            'phone_1': Customer.phone_1,
+        },
+        default_sort=('installation_date', 'desc'),
+        search=lambda: [
+            Customer.first_name, Customer.last_name, Customer.internet_id, Customer.phone_1, Customer.cnic,
+        ],
+        filters={
+            'area_id': Customer.area_id,
+            'sub_zone_id': Customer.sub_zone_id,
+            'isp_id': Customer.isp_id,
+            'connection_type': Customer.connection_type,
+            'is_active': Customer.is_active,
+        },
+    ),
+}
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, date):
+        return ['d', value.isoformat()]
+    if isinstance(value, Decimal):
+        return ['n', str(value)]
+    if isinstance(value, uuid.UUID):
+        return ['u', str(value)]
+    return ['v', value]
+
+
+def _decode_value(encoded):
+    kind, value = encoded
+    if kind == 'dt':
+        return datetime.fromisoformat(value)
+    if kind == 'd':
+        return date.fromisoformat(value)
+    if kind == 'n':
+        return Decimal(value)
+    if kind == 'u':
+        return uuid.UUID(value)
+    return value
+
+
+def encode_cursor(sort_value, row_id, backwards, fingerprint):
+    payload = json.dumps([_encode_value(sort_value), str(row_id), backwards, fingerprint], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fingerprint):
+    """
+    Returns:
+        (sort_value, row_id, backwards)
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, row_id, backwards, cursor_fingerprint = json.loads(base64.urlsafe_b64decode(padded))
+        value, row_id = _decode_value(value), uuid.UUID(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidPageRequest('Malformed cursor') from e
+    if cursor_fingerprint != fingerprint:
+        raise InvalidPageRequest('Cursor does not match the current sort and filters; start from the first page')
+    return value, row_id, bool(backwards)
+
+
+def _selected_column(spec, name):
+    """A column of the entity's select list by its key or label (e.g. customer_name)."""
+    for column in spec.columns():
+        if column.key == name:
+            return column.element if isinstance(column, Label) else column
+    return None
+
+
+def _is_text(column):
+    try:
+        return column.type.python_type is str
+    except NotImplementedError:
+        return False
+
+
+def sort_param(spec, args):
+    """
+    Returns:
+        (sort_by, sort_dir, sort expression)
+    """
+    sort_by, sort_dir = args.get('sort_by'), args.get('sort_dir')
+    if not sort_by and args.get('sort'):
+        # CRUDPage's "key:dir,key:dir"; keyset pagination orders by the first key only
+        sort_by, _, sort_dir = args['sort'].split(',')[0].partition(':')
+    sort_by = sort_by or spec.default_sort[0]
+    sort_dir = (sort_dir or spec.default_sort[1]).lower()
+    if sort_dir not in ('asc', 'desc'):
+        raise InvalidPageRequest('sort_dir must be asc or desc')
+
+    if sort_by in spec.sort_keys:
+        return sort_by, sort_dir, spec.sort_keys[sort_by]
+    # Other text columns (display names included) sort correctly but without an index;
+    # NULLs become '' because a row-value comparison never matches NULL
+    column = _selected_column(spec, sort_by)
+    if column is None or not _is_text(column):
+        raise InvalidPageRequest(f"Cannot sort by {sort_by}")
+    return sort_by, sort_dir, func.coalesce(column, '')
+
+
+def filter_params(args):
+    filters = {}
+    for key in sorted(args.keys()):
+        if not key.startswith('filter_'):
+            continue
+        value = args.get(key)
+        if value not in (None, '', 'all'):
+            filters[key[len('filter_'):]] = value
+    return filters
+
+
+def _filter_value(column, value):
+    python_type = column.type.python_type
+    if python_type is bool:
+        return value.lower() in ('true', '1', 'on', 'yes')
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    return value
+
+
+def _filter_condition(spec, name, value):
+    """Equality for the entity's filter columns, substring match for other text columns."""
+    column = spec.filters.get(name)
+    if column is not None:
+        try:
+            return column == _filter_value(column, value)
+        except ValueError as e:
+            raise InvalidPageRequest(f"Invalid value for filter_{name}") from e
+
+    column = _selected_column(spec, name)
+    if column is None or not _is_text(column):
+        raise InvalidPageRequest(f"Cannot filter by {name}")
+    return column.ilike(f"%{value.strip()}%")
+
+
+def _int_param(args, name, default, minimum, maximum):
+    try:
+        value = int(args.get(name, default))
+    except (TypeError, ValueError):
+        raise InvalidPageRequest(f"{name} must be an integer")
+    return max(minimum, min(value, maximum))
+
+
+def serialize_row(row):
+    item = {}
+    for key, value in row._mapping.items():
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = float(value)
+        elif isinstance(value, uuid.UUID):
+            value = str(value)
+        item[key] = value
+    return item
+
+
+def fields_param(spec, args):
+    """
+    The column keys requested with `fields=a,b,c`, in the entity's column order, or None
+    for all columns.
+
+    Raises:
+        InvalidPageRequest: for a key that is not one of the entity's columns
+    """
+    value = (args.get('fields') or '').strip()
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    keys = [column.key for column in spec.columns()]
+    unknown = sorted(requested - set(keys))
+    if unknown:
+        raise InvalidPageRequest(f"Unknown fields: {', '.join(unknown)}")
+    return [key for key in keys if key in requested or key == 'id']
+
+
+def request_scope(spec):
+    """
+    How the caller may read an entity under spec.access, as (company_id, access): company_id
+    is None only for 'all' access and a UUID otherwise. None when the caller's role may not
+    read the entity, or a company-scoped token carries no valid company_id.
+    """
+    claims = get_jwt()
+    access = spec.access.get(claims.get('role'))
+    if access is None:
+        return None
+    if access == 'all':
+        return None, access
+    try:
+        return uuid.UUID(str(claims.get('company_id'))), access
+    except ValueError:
+        return None
+
+
+def base_statement(spec, company_id, filters, q, fields=None, active_only=False):
+    """
+    The entity's filtered select, without ordering or paging.
+
+    Args:
+        fields: Column keys to select (see fields_param); None selects every column
+        active_only: Leave out rows with is_active false ('active' access)
+    """
+    columns = spec.columns()
+    if fields is not None:
+        columns = [column for column in columns if column.key in fields]
+    statement = select(*columns).select_from(spec.model)
+    for target, onclause in spec.joins():
+        statement = statement.outerjoin(target, onclause)
+    if spec.company_scoped and company_id is not None:
+        statement = statement.where(spec.model.company_id == company_id)
+    if active_only:
+        statement = statement.where(spec.model.is_active == True)
+    for name, value in filters.items():
+        statement = statement.where(_filter_condition(spec, name, value))
+    if q:
+        pattern = f"%{q.strip()}%"
+        statement = statement.where(or_(*(column.ilike(pattern) for column in spec.search())))
+    return statement
+
+
+def paginate(spec, args, company_id, active_only=False):
+    """
+    One page of an entity for the request args (see the module docstring).
+
+    Raises:
+        InvalidPageRequest
+    """
+    sort_by, sort_dir, sort_column = sort_param(spec, args)
+    filters = filter_params(args)
+    q = (args.get('q') or '').strip()
+    fields = fields_param(spec, args)
+    page_size = _int_param(args, 'page_size', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    fingerprint = hashlib.blake2b(
+        json.dumps([sort_by, sort_dir, filters, q]).encode(), digest_size=8
+    ).hexdigest()
+
+    id_column = spec.model.id
+    statement = base_statement(spec, company_id, filters, q, fields, active_only)
+    filtered = statement
+
+    backwards = False
+    cursor = args.get('cursor')
+    if cursor:
+        value, row_id, backwards = decode_cursor(cursor, fingerprint)
+        # Moving forward in a descending order, or backward in an ascending one, goes to smaller keys
+        if (sort_dir == 'desc') != backwards:
+            statement = statement.where(tuple_(sort_column, id_column) < (value, row_id))
+        else:
+            statement = statement.where(tuple_(sort_column, id_column) > (value, row_id))
+
+    descending = (sort_dir == 'desc') != backwards
+    order = (sort_column.desc(), id_column.desc()) if descending else (sort_column.asc(), id_column.asc())
+    statement = statement.add_columns(
+        sort_column.label('_sort_value'), id_column.label('_sort_id'),
+    ).order_by(*order).limit(page_size + 1)
+
+    page = _int_param(args, 'page', 1, 1, 10 ** 6)
+    if not cursor and page > 1:
+        # Clients without a cursor can still jump to a page; this costs OFFSET rows
+        statement = statement.offset((page - 1) * page_size)
+
+    rows = db.session.execute(statement).all()
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    # Forward pages have a next page if we over-fetched; backward pages always do
+    has_next = more if not backwards else True
+    has_prev = bool(cursor or page > 1) if not backwards else more
+
+    count = {'total': None, 'total_exact': None, 'count_strategy': None}
+    total_param = args.get('total') or spec.count_strategy
+    if total_param != 'none':
+        if total_param not in COUNT_STRATEGIES:
+            raise InvalidPageRequest(f"total must be none or one of {', '.join(COUNT_STRATEGIES)}")
+        count = count_rows(filtered, total_param).as_dict()
+
+    items = []
+    for row in rows:
+        item = serialize_row(row)
+        item.pop('_sort_value', None)
+        item.pop('_sort_id', None)
+        items.append(item)
+
+    return {
+        'items': items,
+        **count,
+        'page_size': page_size,
+        'has_more': has_next,
+        'next_cursor': encode_cursor(rows[-1]._sort_value, rows[-1]._sort_id, False, fingerprint) if rows and has_next else None,
+        'prev_cursor': encode_cursor(rows[0]._sort_value, rows[0]._sort_id, True, fingerprint) if rows and has_prev else None,
+    }
+
+
+pagination_bp = Blueprint('pagination', __name__)
+
+
+def get_entity_page(entity):
+    spec = PAGE_SPECS.get(entity)
+    if spec is None:
+        return jsonify({'error': f"Unknown entity {entity}"}), 404
+
+    scope = request_scope(spec)
+    if scope is None:
+        return jsonify({'error': 'Unauthorized'}), 403
+    company_id, access = scope
+    try:
+        return jsonify(paginate(spec, request.args, company_id, access == 'active')), 200
+    except InvalidPageRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+
+pagination_bp.add_url_rule('/<entity>/page', view_func=jwt_required()(get_entity_page), methods=['GET'])
+
+
+def init_pagination(app):
+    """
+    Serve /<entity>/page with keyset pagination for every entity in PAGE_SPECS. Existing
+    /<entity>/page routes of those entities are pointed at it.
+
+    Args:
+        app: Flask application instance
+    """
+    for rule in list(app.url_map.iter_rules()):
+        parts = rule.rule.strip('/').split('/')
+        if len(parts) == 2 and parts[1] == 'page' and parts[0] in PAGE_SPECS:
+            app.view_functions[rule.endpoint] = _bound_page_view(parts[0])
+
+    app.register_blueprint(pagination_bp)
+
+
+def _bound_page_view(entity):
+    @jwt_required()
+    def view(**kwargs):
+        return get_entity_page(entity)
+    view.__name__ = f"get_{entity}_page"
+    return view
@@ -1,10 +1,26 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+import atexit
 import logging
+import time
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.orm import aliased
 from app import db
-from app.models import Customer, Invoice, ServicePlan
-from app.crud.invoice_crud import generate_invoice_number, add_invoice
+from app.models import Customer, CustomerPackage, Invoice, InvoiceLineItem, DetailedLog, ServicePlan
+from invoice_numbers import reserve_invoice_numbers
+from streaming import read_connection, stream_batches
+from bank_journal import generate_balance_checkpoints
+from month_snapshots import close_months_job, record_bulk_write
+from export_jobs import cleanup_export_jobs
+from invoice_pdf import cleanup_invoice_pdfs
+from financial_rollups import record_bulk_insert
+from dashboard_cache import invalidate_companies
+from job_runs import add_instrumented_job, attach, current_run, install_statement_counter
+from local_files import start_sweeper
+from scheduler_leader import SchedulerLeader, DEFAULT_LOCK_KEY
 import uuid
 
 # Configure logging
@@ -14,6 +30,14 @@ logger = logging.getLogger(__name__)
 # Global scheduler instance
 scheduler = None
 
+# Rows per INSERT statement when bulk generating invoices
+BULK_INVOICE_BATCH_SIZE = 1000
+
+# Use the system user ID for generated_by
+SYSTEM_USER_ID = "00000000-0000-0000-0000-000000000000"  # Replace with your actual system user ID
+SYSTEM_IP_ADDRESS = '127.0.0.1'
+SYSTEM_USER_AGENT = 'Automatic Invoice Generator'
+
 def generate_automatic_invoices(app=None):
     """
     Generate invoices for customers whose recharge date is today.
@@ -25,136 +49,528 @@ def generate_automatic_invoices(app=None):
     logger.info(f"Running automatic invoice generation for date: {datetime.now().date()}")
     
     if app:
-        with app.app_context():
-            _process_invoices()
+        return run_billing_shards(app)
     else:
         logger.error("No Flask app provided to generate_automatic_invoices")
 
-def _process_invoices():
+def _billing_shards(today, shard_by='company'):
+    """
+    List the shards that have customers with a billable package due today.
+
+    Args:
+        today: Billing date
+        shard_by: 'company' for one shard per Company, 'area' for one per (Company, Area)
+
+    Returns:
+        list of dicts with company_id and area_id (None when sharding by company)
+    """
+    columns = [Customer.company_id]
+    if shard_by == 'area':
+        columns.append(Customer.area_id)
+
+    rows = db.session.query(*columns).join(
+        CustomerPackage, CustomerPackage.customer_id == Customer.id
+    ).filter(
+        customers_due_today_filter(today),
+        billable_package_filter(today),
+    ).distinct().all()
+
+    return [
+        {'company_id': row[0], 'area_id': row[1] if shard_by == 'area' else None}
+        for row in rows
+    ]
+
+def _run_billing_shard(app, shard, job_run=None):
+    """
+    Generate invoices for one shard in its own application context, and so its own
+    session and transactions. Errors are captured in the result instead of raised so
+    one tenant's failure never affects the others.
+    """
+    started = time.perf_counter()
+    result = {
+        'company_id': str(shard['company_id']),
+        'area_id': str(shard['area_id']) if shard['area_id'] else None,
+        'due': 0, 'created': 0, 'skipped': 0, 'failed': 0,
+        'error': None,
+    }
+
+    with app.app_context(), attach(job_run):
+        try:
+            result.update(_process_invoices(company_id=shard['company_id'], area_id=shard['area_id']))
+        except Exception as e:
+            db.session.rollback()
+            result['error'] = str(e)
+            logger.error(f"Billing shard {result['company_id']}/{result['area_id']} failed: {str(e)}")
+        finally:
+            db.session.remove()
+
+    result['duration_seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+def run_billing_shards(app, max_workers=None, shard_by=None):
+    """
+    Run the daily billing job split into per-company (or per-area) shards on a bounded
+    worker pool.
+
+    Args:
+        app: Flask application instance
+        max_workers: Pool size, defaults to BILLING_MAX_WORKERS. Keep it within the
+                     SQLAlchemy connection pool size.
+        shard_by: 'company' or 'area', defaults to BILLING_SHARD_BY
+
+    Returns:
+        list of per-shard results (timing and due/created/skipped/failed counts)
+    """
+    max_workers = max_workers or app.config.get('BILLING_MAX_WORKERS', 4)
+    shard_by = shard_by or app.config.get('BILLING_SHARD_BY', 'company')
+    today = datetime.now().date()
+    started = time.perf_counter()
+
+    with app.app_context(), current_run().phase('shard_discovery'):
+        shards = _billing_shards(today, shard_by)
+        db.session.remove()
+
+    logger.info(f"Billing {len(shards)} {shard_by} shards with {max_workers} workers")
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='billing') as executor:
+        # Worker threads report statements and counts to the run that started them
+        job_run = current_run()
+        futures = [executor.submit(_run_billing_shard, app, shard, job_run) for shard in shards]
+        for future in as_completed(futures):
+            shard_result = future.result()
+            results.append(shard_result)
+            logger.info(
+                f"Shard {shard_result['company_id']}/{shard_result['area_id']}: "
+                f"{shard_result['created']} created, {shard_result['skipped']} skipped, "
+                f"{shard_result['failed']} failed in {shard_result['duration_seconds']}s"
+                + (f" (error: {shard_result['error']})" if shard_result['error'] else "")
+            )
+
+    logger.info(
+        f"Billing run finished in {time.perf_counter() - started:.2f}s: "
+        f"{sum(r['created'] for r in results)} invoices created across {len(results)} shards"
+    )
+    return results
+
+def _billing_window(today):
+    """
+    Return the billing/month boundaries used for invoices generated on `today`.
+    """
+    current_month_start = datetime(today.year, today.month, 1).date()
+    next_month_start = (datetime(today.year, today.month, 1) + timedelta(days=32)).replace(day=1).date()
+    return {
+        'current_month_start': current_month_start,
+        'next_month_start': next_month_start,
+        'billing_start_date': today,
+        # The end date is the last day of the current month
+        'billing_end_date': next_month_start - timedelta(days=1),
+        # Due date is 7 days from today
+        'due_date': today + timedelta(days=7),
+    }
+
+def recharge_day_key(day):
+    """
+    Return the Customer.recharge_day_key value (month * 100 + day) for a date.
+    """
+    return day.month * 100 + day.day
+
+def customers_due_today_filter(today):
+    """
+    Filter criteria for active customers whose recharge date falls on today's month and day.
+    Served by idx_customers_recharge_day_key instead of extract() on every row.
+    """
+    return and_(
+        Customer.is_active == True,
+        Customer.recharge_day_key == recharge_day_key(today),
+    )
+
+def billable_package_filter(today):
+    """
+    Filter criteria for packages that bill today: active, started, and not yet ended.
+    """
+    return and_(
+        CustomerPackage.is_active == True,
+        CustomerPackage.start_date <= today,
+        or_(CustomerPackage.end_date == None, CustomerPackage.end_date >= today),
+    )
+
+def customer_packages_due_query(today):
+    """
+    Billable packages (see billable_package_filter) of customers due today, with the plan
+    each package bills.
+    """
+    return db.session.query(
+        CustomerPackage.id.label('customer_package_id'),
+        CustomerPackage.customer_id,
+        Customer.company_id,
+        ServicePlan.id.label('service_plan_id'),
+        ServicePlan.name.label('plan_name'),
+        ServicePlan.price.label('plan_price'),
+    ).join(
+        Customer, Customer.id == CustomerPackage.customer_id
+    ).join(
+        ServicePlan, ServicePlan.id == CustomerPackage.service_plan_id
+    ).filter(
+        customers_due_today_filter(today),
+        billable_package_filter(today),
+    )
+
+def _calculate_amounts(price, discount_amount):
+    """
+    Calculate subtotal, discount percentage and total for a plan price and a flat discount.
+    """
+    subtotal = float(price)
+    discount_percentage = 0
+    if discount_amount:
+        discount_percentage = (float(discount_amount) / subtotal) * 100
+
+    total_amount = subtotal - (subtotal * discount_percentage / 100)
+    return subtotal, discount_percentage, total_amount
+
+def _pending_invoice_query(today, company_id=None, area_id=None):
+    """
+    Query the billable packages of every customer due today who has no subscription invoice
+    this month, optionally limited to one company and area.
+
+    Built on customer_packages_due_query(): a single anti-join against invoices replaces the
+    per-customer existence check, and each package row carries its plan price/name and the
+    customer's discount so no per-customer lookups are needed. Rows are ordered by customer
+    so a customer's packages arrive together.
+    """
+    window = _billing_window(today)
+    existing_invoice = aliased(Invoice)
+
+    query = customer_packages_due_query(today).add_columns(
+        Customer.discount_amount,
+    ).outerjoin(
+        existing_invoice,
+        and_(
+            existing_invoice.customer_id == CustomerPackage.customer_id,
+            existing_invoice.billing_start_date >= window['current_month_start'],
+            existing_invoice.billing_start_date < window['next_month_start'],
+            existing_invoice.invoice_type == 'subscription',
+        )
+    ).filter(
+        existing_invoice.id == None,
+    )
+
+    if company_id:
+        query = query.filter(Customer.company_id == company_id)
+    if area_id:
+        query = query.filter(Customer.area_id == area_id)
+
+    return query.order_by(CustomerPackage.customer_id, CustomerPackage.start_date, CustomerPackage.id)
+
+def _customer_batches(batches):
+    """
+    Regroup streamed package rows (ordered by customer) into batches of per-customer package
+    lists. The last customer of each batch is held back until the next batch shows its rows
+    are complete, so a customer is never split across two invoices.
+    """
+    packages = []
+    for rows in batches:
+        customers = []
+        for row in rows:
+            if packages and packages[-1].customer_id != row.customer_id:
+                customers.append(packages)
+                packages = []
+            packages.append(row)
+        if customers:
+            yield customers
+    if packages:
+        yield [packages]
+
+def _build_invoice_batch(customers, today, invoice_numbers):
+    """
+    Build Invoice, InvoiceLineItem and DetailedLog insert parameters for a batch of customers,
+    one invoice per customer with a line item per package.
+    """
+    window = _billing_window(today)
+    invoices, line_items, logs = [], [], []
+
+    for packages, invoice_number in zip(customers, invoice_numbers):
+        customer = packages[0]
+        subtotal, discount_percentage, total_amount = _calculate_amounts(
+            sum(float(package.plan_price) for package in packages), customer.discount_amount
+        )
+        invoice_id = uuid.uuid4()
+        plan_names = ', '.join(package.plan_name for package in packages)
+        notes = f"Automatically generated invoice for {plan_names} plan{'s' if len(packages) > 1 else ''}"
+
+        invoices.append({
+            'id': invoice_id,
+            'invoice_number': invoice_number,
+            'company_id': customer.company_id,
+            'customer_id': customer.customer_id,
+            'billing_start_date': window['billing_start_date'],
+            'billing_end_date': window['billing_end_date'],
+            'due_date': window['due_date'],
+            'subtotal': subtotal,
+            'discount_percentage': discount_percentage,
+            'total_amount': total_amount,
+            'invoice_type': 'subscription',
+            'notes': notes,
+            'generated_by': uuid.UUID(SYSTEM_USER_ID),
+            'status': 'pending',
+            'is_active': True,
+        })
+        for package in packages:
+            # The customer's discount is spread over the packages in proportion to price
+            unit_price = float(package.plan_price)
+            line_discount = unit_price * discount_percentage / 100
+            line_items.append({
+                'id': uuid.uuid4(),
+                'invoice_id': invoice_id,
+                'customer_package_id': package.customer_package_id,
+                'item_type': 'package',
+                'description': package.plan_name,
+                'quantity': 1,
+                'unit_price': unit_price,
+                'discount_amount': line_discount,
+                'line_total': unit_price - line_discount,
+            })
+        logs.append({
+            'id': uuid.uuid4(),
+            'user_id': uuid.UUID(SYSTEM_USER_ID),
+            'company_id': customer.company_id,
+            'action': 'create',
+            'table_name': 'invoices',
+            'record_id': invoice_id,
+            'new_values': {
+                'invoice_number': invoice_number,
+                'customer_id': str(customer.customer_id),
+                'billing_start_date': window['billing_start_date'].isoformat(),
+                'billing_end_date': window['billing_end_date'].isoformat(),
+                'due_date': window['due_date'].isoformat(),
+                'subtotal': subtotal,
+                'discount_percentage': discount_percentage,
+                'total_amount': total_amount,
+                'invoice_type': 'subscription',
+                'notes': notes,
+            },
+            'ip_address': SYSTEM_IP_ADDRESS,
+            'user_agent': SYSTEM_USER_AGENT,
+        })
+
+    return invoices, line_items, logs
+
+def _insert_invoice_batch(customers, today):
+    """
+    Insert one batch of invoices (a list of per-customer package rows) with three
+    executemany statements and a single commit. Returns the invoice numbers that were created.
+    """
+    # Each company numbers its invoices in its own format
+    numbers_by_company = {
+        company_id: iter(reserve_invoice_numbers(company_id, count))
+        for company_id, count in Counter(packages[0].company_id for packages in customers).items()
+    }
+    invoice_numbers = [next(numbers_by_company[packages[0].company_id]) for packages in customers]
+    invoices, line_items, logs = _build_invoice_batch(customers, today, invoice_numbers)
+
+    try:
+        db.session.execute(insert(Invoice), invoices)
+        db.session.execute(insert(InvoiceLineItem), line_items)
+        db.session.execute(insert(DetailedLog), logs)
+        # Bulk inserts skip the session listeners that maintain the dashboard rollups
+        # and reopen closed months
+        record_bulk_insert(Invoice, invoices)
+        record_bulk_write(Invoice, invoices)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    invalidate_companies(invoice['company_id'] for invoice in invoices)
+
+    return invoice_numbers
+
+def _process_invoices(bulk=True, company_id=None, area_id=None):
     """
     Internal function to process invoices within an application context
+
+    Args:
+        bulk: Insert invoices, line items and logs in batched statements. When False
+              every customer is inserted in its own transaction.
+        company_id: Only bill this company's customers (one billing shard)
+        area_id: Only bill customers in this area
+
+    Returns:
+        dict with the number of customers due, invoices created, skipped and failed
     """
     today = datetime.now().date()
-    
+    result = {'due': 0, 'created': 0, 'skipped': 0, 'failed': 0}
+    run = current_run()
+
     try:
-        # Get all active customers whose recharge date is today
-        customers = Customer.query.filter(
-            Customer.is_active == True,
-            Customer.recharge_date != None,
-            db.func.extract('day', Customer.recharge_date) == today.day,
-            db.func.extract('month', Customer.recharge_date) == today.month
-        ).all()
-        
-        logger.info(f"Found {len(customers)} customers with recharge date today")
-        
-        # Check if invoices have already been generated this month for these customers
-        current_month_start = datetime(today.year, today.month, 1).date()
-        next_month_start = (datetime(today.year, today.month, 1) + timedelta(days=32)).replace(day=1).date()
-        
-        invoice_count = 0
-        
-        for customer in customers:
-            # Check if an invoice already exists for this customer in the current month
-            existing_invoice = Invoice.query.filter(
-                Invoice.customer_id == customer.id,
-                Invoice.billing_start_date >= current_month_start,
-                Invoice.billing_start_date < next_month_start,
-                Invoice.invoice_type == 'subscription'
-            ).first()
-            
-            if existing_invoice:
-                logger.info(f"Invoice already exists for customer {customer.id} ({customer.first_name} {customer.last_name}) this month")
-                continue
-            
-            try:
-                # Get the customer's service plan
-                service_plan = ServicePlan.query.get(customer.service_plan_id)
-                if not service_plan:
-                    logger.error(f"Service plan not found for customer {customer.id}")
-                    continue
-                
-                # Calculate billing period
-                billing_start_date = today
-                # Calculate the end date (same day next month - 1 day)
-                next_month = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
-                billing_end_date = (next_month - timedelta(days=1))
-                
-                # Calculate due date (7 days from today)
-                due_date = today + timedelta(days=7)
-                
-                # Calculate amounts
-                subtotal = float(service_plan.price)
-                discount_percentage = 0
-                if customer.discount_amount:
-                    discount_percentage = (float(customer.discount_amount) / subtotal) * 100
-                
-                total_amount = subtotal - (subtotal * discount_percentage / 100)
-                
-                # Create invoice data
-                invoice_data = {
-                    'company_id': str(customer.company_id),
-                    'customer_id': str(customer.id),
-                    'billing_start_date': billing_start_date.isoformat(),
-                    'billing_end_date': billing_end_date.isoformat(),
-                    'due_date': due_date.isoformat(),
-                    'subtotal': subtotal,
-                    'discount_percentage': discount_percentage,
-                    'total_amount': total_amount,
-                    'invoice_type': 'subscription',
-                    'notes': f"Automatically generated invoice for {service_plan.name} plan"
-                }
-                
-                # Use the system user ID for generated_by
-                system_user_id = "00000000-0000-0000-0000-000000000000"  # Replace with your actual system user ID
-                
-                # Add the invoice
-                new_invoice = add_invoice(
-                    invoice_data, 
-                    system_user_id, 
-                    'system', 
-                    '127.0.0.1',  # IP address
-                    'Automatic Invoice Generator'  # User agent
-                )
-                
-                logger.info(f"Successfully generated invoice {new_invoice.invoice_number} for customer {customer.id} ({customer.first_name} {customer.last_name})")
-                invoice_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error generating invoice for customer {customer.id}: {str(e)}")
-        
-        logger.info(f"Automatic invoice generation completed. Generated {invoice_count} invoices.")
+        # Packages of customers due today that still need this month's subscription invoice,
+        # streamed in batches on a separate connection so each batch can commit while the scan is open
+        with read_connection() as conn:
+            batches = _customer_batches(
+                stream_batches(_pending_invoice_query(today, company_id, area_id), BULK_INVOICE_BATCH_SIZE, conn)
+            )
+            while True:
+                with run.phase('select_due'):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+
+                result['due'] += len(batch)
+                run.add(rows_scanned=sum(len(packages) for packages in batch))
+
+                if bulk:
+                    try:
+                        with run.phase('bulk_insert'):
+                            _insert_invoice_batch(batch, today)
+                        result['created'] += len(batch)
+                        logger.info(f"Bulk generated {len(batch)} invoices")
+                        continue
+                    except Exception as e:
+                        # Fall back to per-customer generation so one bad row does not fail the batch
+                        logger.error(f"Bulk invoice insert failed, retrying {len(batch)} customers individually: {str(e)}")
+
+                for packages in batch:
+                    try:
+                        with run.phase('single_insert'):
+                            _insert_invoice_batch([packages], today)
+                        result['created'] += 1
+                    except Exception as e:
+                        db.session.rollback()
+                        logger.error(f"Error generating invoice for customer {packages[0].customer_id}: {str(e)}")
+                        result['failed'] += 1
+
+        logger.info(f"Found {result['due']} customers with recharge date today and no invoice this month")
+        logger.info(f"Automatic invoice generation completed. Generated {result['created']} invoices.")
     except Exception as e:
+        result['failed'] += result['due'] - result['created'] - result['skipped'] - result['failed']
+        db.session.rollback()
+        result['error'] = str(e)
         logger.error(f"Error in invoice generation process: {str(e)}")
 
-def init_scheduler(app):
+    run.add(created=result['created'], skipped=result['skipped'], failed=result['failed'])
+    return result
+
+def create_scheduler(app):
     """
-    Initialize the background scheduler with the Flask app context.
-    
+    Build and start a BackgroundScheduler with all scheduled jobs registered.
+
     Args:
         app: Flask application instance
     """
-    if not app:
-        logger.error("No Flask app provided to init_scheduler")
-        return
-    
-    global scheduler
-    scheduler = BackgroundScheduler()
-    
+    install_statement_counter()
+    new_scheduler = BackgroundScheduler()
+
     # Run the job every day at 1:00 AM
-    scheduler.add_job(
-        func=generate_automatic_invoices,
+    add_instrumented_job(
+        new_scheduler,
+        app,
+        generate_automatic_invoices,
         args=[app],  # Pass the Flask app to the job
         trigger=CronTrigger(hour=1, minute=0),
         id='generate_invoices_job',
         name='Generate invoices for customers with recharge date today',
         replace_existing=True
     )
-    
-    # Start the scheduler
-    scheduler.start()
-    
-    # Shut down the scheduler when the app is shutting down
-    @app.teardown_appcontext
-    def shutdown_scheduler(exception=None):
-        if scheduler and scheduler.running:
-            scheduler.shutdown(wait=False)  # Do not wait for jobs to complete
\ No newline at end of file
+
+    # Daily bank balance checkpoints shortly after midnight
+    add_instrumented_job(
+        new_scheduler,
+        app,
+        generate_balance_checkpoints,
+        args=[app],
+        trigger=CronTrigger(hour=0, minute=15),
+        id='bank_balance_checkpoints_job',
+        name='Write bank account balance checkpoints',
+        replace_existing=True
+    )
+
+    # Snapshot closed financial months to Parquet
+    add_instrumented_job(
+        new_scheduler,
+        app,
+        close_months_job,
+        args=[app],
+        trigger=CronTrigger(hour=2, minute=30),
+        id='close_months_job',
+        name='Write Parquet snapshots of closed months',
+        replace_existing=True
+    )
+
+    # Remove expired export artifacts and fail exports whose worker died
+    add_instrumented_job(
+        new_scheduler,
+        app,
+        cleanup_export_jobs,
+        args=[app],
+        trigger=CronTrigger(minute='*/15'),
+        id='cleanup_export_jobs',
+        name='Delete expired export jobs and their files',
+        replace_existing=True
+    )
+
+    # Remove cached invoice PDFs and route books nobody has opened for a while
+    add_instrumented_job(
+        new_scheduler,
+        app,
+        cleanup_invoice_pdfs,
+        args=[app],
+        trigger=CronTrigger(hour=3, minute=15),
+        id='cleanup_invoice_pdfs',
+        name='Delete stale cached invoice PDFs',
+        replace_existing=True
+    )
+
+    new_scheduler.start()
+    return new_scheduler
+
+def start_scheduler_leader(app):
+    """
+    Contend for scheduler leadership in the background. Only the process holding the
+    Postgres advisory lock runs the jobs; the others take over if it goes away.
+
+    Returns:
+        SchedulerLeader
+    """
+    def start():
+        global scheduler
+        scheduler = create_scheduler(app)
+        return scheduler
+
+    with app.app_context():
+        engine = db.engine
+
+    leader = SchedulerLeader(
+        engine,
+        start,
+        lock_key=app.config.get('SCHEDULER_LOCK_KEY', DEFAULT_LOCK_KEY),
+        poll_interval=app.config.get('SCHEDULER_POLL_INTERVAL', 15),
+    )
+    leader.start()
+    atexit.register(leader.stop, 5)
+    return leader
+
+def init_scheduler(app):
+    """
+    Initialize the background scheduler with the Flask app context.
+
+    With SCHEDULER_MODE='embedded' (default) every process contends for leadership and
+    exactly one runs the jobs, so it is safe with several uvicorn/gunicorn workers. With
+    'external' jobs only run in the dedicated scheduler_runner.py process. Either way every
+    process sweeps its local file caches (see local_files.py).
+
+    Args:
+        app: Flask application instance
+    """
+    if not app:
+        logger.error("No Flask app provided to init_scheduler")
+        return
+
+    # Cached files live on each host's own disk; every process cleans its own
+    start_sweeper(app)
+
+    mode = app.config.get('SCHEDULER_MODE', 'embedded')
+    if mode != 'embedded':
+        logger.info(f"Scheduler mode is '{mode}', not running jobs in this process")
+        return
+
+    return start_scheduler_leader(app)
@@ -0,0 +1,133 @@
+"""
+Leader election for the job scheduler using a PostgreSQL advisory lock.
+
+Every process that wants to run scheduled jobs (API workers or the dedicated
+scheduler_runner.py) contends for one session-level advisory lock. The holder starts its
+scheduler; everyone else keeps polling. The lock lives on a dedicated connection, so if
+the leader process dies or loses its DB connection Postgres releases the lock and the
+next poller takes over.
+"""
+import logging
+import threading
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_advisory_lock
+DEFAULT_LOCK_KEY = 7210894531
+
+
+class SchedulerLeader:
+    """
+    Runs `start_scheduler` only while this process holds the advisory lock.
+
+    Args:
+        engine: SQLAlchemy engine for the application database
+        start_scheduler: Callable returning a started scheduler (must expose shutdown())
+        lock_key: Advisory lock key shared by all contenders
+        poll_interval: Seconds between lock attempts / leadership health checks
+    """
+
+    def __init__(self, engine, start_scheduler, lock_key=DEFAULT_LOCK_KEY, poll_interval=15):
+        self.engine = engine
+        self.start_scheduler = start_scheduler
+        self.lock_key = lock_key
+        self.poll_interval = poll_interval
+        self.scheduler = None
+        self._conn = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self):
+        return self.scheduler is not None
+
+    def _try_acquire(self):
+        if self.engine.dialect.name != 'postgresql':
+            # No advisory locks (SQLite in development): this process is always the leader
+            return True
+
+        try:
+            if self._conn is None:
+                self._conn = self.engine.connect()
+            acquired = self._conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {'key': self.lock_key}
+            ).scalar()
+            # Do not keep a transaction open on the lock connection
+            self._conn.commit()
+            return bool(acquired)
+        except Exception as e:
+            logger.warning(f"Scheduler leader election failed to reach the database: {str(e)}")
+            self._close_connection()
+            return False
+
+    def _still_leader(self):
+        if self.engine.dialect.name != 'postgresql':
+            return True
+
+        try:
+            self._conn.execute(text("SELECT 1"))
+            self._conn.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"Scheduler lost its leader connection: {str(e)}")
+            self._close_connection()
+            return False
+
+    def _close_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.invalidate()
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _become_leader(self):
+        logger.info("Acquired scheduler leadership, starting jobs")
+        self.scheduler = self.start_scheduler()
+
+    def _step_down(self):
+        if self.scheduler is not None:
+            logger.info("Stepping down as scheduler leader")
+            try:
+                self.scheduler.shutdown(wait=False)
+            except Exception as e:
+                logger.error(f"Error shutting down scheduler: {str(e)}")
+            self.scheduler = None
+
+    def run_forever(self):
+        """
+        Contend for leadership until stop() is called. Blocks the calling thread.
+        """
+        while not self._stop.is_set():
+            if self.is_leader:
+                if not self._still_leader():
+                    self._step_down()
+            elif self._try_acquire():
+                self._become_leader()
+
+            self._stop.wait(self.poll_interval)
+
+        self._step_down()
+        if self._conn is not None:
+            # Closing the session releases the advisory lock for the next leader
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def start(self):
+        """
+        Contend for leadership on a background daemon thread.
+        """
+        self._thread = threading.Thread(target=self.run_forever, name='scheduler-leader', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
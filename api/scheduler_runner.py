@@ -0,0 +1,50 @@
+"""
+Dedicated scheduler process.
+
+Run one or more of these (on any host) with SCHEDULER_MODE=external set for the API
+workers. Exactly one runner holds the Postgres advisory lock and runs the jobs; the
+others wait and take over automatically if the leader exits or loses its connection.
+
+Usage:
+    python scheduler_runner.py
+"""
+import logging
+import signal
+
+from app import create_app, db
+from bootstrap import init_extensions
+from scheduler import create_scheduler
+from scheduler_leader import SchedulerLeader, DEFAULT_LOCK_KEY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    # Same hooks and listeners as the API, without starting the embedded scheduler
+    app = init_extensions(create_app())
+
+    with app.app_context():
+        engine = db.engine
+
+    leader = SchedulerLeader(
+        engine,
+        lambda: create_scheduler(app),
+        lock_key=app.config.get('SCHEDULER_LOCK_KEY', DEFAULT_LOCK_KEY),
+        poll_interval=app.config.get('SCHEDULER_POLL_INTERVAL', 15),
+    )
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, stopping scheduler runner")
+        leader.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    logger.info("Scheduler runner started, contending for leadership")
+    leader.run_forever()
+    logger.info("Scheduler runner stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Single-flight coalescing for expensive dashboard requests.
+
+Concurrent identical requests (same company, role, path and normalised filters) in a worker
+process wait for the first one - the leader - and share its response instead of running the
+same aggregation again. If the leader raises, every waiter gets the same exception. Waiters
+give up with SingleFlightTimeout (a 503 for HTTP callers) after SINGLE_FLIGHT_TIMEOUT.
+
+With SINGLE_FLIGHT_CROSS_WORKER enabled (Postgres only), each process leader also takes a
+transaction-scoped advisory lock for the key. A leader in another worker that finds the lock
+held waits for it, then reads the successful response the lock holder left in the unlogged
+single_flight_results table. It only computes the response itself if nothing was stored, for
+example because the other leader failed.
+"""
+import functools
+import hashlib
+import threading
+
+from flask import Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from dashboard_cache import CACHED_DASHBOARD_PATHS, normalize_params
+
+DEFAULT_TIMEOUT_SECONDS = 30
+DEFAULT_RESULT_TTL_SECONDS = 60
+
+# Endpoints coalesced by init_single_flight()
+COALESCED_PATHS = CACHED_DASHBOARD_PATHS + (
+    '/dashboard/ledger',
+    '/dashboard/unified-financial',
+)
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised in a waiter when the in-flight computation takes longer than its timeout."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    In-process request coalescing: do(key, fn) runs fn once per key at a time and hands its
+    result (or exception) to every caller that arrived while it was running.
+
+    Args:
+        timeout: Default seconds a waiter waits for the leader
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'leaders': 0, 'coalesced': 0, 'timeouts': 0, 'errors': 0}
+
+    def do(self, key, fn, timeout=None):
+        """
+        Return fn() for `key`, sharing one execution between concurrent callers.
+
+        Returns:
+            (value, shared) where shared is True if another caller computed the value
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self._counters['leaders'] += 1
+            else:
+                call.waiters += 1
+                leader = False
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            if not call.done.wait(self.timeout if timeout is None else timeout):
+                with self._lock:
+                    self._counters['timeouts'] += 1
+                raise SingleFlightTimeout(f"Timed out waiting for in-flight request {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._counters['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, 'in_flight': len(self._calls)}
+
+
+single_flight = SingleFlight()
+
+
+def advisory_lock_id(key):
+    """Signed 64-bit Postgres advisory lock id for a coalescing key."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def run_across_workers(key, compute, timeout=DEFAULT_TIMEOUT_SECONDS, result_ttl=DEFAULT_RESULT_TTL_SECONDS):
+    """
+    Run compute() - returning (status, body, mimetype) - at most once at a time across all
+    workers sharing the database, reusing a response another worker produced while we waited.
+    The lock and the stored result are on a dedicated connection, in one transaction.
+    """
+    lock_id = advisory_lock_id(key)
+
+    with db.engine.connect() as connection:
+        with connection.begin():
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_xact_lock(:lock_id)"), {'lock_id': lock_id}
+            ).scalar()
+
+            if not acquired:
+                connection.execute(text(f"SET LOCAL lock_timeout = '{int(timeout * 1000)}ms'"))
+                try:
+                    connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {'lock_id': lock_id})
+                except OperationalError as e:
+                    raise SingleFlightTimeout(f"Timed out waiting for request {key} in another worker") from e
+
+                # now() is when we started waiting; anything newer was computed for us
+                row = connection.execute(
+                    text("SELECT payload, content_type FROM single_flight_results "
+                         "WHERE key = :key AND created_at >= now()"),
+                    {'key': key},
+                ).first()
+                if row is not None:
+                    return 200, bytes(row.payload), row.content_type
+
+            status, body, mimetype = compute()
+
+            if status == 200:
+                connection.execute(
+                    text("INSERT INTO single_flight_results (key, payload, content_type, created_at) "
+                         "VALUES (:key, :payload, :content_type, clock_timestamp()) "
+                         "ON CONFLICT (key) DO UPDATE SET payload = EXCLUDED.payload, "
+                         "content_type = EXCLUDED.content_type, created_at = EXCLUDED.created_at"),
+                    {'key': key, 'payload': body, 'content_type': mimetype},
+                )
+                connection.execute(
+                    text("DELETE FROM single_flight_results WHERE created_at < now() - make_interval(secs => :ttl)"),
+                    {'ttl': result_ttl},
+                )
+            return status, body, mimetype
+
+
+def coalesced(view, flight=None):
+    """
+    Wrap a JWT protected view so concurrent identical requests from the same company share
+    one execution.
+    """
+    flight = flight or single_flight
+
+    @functools.wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        claims = get_jwt()
+        company_id = claims.get('company_id')
+        if company_id is None:
+            return view(*args, **kwargs)
+
+        app = current_app._get_current_object()
+        timeout = app.config.get('SINGLE_FLIGHT_TIMEOUT', DEFAULT_TIMEOUT_SECONDS)
+        key = f"{company_id}:{claims.get('role')}:{request.path}:{normalize_params(request.args)}"
+
+        def compute():
+            response = app.make_response(view(*args, **kwargs))
+            return response.status_code, response.get_data(), response.mimetype
+
+        def compute_once():
+            if app.config.get('SINGLE_FLIGHT_CROSS_WORKER') and db.engine.dialect.name == 'postgresql':
+                return run_across_workers(
+                    key, compute, timeout, app.config.get('SINGLE_FLIGHT_RESULT_TTL', DEFAULT_RESULT_TTL_SECONDS)
+                )
+            return compute()
+
+        try:
+            (status, body, mimetype), shared = flight.do(key, compute_once, timeout)
+        except SingleFlightTimeout:
+            return jsonify({'error': 'The server is busy computing this report, please retry shortly'}), 503
+
+        response = Response(body, status=status, mimetype=mimetype)
+        response.headers['X-Coalesced'] = 'follower' if shared else 'leader'
+        return response
+
+    return wrapper
+
+
+def init_single_flight(app):
+    """
+    Coalesce concurrent identical requests to the expensive dashboard endpoints. Call after
+    the routes are registered and before init_dashboard_cache(), so cache hits skip it.
+
+    Args:
+        app: Flask application instance
+    """
+    single_flight.timeout = app.config.get('SINGLE_FLIGHT_TIMEOUT', DEFAULT_TIMEOUT_SECONDS)
+
+    for rule in app.url_map.iter_rules():
+        if rule.rule in COALESCED_PATHS:
+            app.view_functions[rule.endpoint] = coalesced(app.view_functions[rule.endpoint])
@@ -0,0 +1,90 @@
+"""
+Streaming reads for large table scans.
+
+Query results are fetched in batches through a server-side cursor (stream_results +
+yield_per) instead of materialising every row at once, and ORM objects are expunged from
+the session once the caller has moved past them. Memory stays proportional to the batch
+size, not to the number of rows a company has.
+"""
+from contextlib import contextmanager
+
+from app import db
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def stream_query(query, batch_size=DEFAULT_BATCH_SIZE, expunge=True):
+    """
+    Iterate over an ORM Query (e.g. Customer.query.filter(...)) one object at a time,
+    fetching `batch_size` rows per round trip.
+
+    Args:
+        query: SQLAlchemy ORM Query
+        batch_size: Rows fetched per batch
+        expunge: Remove objects from the session after the caller has processed them.
+                 Turn off if the caller modifies the objects and flushes them later.
+    """
+    session = query.session
+    seen = []
+
+    for obj in query.execution_options(stream_results=True).yield_per(batch_size):
+        yield obj
+        if expunge:
+            seen.append(obj)
+            if len(seen) >= batch_size:
+                _expunge_all(session, seen)
+
+    if expunge:
+        _expunge_all(session, seen)
+
+
+def _expunge_all(session, objects):
+    for obj in objects:
+        if obj in session:
+            session.expunge(obj)
+    objects.clear()
+
+
+@contextmanager
+def read_connection():
+    """
+    A dedicated connection for long streaming reads, so the session can keep committing
+    writes (which would close a server-side cursor on its own connection) while the scan
+    is still open.
+    """
+    with db.engine.connect() as conn:
+        yield conn
+
+
+def stream_batches(statement, batch_size=DEFAULT_BATCH_SIZE, connection=None):
+    """
+    Execute a Core/ORM select (typically column-only) and yield lists of Row objects of up
+    to `batch_size` rows each.
+
+    Args:
+        statement: SQLAlchemy select() or ORM Query
+        batch_size: Rows per yielded batch
+        connection: Connection to read on; defaults to the session's connection
+    """
+    if hasattr(statement, 'statement'):
+        # ORM Query -> its select()
+        statement = statement.statement
+
+    executor = connection if connection is not None else db.session
+    result = executor.execute(
+        statement,
+        execution_options={'stream_results': True, 'yield_per': batch_size},
+    )
+    try:
+        for partition in result.partitions(batch_size):
+            yield partition
+    finally:
+        result.close()
+
+
+def stream_rows(statement, batch_size=DEFAULT_BATCH_SIZE, connection=None):
+    """
+    Like stream_batches() but yields one Row at a time.
+    """
+    for batch in stream_batches(statement, batch_size, connection):
+        yield from batch
@@ -0,0 +1,139 @@
+import shutil
+import tempfile
+import unittest
+from datetime import date
+import numpy as np
+import pandas as pd
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import Company, Vendor
+from analytics import (
+    collections_ageing_from_frames, customer_growth_from_frame, income_heatmap_from_frame, init_analytics,
+    month_window, revenue_trend_from_frames,
+)
+import uuid
+
+def frame(rows):
+    return pd.DataFrame({
+        'when': pd.to_datetime([when for when, _ in rows]),
+        'amount': [amount for _, amount in rows],
+    })
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.window = month_window(3, date(2026, 3, 15))
+
+    def test_month_window(self):
+        self.assertEqual(self.window.tolist(), [2026 * 12 + 0, 2026 * 12 + 1, 2026 * 12 + 2])
+
+    def test_revenue_trend_fills_empty_months(self):
+        payments = frame([('2026-01-05', 1000), ('2026-03-01', 500), ('2026-03-31', 250)])
+        expenses = frame([('2026-03-10', 200)])
+        isp_payments = frame([('2026-01-20', 300)])
+
+        trend = revenue_trend_from_frames(payments, expenses, isp_payments, self.window)
+
+        self.assertEqual(trend, [
+            {'month': '2026-01', 'revenue': 1000, 'expenses': 300, 'profit': 700},
+            {'month': '2026-02', 'revenue': 0, 'expenses': 0, 'profit': 0},
+            {'month': '2026-03', 'revenue': 750, 'expenses': 200, 'profit': 550},
+        ])
+
+    def test_customer_growth_counts_history_before_the_window(self):
+        customers = pd.DataFrame({
+            'installed': pd.to_datetime(['2025-06-01', '2026-01-10', '2026-03-02', '2026-03-20']),
+            'is_active': [True, False, True, True],
+            'updated': pd.to_datetime(['2025-06-01', '2026-02-14', '2026-03-02', None]),
+        })
+
+        growth = customer_growth_from_frame(customers, self.window)
+
+        self.assertEqual([(row['new'], row['churned'], row['total']) for row in growth], [(1, 0, 2), (0, 1, 1), (2, 0, 3)])
+        self.assertEqual(growth[2]['month_short'], 'Mar')
+
+    def test_collections_ageing_buckets(self):
+        invoices = pd.DataFrame({
+            'due_date': pd.to_datetime(['2026-03-20', '2026-02-01', '2026-01-10', '2025-10-01']),
+            'remaining_amount': [100.0, 200.0, 300.0, 400.0],
+        })
+        payments = frame([('2026-02-03', 150)])
+
+        result = collections_ageing_from_frames(invoices, payments, date(2026, 3, 15), self.window)
+
+        self.assertEqual([row['amount'] for row in result['aging_analysis']], [100, 200, 300, 400])
+        self.assertEqual(result['total_outstanding'], 1000)
+        self.assertEqual(result['collection_trends'][1], {'month': '2026-02', 'payment_count': 1, 'collection_amount': 150})
+
+    def test_income_heatmap_weeks(self):
+        payments = frame([('2026-01-01', 100), ('2026-01-07', 50), ('2026-01-08', 25), ('2026-01-31', 10)])
+
+        heatmap = {(cell['month'], cell['week']): cell['value'] for cell in income_heatmap_from_frame(payments)}
+
+        self.assertEqual(len(heatmap), 60)
+        self.assertEqual(heatmap[('Jan', 'Week 1')], 150)
+        self.assertEqual(heatmap[('Jan', 'Week 2')], 25)
+        self.assertEqual(heatmap[('Jan', 'Week 5')], 10)
+        self.assertEqual(heatmap[('Feb', 'Week 1')], 0)
+
+class TestVendorAnalyticsAccess(unittest.TestCase):
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['MONTH_SNAPSHOT_DIR'] = self.snapshot_dir
+        init_analytics(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.isp = Company(id=uuid.uuid4(), name='Fiber Link')
+        self.vendor_company = Company(id=uuid.uuid4(), name='Corner Net')
+        self.other = Company(id=uuid.uuid4(), name='Other ISP')
+        db.session.add_all([self.isp, self.vendor_company, self.other])
+        db.session.add(Vendor(
+            id=uuid.uuid4(), company_id=self.isp.id, vendor_company_id=self.vendor_company.id,
+            name='Corner Net', phone='03001234567', cnic='3520211111111',
+        ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+
+    def get(self, path, company, role='company_owner'):
+        token = create_access_token(identity=str(uuid.uuid4()), additional_claims={
+            'role': role, 'company_id': str(company.id) if company else None,
+        })
+        return self.client.get(path, headers={'Authorization': f"Bearer {token}"})
+
+    def test_managing_company_and_the_vendor_can_view_its_analytics(self):
+        for path in ('revenue-trend', 'customer-growth'):
+            url = f"/vendors/{self.vendor_company.id}/{path}?months=2"
+            self.assertEqual(self.get(url, self.isp).status_code, 200)
+            self.assertEqual(self.get(url, self.vendor_company).status_code, 200)
+            self.assertEqual(self.get(url, None, role='super_admin').status_code, 200)
+
+    def test_other_companies_cannot_view_vendor_analytics(self):
+        for path in ('revenue-trend', 'customer-growth'):
+            url = f"/vendors/{self.vendor_company.id}/{path}"
+            self.assertEqual(self.get(url, self.other).status_code, 403)
+            self.assertEqual(self.get(url, None).status_code, 403)
+        # The vendor does not see the company that manages it
+        self.assertEqual(self.get(f"/vendors/{self.isp.id}/revenue-trend", self.vendor_company).status_code, 403)
+
+    def test_company_dashboards_are_gated_by_role(self):
+        for path in ('/dashboard/collections-ageing', '/dashboard/income-heatmap'):
+            self.assertEqual(self.get(path, self.isp).status_code, 200)
+            for role in ('manager', 'auditor', 'employee'):
+                self.assertEqual(self.get(path, self.isp, role=role).status_code, 403)
+            # super_admin names the company; without one there is nothing to report on
+            self.assertEqual(self.get(f"{path}?company_id={self.isp.id}", None, role='super_admin').status_code, 200)
+            self.assertEqual(self.get(path, None, role='super_admin').status_code, 400)
+            self.assertEqual(self.get(path, None).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
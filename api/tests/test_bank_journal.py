@@ -0,0 +1,148 @@
+import unittest
+from unittest import mock
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from app import create_app, db
+from app.models import BankAccount, BankAccountCheckpoint, BankAccountJournal, Payment
+from bank_journal import (
+    _lock_accounts, account_statement, balance_as_of, create_balance_checkpoints, install_bank_journal_listeners,
+)
+import uuid
+
+class TestBankJournal(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        install_bank_journal_listeners()
+
+        self.company_id = uuid.uuid4()
+        self.account = BankAccount(
+            id=uuid.uuid4(), company_id=self.company_id, bank_name='HBL', account_title='Fiber Link',
+            account_number='0001', initial_balance=1000, is_active=True,
+        )
+        db.session.add(self.account)
+        db.session.commit()
+        self.day = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_payment(self, amount, payment_date, status='paid'):
+        payment = Payment(
+            id=uuid.uuid4(), company_id=self.company_id, bank_account_id=self.account.id, amount=amount,
+            payment_date=payment_date, payment_method='cash', status=status, is_active=True,
+        )
+        db.session.add(payment)
+        db.session.commit()
+        return payment
+
+    def balance(self, at=None):
+        return balance_as_of(self.account.id, at)
+
+    def test_postings_build_the_balance(self):
+        self.add_payment(500, self.day)
+        self.add_payment(200, self.day, status='failed')
+
+        self.assertEqual(self.balance(), Decimal('1500'))
+        self.assertEqual(self.balance(self.day), Decimal('1000'))
+
+    def test_edit_of_a_committed_payment_reverses_its_old_posting(self):
+        payment = self.add_payment(500, self.day)
+
+        # The commit expired the payment; the old amount must still be reversed
+        payment.amount = 300
+        db.session.commit()
+
+        amounts = sorted(float(entry.amount) for entry in BankAccountJournal.query.filter_by(source_id=payment.id))
+        self.assertEqual(amounts, [-500, 300, 500])
+        self.assertEqual(self.balance(), Decimal('1300'))
+
+    def test_cancelling_and_deleting_committed_payments_reverse_them(self):
+        cancelled = self.add_payment(500, self.day)
+        deleted = self.add_payment(250, self.day)
+
+        cancelled.status = 'cancelled'
+        db.session.commit()
+        db.session.delete(deleted)
+        db.session.commit()
+
+        self.assertEqual(self.balance(), Decimal('1000'))
+
+    def test_backdated_postings_move_later_checkpoints(self):
+        self.add_payment(500, self.day)
+        for offset in (1, 2, 3):
+            create_balance_checkpoints(self.day + timedelta(days=offset))
+
+        backdated = self.add_payment(100, self.day + timedelta(hours=12))
+        backdated.amount = 150
+        db.session.commit()
+
+        checkpoints = BankAccountCheckpoint.query.order_by(BankAccountCheckpoint.as_of).all()
+        self.assertEqual([float(checkpoint.balance) for checkpoint in checkpoints], [1650, 1650, 1650])
+        for offset in (1, 2, 3, 4):
+            at = self.day + timedelta(days=offset)
+            expected = db.session.query(db.func.sum(BankAccountJournal.amount)).filter(
+                BankAccountJournal.entry_date < at
+            ).scalar()
+            self.assertEqual(self.balance(at), Decimal(str(expected)))
+
+    def test_checkpoints_after_the_entry_only_are_moved(self):
+        create_balance_checkpoints(self.day + timedelta(days=1))
+        create_balance_checkpoints(self.day + timedelta(days=3))
+
+        self.add_payment(400, self.day + timedelta(days=2))
+
+        checkpoints = BankAccountCheckpoint.query.order_by(BankAccountCheckpoint.as_of).all()
+        self.assertEqual([float(checkpoint.balance) for checkpoint in checkpoints], [1000, 1400])
+
+    def test_statement_runs_the_balance_from_the_opening(self):
+        self.add_payment(500, self.day)
+        self.add_payment(250, self.day + timedelta(days=1))
+        create_balance_checkpoints(self.day + timedelta(hours=1))
+
+        statement = account_statement(self.account.id, self.day, self.day + timedelta(days=2))
+
+        self.assertEqual(statement['opening_balance'], 1000)
+        self.assertEqual([entry['balance'] for entry in statement['entries']], [1500, 1750])
+        self.assertEqual(statement['closing_balance'], 1750)
+
+    def test_checkpoints_are_taken_at_local_midnight(self):
+        self.app.config['FINANCIAL_TIMEZONE'] = 'Asia/Karachi'
+        local = ZoneInfo('Asia/Karachi')
+        midnight = datetime.combine(datetime.now(local).date(), time.min, tzinfo=local)
+        create_balance_checkpoints()
+
+        checkpoint = BankAccountCheckpoint.query.one()
+        self.assertEqual(checkpoint.as_of.replace(tzinfo=checkpoint.as_of.tzinfo or timezone.utc), midnight)
+
+        # A payment at local midnight is today's, after the checkpoint, and leaves it alone
+        self.add_payment(500, midnight.astimezone(timezone.utc))
+        self.assertEqual(float(BankAccountCheckpoint.query.one().balance), 1000)
+        self.assertEqual(self.balance(), Decimal('1500'))
+
+    def test_postings_and_checkpoints_lock_accounts_on_postgres(self):
+        connection = mock.Mock()
+        connection.dialect.name = 'postgresql'
+        first, second = uuid.UUID(int=2), uuid.UUID(int=1)
+
+        _lock_accounts(connection, {first, second}, shared=True)
+        _lock_accounts(connection, [first], shared=False)
+
+        (shared_sql, shared_params), (exclusive_sql, _) = [call.args for call in connection.execute.call_args_list]
+        self.assertIn('pg_advisory_xact_lock_shared(', str(shared_sql))
+        self.assertEqual(shared_params['keys'], [str(second), str(first)])
+        self.assertIn('pg_advisory_xact_lock(', str(exclusive_sql))
+
+        connection.dialect.name = 'sqlite'
+        _lock_accounts(connection, [first], shared=True)
+        self.assertEqual(connection.execute.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+from unittest import mock
+from decimal import Decimal
+from app import create_app, db
+from app.models import Area, Customer, CustomerPackage, ISP, ServicePlan
+from bulk_import import IMPORT_SPECS, InvalidImport, _insert_merge, import_rows, merge_statement, validate_frame
+import pandas as pd
+import uuid
+
+class TestBulkImport(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.company_id = uuid.uuid4()
+        self.area = Area(id=uuid.uuid4(), company_id=self.company_id, name='Model Town')
+        self.isp = ISP(id=uuid.uuid4(), company_id=self.company_id, name='Fiber Link')
+        self.plan = ServicePlan(id=uuid.uuid4(), company_id=self.company_id, isp_id=self.isp.id,
+                                name='10 Mbps', price=2000)
+        db.session.add_all([self.area, self.isp, self.plan])
+        db.session.commit()
+        self.spec = IMPORT_SPECS['customers']
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def row(self, number, **overrides):
+        row = {
+            'internet_id': f"NET-{number:04d}",
+            'first_name': 'Ali',
+            'last_name': 'Khan',
+            'email': f"ali{number}@example.com",
+            'phone_1': '03001234567',
+            'area_id': str(self.area.id),
+            'installation_address': 'House 1, Street 2',
+            'service_plan_id': str(self.plan.id),
+            'isp_id': str(self.isp.id),
+            'connection_type': 'internet',
+            'internet_connection_type': 'fiber',
+            'cnic': f"35202{number:08d}",
+            'installation_date': '2026-01-15',
+        }
+        row.update(overrides)
+        return row
+
+    def frame(self, rows):
+        return pd.DataFrame(rows).astype(str)
+
+    def test_validate_reports_field_errors_per_row(self):
+        rows = [
+            self.row(1),
+            self.row(2, first_name=''),
+            self.row(3, cnic='123'),
+            self.row(4, area_id=str(uuid.uuid4())),
+            self.row(5, internet_id='NET-0099'),
+            self.row(6, internet_id='NET-0099', installation_date='15/01/2026'),
+        ]
+        valid, report = validate_frame(self.spec, self.frame(rows), self.company_id)
+
+        self.assertEqual(report['totalRecords'], 6)
+        self.assertEqual(report['successCount'], 1)
+        self.assertEqual(report['failedCount'], 5)
+        self.assertEqual(len(valid), 1)
+        self.assertEqual(report['validRows'][0]['internet_id'], 'NET-0001')
+        errors = {error['row']: error['fieldErrors'] for error in report['errors']}
+        self.assertEqual(set(errors), {1, 2, 3, 4, 5})
+        self.assertIn('first_name', errors[1])
+        self.assertIn('cnic', errors[2])
+        self.assertEqual(errors[3]['area_id'], 'Invalid area_id selection')
+        self.assertEqual(errors[4], {'internet_id': 'Duplicate internet_id in the file'})
+        self.assertEqual(set(errors[5]), {'internet_id', 'installation_date'})
+
+    def test_validate_rejects_values_already_in_the_database(self):
+        import_rows(self.spec, self.frame([self.row(1)]), self.company_id)
+
+        _, report = validate_frame(self.spec, self.frame([self.row(2, cnic='3520200000001')]), self.company_id)
+
+        self.assertEqual(report['failedCount'], 1)
+        self.assertEqual(report['errors'][0]['fieldErrors'], {'cnic': 'cnic already exists'})
+
+    def test_import_inserts_customers_with_packages(self):
+        rows = [self.row(number) for number in range(1, 4)] + [self.row(4, email='not-an-email')]
+        report = import_rows(self.spec, self.frame(rows), self.company_id)
+
+        self.assertEqual(report['successCount'], 3)
+        self.assertEqual(report['failedCount'], 1)
+        self.assertEqual(len(report['validRows']), 3)
+        customers = Customer.query.filter_by(company_id=self.company_id).all()
+        self.assertEqual(sorted(customer.internet_id for customer in customers), ['NET-0001', 'NET-0002', 'NET-0003'])
+        self.assertTrue(all(customer.is_active for customer in customers))
+        # The sheet has no recharge dates at all
+        self.assertTrue(all(customer.recharge_date is None for customer in customers))
+        packages = CustomerPackage.query.all()
+        self.assertEqual({package.customer_id for package in packages}, {customer.id for customer in customers})
+        self.assertTrue(all(package.service_plan_id == self.plan.id for package in packages))
+
+    def test_merge_sql_writes_model_defaults_the_sheet_does_not_set(self):
+        merge, params = merge_statement(self.spec, 'import_customers')
+
+        target, dependent = merge.split(' INSERT INTO customer_packages ')
+        inserted_columns = target[target.index('customers (') + len('customers ('):target.index(')')]
+        self.assertIn('connection_commission_amount', inserted_columns.split(', '))
+        self.assertIn('ON CONFLICT DO NOTHING RETURNING id', target)
+        self.assertIn('JOIN inserted USING (id) RETURNING customer_id', dependent)
+        self.assertEqual(params, {'is_active': True})
+
+    def test_import_applies_model_defaults(self):
+        import_rows(self.spec, self.frame([self.row(1, is_active='')]), self.company_id)
+
+        customer = Customer.query.one()
+        self.assertTrue(customer.is_active)
+        self.assertEqual(customer.connection_commission_amount, Decimal('0.00'))
+
+    def test_rows_lost_to_a_concurrent_insert_are_reported_as_failed(self):
+        def lose_second_row(spec, valid):
+            # Stands in for the COPY/merge: the second row conflicts with a concurrent insert
+            return _insert_merge(spec, valid.drop(valid.index[1]))
+
+        dialect = db.session.get_bind().dialect
+        with mock.patch.object(dialect, 'name', 'postgresql'), \
+                mock.patch('bulk_import._copy_merge', side_effect=lose_second_row) as copy_merge:
+            report = import_rows(self.spec, self.frame([self.row(number) for number in range(1, 4)]), self.company_id)
+
+        copy_merge.assert_called_once()
+        self.assertEqual(report['successCount'], 2)
+        self.assertEqual(report['failedCount'], 1)
+        self.assertFalse(report['success'])
+        self.assertEqual([row['internet_id'] for row in report['validRows']], ['NET-0001', 'NET-0003'])
+        self.assertEqual(report['errors'][0]['row'], 1)
+        self.assertEqual(report['errors'][0]['errors'], ['internet_id or cnic already exists'])
+
+    def test_import_requires_a_company(self):
+        with self.assertRaises(InvalidImport):
+            import_rows(self.spec, self.frame([self.row(1)]), None)
+
+if __name__ == '__main__':
+    unittest.main()
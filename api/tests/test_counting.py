@@ -0,0 +1,48 @@
+import unittest
+from app import create_app, db
+from app.models import DetailedLog
+from counting import count_rows
+import uuid
+
+class TestCounting(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.execute(db.insert(DetailedLog), [
+            {
+                'id': uuid.uuid4(),
+                'action': 'UPDATE' if n % 10 else 'CREATE',
+                'table_name': 'customers',
+                'record_id': uuid.uuid4(),
+            }
+            for n in range(250)
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_exact(self):
+        result = count_rows(db.select(DetailedLog.id), 'exact')
+        self.assertEqual((result.value, result.exact), (250, True))
+
+    def test_capped_stops_at_the_cap(self):
+        result = count_rows(db.select(DetailedLog.id), 'capped', cap=100)
+        self.assertEqual((result.value, result.exact), (100, False))
+
+        small = count_rows(db.select(DetailedLog.id).where(DetailedLog.action == 'CREATE'), 'capped', cap=100)
+        self.assertEqual((small.value, small.exact), (25, True))
+
+    def test_estimate_falls_back_to_capped_without_postgres(self):
+        result = count_rows(db.select(DetailedLog.id).order_by(DetailedLog.id), 'estimate', cap=100)
+        self.assertEqual(result.as_dict(), {'total': 100, 'total_exact': False, 'count_strategy': 'capped'})
+
+if __name__ == '__main__':
+    unittest.main()
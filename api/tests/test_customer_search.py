@@ -0,0 +1,70 @@
+import unittest
+from datetime import date
+from app import create_app, db
+from app.models import Customer
+from customer_search import get_customer_option, search_customers
+import uuid
+
+class TestCustomerSearch(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.company_id = uuid.uuid4()
+        self.ali = self.add_customer('Ali', 'Khan', 'ISP-1001', '03001234567')
+        self.add_customer('Sara', 'Ali', 'ISP-2001', '03111234567')
+        self.add_customer('Bilal', 'Ahmed', 'ALI-77', '03211234567')
+        self.add_customer('Ali', 'Raza', 'ISP-3001', '03331234567', company_id=uuid.uuid4())
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_customer(self, first_name, last_name, internet_id, phone, company_id=None):
+        customer = Customer(
+            id=uuid.uuid4(),
+            company_id=company_id or self.company_id,
+            area_id=uuid.uuid4(),
+            isp_id=uuid.uuid4(),
+            first_name=first_name,
+            last_name=last_name,
+            email=f"{internet_id.lower()}@example.com",
+            internet_id=internet_id,
+            phone_1=phone,
+            installation_address='House 1, Street 2',
+            installation_date=date(2026, 1, 1),
+            cnic=f"35202-{internet_id[-4:]}-{len(first_name)}",
+            connection_type='internet',
+            is_active=True
+        )
+        db.session.add(customer)
+        return customer
+
+    def test_matches_are_company_scoped_and_prefix_matches_rank_first(self):
+        results = search_customers(self.company_id, 'ali')
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(set(results[0]), {'id', 'name', 'internet_id', 'phone_1', 'installation_address', 'is_active'})
+        # 'Ali Khan' and 'ALI-77' start with the term, 'Sara Ali' only contains it
+        self.assertEqual(results[-1]['name'], 'Sara Ali')
+
+    def test_exact_identifier_match_ranks_first(self):
+        results = search_customers(self.company_id, '03111234567')
+        self.assertEqual([r['internet_id'] for r in results], ['ISP-2001'])
+
+        results = search_customers(self.company_id, 'isp-1001')
+        self.assertEqual(results[0]['id'], str(self.ali.id))
+
+    def test_blank_query_and_lookup_by_id(self):
+        self.assertEqual(search_customers(self.company_id, '  '), [])
+        self.assertEqual(get_customer_option(self.company_id, self.ali.id)['name'], 'Ali Khan')
+        self.assertIsNone(get_customer_option(uuid.uuid4(), self.ali.id))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+from datetime import date, datetime
+from app import create_app, db
+from app.models import Complaint, Customer, CustomerPackage, Payment
+from dashboard_cache import DashboardCache, dashboard_cache, install_dashboard_cache_listeners, normalize_params
+from werkzeug.datastructures import MultiDict
+import uuid
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestDashboardCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = DashboardCache(max_entries=2, ttl_seconds=60, clock=self.clock)
+
+    def test_params_are_normalised(self):
+        first = normalize_params(MultiDict([('end_date', '2026-03-31'), ('area', 'all'), ('start_date', '2026-03-01')]))
+        second = normalize_params(MultiDict([('start_date', '2026-03-01'), ('end_date', '2026-03-31'), ('_', '123')]))
+
+        self.assertEqual(first, second)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set('c1', 'a', 1)
+        self.cache.set('c1', 'b', 2)
+        self.cache.get('c1', 'a')
+        self.cache.set('c1', 'c', 3)
+
+        self.assertEqual(self.cache.get('c1', 'a'), 1)
+        self.assertIsNone(self.cache.get('c1', 'b'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        self.cache.set('c1', 'a', 1)
+        self.clock.now = 61
+
+        self.assertIsNone(self.cache.get('c1', 'a'))
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+
+    def test_invalidation_is_per_company(self):
+        self.cache.set('c1', 'a', 1)
+        self.cache.set('c2', 'a', 2)
+        self.cache.invalidate_company('c1')
+
+        self.assertIsNone(self.cache.get('c1', 'a'))
+        self.assertEqual(self.cache.get('c2', 'a'), 2)
+
+    def test_value_computed_across_a_write_is_not_stored(self):
+        generation = self.cache.generation('c1')
+        self.cache.invalidate_company('c1')
+        self.cache.set('c1', 'a', 1, generation)
+
+        self.assertIsNone(self.cache.get('c1', 'a'))
+
+class TestDashboardCacheInvalidation(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        install_dashboard_cache_listeners()
+        dashboard_cache.clear()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_payment(self, company_id):
+        db.session.add(Payment(
+            id=uuid.uuid4(),
+            company_id=company_id,
+            amount=100,
+            payment_date=datetime.now(),
+            payment_method='cash',
+            status='paid',
+            is_active=True
+        ))
+
+    def test_commit_invalidates_only_the_written_company(self):
+        written, other = uuid.uuid4(), uuid.uuid4()
+        dashboard_cache.set(written, 'executive', {'total': 1})
+        dashboard_cache.set(other, 'executive', {'total': 2})
+
+        self.add_payment(written)
+        db.session.commit()
+
+        self.assertIsNone(dashboard_cache.get(written, 'executive'))
+        self.assertEqual(dashboard_cache.get(other, 'executive'), {'total': 2})
+
+    def test_rolled_back_writes_do_not_invalidate(self):
+        company_id = uuid.uuid4()
+        dashboard_cache.set(company_id, 'executive', {'total': 1})
+
+        self.add_payment(company_id)
+        db.session.flush()
+        db.session.rollback()
+
+        self.assertEqual(dashboard_cache.get(company_id, 'executive'), {'total': 1})
+
+    def test_writes_to_child_rows_invalidate_the_parent_company(self):
+        company_id = uuid.uuid4()
+        customer = Customer(
+            id=uuid.uuid4(), company_id=company_id, area_id=uuid.uuid4(), isp_id=uuid.uuid4(),
+            first_name='Ali', last_name='Khan', email='ali@example.com', internet_id='FL-1', phone_1='0300',
+            installation_address='Street 1', installation_date=date(2026, 1, 1), cnic='35202-0000000-1',
+            connection_type='fiber',
+        )
+        db.session.add(customer)
+        db.session.commit()
+
+        dashboard_cache.set(company_id, 'service-support', {'open': 0})
+        db.session.add(Complaint(id=uuid.uuid4(), customer_id=customer.id, ticket_number='T-1', description='No signal'))
+        db.session.commit()
+        self.assertIsNone(dashboard_cache.get(company_id, 'service-support'))
+
+        dashboard_cache.set(company_id, 'service-plan', {'packages': 0})
+        db.session.add(CustomerPackage(id=uuid.uuid4(), customer_id=customer.id, service_plan_id=uuid.uuid4(),
+                                       start_date=date(2026, 1, 1)))
+        db.session.commit()
+        self.assertIsNone(dashboard_cache.get(company_id, 'service-plan'))
+
+if __name__ == '__main__':
+    unittest.main()
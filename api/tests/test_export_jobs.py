@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from app import create_app, db
+from app.models import DetailedLog, ExportJob
+from export_jobs import cleanup_export_jobs, init_export_jobs, serialize_export_job, submit_export
+from flask_jwt_extended import create_access_token
+from pagination import InvalidPageRequest
+import uuid
+
+class TestExportJobs(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.export_dir = tempfile.mkdtemp()
+        self.app.config['EXPORT_DIR'] = self.export_dir
+        init_export_jobs(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.company_id = uuid.uuid4()
+        self.start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        for n in range(12):
+            self.add_log(n)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.export_dir)
+
+    def add_log(self, n):
+        db.session.add(DetailedLog(
+            id=uuid.uuid4(),
+            company_id=self.company_id,
+            action='UPDATE',
+            table_name='customers',
+            record_id=uuid.uuid4(),
+            created_at=self.start + timedelta(minutes=n),
+        ))
+
+    def submit(self, **params):
+        return submit_export(self.company_id, None, 'logs', 'csv', {'fields': 'action', **params})
+
+    def test_job_writes_file_and_reports_progress(self):
+        job, cached = self.submit()
+
+        self.assertFalse(cached)
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual((job.total_rows, job.rows_written), (12, 12))
+        self.assertEqual(serialize_export_job(job)['progress'], 1.0)
+        with open(job.file_path) as f:
+            self.assertEqual(len(f.read().splitlines()), 13)
+
+    def test_identical_export_reuses_artifact_until_data_changes(self):
+        first, _ = self.submit()
+        again, cached = self.submit(filter_action='all', q=' ')
+        self.assertTrue(cached)
+        self.assertEqual(again.id, first.id)
+
+        self.add_log(30)
+        db.session.commit()
+        changed, cached = self.submit()
+        self.assertFalse(cached)
+        self.assertNotEqual(changed.id, first.id)
+        self.assertEqual(changed.rows_written, 13)
+
+    def test_cleanup_removes_expired_jobs_and_files(self):
+        job, _ = self.submit()
+        path = job.file_path
+        job.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+        db.session.commit()
+
+        result = cleanup_export_jobs(self.app)
+
+        self.assertEqual(result['expired'], 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(ExportJob.query.count(), 0)
+
+    def test_invalid_export_is_rejected(self):
+        with self.assertRaises(InvalidPageRequest):
+            submit_export(self.company_id, None, 'logs', 'pdf', {})
+        with self.assertRaises(InvalidPageRequest):
+            self.submit(fields='password')
+
+    def headers(self, role, company_id=None):
+        claims = {'role': role}
+        if company_id:
+            claims['company_id'] = str(company_id)
+        return {'Authorization': f"Bearer {create_access_token(identity=str(uuid.uuid4()), additional_claims=claims)}"}
+
+    def test_endpoints_refuse_roles_without_access_and_tokens_without_a_company(self):
+        client = self.app.test_client()
+        body = {'entity': 'logs', 'format': 'csv', 'params': {'fields': 'action'}}
+        self.assertEqual(client.post('/exports', json=body, headers=self.headers('employee', self.company_id)).status_code, 403)
+        self.assertEqual(client.post('/exports', json=body, headers=self.headers('company_owner')).status_code, 403)
+        self.assertEqual(client.get('/exports', headers=self.headers('manager')).status_code, 403)
+
+        owner = self.headers('company_owner', self.company_id)
+        job_id = client.post('/exports', json=body, headers=owner).get_json()['id']
+        self.assertEqual(client.get(f"/exports/{job_id}/download", headers=owner).status_code, 200)
+        for headers in (self.headers('employee', self.company_id), self.headers('company_owner', uuid.uuid4())):
+            self.assertEqual(client.get(f"/exports/{job_id}/download", headers=headers).status_code, 404)
+        self.assertEqual(client.get('/exports', headers=self.headers('employee', self.company_id)).get_json(), [])
+
+    def test_access_level_is_part_of_the_cache_key(self):
+        company, _ = submit_export(self.company_id, None, 'customers', 'csv', {}, 'company')
+        active, cached = submit_export(self.company_id, None, 'customers', 'csv', {}, 'active')
+
+        self.assertFalse(cached)
+        self.assertNotEqual(active.id, company.id)
+        self.assertEqual((company.access, active.access), ('company', 'active'))
+
+if __name__ == '__main__':
+    unittest.main()
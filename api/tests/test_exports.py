@@ -0,0 +1,98 @@
+import csv
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from openpyxl import load_workbook
+from app import create_app, db
+from app.models import DetailedLog
+from exports import export_statement, init_exports, iter_csv, write_xlsx
+from flask_jwt_extended import create_access_token
+from pagination import PAGE_SPECS, InvalidPageRequest
+import uuid
+
+class TestExports(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        init_exports(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.company_id = uuid.uuid4()
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        db.session.execute(db.insert(DetailedLog), [
+            {
+                'id': uuid.uuid4(),
+                'company_id': self.company_id,
+                'action': 'CREATE' if n % 5 == 0 else 'UPDATE',
+                'table_name': 'customers',
+                'record_id': uuid.uuid4(),
+                'created_at': start + timedelta(minutes=n),
+            }
+            for n in range(25)
+        ] + [{
+            'id': uuid.uuid4(),
+            'company_id': uuid.uuid4(),
+            'action': 'CREATE',
+            'table_name': 'customers',
+            'record_id': uuid.uuid4(),
+            'created_at': start,
+        }])
+        db.session.commit()
+        self.spec = PAGE_SPECS['logs']
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_csv_streams_header_then_batches(self):
+        statement = export_statement(self.spec, {'fields': 'action,created_at'}, self.company_id)
+        chunks = list(iter_csv(statement, batch_size=10))
+
+        # Header, then 10 + 10 + 5 rows
+        self.assertEqual(len(chunks), 4)
+        rows = list(csv.reader(io.StringIO(''.join(chunks))))
+        self.assertEqual(rows[0], ['id', 'action', 'created_at'])
+        self.assertEqual(len(rows), 26)
+        created = [row[2] for row in rows[1:]]
+        self.assertEqual(created, sorted(created, reverse=True))
+
+    def test_xlsx_has_filtered_rows(self):
+        statement = export_statement(self.spec, {'filter_action': 'CREATE', 'sort_dir': 'asc'}, self.company_id)
+        handle, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        try:
+            write_xlsx(statement, path, batch_size=2, title='logs')
+            sheet = load_workbook(path, read_only=True)['logs']
+            rows = list(sheet.iter_rows(values_only=True))
+        finally:
+            os.remove(path)
+
+        self.assertEqual(len(rows), 6)
+        action = rows[0].index('action')
+        self.assertEqual({row[action] for row in rows[1:]}, {'CREATE'})
+
+    def test_unknown_sort_is_rejected(self):
+        with self.assertRaises(InvalidPageRequest):
+            export_statement(self.spec, {'sort_by': 'no_such_column'}, self.company_id)
+
+    def export(self, **claims):
+        token = create_access_token(identity=str(uuid.uuid4()), additional_claims=claims)
+        return self.app.test_client().get('/logs/export', headers={'Authorization': f"Bearer {token}"})
+
+    def test_endpoint_exports_only_the_token_company(self):
+        response = self.export(role='company_owner', company_id=str(self.company_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(list(csv.reader(io.StringIO(response.get_data(as_text=True))))), 26)
+
+    def test_endpoint_refuses_roles_without_access_and_tokens_without_a_company(self):
+        self.assertEqual(self.export(role='employee', company_id=str(self.company_id)).status_code, 403)
+        self.assertEqual(self.export(role='company_owner').status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
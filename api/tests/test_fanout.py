@@ -0,0 +1,108 @@
+import unittest
+from unittest import mock
+import threading
+from app import create_app, db
+import fanout
+from fanout import init_fanout, run_blocks
+
+class TestFanOut(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_blocks_return_values_and_timings(self):
+        result = run_blocks({
+            'revenue': lambda: 100,
+            'expenses': lambda: db.session.execute(db.text('SELECT 40')).scalar(),
+        })
+
+        self.assertEqual(result.values, {'revenue': 100, 'expenses': 40})
+        self.assertEqual(set(result.timings_ms), {'revenue', 'expenses'})
+        self.assertIn('total;dur=', result.server_timing())
+
+    def test_block_errors_propagate(self):
+        def failing():
+            raise ValueError('complaint stats failed')
+
+        with self.assertRaises(ValueError):
+            run_blocks({'revenue': lambda: 100, 'complaints': failing})
+
+    def test_timings_are_reported_in_server_timing_header(self):
+        init_fanout(self.app)
+
+        @self.app.route('/fanout-test')
+        def fanout_test():
+            return {'values': run_blocks({'a': lambda: 1, 'b': lambda: 2}).values}
+
+        response = self.app.test_client().get('/fanout-test')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('a;dur=', response.headers['Server-Timing'])
+        self.assertIn('b;dur=', response.headers['Server-Timing'])
+
+class TestFanOutPool(unittest.TestCase):
+    """The threaded path, forced by a stub dialect in place of SQLite."""
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['DASHBOARD_FANOUT_WORKERS'] = 1
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        patcher = mock.patch.object(db.engine.dialect, 'name', 'stub')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # A private single-worker pool so a queued block can be observed
+        executor = mock.patch('fanout._executor', None)
+        executor.start()
+        self.addCleanup(executor.stop)
+
+    def tearDown(self):
+        if fanout._executor is not None:
+            fanout._executor.shutdown(wait=True)
+        self.app_context.pop()
+
+    def test_blocks_run_on_the_pool(self):
+        result = run_blocks({'a': lambda: threading.current_thread().name, 'b': lambda: 2})
+
+        self.assertTrue(result.values['a'].startswith('fanout'))
+        self.assertEqual(result.values['b'], 2)
+        self.assertEqual(set(result.timings_ms), {'a', 'b'})
+
+    def test_timeout_cancels_blocks_that_have_not_started(self):
+        release = threading.Event()
+        ran = []
+
+        with self.assertRaises(TimeoutError) as raised:
+            run_blocks({
+                'slow': lambda: release.wait(5),
+                'queued': lambda: ran.append('queued'),
+            }, timeout=0.05)
+
+        self.assertIn('queued', str(raised.exception))
+        release.set()
+        fanout._executor.shutdown(wait=True)
+        self.assertEqual(ran, [])
+
+    def test_running_blocks_get_a_statement_timeout_on_postgres(self):
+        with mock.patch('fanout._limit_statement_time') as limit:
+            fanout._run_block(self.app, 'a', lambda: 1, deadline=1.0)
+            limit.assert_not_called()
+
+            with mock.patch.object(db.engine.dialect, 'name', 'postgresql'):
+                value, _ = fanout._run_block(self.app, 'a', lambda: 1, deadline=1.0)
+            limit.assert_called_once_with(1.0)
+        self.assertEqual(value, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from app import create_app, db
+from app.models import Customer, DetailedLog
+from flask import jsonify
+from flask_jwt_extended import create_access_token, jwt_required
+from fieldsets import get_row, init_fieldsets, list_rows
+from pagination import PAGE_SPECS, InvalidPageRequest, paginate
+import uuid
+
+class TestFieldsets(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.company_id = uuid.uuid4()
+        self.log_ids = [uuid.uuid4() for _ in range(3)]
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        db.session.execute(db.insert(DetailedLog), [
+            {
+                'id': log_id,
+                'company_id': self.company_id,
+                'action': 'CREATE' if n == 0 else 'UPDATE',
+                'table_name': 'customers',
+                'record_id': uuid.uuid4(),
+                'created_at': start + timedelta(minutes=n),
+            }
+            for n, log_id in enumerate(self.log_ids)
+        ])
+        db.session.commit()
+        self.spec = PAGE_SPECS['logs']
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_list_returns_only_requested_fields_in_default_order(self):
+        rows = list_rows(self.spec, {'fields': 'action,user_name'}, self.company_id)
+
+        self.assertEqual([set(row) for row in rows], [{'id', 'action', 'user_name'}] * 3)
+        self.assertEqual([row['id'] for row in rows], [str(log_id) for log_id in reversed(self.log_ids)])
+
+        rows = list_rows(self.spec, {'fields': 'action', 'filter_action': 'CREATE'}, self.company_id)
+        self.assertEqual(rows, [{'id': str(self.log_ids[0]), 'action': 'CREATE'}])
+
+    def test_detail_and_page_accept_fields(self):
+        row = get_row(self.spec, self.log_ids[1], {'fields': 'table_name'}, self.company_id)
+        self.assertEqual(row, {'id': str(self.log_ids[1]), 'table_name': 'customers'})
+        self.assertIsNone(get_row(self.spec, self.log_ids[1], {'fields': 'table_name'}, uuid.uuid4()))
+
+        page = paginate(self.spec, {'fields': 'created_at', 'page_size': '2'}, self.company_id)
+        self.assertEqual([set(item) for item in page['items']], [{'id', 'created_at'}] * 2)
+        self.assertIsNotNone(page['next_cursor'])
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaises(InvalidPageRequest):
+            list_rows(self.spec, {'fields': 'id,password'}, self.company_id)
+
+class TestFieldsetAccess(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.add_url_rule('/customers/list', 'list_customers', jwt_required()(lambda: jsonify([])))
+        self.app.add_url_rule('/customers/<customer_id>', 'get_customer',
+                              jwt_required()(lambda customer_id: jsonify({})))
+        init_fieldsets(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.company_id = uuid.uuid4()
+        self.customers = {}
+        for n, (name, active) in enumerate((('Active', True), ('Inactive', False))):
+            customer = Customer(
+                id=uuid.uuid4(), company_id=self.company_id, area_id=uuid.uuid4(), isp_id=uuid.uuid4(),
+                first_name=name, last_name='Customer', email=f"c{n}@example.com", internet_id=f"FL-{n}",
+                phone_1='0300', installation_address='Street 1', installation_date=date(2026, 1, n + 1),
+                cnic=f"35202-000000{n}-1", connection_type='fiber', is_active=active,
+            )
+            db.session.add(customer)
+            self.customers[name] = customer.id
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def get(self, url, role, company_id=None):
+        token = create_access_token(identity=str(uuid.uuid4()), additional_claims={
+            'role': role, 'company_id': str(company_id or self.company_id),
+        })
+        return self.client.get(url, headers={'Authorization': f"Bearer {token}"})
+
+    def names(self, role, company_id=None):
+        return [row['first_name'] for row in self.get('/customers/list?fields=first_name', role, company_id).get_json()]
+
+    def test_list_applies_the_role_scope(self):
+        self.assertEqual(self.names('company_owner'), ['Inactive', 'Active'])
+        self.assertEqual(self.names('employee'), ['Active'])
+        self.assertEqual(self.names('auditor'), ['Active'])
+        self.assertEqual(self.names('manager', company_id=uuid.uuid4()), [])
+        self.assertEqual(self.names('super_admin', company_id=uuid.uuid4()), ['Inactive', 'Active'])
+
+    def test_roles_without_access_are_refused(self):
+        for role in ('customer', 'technician', 'recovery_agent'):
+            self.assertEqual(self.get('/customers/list?fields=first_name', role).status_code, 403)
+            self.assertEqual(self.get(f"/customers/{self.customers['Active']}?fields=first_name", role).status_code, 403)
+
+    def test_company_scoped_tokens_without_a_company_are_refused(self):
+        token = create_access_token(identity=str(uuid.uuid4()), additional_claims={'role': 'company_owner'})
+        response = self.client.get('/customers/list?fields=first_name', headers={'Authorization': f"Bearer {token}"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_detail_hides_inactive_rows_from_active_only_roles(self):
+        url = f"/customers/{self.customers['Inactive']}?fields=first_name"
+        self.assertEqual(self.get(url, 'company_owner').get_json()['first_name'], 'Inactive')
+        self.assertEqual(self.get(url, 'employee').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from app import create_app, db
+from app.models import CustomerPackage, FinancialDailyRollup, Invoice, InvoiceLineItem, ISPPayment, Payment, ServicePlan
+from flask import jsonify
+from flask_jwt_extended import create_access_token
+from financial_rollups import (
+    init_financial_rollups, install_financial_rollup_listeners, record_bulk_insert, unified_financial_summary,
+)
+import uuid
+
+class TestFinancialRollups(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        install_financial_rollup_listeners()
+
+        self.company_id = uuid.uuid4()
+        # 21:00 UTC is already the next day in Pakistan
+        self.paid_at = datetime(2026, 3, 10, 21, 0, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_payment(self, amount, status='paid', method='cash'):
+        payment = Payment(
+            id=uuid.uuid4(),
+            company_id=self.company_id,
+            amount=amount,
+            payment_date=self.paid_at,
+            payment_method=method,
+            status=status,
+            is_active=True
+        )
+        db.session.add(payment)
+        db.session.commit()
+        return payment
+
+    def rollup_rows(self, category):
+        return FinancialDailyRollup.query.filter_by(company_id=self.company_id, category=category).all()
+
+    def test_payments_accumulate_into_one_local_day_row(self):
+        self.add_payment(400)
+        self.add_payment(600)
+
+        rows = self.rollup_rows('collection')
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].day, datetime(2026, 3, 11).date())
+        self.assertIsNone(rows[0].bank_account_id)
+        self.assertEqual(float(rows[0].amount), 1000)
+        self.assertEqual(rows[0].txn_count, 2)
+
+    def test_edits_and_deletes_move_the_totals(self):
+        payment = self.add_payment(400)
+        pending = self.add_payment(300, status='pending')
+        self.assertEqual(float(self.rollup_rows('collection')[0].amount), 400)
+
+        payment.amount = 250
+        pending.status = 'paid'
+        db.session.commit()
+        self.assertEqual(float(self.rollup_rows('collection')[0].amount), 550)
+
+        db.session.delete(payment)
+        db.session.commit()
+        row = self.rollup_rows('collection')[0]
+        self.assertEqual(float(row.amount), 300)
+        self.assertEqual(row.txn_count, 1)
+
+    def test_bulk_inserted_invoices_and_summary(self):
+        day = datetime(2026, 3, 11).date()
+        invoices = [{
+            'id': uuid.uuid4(),
+            'invoice_number': f"INV-2026-{n:04d}",
+            'company_id': self.company_id,
+            'customer_id': uuid.uuid4(),
+            'billing_start_date': day,
+            'billing_end_date': day + timedelta(days=20),
+            'due_date': day + timedelta(days=7),
+            'subtotal': 1000,
+            'discount_percentage': 0,
+            'total_amount': 1000,
+            'invoice_type': 'subscription',
+            'status': 'pending',
+            'is_active': True,
+        } for n in range(2)]
+        db.session.execute(db.insert(Invoice), invoices)
+        record_bulk_insert(Invoice, invoices)
+        db.session.commit()
+        self.add_payment(1500, method='online')
+
+        summary = unified_financial_summary(self.company_id, datetime(2026, 3, 1).date(), datetime(2026, 3, 31).date())
+
+        self.assertEqual(summary['kpis']['total_collections'], 1500)
+        self.assertEqual(summary['kpis']['collection_efficiency'], 75)
+        self.assertEqual(summary['three_line_trend'], [
+            {'month': '2026-03', 'invoiced': 2000, 'collected': 1500, 'spent': 0},
+        ])
+        self.assertEqual(summary['cash_payments']['collections'], 1500)
+
+        filtered = unified_financial_summary(self.company_id, datetime(2026, 3, 1).date(),
+                                             datetime(2026, 3, 31).date(), payment_method='cash')
+        self.assertEqual(filtered['kpis']['total_collections'], 0)
+
+    def test_bandwidth_and_plan_income(self):
+        for amount, usage in ((5000, 1000), (3000, 500)):
+            db.session.add(ISPPayment(
+                id=uuid.uuid4(), company_id=self.company_id, isp_id=uuid.uuid4(), payment_type='bandwidth_usage',
+                description='Upstream', amount=amount, payment_date=self.paid_at, billing_period='2026-03',
+                bandwidth_usage_gb=usage, payment_method='bank_transfer', processed_by=uuid.uuid4(),
+            ))
+        basic = ServicePlan(id=uuid.uuid4(), company_id=self.company_id, name='Basic', price=1000)
+        fiber = ServicePlan(id=uuid.uuid4(), company_id=self.company_id, name='Fiber', price=2500)
+        day = datetime(2026, 3, 11).date()
+        invoice = Invoice(
+            id=uuid.uuid4(), invoice_number='INV-2026-0001', company_id=self.company_id, customer_id=uuid.uuid4(),
+            billing_start_date=day, billing_end_date=day + timedelta(days=30), due_date=day + timedelta(days=7),
+            subtotal=3500, discount_percentage=0, total_amount=3500, invoice_type='subscription', is_active=True,
+        )
+        db.session.add_all([basic, fiber, invoice])
+        for plan in (basic, fiber):
+            package = CustomerPackage(id=uuid.uuid4(), customer_id=invoice.customer_id, service_plan_id=plan.id, start_date=day)
+            db.session.add_all([package, InvoiceLineItem(
+                invoice_id=invoice.id, customer_package_id=package.id, description=plan.name,
+                unit_price=plan.price, line_total=plan.price,
+            )])
+        db.session.commit()
+
+        summary = unified_financial_summary(self.company_id, datetime(2026, 3, 1).date(), datetime(2026, 3, 31).date())
+
+        self.assertEqual(summary['isp_payments']['bandwidth_analysis'], [
+            {'month': '2026-03', 'total_cost': 8000, 'total_usage': 1500, 'cost_per_gb': 8000 / 1500},
+        ])
+        # Bandwidth rows come from the rollup and stay out of the cash flow totals
+        self.assertEqual(len(self.rollup_rows('bandwidth_gb')), 1)
+        self.assertEqual(summary['kpis']['total_isp_payments'], 8000)
+        self.assertEqual(summary['income_analysis']['income_by_plan'], [
+            {'plan': 'Fiber', 'amount': 2500, 'count': 1},
+            {'plan': 'Basic', 'amount': 1000, 'count': 1},
+        ])
+
+    def test_existing_view_keeps_the_filters_the_rollups_cannot_answer(self):
+        self.app.add_url_rule('/dashboard/unified-financial', 'unified_financial',
+                              lambda: jsonify({'source': 'original'}))
+        init_financial_rollups(self.app)
+        self.add_payment(400)
+        token = create_access_token(identity=str(uuid.uuid4()),
+                                    additional_claims={'role': 'company_owner', 'company_id': str(self.company_id)})
+        client = self.app.test_client()
+        headers = {'Authorization': f"Bearer {token}"}
+
+        response = client.get('/dashboard/unified-financial?invoice_status=paid', headers=headers)
+        self.assertEqual(response.get_json(), {'source': 'original'})
+
+        response = client.get('/dashboard/unified-financial?start_date=2026-03-01&end_date=2026-03-31', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['kpis']['total_collections'], 400)
+
+        for role in ('employee', 'auditor', 'manager'):
+            token = create_access_token(identity=str(uuid.uuid4()),
+                                        additional_claims={'role': role, 'company_id': str(self.company_id)})
+            response = client.get('/dashboard/unified-financial', headers={'Authorization': f"Bearer {token}"})
+            self.assertEqual(response.status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
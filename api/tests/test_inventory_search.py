@@ -0,0 +1,76 @@
+import unittest
+from app import create_app, db
+from app.models import InventoryAssignment, InventoryItem, Supplier
+from inventory_search import get_inventory_option, search_inventory
+import uuid
+
+class TestInventorySearch(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.company_id = uuid.uuid4()
+        self.supplier = Supplier(id=uuid.uuid4(), company_id=self.company_id, name='Fiber Traders')
+        db.session.add(self.supplier)
+        self.router = self.add_item('Router', {'serial_number': 'RT-0001', 'mac_address': 'AA:BB:CC:00:00:01'})
+        self.dish = self.add_item('Dish', {'serial_number': 'DS-7788'})
+        self.cable = self.add_item('Cable', {}, quantity=0)
+        self.add_item('Router', {'serial_number': 'RT-0002'}, company_id=uuid.uuid4())
+        db.session.add(InventoryAssignment(id=uuid.uuid4(), inventory_item_id=self.dish.id, status='assigned'))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_item(self, item_type, attributes, quantity=1, company_id=None):
+        item = InventoryItem(
+            id=uuid.uuid4(),
+            company_id=company_id or self.company_id,
+            vendor=self.supplier.id,
+            item_type=item_type,
+            quantity=quantity,
+            unit_price=1500,
+            is_active=True,
+            attributes=attributes
+        )
+        db.session.add(item)
+        return item
+
+    def test_matches_serial_and_mac_with_slim_fields(self):
+        page = search_inventory(self.company_id, {'q': 'rt-00'})
+        self.assertEqual([item['id'] for item in page['items']], [str(self.router.id)])
+        self.assertEqual(set(page['items'][0]),
+                         {'id', 'item_type', 'quantity', 'unit_price', 'vendor_name', 'serial_number', 'mac_address'})
+        self.assertEqual(page['items'][0]['vendor_name'], 'Fiber Traders')
+
+        page = search_inventory(self.company_id, {'q': 'cc:00'})
+        self.assertEqual([item['item_type'] for item in page['items']], ['Router'])
+
+    def test_unassigned_and_in_stock_filters(self):
+        page = search_inventory(self.company_id, {'unassigned': 'true'})
+        self.assertEqual({item['item_type'] for item in page['items']}, {'Router', 'Cable'})
+
+        page = search_inventory(self.company_id, {'unassigned': 'true', 'in_stock': 'true'})
+        self.assertEqual([item['item_type'] for item in page['items']], ['Router'])
+
+    def test_cursor_pages_through_items(self):
+        first = search_inventory(self.company_id, {'page_size': 2})
+        self.assertEqual([item['item_type'] for item in first['items']], ['Cable', 'Dish'])
+        self.assertTrue(first['has_more'])
+
+        second = search_inventory(self.company_id, {'page_size': 2, 'cursor': first['next_cursor']})
+        self.assertEqual([item['item_type'] for item in second['items']], ['Router'])
+        self.assertFalse(second['has_more'])
+
+    def test_lookup_by_id(self):
+        self.assertEqual(get_inventory_option(self.company_id, self.dish.id)['serial_number'], 'DS-7788')
+        self.assertIsNone(get_inventory_option(uuid.uuid4(), self.dish.id))
+
+if __name__ == '__main__':
+    unittest.main()
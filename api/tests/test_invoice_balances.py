@@ -0,0 +1,96 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models import Invoice, Payment
+from invoice_balances import install_invoice_balance_listeners, reconcile_invoice_balances
+import uuid
+
+class TestInvoiceBalances(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        install_invoice_balance_listeners()
+
+        today = datetime.now().date()
+        self.invoice = Invoice(
+            id=uuid.uuid4(),
+            company_id=uuid.uuid4(),
+            invoice_number="INV-2026-0001",
+            customer_id=uuid.uuid4(),
+            billing_start_date=today,
+            billing_end_date=today + timedelta(days=30),
+            due_date=today + timedelta(days=7),
+            subtotal=1000.00,
+            discount_percentage=0,
+            total_amount=1000.00,
+            invoice_type="subscription",
+            status="pending",
+            is_active=True
+        )
+        db.session.add(self.invoice)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_payment(self, amount, status):
+        payment = Payment(
+            id=uuid.uuid4(),
+            company_id=self.invoice.company_id,
+            invoice_id=self.invoice.id,
+            amount=amount,
+            payment_date=datetime.now(),
+            payment_method="cash",
+            status=status,
+            is_active=True
+        )
+        db.session.add(payment)
+        db.session.commit()
+        return payment
+
+    def test_paid_payment_updates_totals(self):
+        self.add_payment(400, 'paid')
+
+        self.assertEqual(float(self.invoice.paid_amount), 400)
+        self.assertEqual(float(self.invoice.remaining_amount), 600)
+
+    def test_pending_payment_counts_once_verified(self):
+        payment = self.add_payment(400, 'pending')
+        self.assertEqual(float(self.invoice.paid_amount), 0)
+
+        payment.status = 'paid'
+        db.session.commit()
+        self.assertEqual(float(self.invoice.paid_amount), 400)
+
+    def test_cancelled_and_refunded_payments_are_removed(self):
+        first = self.add_payment(400, 'paid')
+        second = self.add_payment(600, 'paid')
+        self.assertEqual(float(self.invoice.remaining_amount), 0)
+
+        first.status = 'cancelled'
+        second.status = 'refunded'
+        db.session.commit()
+        self.assertEqual(float(self.invoice.paid_amount), 0)
+        self.assertEqual(float(self.invoice.remaining_amount), 1000)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.add_payment(400, 'paid')
+        db.session.execute(db.update(Invoice).where(Invoice.id == self.invoice.id).values(paid_amount=0))
+        db.session.commit()
+
+        drift = reconcile_invoice_balances(fix=True)
+
+        self.assertEqual(len(drift), 1)
+        self.assertEqual(drift[0]['actual_paid_amount'], 400)
+        db.session.refresh(self.invoice)
+        self.assertEqual(float(self.invoice.paid_amount), 400)
+        self.assertEqual(reconcile_invoice_balances(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+from unittest import mock
+from collections import namedtuple
+from datetime import date
+from app import create_app, db
+from app.models import Invoice
+from invoice_numbers import (
+    InvoiceNumberAllocator, install_invoice_number_listeners, next_invoice_number, sequence_name,
+    split_invoice_number,
+)
+from scheduler import _insert_invoice_batch
+import uuid
+
+COMPANY_A = uuid.uuid4()
+COMPANY_B = uuid.uuid4()
+COMPANY_C = uuid.uuid4()
+FORMATS = {COMPANY_A: 'INV-2026-0001', COMPANY_B: 'FL/26/000001', COMPANY_C: 'INV-2026-0001'}
+
+def company_format(company_id=None):
+    return FORMATS[company_id]
+
+class FakeSequenceAllocator(InvoiceNumberAllocator):
+    """Allocator backed by in-memory counters in place of Postgres sequences."""
+
+    def __init__(self, block_size=None):
+        super().__init__(block_size)
+        self.counters = {}
+        self.fetches = []
+
+    def _uses_sequence(self):
+        return True
+
+    def _fetch_counters(self, prefix, count):
+        self.fetches.append((prefix, count))
+        last = self.counters.get(prefix, 0)
+        self.counters[prefix] = last + count
+        return list(range(last + 1, last + count + 1))
+
+class TestInvoiceNumberAllocator(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch('invoice_numbers.generate_invoice_number', side_effect=company_format)
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.allocator = FakeSequenceAllocator(block_size=3)
+
+    def test_each_company_keeps_its_number_format(self):
+        self.assertEqual(self.allocator.reserve(COMPANY_A, 2), ['INV-2026-0001', 'INV-2026-0002'])
+        self.assertEqual(self.allocator.reserve(COMPANY_B, 2), ['FL/26/000001', 'FL/26/000002'])
+        self.assertEqual(self.allocator.reserve(COMPANY_A, 1), ['INV-2026-0003'])
+        # One template lookup per company per day
+        self.assertEqual(self.generate.call_count, 2)
+
+    def test_companies_sharing_a_prefix_share_its_sequence(self):
+        first = self.allocator.reserve(COMPANY_A, 2)
+        second = self.allocator.reserve(COMPANY_C, 2)
+        self.assertEqual(first + second, ['INV-2026-0001', 'INV-2026-0002', 'INV-2026-0003', 'INV-2026-0004'])
+        self.assertEqual(set(self.allocator.counters), {'INV-2026-'})
+
+    def test_single_numbers_come_from_a_block_per_prefix(self):
+        numbers = [self.allocator.next_number(COMPANY_A) for _ in range(4)]
+        numbers.append(self.allocator.next_number(COMPANY_B))
+
+        self.assertEqual(numbers, ['INV-2026-0001', 'INV-2026-0002', 'INV-2026-0003', 'INV-2026-0004', 'FL/26/000001'])
+        self.assertEqual(self.allocator.fetches, [('INV-2026-', 3), ('INV-2026-', 3), ('FL/26/', 3)])
+
+    def test_template_rolls_over_with_the_day(self):
+        self.allocator.reserve(COMPANY_A, 1)
+        today, prefix, width = self.allocator._templates[COMPANY_A]
+        self.allocator._templates[COMPANY_A] = (date(2025, 12, 31), 'INV-2025-', width)
+
+        self.allocator.reserve(COMPANY_A, 1)
+        self.assertEqual(self.allocator._templates[COMPANY_A], (today, prefix, width))
+
+    def test_sequence_names_are_stable_per_prefix(self):
+        self.assertEqual(sequence_name('INV-2026-'), sequence_name('INV-2026-'))
+        self.assertNotEqual(sequence_name('INV-2026-'), sequence_name('INV-2027-'))
+        self.assertLessEqual(len(sequence_name('INV-2026-')), 63)
+
+    def test_split_rejects_numbers_without_a_counter(self):
+        self.assertEqual(split_invoice_number('FL/26/000042'), ('FL/26/', 42, 6))
+        with self.assertRaises(ValueError):
+            split_invoice_number('DRAFT')
+
+DueRow = namedtuple('DueRow', 'customer_id company_id customer_package_id plan_name plan_price discount_amount')
+
+class TestSchedulerNumbering(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        patcher = mock.patch('invoice_numbers.generate_invoice_number', side_effect=company_format)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_batch_numbers_each_company_in_its_own_format(self):
+        rows = [
+            DueRow(uuid.uuid4(), COMPANY_A, uuid.uuid4(), 'Basic', 1000, None),
+            DueRow(uuid.uuid4(), COMPANY_B, uuid.uuid4(), 'Basic', 1000, None),
+            DueRow(uuid.uuid4(), COMPANY_A, uuid.uuid4(), 'Basic', 1000, None),
+        ]
+        numbers = _insert_invoice_batch([[row] for row in rows], date(2026, 10, 17))
+
+        self.assertEqual(numbers, ['INV-2026-0001', 'FL/26/000001', 'INV-2026-0002'])
+        stored = dict(db.session.query(Invoice.customer_id, Invoice.invoice_number).all())
+        self.assertEqual([stored[row.customer_id] for row in rows], numbers)
+
+    def test_manual_invoices_are_numbered_from_the_sequence(self):
+        install_invoice_number_listeners()
+        allocator = FakeSequenceAllocator(block_size=5)
+        patcher = mock.patch('invoice_numbers.allocator', allocator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        def manual_invoice(invoice_number):
+            return Invoice(
+                invoice_number=invoice_number, company_id=COMPANY_A, billing_start_date=date(2026, 10, 1),
+                billing_end_date=date(2026, 10, 31), due_date=date(2026, 10, 10), subtotal=1000,
+                discount_percentage=0, total_amount=1000, invoice_type='manual',
+            )
+
+        # A max+1 number from generate_invoice_number is replaced by the next counter
+        max_plus_one = manual_invoice('INV-2026-0001')
+        db.session.add(max_plus_one)
+        db.session.flush()
+        self.assertEqual(max_plus_one.invoice_number, 'INV-2026-0001')
+        self.assertEqual(allocator.counters['INV-2026-'], 5)
+
+        colliding = manual_invoice('INV-2026-0001')
+        db.session.add(colliding)
+        db.session.flush()
+        self.assertEqual(colliding.invoice_number, 'INV-2026-0002')
+
+        # Numbers the allocator handed out are kept
+        allocated = manual_invoice(next_invoice_number(COMPANY_A))
+        db.session.add(allocated)
+        db.session.commit()
+        self.assertEqual(allocated.invoice_number, 'INV-2026-0003')
+
+if __name__ == '__main__':
+    unittest.main()
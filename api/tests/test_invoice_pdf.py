@@ -0,0 +1,187 @@
+import unittest
+from app import create_app, db
+from app.models import Area, Company, Customer, Invoice, InvoiceLineItem, ISP, Payment
+from app.models import ExportJob
+from flask_jwt_extended import create_access_token
+from invoice_pdf import (
+    content_hash, ensure_rendered, init_invoice_pdf, invoice_pdf, load_documents, render_route_book, route_book_ids,
+)
+from local_files import run_sweeps
+from datetime import date, datetime, timezone
+from pypdf import PdfReader
+from unittest.mock import patch
+import invoice_pdf as invoice_pdf_module
+import io
+import os
+import shutil
+import tempfile
+import uuid
+
+class TestInvoicePdf(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.pdf_dir = tempfile.mkdtemp()
+        self.app.config['INVOICE_PDF_DIR'] = self.pdf_dir
+        init_invoice_pdf(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.company = Company(id=uuid.uuid4(), name='Fiber Link', address='Main Boulevard')
+        self.isp = ISP(id=uuid.uuid4(), company_id=self.company.id, name='Upstream')
+        self.north = Area(id=uuid.uuid4(), company_id=self.company.id, name='North')
+        self.south = Area(id=uuid.uuid4(), company_id=self.company.id, name='South')
+        db.session.add_all([self.company, self.isp, self.north, self.south])
+        self.south_invoice = self.add_invoice(self.south, 'NET-0001', date(2026, 10, 1))
+        self.north_invoice = self.add_invoice(self.north, 'NET-0002', date(2026, 10, 1))
+        self.add_invoice(self.north, 'NET-0003', date(2026, 9, 1))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.pdf_dir)
+
+    def add_invoice(self, area, internet_id, billing_start):
+        customer = Customer(
+            id=uuid.uuid4(), company_id=self.company.id, area_id=area.id, isp_id=self.isp.id,
+            first_name='Ali', last_name=internet_id, email=f"{internet_id}@example.com", internet_id=internet_id,
+            phone_1='03001234567', installation_address='House 1', installation_date=billing_start,
+            cnic=f"3520{internet_id[-4:]}00000", connection_type='internet',
+        )
+        invoice = Invoice(
+            id=uuid.uuid4(), invoice_number=f"INV-{internet_id}-{billing_start:%Y%m}", company_id=self.company.id,
+            customer_id=customer.id, billing_start_date=billing_start, billing_end_date=billing_start.replace(day=28),
+            due_date=billing_start.replace(day=10), subtotal=2000, discount_percentage=0, total_amount=2000,
+            invoice_type='subscription', status='pending', is_active=True,
+        )
+        line_item = InvoiceLineItem(
+            id=uuid.uuid4(), invoice_id=invoice.id, description='10 Mbps', quantity=1, unit_price=2000,
+            line_total=2000,
+        )
+        db.session.add_all([customer, invoice, line_item])
+        return invoice
+
+    def test_hash_changes_only_when_printed_state_changes(self):
+        before = content_hash(load_documents([self.north_invoice.id])[str(self.north_invoice.id)])
+        self.assertEqual(before, content_hash(load_documents([self.north_invoice.id])[str(self.north_invoice.id)]))
+
+        db.session.add(Payment(
+            id=uuid.uuid4(), company_id=self.company.id, invoice_id=self.north_invoice.id, amount=500,
+            payment_date=datetime(2026, 10, 5, tzinfo=timezone.utc), payment_method='cash', status='paid',
+            is_active=True,
+        ))
+        db.session.commit()
+
+        after = content_hash(load_documents([self.north_invoice.id])[str(self.north_invoice.id)])
+        self.assertNotEqual(before, after)
+
+    def test_unchanged_invoice_is_served_from_the_cache(self):
+        path, digest = invoice_pdf(self.north_invoice.id)
+        self.assertTrue(os.path.exists(path))
+        self.assertIn(digest, path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(5), b'%PDF-')
+
+        os.utime(path, (0, 0))
+        self.assertEqual(invoice_pdf(self.north_invoice.id), (path, digest))
+        # A cache hit touches the file instead of rewriting it
+        self.assertGreater(os.path.getmtime(path), 0)
+        self.assertEqual(len(os.listdir(os.path.dirname(path))), 1)
+
+    def test_route_book_merges_the_month_in_route_order(self):
+        self.assertEqual(route_book_ids(self.company.id, date(2026, 10, 1)),
+                         [self.north_invoice.id, self.south_invoice.id])
+        self.assertEqual(route_book_ids(self.company.id, date(2026, 10, 1), self.south.id), [self.south_invoice.id])
+
+        path = render_route_book(self.company.id, date(2026, 10, 1))
+        pages = PdfReader(path).pages
+        self.assertEqual(len(pages), 2)
+        self.assertIn('NET-0002', pages[0].extract_text())
+        self.assertIn('NET-0001', pages[1].extract_text())
+        self.assertEqual(render_route_book(self.company.id, date(2026, 10, 1)), path)
+
+    def test_route_book_of_an_empty_month_is_none(self):
+        self.assertIsNone(render_route_book(self.company.id, date(2026, 12, 1)))
+
+    def test_payment_date_is_printed_in_the_financial_timezone(self):
+        # 20:00 UTC is already the next day in Karachi (UTC+5)
+        db.session.add(Payment(
+            id=uuid.uuid4(), company_id=self.company.id, invoice_id=self.north_invoice.id, amount=500,
+            payment_date=datetime(2026, 10, 5, 20, 0, tzinfo=timezone.utc), payment_method='cash', status='paid',
+            is_active=True,
+        ))
+        db.session.commit()
+
+        document = load_documents([self.north_invoice.id])[str(self.north_invoice.id)]
+        self.assertEqual(document['payments'][0]['payment_date'], '2026-10-06')
+
+    def test_missing_invoices_render_on_the_process_pool(self):
+        for i in range(3):
+            self.add_invoice(self.south, f"NET-01{i:02d}", date(2026, 10, 1))
+        db.session.commit()
+        invoice_ids = route_book_ids(self.company.id, date(2026, 10, 1))
+        self.app.config['INVOICE_PDF_WORKERS'] = 2
+        progress = []
+
+        with patch.object(invoice_pdf_module, 'POOL_THRESHOLD', 1), patch.object(invoice_pdf_module, '_pool', None):
+            try:
+                rendered = ensure_rendered(invoice_ids, progress.append)
+                self.assertIsNotNone(invoice_pdf_module._pool)
+            finally:
+                if invoice_pdf_module._pool is not None:
+                    invoice_pdf_module._pool.shutdown()
+
+        self.assertEqual(len(rendered), 5)
+        self.assertEqual(sum(progress), 5)
+        for _, path in rendered:
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(5), b'%PDF-')
+
+    def test_large_route_book_is_rendered_as_a_job(self):
+        self.app.config['INVOICE_PDF_ROUTE_BOOK_JOB_THRESHOLD'] = 2
+        client = self.app.test_client()
+        token = create_access_token(identity=str(uuid.uuid4()), additional_claims={
+            'role': 'company_owner', 'company_id': str(self.company.id),
+        })
+        headers = {'Authorization': f"Bearer {token}"}
+
+        response = client.get('/invoices/pdf/route-book?month=2026-10', headers=headers)
+        self.assertEqual(response.status_code, 202)
+        job = response.get_json()
+        self.assertEqual((job['entity'], job['status'], job['total_rows'], job['rows_written']),
+                         ('route_book', 'succeeded', 2, 2))
+
+        response = client.get(f"/invoices/pdf/route-book/jobs/{job['id']}/download", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(PdfReader(io.BytesIO(response.data)).pages), 2)
+        response.close()
+
+        # Below the threshold the book is still served in the request
+        response = client.get(f"/invoices/pdf/route-book?month=2026-10&area_id={self.south.id}", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/pdf')
+        response.close()
+
+        other = create_access_token(identity=str(uuid.uuid4()), additional_claims={
+            'role': 'company_owner', 'company_id': str(uuid.uuid4()),
+        })
+        response = client.get(f"/invoices/pdf/route-book/jobs/{job['id']}",
+                              headers={'Authorization': f"Bearer {other}"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(ExportJob.query.count(), 1)
+
+    def test_every_host_sweeps_its_own_stale_pdfs(self):
+        stale, _ = invoice_pdf(self.north_invoice.id)
+        fresh, _ = invoice_pdf(self.south_invoice.id)
+        os.utime(stale, (0, 0))
+
+        self.assertEqual(run_sweeps(self.app)['invoice_pdfs'], 1)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(fresh))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from app import create_app, db
+from app.models import JobRun
+from flask_jwt_extended import create_access_token
+from job_runs import JobRunRecorder, current_run, init_job_runs
+import uuid
+
+class TestJobRuns(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        init_job_runs(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def headers(self, role):
+        token = create_access_token(identity=str(uuid.uuid4()), additional_claims={'role': role})
+        return {'Authorization': f"Bearer {token}"}
+
+    def record(self, job_id='generate_invoices_job'):
+        with JobRunRecorder(self.app, job_id, 'Generate invoices') as run:
+            with current_run().phase('select_due'):
+                pass
+            current_run().add(rows_scanned=10, created=7, skipped=2, failed=1)
+        return run
+
+    def test_recorder_persists_counts_and_phases(self):
+        run = self.record()
+
+        job_run = db.session.get(JobRun, run.run_id)
+        self.assertEqual(job_run.status, 'succeeded')
+        self.assertEqual((job_run.rows_scanned, job_run.created_count, job_run.skipped_count, job_run.failed_count),
+                         (10, 7, 2, 1))
+        self.assertIn('select_due', job_run.phase_durations)
+
+    def test_failed_job_is_recorded_and_reraised(self):
+        with self.assertRaises(RuntimeError):
+            with JobRunRecorder(self.app, 'generate_invoices_job') as run:
+                raise RuntimeError('boom')
+
+        job_run = db.session.get(JobRun, run.run_id)
+        self.assertEqual(job_run.status, 'failed')
+        self.assertEqual(job_run.error_message, 'boom')
+
+    def test_job_still_runs_when_the_run_cannot_be_recorded(self):
+        JobRun.__table__.drop(db.engine)
+        ran = []
+
+        with self.assertLogs('job_runs', level='ERROR') as logs:
+            with JobRunRecorder(self.app, 'generate_invoices_job') as run:
+                ran.append(True)
+                current_run().add(created=1)
+
+        self.assertEqual(ran, [True])
+        self.assertIsNone(run.run_id)
+        self.assertIn('Could not record the start of job generate_invoices_job', logs.output[0])
+
+    def test_job_error_is_not_masked_when_recording_the_end_fails(self):
+        with self.assertRaises(RuntimeError), self.assertLogs('job_runs', level='ERROR') as logs:
+            with JobRunRecorder(self.app, 'generate_invoices_job'):
+                JobRun.__table__.drop(db.engine)
+                raise RuntimeError('boom')
+
+        self.assertIn('Could not record the end of job generate_invoices_job', logs.output[0])
+
+    def test_only_super_admins_can_read_job_runs(self):
+        run = self.record()
+
+        for role in ('company_owner', 'manager', 'employee'):
+            self.assertEqual(self.client.get('/job-runs', headers=self.headers(role)).status_code, 403)
+            self.assertEqual(self.client.get(f"/job-runs/{run.run_id}", headers=self.headers(role)).status_code, 403)
+
+        response = self.client.get('/job-runs', headers=self.headers('super_admin'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.get_json()], [str(run.run_id)])
+        response = self.client.get(f"/job-runs/{run.run_id}", headers=self.headers('super_admin'))
+        self.assertEqual(response.get_json()['created'], 7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timezone
+from sqlalchemy import delete, insert, update
+from app import create_app, db
+from app.models import ClosedMonth, Payment
+from month_snapshots import (
+    close_month, closed_months, install_month_snapshot_listeners, is_month_closed, last_closable_month,
+    parse_month, read_range, record_bulk_write,
+)
+import uuid
+
+class TestMonthSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['MONTH_SNAPSHOT_DIR'] = self.snapshot_dir
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        install_month_snapshot_listeners()
+
+        self.company_id = uuid.uuid4()
+        self.february = parse_month('2026-02')
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+
+    def add_payment(self, amount, paid_at):
+        payment = Payment(
+            id=uuid.uuid4(),
+            company_id=self.company_id,
+            amount=amount,
+            payment_date=paid_at,
+            payment_method='cash',
+            status='paid',
+            is_active=True
+        )
+        db.session.add(payment)
+        db.session.commit()
+        return payment
+
+    def test_last_closable_month_waits_for_the_grace_period(self):
+        self.assertEqual(last_closable_month(date(2026, 3, 3), grace_days=5), parse_month('2026-01'))
+        self.assertEqual(last_closable_month(date(2026, 3, 6), grace_days=5), self.february)
+
+    def test_closed_month_is_read_from_its_snapshot(self):
+        self.add_payment(400, datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc))
+        self.add_payment(250, datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc))
+
+        counts = close_month(self.company_id, self.february)
+        self.assertEqual(counts['payments'], 1)
+        self.assertEqual(closed_months(self.company_id), [self.february])
+        self.assertTrue(os.path.exists(os.path.join(self.snapshot_dir, str(self.company_id), '2026-02', 'payments.parquet')))
+
+        # Remove the source row behind the listeners' back: February must now come from the file
+        db.session.execute(delete(Payment.__table__).where(Payment.__table__.c.amount == 400))
+        db.session.commit()
+
+        frame = read_range('payments', self.company_id, datetime(2026, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(sorted(frame['amount'].astype(float).tolist()), [250, 400])
+
+    def test_write_into_closed_month_drops_the_snapshot(self):
+        self.add_payment(400, datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc))
+        close_month(self.company_id, self.february)
+
+        self.add_payment(100, datetime(2026, 2, 20, 12, 0, tzinfo=timezone.utc))
+
+        self.assertFalse(is_month_closed(self.company_id, self.february))
+        frame = read_range('payments', self.company_id, datetime(2026, 2, 1, tzinfo=timezone.utc))
+        self.assertEqual(sorted(frame['amount'].astype(float).tolist()), [100, 400])
+
+    def test_edit_of_a_committed_row_in_a_closed_month_drops_the_snapshot(self):
+        payment = self.add_payment(400, datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc))
+        close_month(self.company_id, self.february)
+
+        # The commit expired the payment; its date is never touched
+        payment.amount = 450
+        db.session.commit()
+
+        self.assertFalse(is_month_closed(self.company_id, self.february))
+
+    def test_moving_a_row_out_of_a_closed_month_drops_the_snapshot(self):
+        payment = self.add_payment(400, datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc))
+        close_month(self.company_id, self.february)
+
+        payment.payment_date = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+        db.session.commit()
+
+        self.assertFalse(is_month_closed(self.company_id, self.february))
+
+    def test_snapshots_are_only_served_while_the_database_says_closed(self):
+        self.add_payment(400, datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc))
+        close_month(self.company_id, self.february)
+        self.assertEqual(closed_months(self.company_id), [self.february])
+
+        # Another host re-closed the month: this host's files are stale
+        db.session.execute(update(ClosedMonth.__table__).values(snapshot_id=uuid.uuid4()))
+        db.session.commit()
+        self.assertTrue(is_month_closed(self.company_id, self.february))
+        self.assertEqual(closed_months(self.company_id), [])
+
+        # Another host reopened it; its files are still on this host's disk
+        close_month(self.company_id, self.february)
+        db.session.execute(delete(ClosedMonth.__table__))
+        db.session.execute(update(Payment.__table__).values(amount=450))
+        db.session.commit()
+        frame = read_range('payments', self.company_id, datetime(2026, 2, 1, tzinfo=timezone.utc))
+        self.assertEqual(frame['amount'].astype(float).tolist(), [450])
+
+    def test_bulk_inserts_into_a_closed_month_reopen_it(self):
+        self.add_payment(400, datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc))
+        close_month(self.company_id, self.february)
+
+        rows = [{
+            'id': uuid.uuid4(), 'company_id': self.company_id, 'amount': 100,
+            'payment_date': datetime(2026, 2, 20, 12, 0, tzinfo=timezone.utc),
+            'payment_method': 'cash', 'status': 'paid', 'is_active': True,
+        }]
+        db.session.execute(insert(Payment), rows)
+        record_bulk_write(Payment, rows)
+        db.session.commit()
+
+        self.assertFalse(is_month_closed(self.company_id, self.february))
+
+if __name__ == '__main__':
+    unittest.main()
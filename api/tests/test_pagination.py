@@ -0,0 +1,103 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from app import create_app, db
+from app.models import DetailedLog
+from flask_jwt_extended import create_access_token
+from pagination import PAGE_SPECS, InvalidPageRequest, init_pagination, paginate
+import uuid
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        init_pagination(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.company_id = uuid.uuid4()
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        # Pairs of logs share a timestamp, so the id tie-breaker matters
+        db.session.execute(db.insert(DetailedLog), [
+            {
+                'id': uuid.uuid4(),
+                'company_id': self.company_id,
+                'action': 'UPDATE' if n % 3 else 'CREATE',
+                'table_name': 'customers',
+                'record_id': uuid.uuid4(),
+                'created_at': start + timedelta(minutes=n // 2),
+            }
+            for n in range(45)
+        ] + [{
+            'id': uuid.uuid4(),
+            'company_id': uuid.uuid4(),
+            'action': 'UPDATE',
+            'table_name': 'customers',
+            'record_id': uuid.uuid4(),
+            'created_at': start,
+        }])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def page(self, **args):
+        return paginate(PAGE_SPECS['logs'], {'page_size': '10', **args}, self.company_id)
+
+    def test_cursors_walk_every_row_once_in_order(self):
+        seen, cursor = [], None
+        while True:
+            page = self.page(**({'cursor': cursor, 'total': 'none'} if cursor else {}))
+            seen.extend(page['items'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len({item['id'] for item in seen}), 45)
+        keys = [(item['created_at'], item['id']) for item in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_prev_cursor_returns_the_previous_page(self):
+        first = self.page()
+        second = self.page(cursor=first['next_cursor'])
+        back = self.page(cursor=second['prev_cursor'])
+
+        self.assertEqual(first['total'], 45)
+        self.assertIsNone(first['prev_cursor'])
+        self.assertEqual([i['id'] for i in back['items']], [i['id'] for i in first['items']])
+
+    def test_filters_and_skipped_total(self):
+        page = self.page(filter_action='CREATE', total='none')
+
+        self.assertIsNone(page['total'])
+        self.assertEqual({item['action'] for item in page['items']}, {'CREATE'})
+
+    def test_cursor_from_other_filters_is_rejected(self):
+        cursor = self.page()['next_cursor']
+
+        with self.assertRaises(InvalidPageRequest):
+            self.page(cursor=cursor, filter_action='CREATE')
+        with self.assertRaises(InvalidPageRequest):
+            self.page(sort_by='ip_address_hash')
+
+    def get_page(self, **claims):
+        token = create_access_token(identity=str(uuid.uuid4()), additional_claims=claims)
+        return self.app.test_client().get('/logs/page?page_size=100', headers={'Authorization': f"Bearer {token}"})
+
+    def test_endpoint_scopes_to_the_token_company(self):
+        response = self.get_page(role='company_owner', company_id=str(self.company_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['items']), 45)
+        self.assertEqual(len(self.get_page(role='super_admin').get_json()['items']), 46)
+
+    def test_endpoint_refuses_roles_without_access_and_tokens_without_a_company(self):
+        self.assertEqual(self.get_page(role='employee', company_id=str(self.company_id)).status_code, 403)
+        self.assertEqual(self.get_page(role='company_owner').status_code, 403)
+        self.assertEqual(self.get_page(role='manager').status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
+from unittest import mock
 from datetime import datetime, timedelta
 from app import create_app, db
-from app.models import Customer, Invoice, ServicePlan, Company
-from scheduler import _process_invoices
+from app.models import Customer, CustomerPackage, Invoice, InvoiceLineItem, DetailedLog, ServicePlan, Company
+import scheduler
+from scheduler import _process_invoices, run_billing_shards
 import uuid
 
 class TestScheduler(unittest.TestCase):
@@ -13,6 +15,10 @@ class TestScheduler(unittest.TestCase):
         self.app_context = self.app.app_context()
         self.app_context.push()
         db.create_all()
+        # The all-zero system user id reads back as an integer from SQLite's NUMERIC affinity
+        patcher = mock.patch('scheduler.SYSTEM_USER_ID', str(uuid.uuid4()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
         
         # Create test data
         self.create_test_data()
@@ -49,7 +55,6 @@ class TestScheduler(unittest.TestCase):
             id=uuid.uuid4(),
             company_id=company.id,
             area_id=uuid.uuid4(),
-            service_plan_id=service_plan.id,
             isp_id=uuid.uuid4(),
             first_name="John",
             last_name="Doe",
@@ -69,7 +74,6 @@ class TestScheduler(unittest.TestCase):
             id=uuid.uuid4(),
             company_id=company.id,
             area_id=uuid.uuid4(),
-            service_plan_id=service_plan.id,
             isp_id=uuid.uuid4(),
             first_name="Jane",
             last_name="Smith",
@@ -89,7 +93,6 @@ class TestScheduler(unittest.TestCase):
             id=uuid.uuid4(),
             company_id=company.id,
             area_id=uuid.uuid4(),
-            service_plan_id=service_plan.id,
             isp_id=uuid.uuid4(),
             first_name="Bob",
             last_name="Johnson",
@@ -105,6 +108,11 @@ class TestScheduler(unittest.TestCase):
         )
         
         db.session.add_all([customer1, customer2, customer3])
+        db.session.add_all([
+            CustomerPackage(id=uuid.uuid4(), customer_id=customer.id, service_plan_id=service_plan.id,
+                            start_date=customer.installation_date, is_active=True)
+            for customer in (customer1, customer2, customer3)
+        ])
         
         # Create an existing invoice for customer3
         current_month_start = datetime(today.year, today.month, 1).date()
@@ -166,6 +174,194 @@ class TestScheduler(unittest.TestCase):
         customer3_invoices = Invoice.query.filter_by(customer_id=self.customer3.id).count()
         self.assertEqual(customer3_invoices, 1)
 
+    def test_process_invoices_bulk_writes_line_items_and_logs(self):
+        with self.app.app_context():
+            result = _process_invoices(bulk=True)
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(result['failed'], 0)
+
+        new_invoice = Invoice.query.filter_by(customer_id=self.customer1.id).one()
+        line_items = InvoiceLineItem.query.filter_by(invoice_id=new_invoice.id).all()
+        self.assertEqual(len(line_items), 1)
+        self.assertEqual(float(line_items[0].line_total), float(new_invoice.total_amount))
+
+        logs = DetailedLog.query.filter_by(table_name='invoices', record_id=new_invoice.id).count()
+        self.assertEqual(logs, 1)
+
+    def test_process_invoices_is_idempotent(self):
+        with self.app.app_context():
+            first = _process_invoices(bulk=True)
+            second = _process_invoices(bulk=True)
+
+        self.assertEqual(first['created'], 1)
+        self.assertEqual(second['due'], 0)
+        self.assertEqual(second['created'], 0)
+        self.assertEqual(Invoice.query.filter_by(customer_id=self.customer1.id).count(), 1)
+
+    def test_process_invoices_per_customer_matches_bulk(self):
+        with self.app.app_context():
+            result = _process_invoices(bulk=False)
+
+        self.assertEqual(result['created'], 1)
+        new_invoice = Invoice.query.filter_by(customer_id=self.customer1.id).one()
+        self.assertEqual(float(new_invoice.total_amount), float(self.service_plan.price))
+
+    def add_package(self, customer, price, **fields):
+        plan = ServicePlan(id=uuid.uuid4(), company_id=self.company.id, name=f"Plan {price}", price=price, is_active=True)
+        package = CustomerPackage(id=uuid.uuid4(), customer_id=customer.id, service_plan_id=plan.id,
+                                  start_date=customer.installation_date, is_active=True)
+        for name, value in fields.items():
+            setattr(package, name, value)
+        db.session.add_all([plan, package])
+        db.session.commit()
+        return package
+
+    def test_customer_with_several_packages_gets_one_invoice(self):
+        today = datetime.now().date()
+        tv = self.add_package(self.customer1, 500)
+        self.add_package(self.customer1, 300, end_date=today - timedelta(days=1))
+        self.add_package(self.customer1, 200, is_active=False)
+        self.add_package(self.customer1, 100, start_date=today + timedelta(days=1))
+
+        with self.app.app_context():
+            result = _process_invoices(bulk=True)
+
+        self.assertEqual(result['due'], 1)
+        self.assertEqual(result['created'], 1)
+        new_invoice = Invoice.query.filter_by(customer_id=self.customer1.id).one()
+        self.assertEqual(float(new_invoice.total_amount), 1500)
+        line_items = InvoiceLineItem.query.filter_by(invoice_id=new_invoice.id).all()
+        self.assertEqual(sorted(float(item.line_total) for item in line_items), [500, 1000])
+        self.assertIn(tv.id, {item.customer_package_id for item in line_items})
+
+    def test_customer_packages_split_across_batches_stay_on_one_invoice(self):
+        self.add_package(self.customer1, 500)
+
+        with mock.patch('scheduler.BULK_INVOICE_BATCH_SIZE', 1), self.app.app_context():
+            result = _process_invoices(bulk=True)
+
+        self.assertEqual(result['created'], 1)
+        new_invoice = Invoice.query.filter_by(customer_id=self.customer1.id).one()
+        self.assertEqual(InvoiceLineItem.query.filter_by(invoice_id=new_invoice.id).count(), 2)
+
+    def test_discount_is_spread_over_the_packages(self):
+        self.customer1.discount_amount = 300
+        db.session.commit()
+        self.add_package(self.customer1, 500)
+
+        with self.app.app_context():
+            _process_invoices(bulk=True)
+
+        new_invoice = Invoice.query.filter_by(customer_id=self.customer1.id).one()
+        line_items = InvoiceLineItem.query.filter_by(invoice_id=new_invoice.id).all()
+        self.assertAlmostEqual(float(new_invoice.total_amount), 1200)
+        self.assertAlmostEqual(sum(float(item.line_total) for item in line_items), 1200)
+        self.assertAlmostEqual(sum(float(item.discount_amount) for item in line_items), 300)
+
+class TestBillingShards(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        patcher = mock.patch('scheduler.SYSTEM_USER_ID', str(uuid.uuid4()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.today = datetime.now().date()
+        self.north, self.south = Company(id=uuid.uuid4(), name="North ISP"), Company(id=uuid.uuid4(), name="South ISP")
+        self.idle = Company(id=uuid.uuid4(), name="Idle ISP")
+        db.session.add_all([self.north, self.south, self.idle])
+        self.areas = {company.id: [uuid.uuid4(), uuid.uuid4()] for company in (self.north, self.south, self.idle)}
+        # North: two customers in each area, South: one customer, Idle: only a customer due tomorrow
+        for area_id in self.areas[self.north.id]:
+            self.add_customer(self.north, area_id)
+            self.add_customer(self.north, area_id)
+        self.add_customer(self.south, self.areas[self.south.id][0])
+        self.add_customer(self.idle, self.areas[self.idle.id][0], recharge_date=self.today + timedelta(days=1))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_customer(self, company, area_id, recharge_date=None):
+        number = Customer.query.count() + len(db.session.new)
+        plan = ServicePlan(id=uuid.uuid4(), company_id=company.id, name="Basic Plan", price=1000, is_active=True)
+        customer = Customer(
+            id=uuid.uuid4(), company_id=company.id, area_id=area_id, isp_id=uuid.uuid4(),
+            first_name="Test", last_name=str(number), email=f"customer{number}@example.com",
+            internet_id=f"SHARD{number:03d}", phone_1="1234567890", installation_address="1 Main St",
+            installation_date=self.today - timedelta(days=30), cnic=f"35202-{number:07d}-1",
+            connection_type="internet", recharge_date=recharge_date or self.today, is_active=True,
+        )
+        package = CustomerPackage(id=uuid.uuid4(), customer_id=customer.id, service_plan_id=plan.id,
+                                  start_date=customer.installation_date, is_active=True)
+        db.session.add_all([plan, customer, package])
+
+    # Shards run on a pool of one: the in-memory SQLite database is a single shared
+    # connection, and without sequences invoice numbers come from max+1
+
+    def by_shard(self, results):
+        return {(result['company_id'], result['area_id']): result for result in results}
+
+    def test_company_shards_cover_each_company_with_customers_due(self):
+        results = self.by_shard(run_billing_shards(self.app, max_workers=1, shard_by='company'))
+
+        self.assertEqual(set(results), {(str(self.north.id), None), (str(self.south.id), None)})
+        self.assertEqual(results[(str(self.north.id), None)]['created'], 4)
+        self.assertEqual(results[(str(self.south.id), None)]['created'], 1)
+        self.assertEqual(Invoice.query.count(), 5)
+
+    def test_area_shards_split_a_company_by_area(self):
+        results = self.by_shard(run_billing_shards(self.app, max_workers=1, shard_by='area'))
+
+        north_areas = {(str(self.north.id), str(area_id)) for area_id in self.areas[self.north.id]}
+        self.assertEqual(set(results), north_areas | {(str(self.south.id), str(self.areas[self.south.id][0]))})
+        for key in north_areas:
+            self.assertEqual(results[key]['due'], 2)
+            self.assertEqual(results[key]['created'], 2)
+
+    def test_a_failing_shard_does_not_stop_the_others(self):
+        process_invoices = scheduler._process_invoices
+
+        def fail_north(company_id=None, area_id=None, **kwargs):
+            if company_id == self.north.id:
+                raise RuntimeError("north data is broken")
+            return process_invoices(company_id=company_id, area_id=area_id, **kwargs)
+
+        with mock.patch('scheduler._process_invoices', side_effect=fail_north):
+            results = self.by_shard(run_billing_shards(self.app, max_workers=1, shard_by='company'))
+
+        north, south = results[(str(self.north.id), None)], results[(str(self.south.id), None)]
+        self.assertEqual(north['error'], "north data is broken")
+        self.assertEqual(north['created'], 0)
+        self.assertIsNone(south['error'])
+        self.assertEqual(south['created'], 1)
+        self.assertEqual(Invoice.query.filter_by(company_id=self.south.id).count(), 1)
+        self.assertEqual(Invoice.query.filter_by(company_id=self.north.id).count(), 0)
+
+    def test_results_report_counts_and_timing_per_shard(self):
+        results = run_billing_shards(self.app, max_workers=1, shard_by='company')
+
+        for result in results:
+            self.assertEqual(
+                set(result),
+                {'company_id', 'area_id', 'due', 'created', 'skipped', 'failed', 'error', 'duration_seconds'},
+            )
+            self.assertGreaterEqual(result['duration_seconds'], 0)
+        self.assertEqual(sum(result['created'] for result in results), 5)
+        self.assertEqual(sum(result['failed'] for result in results), 0)
+
+        # A second run finds everything billed
+        again = run_billing_shards(self.app, max_workers=1, shard_by='company')
+        self.assertEqual(sum(result['due'] for result in again), 0)
+        self.assertEqual(Invoice.query.count(), 5)
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,85 @@
+import unittest
+import threading
+import time
+from single_flight import SingleFlight, SingleFlightTimeout
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.flight = SingleFlight(timeout=5)
+
+    def run_concurrently(self, count, fn, key='executive'):
+        results, errors = [], []
+        started = threading.Barrier(count)
+
+        def call():
+            started.wait()
+            try:
+                results.append(self.flight.do(key, fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_concurrent_callers_share_one_execution(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'total': 42}
+
+        results, errors = self.run_concurrently(10, compute)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([value for value, _ in results], [{'total': 42}] * 10)
+        self.assertEqual(sum(1 for _, shared in results if not shared), 1)
+        self.assertEqual(self.flight.in_flight(), 0)
+
+    def test_leader_error_reaches_every_waiter(self):
+        def compute():
+            time.sleep(0.2)
+            raise ValueError('aggregation failed')
+
+        results, errors = self.run_concurrently(5, compute)
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 5)
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+
+        # The failed call is not cached; the next caller computes again
+        value, shared = self.flight.do('executive', lambda: 'recovered')
+        self.assertEqual((value, shared), ('recovered', False))
+
+    def test_waiter_times_out(self):
+        release = threading.Event()
+        leader = threading.Thread(target=self.flight.do, args=('executive', release.wait))
+        leader.start()
+        time.sleep(0.05)
+
+        with self.assertRaises(SingleFlightTimeout):
+            self.flight.do('executive', lambda: 'never runs', timeout=0.1)
+
+        release.set()
+        leader.join()
+        self.assertEqual(self.flight.stats()['timeouts'], 1)
+
+    def test_different_keys_do_not_wait_on_each_other(self):
+        release = threading.Event()
+        leader = threading.Thread(target=self.flight.do, args=('executive', release.wait))
+        leader.start()
+        time.sleep(0.05)
+
+        value, shared = self.flight.do('customer', lambda: 'fast', timeout=0.1)
+
+        release.set()
+        leader.join()
+        self.assertEqual((value, shared), ('fast', False))
+
+if __name__ == '__main__':
+    unittest.main()
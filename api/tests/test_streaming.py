@@ -0,0 +1,75 @@
+import unittest
+import tracemalloc
+import uuid
+from app import create_app, db
+from app.models import DetailedLog
+from streaming import stream_query, stream_batches
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def insert_logs(self, count):
+        db.session.execute(db.insert(DetailedLog), [
+            {
+                'id': uuid.uuid4(),
+                'action': 'update',
+                'table_name': 'customers',
+                'record_id': uuid.uuid4(),
+                'new_values': {'note': 'x' * 200},
+            }
+            for _ in range(count)
+        ])
+        db.session.commit()
+        db.session.expunge_all()
+
+    def peak_memory_while_streaming(self):
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        seen = 0
+        for log in stream_query(DetailedLog.query, batch_size=500):
+            seen += 1
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return seen, peak
+
+    def test_stream_query_yields_every_row_and_empties_session(self):
+        self.insert_logs(1200)
+
+        ids = {log.id for log in stream_query(DetailedLog.query, batch_size=500)}
+
+        self.assertEqual(len(ids), 1200)
+        self.assertEqual(len(db.session.identity_map), 0)
+
+    def test_stream_batches_respects_batch_size(self):
+        self.insert_logs(1200)
+
+        sizes = [len(batch) for batch in stream_batches(db.select(DetailedLog.id), batch_size=500)]
+
+        self.assertEqual(sizes, [500, 500, 200])
+
+    def test_peak_memory_does_not_grow_with_row_count(self):
+        self.insert_logs(2000)
+        small_count, small_peak = self.peak_memory_while_streaming()
+
+        self.insert_logs(18000)
+        large_count, large_peak = self.peak_memory_while_streaming()
+
+        self.assertEqual(small_count, 2000)
+        self.assertEqual(large_count, 20000)
+        # 10x the rows must not need anywhere near 10x the memory; allow for
+        # allocator noise but fail if the scan materialises the whole table.
+        self.assertLess(large_peak, small_peak * 2)
+
+if __name__ == '__main__':
+    unittest.main()
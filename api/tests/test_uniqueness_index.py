@@ -0,0 +1,122 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from app import create_app, db
+from app.models import User
+from uniqueness_index import (
+    UNIQUE_FIELDS, BloomFilter, UniquenessIndex, install_uniqueness_listeners, record_values,
+)
+import uuid
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestBloomFilter(unittest.TestCase):
+    def test_added_values_are_always_found(self):
+        bloom = BloomFilter(1000)
+        values = [f"35202{number:08d}" for number in range(1000)]
+        for value in values:
+            bloom.add(value)
+
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(f"99999{number:08d}" in bloom for number in range(10000))
+        self.assertLess(false_positives, 300)
+
+class TestUniquenessIndex(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        install_uniqueness_listeners()
+
+        self.add_user('alice', '3520211111111')
+        db.session.commit()
+        self.clock = FakeClock()
+        self.index = UniquenessIndex(User, 'cnic', clock=self.clock)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_user(self, username, cnic):
+        db.session.add(User(
+            id=uuid.uuid4(), username=username, password='x', email=f"{username}@example.com",
+            role='employee', cnic=cnic,
+        ))
+
+    def test_checks_answer_from_the_filter_and_confirm_possible_hits(self):
+        self.assertTrue(self.index.is_taken('3520211111111'))
+        self.assertFalse(self.index.is_taken('3520299999999'))
+
+        stats = self.index.stats()
+        self.assertEqual(stats['rebuilds'], 1)
+        self.assertEqual(stats['answered_from_memory'], 1)
+        self.assertEqual(stats['confirm_queries'], 1)
+
+    def test_committed_rows_are_added_without_a_rebuild(self):
+        index = UNIQUE_FIELDS['users.cnic']
+        index.build()
+        rebuilds = index.stats()['rebuilds']
+        self.assertFalse(index.is_taken('3520222222222'))
+
+        self.add_user('bob', '3520222222222')
+        db.session.commit()
+
+        self.assertTrue(index.is_taken('3520222222222'))
+        self.assertEqual(index.stats()['rebuilds'], rebuilds)
+
+    def test_recorded_bulk_values_reach_the_filter(self):
+        UNIQUE_FIELDS['users.cnic'].build()
+        UNIQUE_FIELDS['users.username'].build()
+        record_values(User, [{'username': 'carol', 'cnic': '3520233333333'}])
+
+        self.assertIn('3520233333333', UNIQUE_FIELDS['users.cnic']._filter)
+        self.assertIn('carol', UNIQUE_FIELDS['users.username']._filter)
+
+    def test_stale_filter_is_rebuilt_and_forgets_deleted_rows(self):
+        self.assertTrue(self.index.is_taken('3520211111111'))
+        User.query.filter_by(username='alice').delete()
+        db.session.commit()
+
+        self.clock.now = self.index.resync_seconds + 1
+        self.assertFalse(self.index.is_taken('3520211111111'))
+        stats = self.index.stats()
+        self.assertEqual(stats['rebuilds'], 2)
+        self.assertEqual(stats['answered_from_memory'], 1)
+
+    def test_rows_inserted_by_other_processes_are_caught_up_from_the_watermark(self):
+        self.assertFalse(self.index.is_taken('3520244444444'))
+
+        # Another worker inserts a user; this process never sees its commit
+        created_at = db.session.query(func.max(User.created_at)).scalar() + timedelta(seconds=5)
+        db.session.execute(insert(User), [{
+            'id': uuid.uuid4(), 'username': 'dave', 'password': 'x', 'email': 'dave@example.com',
+            'role': 'employee', 'cnic': '3520244444444', 'created_at': created_at,
+        }])
+        db.session.commit()
+
+        # The watermark is read at most once per watermark_seconds
+        self.assertFalse(self.index.is_taken('3520244444444'))
+        self.clock.now += self.index.watermark_seconds
+        self.assertTrue(self.index.is_taken('3520244444444'))
+        stats = self.index.stats()
+        self.assertEqual(stats['rebuilds'], 1)
+        self.assertEqual(stats['catch_ups'], 1)
+
+        # Nothing new: only max(created_at) is read, and re-read values are not counted twice
+        values = stats['values']
+        self.clock.now += self.index.watermark_seconds
+        self.assertFalse(self.index.is_taken('3520255555555'))
+        self.assertEqual(self.index.stats()['catch_ups'], 1)
+        self.assertEqual(self.index.stats()['values'], values)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,417 @@
+"""
+In-process uniqueness index for the availability checks of the customer and employee forms.
+
+The forms call /customers/check-cnic/<cnic>, /customers/check-internet-id/<id> and
+/employees/check-cnic/<cnic> as the user types. Each process keeps a Bloom filter of every
+value of the indexed unique columns (UNIQUE_FIELDS), about 10 bits per value at a 1% false
+positive rate. A value that is not in the filter is certainly not in the table, so most
+checks answer from memory; only a value the filter might contain is confirmed with one
+indexed lookup.
+
+The filters are kept current by:
+
+    session writes   values of new or changed rows are added when their transaction commits
+    bulk writes      writers that bypass the session call record_values() (see bulk_import.py)
+    catch-up         before answering from memory, a check compares the table's max(created_at)
+                     (cached for UNIQUENESS_WATERMARK_SECONDS) with the newest row the filter
+                     has seen; if it moved, the values of rows created since are added, so rows
+                     inserted by other processes are seen within about a second
+    resync           a filter older than UNIQUENESS_RESYNC_SECONDS, or filled past its
+                     capacity, is rebuilt from the table in a background thread while the old
+                     one keeps answering; this also drops values of deleted rows
+
+created_at is the inserting transaction's start time, so the catch-up re-reads a
+WATERMARK_OVERLAP window before the watermark to pick up transactions that committed out of
+order. Values changed by an UPDATE in another process are only seen after the next resync.
+The checks are advisory: the unique constraints still reject the insert.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from flask import Blueprint, current_app, jsonify
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import event, func, literal, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Customer, User, Vendor
+from streaming import read_connection, stream_batches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+DEFAULT_RESYNC_SECONDS = 600
+DEFAULT_WATERMARK_SECONDS = 1.0
+# Rows created this long before the watermark are read again by the catch-up
+WATERMARK_OVERLAP = timedelta(seconds=60)
+# Filters are sized for twice the current row count, and at least this many values
+MIN_CAPACITY = 1024
+BUILD_BATCH_SIZE = 10000
+
+_PENDING_KEY = 'uniqueness_index_pending_values'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings.
+
+    Args:
+        capacity: Values the filter is sized for
+        false_positive_rate: Chance that a value never added is reported present, at capacity
+    """
+
+    def __init__(self, capacity, false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(64, math.ceil(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+def normalize(value):
+    return str(value).strip() if value is not None else ''
+
+
+class UniquenessIndex:
+    """
+    Bloom filter over one unique column, with a confirming lookup for possible hits.
+
+    Args:
+        model: Model of the table
+        column: Name of the unique column
+        clock: Monotonic time source (for tests)
+    """
+
+    def __init__(self, model, column, clock=time.monotonic):
+        self.model = model
+        self.column_name = column
+        self.clock = clock
+        self.false_positive_rate = DEFAULT_FALSE_POSITIVE_RATE
+        self.resync_seconds = DEFAULT_RESYNC_SECONDS
+        self.watermark_seconds = DEFAULT_WATERMARK_SECONDS
+        self._filter = None
+        self._built_at = None
+        # Newest created_at the filter has seen, and when the table's was last read
+        self._watermark = None
+        self._watermark_checked_at = None
+        self._pending = None
+        self._building = False
+        self._lock = threading.Lock()
+        self._counters = {'checks': 0, 'answered_from_memory': 0, 'confirm_queries': 0,
+                          'false_positives': 0, 'rebuilds': 0, 'catch_ups': 0}
+
+    @property
+    def column(self):
+        return getattr(self.model, self.column_name)
+
+    @property
+    def created_at(self):
+        return self.model.created_at
+
+    def configure(self, false_positive_rate=None, resync_seconds=None, watermark_seconds=None):
+        with self._lock:
+            if false_positive_rate is not None:
+                self.false_positive_rate = false_positive_rate
+            if resync_seconds is not None:
+                self.resync_seconds = resync_seconds
+            if watermark_seconds is not None:
+                self.watermark_seconds = watermark_seconds
+
+    def build(self):
+        """Rebuild the filter from the table. Values recorded meanwhile are carried over."""
+        with self._lock:
+            self._pending = []
+        try:
+            column = self.column
+            present = column.isnot(None)
+            # Read before the values, so rows created during the build are caught up later
+            watermark = db.session.execute(select(func.max(self.created_at))).scalar()
+            count = db.session.execute(select(func.count()).select_from(self.model).where(present)).scalar()
+            bloom = BloomFilter(max(count * 2, MIN_CAPACITY), self.false_positive_rate)
+            with read_connection() as connection:
+                for batch in stream_batches(select(column).where(present), BUILD_BATCH_SIZE, connection):
+                    for (value,) in batch:
+                        bloom.add(normalize(value))
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            for value in self._pending:
+                bloom.add(value)
+            self._pending = None
+            self._filter = bloom
+            self._built_at = self.clock()
+            self._watermark = watermark
+            self._watermark_checked_at = self._built_at
+            self._counters['rebuilds'] += 1
+
+    def catch_up(self):
+        """
+        Add the values of rows created since the filter's watermark, if the table's
+        max(created_at) moved. Reads the watermark at most once per watermark_seconds.
+        """
+        with self._lock:
+            now = self.clock()
+            if (self._filter is None or self._watermark_checked_at is not None
+                    and now - self._watermark_checked_at < self.watermark_seconds):
+                return
+            self._watermark_checked_at = now
+            seen = self._watermark
+
+        latest = db.session.execute(select(func.max(self.created_at))).scalar()
+        if latest is None or (seen is not None and latest <= seen):
+            return
+        statement = select(self.column).where(self.column.isnot(None))
+        if seen is not None:
+            statement = statement.where(self.created_at > seen - WATERMARK_OVERLAP)
+        values = [normalize(value) for (value,) in db.session.execute(statement)]
+
+        with self._lock:
+            bloom = self._filter
+            # Values re-read from the overlap are already in the filter; skipping them
+            # keeps its count (and the capacity check) honest
+            for value in values:
+                if value and value not in bloom:
+                    bloom.add(value)
+            if self._watermark is None or latest > self._watermark:
+                self._watermark = latest
+            self._counters['catch_ups'] += 1
+
+    def add(self, values):
+        """Record values written to the table."""
+        with self._lock:
+            for value in map(normalize, values):
+                if not value:
+                    continue
+                if self._filter is not None:
+                    self._filter.add(value)
+                if self._pending is not None:
+                    self._pending.append(value)
+
+    def needs_build(self):
+        with self._lock:
+            if self._building:
+                return False
+            if self._filter is None:
+                return True
+            return (self.clock() - self._built_at > self.resync_seconds
+                    or self._filter.count > self._filter.capacity)
+
+    def is_taken(self, value):
+        """Whether a row already has this value. Hits the database only on a possible match."""
+        value = normalize(value)
+        if not value:
+            return False
+        if self.needs_build():
+            _schedule_build(self)
+        self.catch_up()
+
+        bloom = self._filter
+        with self._lock:
+            self._counters['checks'] += 1
+            if bloom is not None and value not in bloom:
+                self._counters['answered_from_memory'] += 1
+                return False
+            self._counters['confirm_queries'] += 1
+
+        taken = db.session.execute(select(literal(1)).where(self.column == value).limit(1)).first() is not None
+        if bloom is not None and not taken:
+            with self._lock:
+                self._counters['false_positives'] += 1
+        return taken
+
+    def stats(self):
+        with self._lock:
+            bloom = self._filter
+            return {
+                **self._counters,
+                'values': bloom.count if bloom else None,
+                'capacity': bloom.capacity if bloom else None,
+                'memory_bytes': len(bloom.bits) if bloom else 0,
+                'age_seconds': round(self.clock() - self._built_at, 1) if self._built_at is not None else None,
+            }
+
+
+UNIQUE_FIELDS = {
+    'customers.cnic': UniquenessIndex(Customer, 'cnic'),
+    'customers.internet_id': UniquenessIndex(Customer, 'internet_id'),
+    'users.cnic': UniquenessIndex(User, 'cnic'),
+    'users.username': UniquenessIndex(User, 'username'),
+    'vendors.cnic': UniquenessIndex(Vendor, 'cnic'),
+}
+
+
+def _indexes_of(model):
+    return [index for index in UNIQUE_FIELDS.values() if index.model is model]
+
+
+def record_values(model, rows):
+    """
+    Add the unique values of rows written without the session (e.g. Core insert()).
+
+    Args:
+        model: Model the rows were written to
+        rows: dicts of column name -> value
+    """
+    for index in _indexes_of(model):
+        index.add(row.get(index.column_name) for row in rows)
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='uniqueness')
+        return _executor
+
+
+def _build_in_app(app, index):
+    with app.app_context():
+        try:
+            index.build()
+        except Exception as e:
+            logger.error(f"Rebuilding the {index.model.__tablename__}.{index.column_name} uniqueness index failed: {str(e)}")
+        finally:
+            with index._lock:
+                index._building = False
+            db.session.remove()
+
+
+def _schedule_build(index):
+    with index._lock:
+        if index._building:
+            return
+        index._building = True
+    app = current_app._get_current_object()
+    if db.engine.dialect.name == 'sqlite':
+        # In-memory SQLite databases are per connection; build in the caller's context
+        try:
+            index.build()
+        finally:
+            with index._lock:
+                index._building = False
+    else:
+        _get_executor(app).submit(_build_in_app, app, index)
+
+
+def _collect_unique_values(session, flush_context, instances):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in (*session.new, *session.dirty):
+        for index in _indexes_of(type(obj)):
+            value = getattr(obj, index.column_name, None)
+            if value is not None:
+                pending.append((index, value))
+
+
+def _add_committed_values(session):
+    for index, value in session.info.pop(_PENDING_KEY, ()):
+        index.add([value])
+
+
+def _discard_unique_values(session, previous_transaction=None):
+    session.info.pop(_PENDING_KEY, None)
+
+
+_listeners_installed = False
+
+
+def install_uniqueness_listeners():
+    """
+    Add the unique values of rows written through the session to the filters when their
+    transaction commits. Installed once per process.
+    """
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Session, 'before_flush', _collect_unique_values)
+    event.listen(Session, 'after_commit', _add_committed_values)
+    event.listen(Session, 'after_soft_rollback', _discard_unique_values)
+    _listeners_installed = True
+
+
+# (entity path, check name) -> indexed field, served as GET /<entity>/<check>/<value>
+CHECK_ROUTES = {
+    ('customers', 'check-cnic'): 'customers.cnic',
+    ('customers', 'check-internet-id'): 'customers.internet_id',
+    ('employees', 'check-cnic'): 'users.cnic',
+    ('employees', 'check-username'): 'users.username',
+    ('vendors', 'check-cnic'): 'vendors.cnic',
+}
+
+uniqueness_bp = Blueprint('uniqueness_index', __name__)
+
+
+def check_available(field, value):
+    return jsonify({'available': not UNIQUE_FIELDS[field].is_taken(value)}), 200
+
+
+def _bound_check_view(field):
+    @jwt_required()
+    def view(**kwargs):
+        value = next(iter(kwargs.values()), None)
+        return check_available(field, value)
+    view.__name__ = f"check_{field.replace('.', '_')}_available"
+    return view
+
+
+for (_entity, _check), _field in CHECK_ROUTES.items():
+    uniqueness_bp.add_url_rule(f"/{_entity}/{_check}/<path:value>", view_func=_bound_check_view(_field),
+                               methods=['GET'])
+
+
+@uniqueness_bp.route('/uniqueness/stats', methods=['GET'])
+@jwt_required()
+def get_uniqueness_stats():
+    if get_jwt().get('role') not in ('super_admin', 'company_owner'):
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify({field: index.stats() for field, index in UNIQUE_FIELDS.items()}), 200
+
+
+def init_uniqueness_index(app):
+    """
+    Answer the availability checks in CHECK_ROUTES from the uniqueness index, install the
+    listeners that keep it current and register the stats endpoint. Existing check routes
+    are pointed at the index.
+
+    Args:
+        app: Flask application instance
+    """
+    for index in UNIQUE_FIELDS.values():
+        index.configure(
+            false_positive_rate=app.config.get('UNIQUENESS_FALSE_POSITIVE_RATE', DEFAULT_FALSE_POSITIVE_RATE),
+            resync_seconds=app.config.get('UNIQUENESS_RESYNC_SECONDS', DEFAULT_RESYNC_SECONDS),
+            watermark_seconds=app.config.get('UNIQUENESS_WATERMARK_SECONDS', DEFAULT_WATERMARK_SECONDS),
+        )
+    install_uniqueness_listeners()
+
+    for rule in list(app.url_map.iter_rules()):
+        parts = rule.rule.strip('/').split('/')
+        if len(parts) == 3 and (parts[0], parts[1]) in CHECK_ROUTES and len(rule.arguments) == 1:
+            app.view_functions[rule.endpoint] = _bound_check_view(CHECK_ROUTES[(parts[0], parts[1])])
+
+    app.register_blueprint(uniqueness_bp)
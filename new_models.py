@@ -1,7 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 import uuid
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy.dialects.postgresql import UUID, ENUM
+from sqlalchemy.dialects.postgresql import UUID, ENUM, JSONB
 from app import db
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -81,6 +81,11 @@ class User(db.Model):
     ledger_entries = relationship('EmployeeLedger', back_populates='employee', lazy='dynamic')
     managed_customers = relationship('Customer', back_populates='technician', foreign_keys='Customer.technician_id')
 
+    __table_args__ = (
+        # Catch-up of the availability checks (see uniqueness_index.py)
+        db.Index('idx_users_created_at', 'created_at'),
+    )
+
 class Area(db.Model):
     __tablename__ = 'areas'
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -173,6 +178,11 @@ class Customer(db.Model):
     stb_serial_number = db.Column(db.String(50))
     discount_amount = db.Column(db.Float)
     recharge_date = db.Column(db.Date)
+    # month * 100 + day of recharge_date, computed by the database so the daily billing query can use an index
+    recharge_day_key = db.Column(
+        db.SmallInteger,
+        db.Computed(db.cast(db.extract('month', recharge_date) * 100 + db.extract('day', recharge_date), db.SmallInteger), persisted=True)
+    )
     miscellaneous_details = db.Column(db.Text)
     miscellaneous_charges = db.Column(db.Float)
     gps_coordinates = db.Column(db.String(50))
@@ -187,6 +197,20 @@ class Customer(db.Model):
     inventory_assignments = relationship('InventoryAssignment', back_populates='customer')
     packages = relationship('CustomerPackage', back_populates='customer', lazy='dynamic')
 
+    __table_args__ = (
+        db.Index('idx_customers_recharge_day_key', 'recharge_day_key', 'company_id', postgresql_where=db.text('is_active')),
+        # Keyset pagination (see pagination.py)
+        db.Index('idx_customers_company_installation_id', 'company_id', 'installation_date', 'id'),
+        # Typeahead search (see customer_search.py); idx_customers_name_trgm on
+        # (first_name || ' ' || last_name) only exists in the migration
+        db.Index('idx_customers_internet_id_trgm', 'internet_id', postgresql_using='gin', postgresql_ops={'internet_id': 'gin_trgm_ops'}),
+        db.Index('idx_customers_cnic_trgm', 'cnic', postgresql_using='gin', postgresql_ops={'cnic': 'gin_trgm_ops'}),
+        db.Index('idx_customers_phone_1_trgm', 'phone_1', postgresql_using='gin', postgresql_ops={'phone_1': 'gin_trgm_ops'}),
+        db.Index('idx_customers_installation_address_trgm', 'installation_address', postgresql_using='gin', postgresql_ops={'installation_address': 'gin_trgm_ops'}),
+        # Catch-up of the availability checks (see uniqueness_index.py)
+        db.Index('idx_customers_created_at', 'created_at'),
+    )
+
 
 class CustomerPackage(db.Model):
     """Junction table linking customers to multiple service plans (packages)"""
@@ -224,6 +248,9 @@ class Invoice(db.Model):
     created_at = db.Column(db.TIMESTAMP(timezone=True), server_default=db.func.current_timestamp())
     updated_at = db.Column(db.TIMESTAMP(timezone=True), onupdate=db.func.current_timestamp())
     is_active = db.Column(db.Boolean, default=True)
+    # Sum of counted payments, maintained incrementally by invoice_balances.py
+    paid_amount = db.Column(db.Numeric(10, 2), nullable=False, default=0, server_default='0')
+    remaining_amount = db.Column(db.Numeric(10, 2), db.Computed(total_amount - paid_amount, persisted=True))
 
     # Relationships
     company = relationship('Company', back_populates='invoices')
@@ -231,6 +258,13 @@ class Invoice(db.Model):
     generator = relationship('User', backref='generated_invoices')
     line_items = relationship('InvoiceLineItem', back_populates='invoice', lazy='dynamic')
 
+    __table_args__ = (
+        db.Index('idx_invoices_open_due', 'company_id', 'due_date', postgresql_where=db.text('remaining_amount > 0')),
+        # Keyset pagination (see pagination.py)
+        db.Index('idx_invoices_company_billing_start_id', 'company_id', 'billing_start_date', 'id'),
+        db.Index('idx_invoices_company_due_date_id', 'company_id', 'due_date', 'id'),
+    )
+
 
 class InvoiceLineItem(db.Model):
     """Line items for invoices - supports both packages and equipment"""
@@ -275,6 +309,11 @@ class Payment(db.Model):
     bank_account = db.relationship('BankAccount', backref=db.backref('payments', lazy=True))
     invoice = db.relationship('Invoice', backref=db.backref('payments', lazy=True))
     receiver = db.relationship('User', backref=db.backref('received_payments', lazy=True))
+
+    __table_args__ = (
+        # Keyset pagination (see pagination.py)
+        db.Index('idx_payments_company_payment_date_id', 'company_id', 'payment_date', 'id'),
+    )
     
 class ISPPayment(db.Model):
     __tablename__ = 'isp_payments'
@@ -333,6 +372,67 @@ class BankAccount(db.Model):
     
     company = relationship('Company', backref=db.backref('bank_accounts', lazy=True))
 
+class BankAccountJournal(db.Model):
+    """
+    Append-only ledger of every posting to a bank account. Rows are never updated:
+    a changed or cancelled source record posts a reversing entry. Written by bank_journal.py.
+    """
+    __tablename__ = 'bank_account_journal'
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = db.Column(UUID(as_uuid=True), db.ForeignKey('companies.id'))
+    bank_account_id = db.Column(UUID(as_uuid=True), db.ForeignKey('bank_accounts.id'), nullable=False)
+    entry_date = db.Column(db.TIMESTAMP(timezone=True), nullable=False)  # When the money moved
+    amount = db.Column(db.Numeric(15, 2), nullable=False)  # Positive credits, negative debits
+    source_type = db.Column(db.String(30), nullable=False)  # opening, payment, isp_payment, expense, extra_income, transfer_in, transfer_out
+    source_id = db.Column(UUID(as_uuid=True))
+    description = db.Column(db.String(255))
+    created_at = db.Column(db.TIMESTAMP(timezone=True), server_default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.Index('idx_bank_journal_account_date', 'bank_account_id', 'entry_date', 'id'),
+        db.Index('idx_bank_journal_source', 'source_type', 'source_id'),
+    )
+
+class BankAccountCheckpoint(db.Model):
+    """Balance of a bank account from all journal entries dated before `as_of`."""
+    __tablename__ = 'bank_account_checkpoints'
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    bank_account_id = db.Column(UUID(as_uuid=True), db.ForeignKey('bank_accounts.id'), nullable=False)
+    as_of = db.Column(db.TIMESTAMP(timezone=True), nullable=False)
+    balance = db.Column(db.Numeric(15, 2), nullable=False)
+    created_at = db.Column(db.TIMESTAMP(timezone=True), server_default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.UniqueConstraint('bank_account_id', 'as_of', name='uq_bank_checkpoint_account_as_of'),
+    )
+
+class FinancialDailyRollup(db.Model):
+    """
+    Daily totals per company, bank account and category, maintained incrementally by
+    financial_rollups.py. Dashboards sum these rows instead of the raw transactions.
+    """
+    __tablename__ = 'financial_daily_rollups'
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = db.Column(UUID(as_uuid=True), db.ForeignKey('companies.id'), nullable=False)
+    bank_account_id = db.Column(UUID(as_uuid=True))  # NULL for cash / no bank account
+    day = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(20), nullable=False)  # invoiced, collection, isp_payment, expense, extra_income, bandwidth_cost, bandwidth_gb
+    subcategory = db.Column(db.String(100), nullable=False, default='')  # Payment method, ISP payment type, expense/income type id, invoice type
+    amount = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    txn_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.TIMESTAMP(timezone=True), server_default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.Index('idx_financial_rollups_company_day', 'company_id', 'day'),
+        # One row per key; cash rows (no bank account) get their own index as NULLs never conflict
+        db.Index('uq_financial_rollups_account_key', 'company_id', 'bank_account_id', 'day', 'category', 'subcategory',
+                 unique=True, postgresql_where=db.text('bank_account_id IS NOT NULL'),
+                 sqlite_where=db.text('bank_account_id IS NOT NULL')),
+        db.Index('uq_financial_rollups_cash_key', 'company_id', 'day', 'category', 'subcategory',
+                 unique=True, postgresql_where=db.text('bank_account_id IS NULL'),
+                 sqlite_where=db.text('bank_account_id IS NULL')),
+    )
+
 class InternalTransfer(db.Model):
     __tablename__ = 'internal_transfers'
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -391,8 +491,8 @@ class InventoryItem(db.Model):
     item_type = db.Column(db.String(50), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
     
-    # Type-specific fields stored in JSON
-    attributes = db.Column(db.JSON)
+    # Type-specific fields stored in JSON (JSONB on Postgres)
+    attributes = db.Column(db.JSON().with_variant(JSONB, 'postgresql'))
     
     # Relationships
     company = relationship('Company', back_populates='inventory_items')
@@ -400,6 +500,12 @@ class InventoryItem(db.Model):
     assignments = relationship('InventoryAssignment', back_populates='inventory_item')
     transactions = relationship('InventoryTransaction', back_populates='inventory_item')
 
+    __table_args__ = (
+        # Inventory search (see inventory_search.py); the trigram indexes on
+        # attributes->>'serial_number' and attributes->>'mac_address' only exist in the migration
+        db.Index('idx_inventory_items_item_type_trgm', 'item_type', postgresql_using='gin', postgresql_ops={'item_type': 'gin_trgm_ops'}),
+    )
+
 class InventoryAssignment(db.Model):
     __tablename__ = 'inventory_assignments'
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -416,6 +522,11 @@ class InventoryAssignment(db.Model):
     customer = relationship('Customer', back_populates='inventory_assignments')
     employee = relationship('User', back_populates='inventory_assignments')
 
+    __table_args__ = (
+        # Open assignments, for the unassigned filter of inventory_search.py
+        db.Index('idx_inventory_assignments_open', 'inventory_item_id', postgresql_where=db.text("status = 'assigned' AND returned_at IS NULL")),
+    )
+
 
 
 class InventoryTransaction(db.Model):
@@ -461,11 +572,19 @@ class Vendor(db.Model):
     cnic_front_image = db.Column(db.String(500))  # Path to front CNIC image
     cnic_back_image = db.Column(db.String(500))  # Path to back CNIC image
     agreement_document = db.Column(db.String(500))  # Path to agreement document
+    # The vendor's own Company account, whose dashboards the managing company may view
+    vendor_company_id = db.Column(UUID(as_uuid=True), db.ForeignKey('companies.id'), nullable=True)
     created_at = db.Column(db.TIMESTAMP(timezone=True), server_default=db.func.current_timestamp())
     updated_at = db.Column(db.TIMESTAMP(timezone=True), server_default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
     is_active = db.Column(db.Boolean, default=True)
     
-    company = relationship('Company', backref=db.backref('vendors', lazy=True))
+    company = relationship('Company', backref=db.backref('vendors', lazy=True), foreign_keys=[company_id])
+    vendor_company = relationship('Company', foreign_keys=[vendor_company_id])
+
+    __table_args__ = (
+        db.Index('idx_vendors_company_vendor_company', 'company_id', 'vendor_company_id'),
+        db.Index('idx_vendors_created_at', 'created_at'),
+    )
 
 class Contract(db.Model):
     __tablename__ = 'contracts'
@@ -575,6 +694,11 @@ class DetailedLog(db.Model):
     user = relationship('User', backref=db.backref('detailed_logs', lazy=True))
     companies = relationship('Company', backref=db.backref('detailed_logs', lazy=True))
 
+    __table_args__ = (
+        # Keyset pagination (see pagination.py)
+        db.Index('idx_detailed_logs_company_created_id', 'company_id', 'created_at', 'id'),
+    )
+
 
 class ISP(db.Model):
     __tablename__ = 'isps'
@@ -867,3 +991,103 @@ class EmployeeLedger(db.Model):
     # Relationships
     company = relationship('Company')
     employee = relationship('User', back_populates='ledger_entries')
+
+
+class JobRun(db.Model):
+    """
+    One execution of a scheduled (APScheduler) job, with counts, per-phase timings and
+    the number of SQL statements it issued. Written by job_runs.JobRunRecorder.
+    """
+    __tablename__ = 'job_runs'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_id = db.Column(db.String(100), nullable=False)
+    job_name = db.Column(db.String(255))
+    hostname = db.Column(db.String(255))
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, succeeded, failed
+    started_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False)
+    finished_at = db.Column(db.TIMESTAMP(timezone=True))
+    duration_ms = db.Column(db.Integer)
+
+    # Work counters
+    rows_scanned = db.Column(db.Integer, default=0)
+    created_count = db.Column(db.Integer, default=0)
+    skipped_count = db.Column(db.Integer, default=0)
+    failed_count = db.Column(db.Integer, default=0)
+    statement_count = db.Column(db.Integer, default=0)
+
+    phase_durations = db.Column(db.JSON)  # {"select": 120.5, "insert": 980.1} in milliseconds
+    details = db.Column(db.JSON)  # Job specific results, e.g. per-shard billing results
+    budget_ms = db.Column(db.Integer)  # Latency budget in effect for this run
+    error_message = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('idx_job_runs_job_started', 'job_id', 'started_at'),
+    )
+
+    def __repr__(self):
+        return f'<JobRun {self.job_id} {self.started_at} {self.status}>'
+
+
+class SingleFlightResult(db.Model):
+    """
+    Short-lived response of a coalesced request, shared with identical requests waiting in
+    other workers. Written by single_flight.run_across_workers(). The migration creates it
+    UNLOGGED in Postgres; the model carries no prefix so create_all() works on SQLite.
+    """
+    __tablename__ = 'single_flight_results'
+
+    key = db.Column(db.String(512), primary_key=True)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    content_type = db.Column(db.String(100))
+    created_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False, server_default=db.func.current_timestamp())
+
+
+class ExportJob(db.Model):
+    """
+    A background /<entity>/export run and the file it produced. Written by export_jobs.py;
+    finished jobs with the same cache_key share their artifact until it expires.
+    """
+    __tablename__ = 'export_jobs'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = db.Column(UUID(as_uuid=True), db.ForeignKey('companies.id'), nullable=True)  # None for super_admin exports
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=True)
+    entity = db.Column(db.String(50), nullable=False)
+    format = db.Column(db.String(10), nullable=False)
+    access = db.Column(db.String(10), nullable=False, default='company')  # PageSpec.access level the rows were read with
+    params = db.Column(db.JSON)  # sort, q, filter_<name> and fields of the export
+    cache_key = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    total_rows = db.Column(db.Integer)  # Row count (possibly estimated) for progress
+    rows_written = db.Column(db.Integer, default=0)
+    file_path = db.Column(db.String(500))
+    file_size = db.Column(db.BigInteger)
+    error_message = db.Column(db.Text)
+    created_at = db.Column(db.TIMESTAMP(timezone=True), server_default=db.func.current_timestamp())
+    started_at = db.Column(db.TIMESTAMP(timezone=True))
+    finished_at = db.Column(db.TIMESTAMP(timezone=True))
+    expires_at = db.Column(db.TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        db.Index('idx_export_jobs_cache_key', 'cache_key', 'status'),
+        db.Index('idx_export_jobs_company_created', 'company_id', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<ExportJob {self.entity} {self.format} {self.status}>'
+
+
+class ClosedMonth(db.Model):
+    """
+    A company's financial month whose rows are served from a Parquet snapshot (see
+    month_snapshots.py). The row is the source of truth on every host: a write into the month
+    deletes it in the writer's transaction, and a snapshot whose manifest carries a different
+    snapshot_id is never read.
+    """
+    __tablename__ = 'closed_months'
+
+    company_id = db.Column(UUID(as_uuid=True), db.ForeignKey('companies.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    snapshot_id = db.Column(UUID(as_uuid=True), nullable=False)
+    closed_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False, server_default=db.func.current_timestamp())
@@ -1,5 +1,7 @@
-import { useState, useMemo } from "react"
+import { useState, useMemo, useEffect } from "react"
 import { Search, Users, Hash, ChevronDown } from "lucide-react"
+import axiosInstance from "../utils/axiosConfig.ts"
+import { getToken } from "../utils/auth.ts"
 
 interface Customer {
   id: string
@@ -8,7 +10,8 @@ interface Customer {
 }
 
 interface SearchableCustomerSelectProps {
-  customers: Customer[]
+  // Without a customers list, matches are fetched from /customers/search as the user types
+  customers?: Customer[]
   value: string
   onChange: (e: React.ChangeEvent<HTMLSelectElement>) => void
   onCustomerSelect?: (customerId: string) => void
@@ -26,8 +29,52 @@ export function SearchableCustomerSelect({
 }: SearchableCustomerSelectProps) {
   const [searchTerm, setSearchTerm] = useState("")
   const [isOpen, setIsOpen] = useState(false)
-  
+  const [matches, setMatches] = useState<Customer[]>([])
+  const [selectedMatch, setSelectedMatch] = useState<Customer | null>(null)
+  const serverSearch = customers === undefined
+
+  const toCustomer = (customer: any): Customer => ({
+    id: customer.id,
+    name: customer.name,
+    internetId: customer.internet_id,
+  })
+
+  useEffect(() => {
+    if (!serverSearch) return
+    const term = searchTerm.trim()
+    if (!term) {
+      setMatches([])
+      return
+    }
+    // Debounced so only the last keystroke of a burst hits the server
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axiosInstance.get("/customers/search", {
+          headers: { Authorization: `Bearer ${getToken()}` },
+          params: { q: term, limit: 20 },
+        })
+        setMatches(response.data.map(toCustomer))
+      } catch (error) {
+        console.error("Failed to search customers", error)
+      }
+    }, 200)
+    return () => clearTimeout(timer)
+  }, [searchTerm, serverSearch])
+
+  useEffect(() => {
+    if (!serverSearch || !value || selectedMatch?.id === value) return
+    // Label a value chosen before this component mounted (e.g. when editing)
+    axiosInstance
+      .get("/customers/search", {
+        headers: { Authorization: `Bearer ${getToken()}` },
+        params: { id: value },
+      })
+      .then((response) => setSelectedMatch(response.data.length ? toCustomer(response.data[0]) : null))
+      .catch((error) => console.error("Failed to load customer", error))
+  }, [value, serverSearch])
+
   const filteredCustomers = useMemo(() => {
+    if (serverSearch) return matches;
     if (!searchTerm) return customers;
   
     return customers.filter(customer => 
@@ -35,11 +82,16 @@ export function SearchableCustomerSelect({
       (customer.internetId?.toLowerCase() || "").includes(searchTerm.toLowerCase()) ||
       (customer.id?.toLowerCase() || "").includes(searchTerm.toLowerCase())
     );
-  }, [customers, searchTerm]);
+  }, [customers, searchTerm, serverSearch, matches]);
 
-  const selectedCustomer = customers.find(customer => customer.id === value)
+  const selectedCustomer = serverSearch
+    ? (selectedMatch?.id === value ? selectedMatch : undefined)
+    : customers.find(customer => customer.id === value)
   
   const handleCustomerSelect = (customerId: string) => {
+    if (serverSearch) {
+      setSelectedMatch(matches.find((customer) => customer.id === customerId) || null)
+    }
     if (onCustomerSelect) {
       onCustomerSelect(customerId)
     } else {
@@ -119,7 +171,7 @@ export function SearchableCustomerSelect({
             {filteredCustomers.length === 0 ? (
               <div className="p-4 text-center text-slate-gray text-sm">
                 <Search className="h-8 w-8 mx-auto mb-2 text-slate-gray/40" />
-                <p>No customers found matching "{searchTerm}"</p>
+                <p>{searchTerm ? `No customers found matching "${searchTerm}"` : "Type a name, internet ID, CNIC or phone number"}</p>
               </div>
             ) : (
               filteredCustomers.map((customer) => (
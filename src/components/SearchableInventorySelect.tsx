@@ -1,7 +1,9 @@
 "use client"
 
-import { useState, useMemo } from "react"
+import { useState, useMemo, useEffect } from "react"
 import { Search, Package, DollarSign, ChevronDown, Box } from "lucide-react"
+import axiosInstance from "../utils/axiosConfig.ts"
+import { getToken } from "../utils/auth.ts"
 
 interface InventoryItem {
     id: string
@@ -9,14 +11,20 @@ interface InventoryItem {
     quantity: number
     unit_price: number | null
     vendor_name?: string
+    serial_number?: string | null
+    mac_address?: string | null
 }
 
 interface SearchableInventorySelectProps {
-    items: InventoryItem[]
+    // Without an items list, matches are fetched from /inventory/search as the user types
+    items?: InventoryItem[]
     excludeIds?: string[]
-    onItemSelect: (itemId: string) => void
+    onItemSelect: (itemId: string, item?: InventoryItem) => void
     isLoading?: boolean
     placeholder?: string
+    // Server search only: leave out items with an open assignment / with no stock
+    unassignedOnly?: boolean
+    inStockOnly?: boolean
 }
 
 export function SearchableInventorySelect({
@@ -24,26 +32,63 @@ export function SearchableInventorySelect({
     excludeIds = [],
     onItemSelect,
     isLoading = false,
-    placeholder = "Search and select inventory item"
+    placeholder = "Search and select inventory item",
+    unassignedOnly = false,
+    inStockOnly = false
 }: SearchableInventorySelectProps) {
     const [searchTerm, setSearchTerm] = useState("")
     const [isOpen, setIsOpen] = useState(false)
+    const [matches, setMatches] = useState<InventoryItem[]>([])
+    const [nextCursor, setNextCursor] = useState<string | null>(null)
+    const [isSearching, setIsSearching] = useState(false)
+    const serverSearch = items === undefined
+
+    const searchParams = (cursor?: string | null) => ({
+        q: searchTerm.trim() || undefined,
+        unassigned: unassignedOnly || undefined,
+        in_stock: inStockOnly || undefined,
+        page_size: 20,
+        cursor: cursor || undefined,
+    })
+
+    const fetchMatches = async (cursor?: string | null) => {
+        setIsSearching(true)
+        try {
+            const response = await axiosInstance.get("/inventory/search", {
+                headers: { Authorization: `Bearer ${getToken()}` },
+                params: searchParams(cursor),
+            })
+            setMatches((previous) => (cursor ? [...previous, ...response.data.items] : response.data.items))
+            setNextCursor(response.data.next_cursor)
+        } catch (error) {
+            console.error("Failed to search inventory", error)
+        } finally {
+            setIsSearching(false)
+        }
+    }
+
+    useEffect(() => {
+        if (!serverSearch || !isOpen) return
+        // Debounced so only the last keystroke of a burst hits the server
+        const timer = setTimeout(() => fetchMatches(), 200)
+        return () => clearTimeout(timer)
+    }, [searchTerm, serverSearch, isOpen, unassignedOnly, inStockOnly])
 
     const availableItems = useMemo(() => {
-        return items.filter(item => !excludeIds.includes(item.id))
-    }, [items, excludeIds])
+        return (serverSearch ? matches : items).filter(item => !excludeIds.includes(item.id))
+    }, [items, matches, serverSearch, excludeIds])
 
     const filteredItems = useMemo(() => {
-        if (!searchTerm) return availableItems;
+        if (serverSearch || !searchTerm) return availableItems;
 
         return availableItems.filter(item =>
             (item.item_type?.toLowerCase() || "").includes(searchTerm.toLowerCase()) ||
             (item.vendor_name?.toLowerCase() || "").includes(searchTerm.toLowerCase())
         );
-    }, [availableItems, searchTerm]);
+    }, [availableItems, searchTerm, serverSearch]);
 
     const handleItemSelect = (itemId: string) => {
-        onItemSelect(itemId)
+        onItemSelect(itemId, availableItems.find(item => item.id === itemId))
         setIsOpen(false)
         setSearchTerm("")
     }
@@ -77,7 +122,7 @@ export function SearchableInventorySelect({
                             <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 h-4 w-4 text-slate-gray/60" />
                             <input
                                 type="text"
-                                placeholder="Search by item type or vendor..."
+                                placeholder={serverSearch ? "Search by item type, serial number or MAC..." : "Search by item type or vendor..."}
                                 value={searchTerm}
                                 onChange={(e) => setSearchTerm(e.target.value)}
                                 className="w-full pl-9 pr-3 py-2 border border-slate-gray/20 rounded-md focus:outline-none focus:ring-2 focus:ring-electric-blue/30 focus:border-transparent"
@@ -91,7 +136,7 @@ export function SearchableInventorySelect({
                         {filteredItems.length === 0 ? (
                             <div className="p-4 text-center text-slate-gray text-sm">
                                 <Search className="h-8 w-8 mx-auto mb-2 text-slate-gray/40" />
-                                <p>{searchTerm ? `No items found matching "${searchTerm}"` : "No items available"}</p>
+                                <p>{isSearching ? "Searching..." : searchTerm ? `No items found matching "${searchTerm}"` : "No items available"}</p>
                             </div>
                         ) : (
                             filteredItems.map((item) => (
@@ -113,6 +158,11 @@ export function SearchableInventorySelect({
                                                         {item.vendor_name}
                                                     </span>
                                                 )}
+                                                {(item.serial_number || item.mac_address) && (
+                                                    <span className="text-xs text-slate-gray/70 block">
+                                                        {[item.serial_number, item.mac_address].filter(Boolean).join(" · ")}
+                                                    </span>
+                                                )}
                                             </div>
                                         </div>
 
@@ -139,6 +189,16 @@ export function SearchableInventorySelect({
                                 </div>
                             ))
                         )}
+                        {serverSearch && nextCursor && (
+                            <button
+                                type="button"
+                                className="w-full p-2 text-sm text-electric-blue hover:bg-light-sky/50 rounded-md"
+                                onClick={() => fetchMatches(nextCursor)}
+                                disabled={isSearching}
+                            >
+                                {isSearching ? "Loading..." : "Load more"}
+                            </button>
+                        )}
                     </div>
                 </div>
             )}
@@ -58,9 +58,7 @@ export function InvoiceForm({ formData, handleInputChange, isEditing }: InvoiceF
   ])
 
   // Equipment invoice state
-  const [inventoryItems, setInventoryItems] = useState<InventoryItem[]>([])
   const [selectedEquipment, setSelectedEquipment] = useState<SelectedEquipment[]>([])
-  const [isLoadingInventory, setIsLoadingInventory] = useState(false)
 
   // Get current invoice type
   const currentInvoiceType = formData.invoice_type || "subscription"
@@ -110,21 +108,6 @@ export function InvoiceForm({ formData, handleInputChange, isEditing }: InvoiceF
     }
   }
 
-  const fetchInventoryItems = async () => {
-    try {
-      setIsLoadingInventory(true)
-      const token = getToken()
-      const response = await axiosInstance.get("/inventory/list", {
-        headers: { Authorization: `Bearer ${token}` },
-      })
-      setInventoryItems(response.data.filter((item: InventoryItem) => item.quantity > 0))
-    } catch (error) {
-      console.error("Failed to fetch inventory items", error)
-    } finally {
-      setIsLoadingInventory(false)
-    }
-  }
-
   const updatePrices = (customer: Customer) => {
     if (currentInvoiceType !== "subscription") return
 
@@ -193,16 +176,14 @@ export function InvoiceForm({ formData, handleInputChange, isEditing }: InvoiceF
       }
     }
 
-    // If switching to equipment, fetch inventory items
+    // Equipment is searched from /inventory/search by SearchableInventorySelect
     if (newType === "equipment") {
-      fetchInventoryItems()
       setSelectedEquipment([])
     }
   }
 
   // Equipment invoice handlers
-  const handleAddEquipment = (itemId: string) => {
-    const item = inventoryItems.find(i => i.id === itemId)
+  const handleAddEquipment = (itemId: string, item?: InventoryItem) => {
     if (!item) return
 
     const existing = selectedEquipment.find(e => e.id === itemId)
@@ -768,10 +749,9 @@ export function InvoiceForm({ formData, handleInputChange, isEditing }: InvoiceF
           <div className="space-y-2">
             <label className="block text-sm font-medium text-slate-gray">Add Item</label>
             <SearchableInventorySelect
-              items={inventoryItems}
               excludeIds={selectedEquipment.map(e => e.id)}
               onItemSelect={handleAddEquipment}
-              isLoading={isLoadingInventory}
+              inStockOnly
               placeholder="Search and select equipment to add..."
             />
           </div>
@@ -839,7 +819,7 @@ export function InvoiceForm({ formData, handleInputChange, isEditing }: InvoiceF
             </div>
           )}
 
-          {selectedEquipment.length === 0 && !isLoadingInventory && (
+          {selectedEquipment.length === 0 && (
             <p className="text-sm text-slate-gray/70 italic">No equipment selected. Use the dropdown above to add items.</p>
           )}
         </div>
@@ -127,6 +127,7 @@ export function PaymentForm({ formData, handleInputChange, isEditing }: PaymentF
       const token = getToken()
       const response = await axiosInstance.get("/invoices/list", {
         headers: { Authorization: `Bearer ${token}` },
+        params: { fields: "id,invoice_number,customer_name,internet_id,total_amount,due_date,status,billing_start_date,billing_end_date" },
       })
 
       // When editing, show all invoices (including the one being edited)
@@ -142,7 +143,7 @@ export function PaymentForm({ formData, handleInputChange, isEditing }: PaymentF
           id: invoice.id,
           invoice_number: invoice.invoice_number,
           customer_name: invoice.customer_name,
-          customer_internet_id: invoice.customer_internet_id || "N/A",
+          customer_internet_id: invoice.internet_id || "N/A",
           total_amount: invoice.total_amount,
           due_date: invoice.due_date,
           status: invoice.status,
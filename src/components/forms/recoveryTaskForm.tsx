@@ -51,6 +51,7 @@ export function RecoveryTaskForm({
       const token = getToken()
       const response = await axiosInstance.get("/invoices/list", {
         headers: { Authorization: `Bearer ${token}` },
+        params: { fields: "id,invoice_number,customer_name,internet_id,total_amount,due_date,status,billing_start_date,billing_end_date" },
       })
       
       // Filter to show only pending/partially paid invoices for new recovery tasks
@@ -66,7 +67,7 @@ export function RecoveryTaskForm({
           id: invoice.id,
           invoice_number: invoice.invoice_number,
           customer_name: invoice.customer_name,
-          customer_internet_id: invoice.customer_internet_id || "N/A",
+          customer_internet_id: invoice.internet_id || "N/A",
           total_amount: invoice.total_amount,
           due_date: invoice.due_date,
           status: invoice.status,
@@ -13,12 +13,6 @@ interface Employee {
   last_name: string
 }
 
-interface Customer {
-  id: string
-  name: string
-  internetId: string
-}
-
 interface TaskFormProps {
   formData: any
   handleInputChange: (e: React.ChangeEvent<HTMLInputElement | HTMLTextAreaElement | HTMLSelectElement>) => void
@@ -27,9 +21,7 @@ interface TaskFormProps {
 
 export function TaskForm({ formData, handleInputChange, isEditing }: TaskFormProps) {
   const [employees, setEmployees] = useState<Employee[]>([])
-  const [customers, setCustomers] = useState<Customer[]>([])
   const [selectedEmployees, setSelectedEmployees] = useState<string[]>([])
-  const [isLoadingCustomers, setIsLoadingCustomers] = useState(false)
 
   useEffect(() => {
     const fetchData = async () => {
@@ -44,25 +36,6 @@ export function TaskForm({ formData, handleInputChange, isEditing }: TaskFormPro
       } catch (error) {
         console.error('Failed to fetch employees', error)
       }
-
-      // Fetch customers
-      try {
-        setIsLoadingCustomers(true)
-        const response = await axiosInstance.get('/customers/list', {
-          headers: { Authorization: `Bearer ${token}` }
-        })
-        setCustomers(
-          response.data.map((customer: any) => ({
-            id: customer.id,
-            name: `${customer.first_name} ${customer.last_name}`,
-            internetId: customer.internet_id,
-          }))
-        )
-      } catch (error) {
-        console.error('Failed to fetch customers', error)
-      } finally {
-        setIsLoadingCustomers(false)
-      }
     }
     
     fetchData()
@@ -152,22 +125,12 @@ export function TaskForm({ formData, handleInputChange, isEditing }: TaskFormPro
       {/* Customer Search (Optional) */}
       <div>
         <label className={labelClasses}>Customer (Optional)</label>
-        {isLoadingCustomers ? (
-          <div className="w-full pl-10 pr-10 py-2.5 border border-slate-gray/20 rounded-lg bg-light-sky/30 text-deep-ocean">
-            <div className="flex items-center justify-center">
-              <div className="animate-spin rounded-full h-5 w-5 border-t-2 border-b-2 border-electric-blue"></div>
-              <span className="ml-2 text-slate-gray/60">Loading customers...</span>
-            </div>
-          </div>
-        ) : (
-          <SearchableCustomerSelect
-            customers={customers}
-            value={formData.customer_id || ""}
-            onChange={(e) => handleInputChange(e)}
-            onCustomerSelect={handleCustomerSelect}
-            placeholder="Search and select customer (optional)"
-          />
-        )}
+        <SearchableCustomerSelect
+          value={formData.customer_id || ""}
+          onChange={(e) => handleInputChange(e)}
+          onCustomerSelect={handleCustomerSelect}
+          placeholder="Search and select customer (optional)"
+        />
       </div>
 
       {/* Priority and Due Date */}
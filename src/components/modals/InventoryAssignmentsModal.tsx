@@ -66,6 +66,7 @@ export const InventoryAssignmentsModal: React.FC<InventoryAssignmentsModalProps>
       const token = getToken()
       const response = await axiosInstance.get("/customers/list", {
         headers: { Authorization: `Bearer ${token}` },
+        params: { fields: "id,first_name,last_name" },
       })
       setCustomers(
         response.data.map((customer: any) => ({
@@ -1,7 +1,7 @@
 "use client"
 
 import type React from "react"
-import { useState, useEffect, useMemo, useCallback } from "react"
+import { useState, useEffect, useMemo, useCallback, useRef } from "react"
 import type { ColumnDef } from "@tanstack/react-table"
 import {
   Plus,
@@ -22,6 +22,7 @@ import { Sidebar } from "./sideNavbar.tsx"
 import { getToken } from "../utils/auth.ts"
 import { toast } from "react-toastify"
 import axiosInstance from "../utils/axiosConfig.ts"
+import { runExportJob } from "../utils/exportJobs.ts"
 
 interface CRUDPageProps<T> {
   title: string
@@ -59,6 +60,8 @@ export function CRUDPage<T extends { id: string; is_active?: boolean }>({
 
   const [pagination, setPagination] = useState({ pageIndex: 0, pageSize: 20 })
   const [pageCount, setPageCount] = useState<number>(0)
+  // Keyset cursors of the pages reached so far; only valid for one sort/search/filter combination
+  const cursorsRef = useRef<{ key: string; byPage: Record<number, string> }>({ key: "", byPage: {} })
   const [sorting, setSorting] = useState<{ id: string; desc: boolean }[]>([])
   const [globalSearch, setGlobalSearch] = useState("")
   const [columnFilters, setColumnFilters] = useState<{ id: string; value: string }[]>([])
@@ -100,15 +103,35 @@ export function CRUDPage<T extends { id: string; is_active?: boolean }>({
         if (f.value) params[`filter_${f.id}`] = f.value
       })
 
+      const queryKey = JSON.stringify([sorting, globalSearch, columnFilters, pagination.pageSize])
+      if (cursorsRef.current.key !== queryKey) {
+        cursorsRef.current = { key: queryKey, byPage: {} }
+      }
+      const cursor = cursorsRef.current.byPage[pagination.pageIndex]
+      if (cursor) {
+        // Adjacent pages are fetched by cursor; the total is already known
+        params.cursor = cursor
+        params.total = "none"
+        delete params.page
+      }
+
       const res = await axiosInstance.get(`/${endpoint}/page`, {
         headers: { Authorization: `Bearer ${token}` },
         params,
       })
       // Expected shape: { items: T[], total: number }
       setData(res.data.items || [])
-      const total = res.data.total || 0
-      setPageCount(Math.ceil(total / pagination.pageSize))
-      if (!stats.total || refreshTrigger > 0) {
+      const { byPage } = cursorsRef.current
+      if (res.data.next_cursor) byPage[pagination.pageIndex + 1] = res.data.next_cursor
+      if (res.data.prev_cursor && pagination.pageIndex > 0) byPage[pagination.pageIndex - 1] ??= res.data.prev_cursor
+      // total is null when it was skipped (total=none)
+      const total = res.data.total ?? null
+      if (total !== null) {
+        // Capped or estimated totals may be short of the real count: keep the next page reachable
+        const pages = Math.ceil(total / pagination.pageSize)
+        setPageCount(res.data.total_exact === false && res.data.has_more ? Math.max(pages, pagination.pageIndex + 2) : pages)
+      }
+      if (total !== null && (!stats.total || refreshTrigger > 0)) {
         // try lazy summary fill if backend doesn't provide /summary
         setStats((prev) => ({ ...prev, total }))
       }
@@ -351,31 +374,27 @@ export function CRUDPage<T extends { id: string; is_active?: boolean }>({
   }, [columns])
 
   const handleExport = async () => {
+    const sort = sorting[0]
+    const params: Record<string, any> = {
+      sort_by: sort?.id,
+      sort_dir: sort?.desc ? "desc" : "asc",
+      q: globalSearch || undefined,
+    }
+    columnFilters.forEach((f) => {
+      if (f.value) params[`filter_${f.id}`] = f.value
+    })
+
+    // Large exports run as a background job; poll it instead of holding one long request
+    const toastId = toast.info("Preparing export...", { autoClose: false })
     try {
-      const token = getToken()
-      const sort = sorting[0]
-      const params: Record<string, any> = {
-        sort_by: sort?.id,
-        sort_dir: sort?.desc ? "desc" : "asc",
-        q: globalSearch || undefined,
-      }
-      columnFilters.forEach((f) => {
-        if (f.value) params[`filter_${f.id}`] = f.value
-      })
-      const res = await axiosInstance.get(`/${endpoint}/export`, {
-        headers: { Authorization: `Bearer ${token}` },
-        params,
-        responseType: "blob",
+      await runExportJob(endpoint, params, "csv", (progress) => {
+        if (progress != null) {
+          toast.update(toastId, { render: `Preparing export... ${Math.round(progress * 100)}%` })
+        }
       })
-      const url = URL.createObjectURL(res.data)
-      const a = document.createElement("a")
-      a.href = url
-      a.download = `${title.toLowerCase()}-export.csv`
-      document.body.appendChild(a)
-      a.click()
-      a.remove()
-      URL.revokeObjectURL(url)
+      toast.dismiss(toastId)
     } catch (e) {
+      toast.dismiss(toastId)
       toast.error("Export failed", { style: { background: "#FEE2E2", color: "#EF4444" } })
     }
   }
@@ -6,8 +6,6 @@ import { useParams } from "react-router-dom"
 import { getToken, getAssetUrl } from "../utils/auth.ts"
 import { useCompany } from "../context/CompanyContext.tsx"
 import { useReactToPrint } from "react-to-print"
-import jsPDF from "jspdf"
-import html2canvas from "html2canvas"
 import axiosInstance from "../utils/axiosConfig.ts"
 import { Sidebar } from "../components/sideNavbar.tsx"
 import { Topbar } from "../components/topNavbar.tsx"
@@ -188,24 +186,24 @@ const InvoiceGenerationPage: React.FC = () => {
   const printInvoice = () => { try { handlePrint() } catch (error) { console.error("Error during print:", error); setError("An unexpected error occurred while printing. Please try again."); setIsPrinting(false) } }
 
   const handleDownloadPDF = async () => {
-    if (!printRef.current) return
+    if (!invoiceData) return
     setIsDownloading(true)
     setError(null)
     try {
-      const canvas = await html2canvas(printRef.current, { scale: 2, useCORS: true, allowTaint: true, backgroundColor: "#ffffff", width: printRef.current.scrollWidth, height: printRef.current.scrollHeight })
-      const imgData = canvas.toDataURL("image/jpeg", 0.8)
-      const pdf = new jsPDF("p", "mm", "a4")
-      const pdfWidth = pdf.internal.pageSize.getWidth()
-      const pdfHeight = pdf.internal.pageSize.getHeight()
-      const imgWidth = pdfWidth
-      const imgHeight = (canvas.height * pdfWidth) / canvas.width
-      let heightLeft = imgHeight
-      let position = 0
-      pdf.addImage(imgData, "JPEG", 0, position, imgWidth, imgHeight)
-      heightLeft -= pdfHeight
-      while (heightLeft >= 0) { position = heightLeft - imgHeight; pdf.addPage(); pdf.addImage(imgData, "JPEG", 0, position, imgWidth, imgHeight); heightLeft -= pdfHeight }
-      pdf.save(`Invoice-${invoiceData?.invoice_number}.pdf`)
-    } catch (error) { console.error("PDF generation failed:", error); setError("Failed to generate PDF. Please try again.") } finally { setIsDownloading(false) }
+      const token = getToken()
+      const response = await axiosInstance.get(`/invoices/${id}/pdf?download=true`, {
+        headers: { Authorization: `Bearer ${token}` },
+        responseType: "blob",
+      })
+      const url = URL.createObjectURL(response.data)
+      const a = document.createElement("a")
+      a.href = url
+      a.download = `Invoice-${invoiceData.invoice_number}.pdf`
+      document.body.appendChild(a)
+      a.click()
+      a.remove()
+      URL.revokeObjectURL(url)
+    } catch (error) { console.error("PDF download failed:", error); setError("Failed to generate PDF. Please try again.") } finally { setIsDownloading(false) }
   }
 
   const handleShareWhatsApp = async () => {
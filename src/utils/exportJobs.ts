@@ -0,0 +1,52 @@
+import axiosInstance from "./axiosConfig.ts"
+import { getToken } from "./auth.ts"
+
+export interface ExportJob {
+  id: string
+  status: "queued" | "running" | "succeeded" | "failed"
+  progress: number | null
+  error: string | null
+  cached?: boolean
+}
+
+const POLL_INTERVAL_MS = 1500
+
+const authHeaders = () => ({ Authorization: `Bearer ${getToken()}` })
+
+// Run an /exports job for the entity's current sort/search/filters, wait for it and save the file.
+// A repeated export of unchanged data comes back finished (cached) on the first response.
+export const runExportJob = async (
+  entity: string,
+  params: Record<string, any>,
+  format: "csv" | "xlsx" = "csv",
+  onProgress?: (progress: number | null) => void,
+) => {
+  let { data: job } = await axiosInstance.post<ExportJob>(
+    "/exports",
+    { entity, format, params },
+    { headers: authHeaders() },
+  )
+
+  while (job.status === "queued" || job.status === "running") {
+    onProgress?.(job.progress)
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS))
+    job = (await axiosInstance.get<ExportJob>(`/exports/${job.id}`, { headers: authHeaders() })).data
+  }
+  if (job.status === "failed") {
+    throw new Error(job.error || "Export failed")
+  }
+
+  const res = await axiosInstance.get(`/exports/${job.id}/download`, {
+    headers: authHeaders(),
+    responseType: "blob",
+    timeout: 0,
+  })
+  const url = URL.createObjectURL(res.data)
+  const a = document.createElement("a")
+  a.href = url
+  a.download = `${entity}-export.${format}`
+  document.body.appendChild(a)
+  a.click()
+  a.remove()
+  URL.revokeObjectURL(url)
+}